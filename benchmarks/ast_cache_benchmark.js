@@ -0,0 +1,27 @@
+// Repeated execution of the same snippet with and without the AST cache.
+// Usage: node benchmarks/ast_cache_benchmark.js
+const fs = require('fs');
+const path = require('path');
+const { ROOT, loadInterpreter, measureAsync, report } = require('./bench_utils');
+
+const { PythonInterpreter } = loadInterpreter();
+const source = fs.readFileSync(path.join(ROOT, 'comprehensive_test.py'), 'utf8');
+const snippet = 'total = 0\nfor i in range(10):\n    total += i\n';
+
+async function run(interpreter, code, times) {
+    for (let i = 0; i < times; i++) await interpreter.executeCode(code);
+}
+
+(async () => {
+    console.log('AST cache benchmark\n');
+    for (const [label, code, times] of [['comprehensive_test.py', source, 20], ['small snippet', snippet, 500]]) {
+        const cached = new PythonInterpreter();
+        const uncached = new PythonInterpreter({ astCacheEntries: 0 });
+
+        let timing = await measureAsync(() => run(uncached, code, times), { iterations: 3 });
+        report(`${label} x${times}, cache disabled`, timing);
+        timing = await measureAsync(() => run(cached, code, times), { iterations: 3 });
+        const stats = cached.getASTCacheStats();
+        report(`${label} x${times}, cache enabled`, timing, `${stats.hits} hits / ${stats.misses} misses`);
+    }
+})();
@@ -0,0 +1,55 @@
+// Attribute reads and method calls at hot sites, with inline caches switched on and off.
+// Usage: node benchmarks/attribute_benchmark.js
+const { loadInterpreter, measure, report } = require('./bench_utils');
+
+const { PythonInterpreter } = loadInterpreter();
+
+const handler = [
+    'class Handler:',
+    '    def __init__(self):',
+    '        self.written = 0',
+    '        self.limit = 10 ** 9',
+    '    def write_data(self, n):',
+    '        if self.written + n < self.limit:',
+    '            self.written += n',
+    '        return self.written',
+    'class LoudHandler(Handler):',
+    '    def write_data(self, n):',
+    '        self.written += 2 * n',
+    '        return self.written'
+].join('\n');
+
+const programs = {
+    'method calls on one class (500k)': [
+        handler,
+        'h = Handler()',
+        'for i in range(500000):',
+        '    h.write_data(i)'
+    ].join('\n'),
+    'attribute reads (500k x 3)': [
+        handler,
+        'h = Handler()',
+        'total = 0',
+        'for i in range(500000):',
+        '    total += h.written + h.limit + h.written'
+    ].join('\n'),
+    'polymorphic site, 2 classes (500k)': [
+        handler,
+        'handlers = [Handler(), LoudHandler()]',
+        'for i in range(500000):',
+        '    handlers[i % 2].write_data(1)'
+    ].join('\n')
+};
+
+console.log('Attribute benchmark\n');
+for (const engine of ['closure', 'vm']) {
+    for (const [label, code] of Object.entries(programs)) {
+        for (const inlineCaches of [true, false]) {
+            const interpreter = new PythonInterpreter({ engine, inlineCaches });
+            const timing = measure(() => interpreter.executeCodeSync(code), { iterations: 5 });
+            const stats = interpreter.getInlineCacheStats();
+            const extra = inlineCaches ? `hit rate ${(stats.hitRate * 100).toFixed(1)}%` : '';
+            report(`${label} [${engine}, ${inlineCaches ? 'cached' : 'uncached'}]`, timing, extra);
+        }
+    }
+}
@@ -0,0 +1,57 @@
+// Shared helpers for the node benchmark scripts in this directory.
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync } = require('child_process');
+const { performance } = require('perf_hooks');
+
+const ROOT = path.resolve(__dirname, '..');
+
+// With a git revision, loads python_interpreter.js as it was at that revision.
+function loadInterpreter(revision = null) {
+    if (!revision) {
+        return require(path.join(ROOT, 'python_interpreter.js'));
+    }
+    const source = execFileSync('git', ['show', `${revision}:python_interpreter.js`], { cwd: ROOT, encoding: 'utf8' });
+    const file = path.join(os.tmpdir(), `python_interpreter.${revision.replace(/[^\w.-]/g, '_')}.js`);
+    fs.writeFileSync(file, source);
+    return require(file);
+}
+
+function optionValue(name) {
+    const index = process.argv.indexOf(name);
+    return index === -1 ? null : process.argv[index + 1];
+}
+
+function measure(fn, { iterations = 5, warmup = 1 } = {}) {
+    for (let i = 0; i < warmup; i++) fn();
+    const samples = [];
+    let result;
+    for (let i = 0; i < iterations; i++) {
+        const start = performance.now();
+        result = fn();
+        samples.push(performance.now() - start);
+    }
+    samples.sort((a, b) => a - b);
+    return { best: samples[0], median: samples[Math.floor(samples.length / 2)], result };
+}
+
+async function measureAsync(fn, { iterations = 5, warmup = 1 } = {}) {
+    for (let i = 0; i < warmup; i++) await fn();
+    const samples = [];
+    let result;
+    for (let i = 0; i < iterations; i++) {
+        const start = performance.now();
+        result = await fn();
+        samples.push(performance.now() - start);
+    }
+    samples.sort((a, b) => a - b);
+    return { best: samples[0], median: samples[Math.floor(samples.length / 2)], result };
+}
+
+function report(label, timing, extra = '') {
+    const ms = timing.median.toFixed(2).padStart(10);
+    console.log(`${label.padEnd(44)} ${ms} ms${extra ? '  ' + extra : ''}`);
+}
+
+module.exports = { ROOT, loadInterpreter, optionValue, measure, measureAsync, report };
@@ -0,0 +1,77 @@
+// Function call overhead: recursive calls, default arguments, method calls and keyword calls,
+// with the bytes allocated per call. The allocation figure needs a young generation large enough
+// that no scavenge runs during one execution.
+// Usage: node --expose-gc --min-semi-space-size=256 --max-semi-space-size=256 benchmarks/call_benchmark.js [--baseline <git-revision>]
+const { loadInterpreter, optionValue, measure, report } = require('./bench_utils');
+
+const baseline = optionValue('--baseline');
+const engines = [['current', loadInterpreter().PythonInterpreter]];
+if (baseline) engines.push([baseline, loadInterpreter(baseline).PythonInterpreter]);
+
+// Each program makes roughly `calls` calls per execution.
+const programs = {
+    'fib(25)': {
+        calls: 242785,
+        code: [
+            'def fib(n):',
+            '    if n < 2:',
+            '        return n',
+            '    return fib(n - 1) + fib(n - 2)',
+            'fib(25)'
+        ].join('\n')
+    },
+    'default arguments (200k)': {
+        calls: 200000,
+        code: [
+            'def scale(value, factor=2, offset=1):',
+            '    return value * factor + offset',
+            'total = 0',
+            'for i in range(200000):',
+            '    total += scale(i)'
+        ].join('\n')
+    },
+    'method calls (200k)': {
+        calls: 200000,
+        code: [
+            'class Counter:',
+            '    def __init__(self):',
+            '        self.count = 0',
+            '    def add(self, n):',
+            '        self.count += n',
+            '        return self.count',
+            'c = Counter()',
+            'for i in range(200000):',
+            '    c.add(i)'
+        ].join('\n')
+    },
+    'keyword arguments (200k)': {
+        calls: 200000,
+        code: [
+            'def scale(value, factor=2, offset=1):',
+            '    return value * factor + offset',
+            'total = 0',
+            'for i in range(200000):',
+            '    total += scale(i, offset=3)'
+        ].join('\n')
+    }
+};
+
+function bytesPerCall(fn, calls) {
+    if (!global.gc) return '';
+    global.gc();
+    const before = process.memoryUsage().heapUsed;
+    fn();
+    return `${((process.memoryUsage().heapUsed - before) / calls).toFixed(1)} bytes/call`;
+}
+
+console.log('Call benchmark\n');
+for (const engine of ['closure', 'vm']) {
+    for (const [label, { calls, code }] of Object.entries(programs)) {
+        for (const [name, PythonInterpreter] of engines) {
+            const interpreter = new PythonInterpreter({ engine });
+            const timing = measure(() => interpreter.executeCodeSync(code), { iterations: 5 });
+            const allocated = bytesPerCall(() => interpreter.executeCodeSync(code), calls);
+            report(`${label} [${engine}${engines.length > 1 ? ', ' + name : ''}]`, timing, allocated);
+        }
+    }
+}
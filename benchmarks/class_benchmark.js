@@ -0,0 +1,71 @@
+// Instance creation and method calls on user classes, with the heap growth of each run.
+// Usage: node --expose-gc benchmarks/class_benchmark.js [--baseline <git-revision>]
+const { loadInterpreter, optionValue, measure, report } = require('./bench_utils');
+
+const baseline = optionValue('--baseline');
+const engines = [['current', loadInterpreter().PythonInterpreter]];
+if (baseline) engines.push([baseline, loadInterpreter(baseline).PythonInterpreter]);
+
+const record = [
+    'class Record:',
+    '    def __init__(self, key, value):',
+    '        self.key = key',
+    '        self.value = value',
+    '    def total(self):',
+    '        return self.key + self.value',
+    '    def scaled(self, factor):',
+    '        return self.value * factor',
+    '    def label(self):',
+    '        return "r" + str(self.key)',
+    '    def is_even(self):',
+    '        return self.key % 2 == 0',
+    '    def swap(self):',
+    '        return Record(self.value, self.key)',
+    'class Slotted:',
+    '    __slots__ = ("key", "value")',
+    '    def __init__(self, key, value):',
+    '        self.key = key',
+    '        self.value = value',
+    '    def total(self):',
+    '        return self.key + self.value'
+].join('\n');
+
+const programs = {
+    'create 100k records (5 methods)': `${record}\nrecords = [Record(i, i) for i in range(100000)]`,
+    'create 100k __slots__ records': `${record}\nrecords = [Slotted(i, i) for i in range(100000)]`,
+    'method calls on 10k records x 20': [
+        record,
+        'records = [Record(i, i) for i in range(10000)]',
+        'total = 0',
+        'for n in range(20):',
+        '    for r in records:',
+        '        total += r.total() + r.scaled(2)'
+    ].join('\n'),
+    'bound method reuse (200k)': [
+        record,
+        'r = Record(1, 2)',
+        'total = 0',
+        'for n in range(200000):',
+        '    f = r.total',
+        '    total += f()'
+    ].join('\n')
+};
+
+function heapGrowth(fn) {
+    if (global.gc) global.gc();
+    const before = process.memoryUsage().heapUsed;
+    fn();
+    return (process.memoryUsage().heapUsed - before) / (1024 * 1024);
+}
+
+console.log('Class benchmark\n');
+for (const engine of ['closure', 'vm']) {
+    for (const [label, code] of Object.entries(programs)) {
+        for (const [name, PythonInterpreter] of engines) {
+            const interpreter = new PythonInterpreter({ engine });
+            const timing = measure(() => interpreter.executeCodeSync(code), { iterations: 3 });
+            const heap = heapGrowth(() => interpreter.executeCodeSync(code));
+            report(`${label} [${engine}${engines.length > 1 ? ', ' + name : ''}]`, timing, `heap +${heap.toFixed(1)} MB`);
+        }
+    }
+}
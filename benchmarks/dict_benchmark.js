@@ -0,0 +1,51 @@
+// Insert, lookup, delete, iteration and bulk update on dicts of 1e5 and 1e6 entries.
+// Usage: node benchmarks/dict_benchmark.js [--baseline <git-revision>]
+const { loadInterpreter, optionValue, measure, report } = require('./bench_utils');
+
+const baseline = optionValue('--baseline');
+const engines = [['current', loadInterpreter().PythonInterpreter]];
+if (baseline) engines.push([baseline, loadInterpreter(baseline).PythonInterpreter]);
+
+const programs = (n) => ({
+    [`insert ${n} int keys`]: [
+        'd = {}',
+        `for i in range(${n}):`,
+        '    d[i] = i'
+    ].join('\n'),
+    [`lookup ${n} str keys`]: [
+        `keys = [str(i) for i in range(${n})]`,
+        'd = {k: 1 for k in keys}',
+        'total = 0',
+        'for k in keys:',
+        '    total += d[k]'
+    ].join('\n'),
+    [`insert/delete churn ${n}`]: [
+        'd = {}',
+        `for i in range(${n}):`,
+        '    d[i] = i',
+        '    if i >= 100:',
+        '        del d[i - 100]'
+    ].join('\n'),
+    [`items() over ${n}`]: [
+        `d = {i: i for i in range(${n})}`,
+        'total = 0',
+        'for k, v in d.items():',
+        '    total += v'
+    ].join('\n'),
+    [`update() with ${n} entries`]: [
+        `src = {i: i for i in range(${n})}`,
+        'd = {}',
+        'd.update(src)'
+    ].join('\n')
+});
+
+console.log('Dict benchmark\n');
+for (const n of [100000, 1000000]) {
+    for (const [label, code] of Object.entries(programs(n))) {
+        for (const [name, PythonInterpreter] of engines) {
+            const interpreter = new PythonInterpreter();
+            const timing = measure(() => interpreter.executeCodeSync(code), { iterations: 3 });
+            report(engines.length > 1 ? `${label} [${name}]` : label, timing);
+        }
+    }
+}
@@ -0,0 +1,50 @@
+// Generator expressions and generator functions feeding reducers, with the heap growth of each run.
+// Usage: node --expose-gc benchmarks/generator_benchmark.js [--baseline <git-revision>]
+const { loadInterpreter, optionValue, measure, report } = require('./bench_utils');
+
+const baseline = optionValue('--baseline');
+const engines = [['current', loadInterpreter().PythonInterpreter]];
+if (baseline) engines.push([baseline, loadInterpreter(baseline).PythonInterpreter]);
+
+const programs = {
+    'sum(genexpr) over 1M': 'total = sum(x * 2 for x in range(1000000))',
+    'any(genexpr) stopping early': 'found = any(x > 10 for x in range(1000000))',
+    'max(genexpr) with filter (500k)': 'best = max(x % 1013 for x in range(500000) if x % 3 == 0)',
+    'generator function pipeline (200k)': [
+        'def numbers(n):',
+        '    i = 0',
+        '    while i < n:',
+        '        yield i',
+        '        i += 1',
+        'def evens(items):',
+        '    for item in items:',
+        '        if item % 2 == 0:',
+        '            yield item',
+        'total = 0',
+        'for value in evens(numbers(200000)):',
+        '    total += value'
+    ].join('\n')
+};
+
+function heapGrowth(fn) {
+    if (global.gc) global.gc();
+    const before = process.memoryUsage().heapUsed;
+    fn();
+    return (process.memoryUsage().heapUsed - before) / (1024 * 1024);
+}
+
+console.log('Generator benchmark\n');
+for (const [label, code] of Object.entries(programs)) {
+    for (const [name, PythonInterpreter] of engines) {
+        const interpreter = new PythonInterpreter();
+        let timing;
+        try {
+            timing = measure(() => interpreter.executeCodeSync(code), { iterations: 5 });
+        } catch (error) {
+            console.log(`${label} [${name}]`.padEnd(44), `failed: ${error.message}`);
+            continue;
+        }
+        const heap = heapGrowth(() => interpreter.executeCodeSync(code));
+        report(engines.length > 1 ? `${label} [${name}]` : label, timing, `heap +${heap.toFixed(1)} MB`);
+    }
+}
@@ -0,0 +1,68 @@
+// Small-int arithmetic, which must stay as fast as plain doubles, and BigInt-promoted arithmetic.
+// Usage: node benchmarks/int_benchmark.js [--baseline <git-revision>]
+const { loadInterpreter, optionValue, measure, report } = require('./bench_utils');
+
+const baseline = optionValue('--baseline');
+const engines = [['current', loadInterpreter().PythonInterpreter]];
+if (baseline) engines.push([baseline, loadInterpreter(baseline).PythonInterpreter]);
+
+const smallInt = {
+    'add/sub loop (1M)': [
+        'total = 0',
+        'for i in range(1000000):',
+        '    total = total + i - 3'
+    ].join('\n'),
+    'mul/mod hash (500k)': [
+        'h = 17',
+        'for i in range(500000):',
+        '    h = (h * 31 + i) % 1000003'
+    ].join('\n'),
+    'floor division and shifts (500k)': [
+        'total = 0',
+        'for i in range(500000):',
+        '    total += (i // 7) + (i >> 2) + (i & 255)'
+    ].join('\n'),
+    'fib(22)': [
+        'def fib(n):',
+        '    if n < 2:',
+        '        return n',
+        '    return fib(n - 1) + fib(n - 2)',
+        'fib(22)'
+    ].join('\n')
+};
+
+const bigInt = {
+    'factorial(2000) by loop': [
+        'total = 1',
+        'for i in range(1, 2001):',
+        '    total *= i'
+    ].join('\n'),
+    'pow(3, 10**6 + 1, 2**127 - 1) x1k': [
+        'm = 2**127 - 1',
+        'for i in range(1000):',
+        '    r = pow(3, 1000001 + i, m)'
+    ].join('\n'),
+    'fibonacci(5000) iteratively': [
+        'a, b = 0, 1',
+        'for i in range(5000):',
+        '    a, b = b, a + b'
+    ].join('\n')
+};
+
+console.log('Int benchmark\n');
+for (const engine of ['closure', 'vm']) {
+    for (const [label, code] of Object.entries(smallInt)) {
+        for (const [name, PythonInterpreter] of engines) {
+            const interpreter = new PythonInterpreter({ engine });
+            const timing = measure(() => interpreter.executeCodeSync(code), { iterations: 5 });
+            report(`${label} [${engine}${engines.length > 1 ? ', ' + name : ''}]`, timing);
+        }
+    }
+}
+console.log('');
+const [, PythonInterpreter] = engines[0];
+for (const [label, code] of Object.entries(bigInt)) {
+    const interpreter = new PythonInterpreter();
+    const timing = measure(() => interpreter.executeCodeSync(code), { iterations: 3 });
+    report(label, timing);
+}
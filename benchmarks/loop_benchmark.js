@@ -0,0 +1,67 @@
+// Interpreter throughput on tight loops, arithmetic and calls.
+// Usage: node benchmarks/loop_benchmark.js [--baseline <git-revision>]
+const { loadInterpreter, optionValue, measureAsync, report } = require('./bench_utils');
+
+const baseline = optionValue('--baseline');
+const engines = [['current', loadInterpreter().PythonInterpreter]];
+if (baseline) engines.push([baseline, loadInterpreter(baseline).PythonInterpreter]);
+
+const programs = {
+    'arithmetic loop (200k iterations)': [
+        'total = 0',
+        'i = 0',
+        'while i < 200000:',
+        '    total = total + i * 2 - 1',
+        '    i += 1'
+    ].join('\n'),
+    'for loop over range (200k)': [
+        'total = 0',
+        'for i in range(200000):',
+        '    if i % 3 == 0:',
+        '        total += i'
+    ].join('\n'),
+    'function calls (50k)': [
+        'def add(a, b):',
+        '    return a + b',
+        'total = 0',
+        'for i in range(50000):',
+        '    total = add(total, i)'
+    ].join('\n'),
+    'function-local loop (200k)': [
+        'def run(n):',
+        '    total = 0',
+        '    i = 0',
+        '    while i < n:',
+        '        total = total + i * 2 - 1',
+        '        i += 1',
+        '    return total',
+        'run(200000)'
+    ].join('\n'),
+    'closure counter (100k)': [
+        'def make():',
+        '    count = 0',
+        '    def bump():',
+        '        nonlocal count',
+        '        count += 1',
+        '    return bump',
+        'bump = make()',
+        'for i in range(100000):',
+        '    bump()'
+    ].join('\n'),
+    'f-string formatting (50k)': [
+        'for i in range(50000):',
+        '    line = f"row {i}: {i * 2} items"'
+    ].join('\n'),
+    'list comprehension (100k)': 'squares = [x * x for x in range(100000) if x % 2 == 0]'
+};
+
+(async () => {
+    console.log('Loop benchmark\n');
+    for (const [label, code] of Object.entries(programs)) {
+        for (const [name, PythonInterpreter] of engines) {
+            const interpreter = new PythonInterpreter();
+            const timing = await measureAsync(() => interpreter.executeCode(code), { iterations: 5 });
+            report(engines.length > 1 ? `${label} [${name}]` : label, timing);
+        }
+    }
+})();
@@ -0,0 +1,50 @@
+// Constant folding and dead-branch pruning, with the optimizer switched on and off.
+// Usage: node benchmarks/optimizer_benchmark.js
+const { loadInterpreter, measure, report } = require('./bench_utils');
+
+const { PythonInterpreter } = loadInterpreter();
+
+const programs = {
+    'folded literal arithmetic (200k)': [
+        'total = 0',
+        'for i in range(200000):',
+        '    total += i % (60 * 60 * 24) + 2 ** 10 - (3 * 4)'
+    ].join('\n'),
+    'constant flag branches (200k)': [
+        'DEBUG = False',
+        'VERBOSE = 0',
+        'total = 0',
+        'for i in range(200000):',
+        '    if DEBUG:',
+        '        print("iteration", i)',
+        '    elif VERBOSE > 1:',
+        '        print(i)',
+        '    total += 1'
+    ].join('\n'),
+    'membership in literal containers (100k)': [
+        'def classify(n):',
+        '    if n % 10 in [1, 3, 5, 7, 9]:',
+        '        return "odd"',
+        '    if n % 10 in {0, 2, 4}:',
+        '        return "low"',
+        '    return "high"',
+        'counts = {}',
+        'for i in range(100000):',
+        '    kind = classify(i)',
+        '    counts[kind] = counts.get(kind, 0) + 1'
+    ].join('\n'),
+    'string concatenation (100k)': [
+        'parts = []',
+        'for i in range(100000):',
+        '    parts.append("prefix" + "-" + "suffix")'
+    ].join('\n')
+};
+
+console.log('Optimizer benchmark\n');
+for (const [label, code] of Object.entries(programs)) {
+    for (const optimize of [true, false]) {
+        const interpreter = new PythonInterpreter({ optimize });
+        const timing = measure(() => interpreter.executeCodeSync(code), { iterations: 5 });
+        report(`${label} [${optimize ? 'optimized' : 'plain'}]`, timing);
+    }
+}
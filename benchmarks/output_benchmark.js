@@ -0,0 +1,36 @@
+// Print-heavy scripts: output kept for the result versus streamed to a sink in batches, with the
+// number of sink calls and the amount of output kept for the result.
+// Usage: node benchmarks/output_benchmark.js [--baseline <git-revision>]
+const { loadInterpreter, optionValue, measureAsync, report } = require('./bench_utils');
+
+const baseline = optionValue('--baseline');
+const code = [
+    'line = "x" * 99',
+    'for k in range(200000):',
+    '    print(k, line)'
+].join('\n');
+
+const configurations = [
+    ['retained, no sink', {}],
+    ['sink, batches of 1 KB', { outputBatchSize: 1024, maxOutput: 1 << 20 }],
+    ['sink, batches of 8 KB', { maxOutput: 1 << 20 }],
+    ['sink, batches of 64 KB', { outputBatchSize: 1 << 16, maxOutput: 1 << 20 }]
+];
+
+(async () => {
+    console.log('Output benchmark (20 MB printed)\n');
+    if (baseline) {
+        const { PythonInterpreter } = loadInterpreter(baseline);
+        const interpreter = new PythonInterpreter();
+        report(`retained, no sink [${baseline}]`, await measureAsync(() => interpreter.executeCode(code), { iterations: 3 }));
+    }
+    const { PythonInterpreter } = loadInterpreter();
+    for (const [label, options] of configurations) {
+        let chunks = 0;
+        const sink = label.startsWith('sink') ? () => { chunks++; } : undefined;
+        const interpreter = new PythonInterpreter({ ...options, onStdout: sink });
+        const timing = await measureAsync(() => interpreter.executeCode(code), { iterations: 3 });
+        const retained = interpreter.stdout.retainedSize / (1024 * 1024);
+        report(label, timing, `${chunks / 4} chunks/run, ${retained.toFixed(1)} MB kept`);
+    }
+})();
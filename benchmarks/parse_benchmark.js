@@ -0,0 +1,47 @@
+// Parser throughput: repo test scripts and the bundled python_stdlib modules.
+// Usage: node benchmarks/parse_benchmark.js
+const fs = require('fs');
+const path = require('path');
+const { ROOT, loadInterpreter, measure, report } = require('./bench_utils');
+
+const { PythonInterpreter } = loadInterpreter();
+const interpreter = new PythonInterpreter();
+
+function countNodes(node) {
+    if (Array.isArray(node)) return node.reduce((total, child) => total + countNodes(child), 0);
+    if (!node || typeof node !== 'object') return 0;
+    let total = node.type ? 1 : 0;
+    for (const key in node) total += countNodes(node[key]);
+    return total;
+}
+
+console.log('Parser benchmark\n');
+
+for (const name of ['comprehensive_test.py', 'file_io_test.py']) {
+    const source = fs.readFileSync(path.join(ROOT, name), 'utf8');
+    const timing = measure(() => interpreter.parseStatements(source), { iterations: 20, warmup: 3 });
+    report(`parse ${name}`, timing, `${countNodes(timing.result)} nodes`);
+}
+
+const stdlibDir = path.join(ROOT, 'python_stdlib');
+const corpus = [];
+const failures = [];
+for (const file of fs.readdirSync(stdlibDir).filter(name => name.endsWith('.py'))) {
+    const source = fs.readFileSync(path.join(stdlibDir, file), 'utf8');
+    try {
+        interpreter.parseStatements(source);
+        corpus.push(source);
+    } catch (error) {
+        failures.push(`${file}: ${error.message}`);
+    }
+}
+
+const bytes = corpus.reduce((total, source) => total + source.length, 0);
+const timing = measure(() => corpus.map(source => interpreter.parseStatements(source)), { iterations: 5 });
+const mbPerSecond = (bytes / (1024 * 1024)) / (timing.median / 1000);
+report(`parse python_stdlib (${corpus.length} modules)`, timing, `${(bytes / 1024).toFixed(0)} KB, ${mbPerSecond.toFixed(1)} MB/s`);
+
+if (failures.length > 0) {
+    console.log(`\nSkipped ${failures.length} modules that use unsupported syntax:`);
+    for (const failure of failures) console.log(`  ${failure}`);
+}
@@ -0,0 +1,45 @@
+// Cost of the deterministic profiler: the same programs with profiling off and on.
+// Usage: node benchmarks/profiler_benchmark.js [--baseline <git-revision>]
+const { loadInterpreter, optionValue, measure, report } = require('./bench_utils');
+
+const baseline = optionValue('--baseline');
+const engines = [['current', loadInterpreter().PythonInterpreter]];
+if (baseline) engines.push([baseline, loadInterpreter(baseline).PythonInterpreter]);
+
+const programs = {
+    'fib(22)': [
+        'def fib(n):',
+        '    if n < 2:',
+        '        return n',
+        '    return fib(n - 1) + fib(n - 2)',
+        'fib(22)'
+    ].join('\n'),
+    'loop (300k)': [
+        'total = 0',
+        'for i in range(300000):',
+        '    total += i % 7'
+    ].join('\n'),
+    'method calls (100k)': [
+        'class Counter:',
+        '    def __init__(self):',
+        '        self.count = 0',
+        '    def add(self, n):',
+        '        self.count += n',
+        'c = Counter()',
+        'for i in range(100000):',
+        '    c.add(i)'
+    ].join('\n')
+};
+
+console.log('Profiler benchmark\n');
+for (const [label, code] of Object.entries(programs)) {
+    for (const [name, PythonInterpreter] of engines) {
+        const interpreter = new PythonInterpreter();
+        const suffix = engines.length > 1 ? ` [${name}]` : '';
+        report(`${label}, profiler off${suffix}`, measure(() => interpreter.executeCodeSync(code)));
+        if (!interpreter.startProfiling) continue;
+        interpreter.startProfiling();
+        report(`${label}, profiler on${suffix}`, measure(() => interpreter.executeCodeSync(code)));
+        interpreter.stopProfiling();
+    }
+}
@@ -0,0 +1,41 @@
+// Module front-end cost: parsing .py source vs loading a .pyast.json artifact.
+// Usage: node benchmarks/pyast_benchmark.js
+const fs = require('fs');
+const path = require('path');
+const { ROOT, loadInterpreter, measure, report } = require('./bench_utils');
+
+const { PythonInterpreter } = loadInterpreter();
+const interpreter = new PythonInterpreter({ astCacheEntries: 0 });
+
+const stdlibDir = path.join(ROOT, 'python_stdlib');
+const modules = [];
+for (const file of fs.readdirSync(stdlibDir).filter(name => name.endsWith('.py'))) {
+    const source = fs.readFileSync(path.join(stdlibDir, file), 'utf8');
+    try {
+        modules.push({ source, artifact: interpreter.serializeAST(source) });
+    } catch (error) {
+        // Modules with unsupported syntax have no artifact.
+    }
+}
+
+const sourceBytes = modules.reduce((total, m) => total + m.source.length, 0);
+const artifactBytes = modules.reduce((total, m) => total + m.artifact.length, 0);
+console.log('AST artifact benchmark');
+console.log(`  ${modules.length} python_stdlib modules, ${(sourceBytes / 1024).toFixed(0)} KB source, ${(artifactBytes / 1024).toFixed(0)} KB artifacts\n`);
+
+let timing = measure(() => modules.map(m => interpreter.parseStatements(m.source)), { iterations: 5 });
+report('parse all modules from source', timing);
+timing = measure(() => modules.map(m => interpreter.deserializeAST(m.artifact)), { iterations: 5 });
+report('load all modules from artifacts', timing);
+
+// Startup for a fresh interpreter importing a py_files module through loadModule().
+const sourceName = 'py_files/data_handler';
+const files = new Map([[`${sourceName}.py`, fs.readFileSync(path.join(ROOT, `${sourceName}.py`), 'utf8')]]);
+files.set(`${sourceName}.pyast.json`, interpreter.serializeAST(files.get(`${sourceName}.py`)));
+globalThis.fetch = async (url) => (files.has(url)
+    ? { ok: true, text: async () => files.get(url) }
+    : { ok: false, text: async () => '' });
+const artifactTiming = measure(() => interpreter.deserializeAST(files.get(`${sourceName}.pyast.json`)), { iterations: 20 });
+const parseTiming = measure(() => interpreter.parseStatements(files.get(`${sourceName}.py`)), { iterations: 20 });
+report('data_handler.py: parse', parseTiming);
+report('data_handler.py: artifact', artifactTiming);
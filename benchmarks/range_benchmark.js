@@ -0,0 +1,46 @@
+// Iteration, membership and len() on range objects, with the heap growth of each run.
+// Usage: node --expose-gc benchmarks/range_benchmark.js [--baseline <git-revision>]
+const { loadInterpreter, optionValue, measure, report } = require('./bench_utils');
+
+const baseline = optionValue('--baseline');
+const engines = [['current', loadInterpreter().PythonInterpreter]];
+if (baseline) engines.push([baseline, loadInterpreter(baseline).PythonInterpreter]);
+
+const programs = {
+    'for loop over range(2M)': [
+        'total = 0',
+        'for i in range(2000000):',
+        '    total += i'
+    ].join('\n'),
+    'membership in range(1M) (1k lookups)': [
+        'r = range(0, 1000000, 3)',
+        'hits = 0',
+        'for i in range(1000):',
+        '    if i * 997 in r:',
+        '        hits += 1'
+    ].join('\n'),
+    'len/index on range(1M) (10k)': [
+        'r = range(1000000)',
+        'total = 0',
+        'for i in range(10000):',
+        '    total += len(r) + r[i]'
+    ].join('\n'),
+    'sum(range(1M))': 'total = sum(range(1000000))'
+};
+
+function heapGrowth(fn) {
+    if (global.gc) global.gc();
+    const before = process.memoryUsage().heapUsed;
+    fn();
+    return (process.memoryUsage().heapUsed - before) / (1024 * 1024);
+}
+
+console.log('Range benchmark\n');
+for (const [label, code] of Object.entries(programs)) {
+    for (const [name, PythonInterpreter] of engines) {
+        const interpreter = new PythonInterpreter();
+        const timing = measure(() => interpreter.executeCodeSync(code), { iterations: 5 });
+        const heap = heapGrowth(() => interpreter.executeCodeSync(code));
+        report(engines.length > 1 ? `${label} [${name}]` : label, timing, `heap +${heap.toFixed(1)} MB`);
+    }
+}
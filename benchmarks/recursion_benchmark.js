@@ -0,0 +1,45 @@
+// Deep recursion: plain recursive functions and method chains at depths the JS stack cannot hold.
+// Usage: node benchmarks/recursion_benchmark.js [--baseline <git-revision>]
+const { loadInterpreter, optionValue, measure, report } = require('./bench_utils');
+
+const baseline = optionValue('--baseline');
+const engines = [['current', loadInterpreter().PythonInterpreter]];
+if (baseline) engines.push([baseline, loadInterpreter(baseline).PythonInterpreter]);
+
+const program = (depth) => [
+    'import sys',
+    "if hasattr(sys, 'setrecursionlimit'):",
+    `    sys.setrecursionlimit(${depth + 100})`,
+    'def count(n):',
+    '    if n == 0:',
+    '        return 0',
+    '    return count(n - 1) + 1',
+    'class Link:',
+    '    def __init__(self, rest):',
+    '        self.rest = rest',
+    '    def size(self):',
+    '        if self.rest is None:',
+    '            return 1',
+    '        return self.rest.size() + 1',
+    'chain = None',
+    `for i in range(${depth}):`,
+    '    chain = Link(chain)',
+    `assert count(${depth}) == ${depth}`,
+    `assert chain.size() == ${depth}`
+].join('\n');
+
+console.log('Recursion benchmark\n');
+for (const engine of ['closure', 'vm']) {
+    for (const depth of [1000, 10000, 100000]) {
+        for (const [name, PythonInterpreter] of engines) {
+            const label = `depth ${depth} [${engine}${engines.length > 1 ? ', ' + name : ''}]`;
+            const interpreter = new PythonInterpreter({ engine });
+            const code = program(depth);
+            try {
+                report(label, measure(() => interpreter.executeCodeSync(code), { iterations: 3 }));
+            } catch (error) {
+                console.log(`${label.padEnd(44)}     failed  ${error.message}`);
+            }
+        }
+    }
+}
@@ -0,0 +1,64 @@
+// Cost of the sampling profiler: the same programs unsampled and sampled every 1 ms and 0.1 ms,
+// with the number of samples taken in the last run.
+// Usage: node benchmarks/sampling_benchmark.js [--baseline <git-revision>]
+const { loadInterpreter, optionValue, measure, report } = require('./bench_utils');
+
+const baseline = optionValue('--baseline');
+const engines = [['current', loadInterpreter().PythonInterpreter]];
+if (baseline) engines.push([baseline, loadInterpreter(baseline).PythonInterpreter]);
+
+const programs = {
+    'fib(22)': [
+        'def fib(n):',
+        '    if n < 2:',
+        '        return n',
+        '    return fib(n - 1) + fib(n - 2)',
+        'fib(22)'
+    ].join('\n'),
+    'loop (300k)': [
+        'total = 0',
+        'for i in range(300000):',
+        '    total += i % 7'
+    ].join('\n'),
+    'method calls (100k)': [
+        'class Counter:',
+        '    def __init__(self):',
+        '        self.count = 0',
+        '    def add(self, n):',
+        '        self.count += n',
+        'c = Counter()',
+        'for i in range(100000):',
+        '    c.add(i)'
+    ].join('\n'),
+    'recursion at depth 900': [
+        'def down(n):',
+        '    if n == 0:',
+        '        total = 0',
+        '        for i in range(200000):',
+        '            total += i',
+        '        return total',
+        '    return down(n - 1)',
+        'down(900)'
+    ].join('\n')
+};
+
+console.log('Sampling benchmark\n');
+for (const engine of ['closure', 'vm']) {
+    for (const [label, code] of Object.entries(programs)) {
+        for (const [name, PythonInterpreter] of engines) {
+            const suffix = ` [${engine}${engines.length > 1 ? ', ' + name : ''}]`;
+            const interpreter = new PythonInterpreter({ engine });
+            report(`${label}, unsampled${suffix}`, measure(() => interpreter.executeCodeSync(code)));
+            if (!interpreter.startSampling) continue;
+            for (const interval of [1, 0.1]) {
+                let sampler = null;
+                const timing = measure(() => {
+                    sampler = interpreter.startSampling({ interval });
+                    interpreter.executeCodeSync(code);
+                    interpreter.stopSampling();
+                });
+                report(`${label}, every ${interval} ms${suffix}`, timing, `${sampler.samples.length} samples`);
+            }
+        }
+    }
+}
@@ -0,0 +1,42 @@
+// Deduplication of tuple records, set algebra and in-place updates.
+// Usage: node benchmarks/set_benchmark.js
+const { loadInterpreter, measure, report } = require('./bench_utils');
+
+const { PythonInterpreter } = loadInterpreter();
+
+const records = 'records = [(i % 50000, str(i % 50000)) for i in range(100000)]';
+const programs = {
+    'dedupe 100k tuple records (seen set)': [
+        records,
+        'seen = set()',
+        'unique = []',
+        'for record in records:',
+        '    if record not in seen:',
+        '        seen.add(record)',
+        '        unique.append(record)'
+    ].join('\n'),
+    'set(records) for 100k tuples': [records, 'unique = set(records)'].join('\n'),
+    'big & small (1M x 10), 1k times': [
+        'big = set(range(1000000))',
+        'small = set(range(0, 100, 10))',
+        'for i in range(1000):',
+        '    common = big & small',
+        '    common = small & big'
+    ].join('\n'),
+    'in-place |= and -= (100k), 10 times': [
+        'evens = set(range(0, 200000, 2))',
+        'odds = set(range(1, 200000, 2))',
+        'for i in range(10):',
+        '    acc = set()',
+        '    acc |= evens',
+        '    acc |= odds',
+        '    acc -= evens'
+    ].join('\n')
+};
+
+console.log('Set benchmark\n');
+for (const [label, code] of Object.entries(programs)) {
+    const interpreter = new PythonInterpreter();
+    const timing = measure(() => interpreter.executeCodeSync(code), { iterations: 3 });
+    report(label, timing);
+}
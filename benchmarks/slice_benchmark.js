@@ -0,0 +1,39 @@
+// Cost of step accounting and of yielding to the event loop every `sliceSteps` steps in the VM.
+// Usage: node benchmarks/slice_benchmark.js [--baseline <git-revision>]
+const { loadInterpreter, optionValue, measureAsync, report } = require('./bench_utils');
+
+const baseline = optionValue('--baseline');
+const code = [
+    'def fib(n):',
+    '    if n < 2:',
+    '        return n',
+    '    return fib(n - 1) + fib(n - 2)',
+    'total = 0',
+    'for i in range(300000):',
+    '    total += i',
+    'fib(22)'
+].join('\n');
+
+const configurations = [
+    ['no budget', {}],
+    ['maxSteps', { maxSteps: 1e9 }],
+    ['timeLimit', { timeLimit: 1e6 }],
+    ['sliceSteps 1000', { sliceSteps: 1000 }],
+    ['sliceSteps 10000', { sliceSteps: 10000 }],
+    ['sliceSteps 100000', { sliceSteps: 100000 }]
+];
+
+(async () => {
+    console.log('Slice benchmark\n');
+    if (baseline) {
+        const { PythonInterpreter } = loadInterpreter(baseline);
+        const interpreter = new PythonInterpreter({ engine: 'vm' });
+        report(`[${baseline}]`, await measureAsync(() => interpreter.executeCode(code), { iterations: 5 }));
+    }
+    const { PythonInterpreter } = loadInterpreter();
+    for (const [label, options] of configurations) {
+        const interpreter = new PythonInterpreter({ engine: 'vm', ...options });
+        const timing = await measureAsync(() => interpreter.executeCode(code), { iterations: 5 });
+        report(label, timing, `${interpreter.steps} steps`);
+    }
+})();
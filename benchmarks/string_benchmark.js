@@ -0,0 +1,49 @@
+// Report building with `s += line` in a loop, with and without reading the string back, and str.join.
+// Usage: node benchmarks/string_benchmark.js [--baseline <git-revision>]
+const { loadInterpreter, optionValue, measure, report } = require('./bench_utils');
+
+const baseline = optionValue('--baseline');
+const engines = [['current', loadInterpreter().PythonInterpreter]];
+if (baseline) engines.push([baseline, loadInterpreter(baseline).PythonInterpreter]);
+
+const programs = {
+    'append 300k lines': [
+        'def build(n):',
+        '    report = ""',
+        '    for i in range(n):',
+        '        report += "line " + str(i) + "\\n"',
+        '    return report',
+        'text = build(300000)'
+    ].join('\n'),
+    'append 40k lines, checking s[-1]': [
+        'def build(n):',
+        '    report = ""',
+        '    for i in range(n):',
+        '        if i and report[-1] != "\\n":',
+        '            report += "\\n"',
+        '        report += "line " + str(i)',
+        '    return report',
+        'text = build(40000)'
+    ].join('\n'),
+    'append 40k lines, checking len() and endswith()': [
+        'def build(n):',
+        '    report = ""',
+        '    for i in range(n):',
+        '        if len(report) > 0 and not report.endswith("\\n"):',
+        '            report += "\\n"',
+        '        report += "line " + str(i)',
+        '    return report',
+        'text = build(40000)'
+    ].join('\n'),
+    'join over a generator (300k)': 'text = "\\n".join("line " + str(i) for i in range(300000))',
+    'join over a list (300k)': 'lines = ["line " + str(i) for i in range(300000)]\ntext = "\\n".join(lines)'
+};
+
+console.log('String benchmark\n');
+for (const [label, code] of Object.entries(programs)) {
+    for (const [name, PythonInterpreter] of engines) {
+        const interpreter = new PythonInterpreter();
+        const timing = measure(() => interpreter.executeCodeSync(code), { iterations: 3 });
+        report(engines.length > 1 ? `${label} [${name}]` : label, timing);
+    }
+}
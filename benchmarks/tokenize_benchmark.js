@@ -0,0 +1,82 @@
+// Tokenizer throughput: comprehensive_test.py and a ~1 MB synthetic module.
+// Usage: node benchmarks/tokenize_benchmark.js
+const fs = require('fs');
+const path = require('path');
+const { ROOT, loadInterpreter, measure, report } = require('./bench_utils');
+
+const { PythonInterpreter } = loadInterpreter();
+
+// The previous per-position slice-and-match tokenizer, kept here for comparison.
+function legacyTokenize(code) {
+    const tokens = [];
+    const patterns = [
+        /^\s+/, /^#.*/, /^\d+\.?\d*/, /^["']([^"'\\]|\\.)*["']/, /^(""".*?"""|'''.*?''')/s,
+        /^[a-zA-Z_][a-zA-Z0-9_]*/,
+        /^(\*\*=|\*\*|\/\/=|\/\/|<<=|<<|>>=|>>|<=|>=|==|!=|<>|\+=|-=|\*=|\/=|%=|&=|\|=|\^=|&&|\|\||[+\-*\/%=<>&|^~!])/,
+        /^[(),\[\]{}:;.,]/
+    ];
+    let position = 0;
+    while (position < code.length) {
+        let matched = false;
+        for (const regex of patterns) {
+            const match = code.slice(position).match(regex);
+            if (match) {
+                tokens.push(match[0]);
+                position += match[0].length;
+                matched = true;
+                break;
+            }
+        }
+        if (!matched) position++;
+    }
+    return tokens;
+}
+
+function syntheticSource(targetBytes) {
+    const chunks = [];
+    let size = 0;
+    let n = 0;
+    while (size < targetBytes) {
+        const items = [];
+        for (let i = 0; i < 40; i++) items.push(`"key_${n}_${i}": [${i}, ${i * 2.5}, 'v${i}']`);
+        const chunk = [
+            `def handler_${n}(request, limit=10):`,
+            `    """Generated handler ${n}."""`,
+            `    table_${n} = {${items.join(', ')}}`,
+            `    total = 0`,
+            `    for key, value in table_${n}.items():`,
+            `        if value[0] % 3 == 0 and key != "skip":`,
+            `            total += value[1] * 0x10 - 1_000  # weighted`,
+            `    return f"handler {n}: {total:.2f}"`,
+            ``
+        ].join('\n') + '\n';
+        chunks.push(chunk);
+        size += chunk.length;
+        n++;
+    }
+    return chunks.join('');
+}
+
+const interpreter = new PythonInterpreter();
+const comprehensive = fs.readFileSync(path.join(ROOT, 'comprehensive_test.py'), 'utf8');
+const synthetic = syntheticSource(1024 * 1024);
+const longLine = 'data = [' + Array.from({ length: 20000 }, (_, i) => `${i}`).join(', ') + ']\n';
+
+console.log('Tokenizer benchmark');
+console.log(`  comprehensive_test.py: ${comprehensive.length} bytes`);
+console.log(`  synthetic module:      ${synthetic.length} bytes`);
+console.log(`  long literal line:     ${longLine.length} bytes\n`);
+
+let timing = measure(() => interpreter.tokenize(comprehensive), { iterations: 20, warmup: 3 });
+report('tokenize comprehensive_test.py', timing, `${timing.result.length} tokens`);
+timing = measure(() => legacyTokenize(comprehensive), { iterations: 5 });
+report('legacy tokenize comprehensive_test.py', timing, `${timing.result.length} tokens`);
+
+timing = measure(() => interpreter.tokenize(synthetic), { iterations: 5 });
+const mbPerSecond = (synthetic.length / (1024 * 1024)) / (timing.median / 1000);
+report('tokenize 1 MB synthetic module', timing, `${timing.result.length} tokens, ${mbPerSecond.toFixed(1)} MB/s`);
+
+timing = measure(() => interpreter.tokenize(longLine), { iterations: 10 });
+report('tokenize 20k-element literal line', timing, `${timing.result.length} tokens`);
+timing = measure(() => legacyTokenize(longLine), { iterations: 1, warmup: 0 });
+report('legacy tokenize 20k-element literal line', timing, `${timing.result.length} tokens`);
@@ -0,0 +1,84 @@
+// Loop- and call-heavy programs on the closure compiler and the bytecode VM.
+// Usage: node benchmarks/vm_benchmark.js
+// Each engine is timed in a process of its own: both engines share the interpreter's code, and
+// V8's type feedback from one would otherwise slow the other down.
+const { execFileSync } = require('child_process');
+const { loadInterpreter, optionValue, measure, report } = require('./bench_utils');
+
+const programs = {
+    'module-level while loop (200k)': [
+        'total = 0',
+        'i = 0',
+        'while i < 200000:',
+        '    total = total + i * 2 - 1',
+        '    i += 1'
+    ].join('\n'),
+    'function-local loop (500k)': [
+        'def run(n):',
+        '    total = 0',
+        '    i = 0',
+        '    while i < n:',
+        '        if i % 3 == 0:',
+        '            total = total + i',
+        '        i += 1',
+        '    return total',
+        'run(500000)'
+    ].join('\n'),
+    'nested for loops (300x300)': [
+        'def grid(n):',
+        '    count = 0',
+        '    for a in range(n):',
+        '        for b in range(n):',
+        '            if a < b:',
+        '                count += 1',
+        '    return count',
+        'grid(300)'
+    ].join('\n'),
+    'function calls (100k)': [
+        'def add(a, b):',
+        '    return a + b',
+        'def run(n):',
+        '    total = 0',
+        '    for i in range(n):',
+        '        total = add(total, i)',
+        '    return total',
+        'run(100000)'
+    ].join('\n'),
+    'recursive fib(25)': [
+        'def fib(n):',
+        '    if n < 2:',
+        '        return n',
+        '    return fib(n - 1) + fib(n - 2)',
+        'fib(25)'
+    ].join('\n'),
+    'method calls (50k)': [
+        'class Counter:',
+        '    def __init__(self):',
+        '        self.value = 0',
+        '    def bump(self, step):',
+        '        self.value = self.value + step',
+        'c = Counter()',
+        'for i in range(50000):',
+        '    c.bump(2)'
+    ].join('\n')
+};
+
+const engine = optionValue('--engine');
+if (engine) {
+    const { PythonInterpreter } = loadInterpreter();
+    const timings = {};
+    for (const [label, code] of Object.entries(programs)) {
+        const interpreter = new PythonInterpreter({ engine });
+        timings[label] = measure(() => interpreter.executeCodeSync(code), { iterations: 10, warmup: 3 });
+    }
+    console.log(JSON.stringify(timings));
+} else {
+    const run = (name) => JSON.parse(execFileSync(process.execPath, [__filename, '--engine', name], { encoding: 'utf8' }));
+    const closure = run('closure');
+    const vm = run('vm');
+    console.log('VM benchmark\n');
+    for (const label of Object.keys(programs)) {
+        report(`${label} [closure]`, closure[label]);
+        report(`${label} [vm]`, vm[label], `${(vm[label].median / closure[label].median).toFixed(2)}x closure`);
+    }
+}
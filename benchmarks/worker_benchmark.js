@@ -0,0 +1,29 @@
+// Throughput of independent scripts run one after another on the calling thread and on worker pools.
+// Usage: node benchmarks/worker_benchmark.js [--scripts <count>]
+const path = require('path');
+const { ROOT, loadInterpreter, optionValue, measureAsync, report } = require('./bench_utils');
+const { PythonWorkerPool } = require(path.join(ROOT, 'python_worker.js'));
+
+const scripts = Number(optionValue('--scripts') || 8);
+const code = [
+    'def fib(n):',
+    '    if n < 2:',
+    '        return n',
+    '    return fib(n - 1) + fib(n - 2)',
+    'print(fib(22))'
+].join('\n');
+
+(async () => {
+    console.log(`Worker benchmark (${scripts} scripts)\n`);
+    const { PythonInterpreter } = loadInterpreter();
+    const interpreter = new PythonInterpreter();
+    report('calling thread', await measureAsync(async () => {
+        for (let i = 0; i < scripts; i++) await interpreter.executeCode(code);
+    }, { iterations: 3 }));
+    for (const size of [1, 2, 4]) {
+        const pool = new PythonWorkerPool({ size });
+        const timing = await measureAsync(() => Promise.all(Array.from({ length: scripts }, () => pool.run(code))), { iterations: 3 });
+        report(`pool of ${size}`, timing);
+        pool.terminate();
+    }
+})();
@@ -39,6 +39,7 @@ def test_control_structures():
     print("For loop with range(5):")
     for i in range(5):
         print(f"  Iteration {i}")
+    print(f"Equal ranges: {range(3) == range(0, 3)} {range(0) == range(2, 2)} {len({range(1, 2, 5), range(1, 3, 7)})}")
     
     # While loop
     print("While loop countdown:")
@@ -165,6 +166,21 @@ def test_classes():
     for operation in calc.get_history():
         print(f"  {operation}")
     
+    # Attributes set on the class after it is defined reach its instances
+    Calculator.precision = 2
+    Calculator.subtract = lambda self, x, y: self.add(x, -y)
+    print(f"Class attributes added later: {calc.precision} {calc.subtract(10, 4)}")
+    
+    # A __slots__ field that was never assigned is missing, not None
+    class Point:
+        __slots__ = ('x', 'y')
+    point = Point()
+    point.x = 1
+    try:
+        print(point.y)
+    except AttributeError:
+        print(f"Unset slot: missing, hasattr={hasattr(point, 'y')}, MRO ends with object: {Point.__mro__[-1] is object}")
+    
     return True
 
 def test_built_in_functions():
@@ -230,6 +246,22 @@ def test_error_handling():
     except IndexError:
         print("Index out of range!")
     
+    try:
+        counts = {"a": 1}
+        for key in counts:
+            counts[key + "!"] = 0
+        print("Dictionary grew during iteration!")
+    except RuntimeError as e:
+        print(f"Dictionary iteration: {e}")
+    
+    try:
+        seen = {1, 2}
+        for item in seen:
+            seen.add(item * 10)
+        print("Set grew during iteration!")
+    except RuntimeError as e:
+        print(f"Set iteration: {e}")
+    
     return True
 
 def run_all_tests():
@@ -1,2545 +1,9443 @@
-class PythonInterpreter {
-    constructor() {
-        this.globals = {};
-        this.builtins = {};
-        this.stdlibPath = 'python_stdlib/';
-        this.modules = new Map();
-        this.executionLog = [];
-        this.functions = new Map();
-        this.classes = new Map();
-        this.importedModules = new Map();
-        this.scopeStack = [{}];
-        this.printOutput = [];
-        this.fileSystem = new Map();
-        this.currentDir = '/workspace';
-        this.openFiles = new Map();
-        this.initializeBuiltins();
-        this.initializeStandardTypes();
-        this.initializeFileSystem();
+// Sticky sub-patterns used by the tokenizer's first-character dispatch.
+// Each is applied in place with lastIndex, so the source is never sliced.
+const NUMBER_PATTERN = /(?:0[xX][0-9a-fA-F_]+|0[oO][0-7_]+|0[bB][01_]+|(?:\d[\d_]*\.?[\d_]*|\.\d[\d_]*)(?:[eE][+-]?\d[\d_]*)?)[jJ]?/y;
+const STRING_PATTERN = /(?:[rRbBuUfF]{1,2})?(?:"""(?:[^"\\]|\\[\s\S]|"(?!""))*"""|'''(?:[^'\\]|\\[\s\S]|'(?!''))*'''|"(?:[^"\\\r\n]|\\[\s\S])*"|'(?:[^'\\\r\n]|\\[\s\S])*')/y;
+const IDENTIFIER_PATTERN = /[\p{L}\p{Nl}_][\p{L}\p{Nl}\p{Mn}\p{Mc}\p{Nd}\p{Pc}]*/uy;
+const OPERATOR_PATTERN = /\*\*=|\/\/=|>>=|<<=|->|:=|\*\*|\/\/|<<|>>|<=|>=|==|!=|\+=|-=|\*=|\/=|%=|&=|\|=|\^=|@=|[+\-*\/%@=<>&|^~!]/y;
+
+// Character classes for the tokenizer, indexed by char code (ASCII only;
+// anything above 127 is tried as a unicode identifier).
+const CHAR_SPACE = 1;
+const CHAR_IDENT = 2;
+const CHAR_DIGIT = 3;
+const CHAR_QUOTE = 4;
+const CHAR_DELIMITER = 5;
+const CHAR_OPERATOR = 6;
+const CHAR_CLASS = new Uint8Array(128);
+for (const ch of ' \t\f') CHAR_CLASS[ch.charCodeAt(0)] = CHAR_SPACE;
+for (let c = 65; c <= 90; c++) CHAR_CLASS[c] = CHAR_CLASS[c + 32] = CHAR_IDENT;
+CHAR_CLASS[95] = CHAR_IDENT;
+for (let c = 48; c <= 57; c++) CHAR_CLASS[c] = CHAR_DIGIT;
+CHAR_CLASS[34] = CHAR_CLASS[39] = CHAR_QUOTE;
+for (const ch of '()[]{},:;.') CHAR_CLASS[ch.charCodeAt(0)] = CHAR_DELIMITER;
+for (const ch of '+-*/%@=<>&|^~!') CHAR_CLASS[ch.charCodeAt(0)] = CHAR_OPERATOR;
+
+const PYTHON_KEYWORDS = new Set([
+    'False', 'None', 'True', 'and', 'as', 'assert', 'async', 'await', 'break', 'class', 'continue',
+    'def', 'del', 'elif', 'else', 'except', 'finally', 'for', 'from', 'global', 'if', 'import',
+    'in', 'is', 'lambda', 'nonlocal', 'not', 'or', 'pass', 'raise', 'return', 'try', 'while',
+    'with', 'yield'
+]);
+const EXPRESSION_KEYWORDS = new Set(['False', 'None', 'True', 'not', 'lambda', 'await', 'yield']);
+const COMPARISON_OPERATORS = new Set(['<', '>', '<=', '>=', '==', '!=']);
+const AUGMENTED_OPERATORS = new Set(['+=', '-=', '*=', '/=', '//=', '%=', '**=', '&=', '|=', '^=', '<<=', '>>=', '@=']);
+
+const BREAK_SIGNAL = Object.freeze({ type: 'break' });
+const CONTINUE_SIGNAL = Object.freeze({ type: 'continue' });
+const NO_DEFAULT = Symbol('NO_DEFAULT');
+
+const BLOCK_KEYS = new Set(['body', 'elseBranch', 'finallyBranch']);
+const TERMINAL_STATEMENTS = new Set(['Return', 'Raise', 'Break', 'Continue']);
+const FOLDABLE_OPERATORS = new Set(['+', '-', '*', '/', '//', '%', '**', '<<', '>>', '&', '|', '^',
+    '<', '>', '<=', '>=', '==', '!=', 'in', 'not in']);
+const OUTER_SCOPE_KEYS = new Set(['decorators', 'params', 'bases', 'keywords']);
+const DYNAMIC_NAMESPACE_BUILTINS = ['globals', 'locals', 'vars', 'exec', 'eval'];
+const MAX_FOLDED_STRING_LENGTH = 4096;
+
+const DEFAULT_AST_CACHE_ENTRIES = 256;
+const DEFAULT_AST_CACHE_BYTES = 8 * 1024 * 1024;
+
+const AST_ARTIFACT_FORMAT = 'pyast';
+const AST_ARTIFACT_VERSION = 2;
+const AST_ARTIFACT_SUFFIX = '.pyast.json';
+const AST_STREAM_OFFSET = 0x30;
+const AST_STREAM_SHORT_LIMIT = 0x4000;
+const AST_TAG_NULL = 0;
+const AST_TAG_TRUE = 1;
+const AST_TAG_FALSE = 2;
+const AST_TAG_STRING = 3;
+const AST_TAG_NUMBER = 4;
+const AST_TAG_BIGINT = 5;
+const AST_TAG_LIST = 6;
+const AST_TAG_SHAPE_BASE = 8;
+
+// Bytecode for the 'vm' engine. Each instruction is an opcode followed by one integer argument.
+const OP_LOAD_CONST = 1;
+const OP_LOAD_FAST = 2;
+const OP_LOAD_DEREF = 3;
+const OP_LOAD_GLOBAL = 4;
+const OP_LOAD_CLASS = 5;
+const OP_STORE_FAST = 6;
+const OP_STORE_DEREF = 7;
+const OP_STORE_GLOBAL = 8;
+const OP_STORE_CLASS = 9;
+const OP_STORE_ATTR = 10;
+const OP_STORE_SUBSCR = 11;
+const OP_STORE_TARGET = 12;
+const OP_UNPACK_SEQUENCE = 13;
+const OP_LOAD_ATTR = 14;
+const OP_LOAD_METHOD = 15;
+const OP_BINARY_SUBSCR = 16;
+const OP_BINARY_SLICE = 17;
+const OP_BINARY_OP = 18;
+const OP_BINARY_ADD = 19;
+const OP_BINARY_SUBTRACT = 20;
+const OP_BINARY_MULTIPLY = 21;
+const OP_BINARY_MODULO = 22;
+const OP_COMPARE_LT = 23;
+const OP_COMPARE_LE = 24;
+const OP_COMPARE_GT = 25;
+const OP_COMPARE_GE = 26;
+const OP_COMPARE_EQ = 27;
+const OP_COMPARE_NE = 28;
+const OP_UNARY_NOT = 29;
+const OP_UNARY_NEGATIVE = 30;
+const OP_UNARY_POSITIVE = 31;
+const OP_UNARY_INVERT = 32;
+const OP_POP_TOP = 33;
+const OP_DUP_TOP = 34;
+const OP_JUMP = 35;
+const OP_POP_JUMP_IF_FALSE = 36;
+const OP_POP_JUMP_IF_TRUE = 37;
+const OP_JUMP_IF_FALSE_OR_POP = 38;
+const OP_JUMP_IF_TRUE_OR_POP = 39;
+const OP_GET_ITER = 40;
+const OP_FOR_ITER = 41;
+const OP_BUILD_LIST = 42;
+const OP_BUILD_TUPLE = 43;
+const OP_BUILD_SET = 44;
+const OP_BUILD_DICT = 45;
+const OP_BUILD_KWARGS = 46;
+const OP_CALL = 47;
+const OP_CALL_METHOD = 48;
+const OP_CALL_EX = 49;
+const OP_MAKE_FUNCTION = 50;
+const OP_MAKE_CLASS = 51;
+const OP_DECORATE = 52;
+const OP_EVAL = 53;
+const OP_EXEC = 54;
+const OP_RETURN_VALUE = 55;
+const OP_RETURN_NONE = 56;
+const OP_BREAK_OUT = 57;
+const OP_CONTINUE_OUT = 58;
+// Superinstructions produced by CodeBuilder's peephole pass.
+const OP_LOAD_FAST_LOAD_FAST = 59;
+const OP_LOAD_FAST_CONST = 60;
+const OP_COMPARE_JUMP_IF_FALSE = 61;
+
+const OPCODE_NAMES = [];
+for (const [name, value] of Object.entries({
+    LOAD_CONST: OP_LOAD_CONST, LOAD_FAST: OP_LOAD_FAST, LOAD_DEREF: OP_LOAD_DEREF, LOAD_GLOBAL: OP_LOAD_GLOBAL,
+    LOAD_CLASS: OP_LOAD_CLASS, STORE_FAST: OP_STORE_FAST, STORE_DEREF: OP_STORE_DEREF, STORE_GLOBAL: OP_STORE_GLOBAL,
+    STORE_CLASS: OP_STORE_CLASS, STORE_ATTR: OP_STORE_ATTR, STORE_SUBSCR: OP_STORE_SUBSCR, STORE_TARGET: OP_STORE_TARGET,
+    UNPACK_SEQUENCE: OP_UNPACK_SEQUENCE, LOAD_ATTR: OP_LOAD_ATTR, LOAD_METHOD: OP_LOAD_METHOD,
+    BINARY_SUBSCR: OP_BINARY_SUBSCR, BINARY_SLICE: OP_BINARY_SLICE, BINARY_OP: OP_BINARY_OP, BINARY_ADD: OP_BINARY_ADD,
+    BINARY_SUBTRACT: OP_BINARY_SUBTRACT, BINARY_MULTIPLY: OP_BINARY_MULTIPLY, BINARY_MODULO: OP_BINARY_MODULO,
+    COMPARE_LT: OP_COMPARE_LT, COMPARE_LE: OP_COMPARE_LE, COMPARE_GT: OP_COMPARE_GT, COMPARE_GE: OP_COMPARE_GE,
+    COMPARE_EQ: OP_COMPARE_EQ, COMPARE_NE: OP_COMPARE_NE, UNARY_NOT: OP_UNARY_NOT, UNARY_NEGATIVE: OP_UNARY_NEGATIVE,
+    UNARY_POSITIVE: OP_UNARY_POSITIVE, UNARY_INVERT: OP_UNARY_INVERT, POP_TOP: OP_POP_TOP, DUP_TOP: OP_DUP_TOP,
+    JUMP: OP_JUMP, POP_JUMP_IF_FALSE: OP_POP_JUMP_IF_FALSE, POP_JUMP_IF_TRUE: OP_POP_JUMP_IF_TRUE,
+    JUMP_IF_FALSE_OR_POP: OP_JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP: OP_JUMP_IF_TRUE_OR_POP, GET_ITER: OP_GET_ITER,
+    FOR_ITER: OP_FOR_ITER, BUILD_LIST: OP_BUILD_LIST, BUILD_TUPLE: OP_BUILD_TUPLE, BUILD_SET: OP_BUILD_SET,
+    BUILD_DICT: OP_BUILD_DICT, BUILD_KWARGS: OP_BUILD_KWARGS, CALL: OP_CALL, CALL_METHOD: OP_CALL_METHOD,
+    CALL_EX: OP_CALL_EX, MAKE_FUNCTION: OP_MAKE_FUNCTION, MAKE_CLASS: OP_MAKE_CLASS, DECORATE: OP_DECORATE,
+    EVAL: OP_EVAL, EXEC: OP_EXEC, RETURN_VALUE: OP_RETURN_VALUE, RETURN_NONE: OP_RETURN_NONE,
+    BREAK_OUT: OP_BREAK_OUT, CONTINUE_OUT: OP_CONTINUE_OUT, LOAD_FAST_LOAD_FAST: OP_LOAD_FAST_LOAD_FAST,
+    LOAD_FAST_CONST: OP_LOAD_FAST_CONST, COMPARE_JUMP_IF_FALSE: OP_COMPARE_JUMP_IF_FALSE
+})) {
+    OPCODE_NAMES[value] = name;
+}
+
+const JUMP_OPCODES = new Set([OP_JUMP, OP_POP_JUMP_IF_FALSE, OP_POP_JUMP_IF_TRUE, OP_JUMP_IF_FALSE_OR_POP,
+    OP_JUMP_IF_TRUE_OR_POP, OP_FOR_ITER]);
+const SPECIALIZED_BINARY_OPCODES = new Map([['+', OP_BINARY_ADD], ['-', OP_BINARY_SUBTRACT], ['*', OP_BINARY_MULTIPLY],
+    ['%', OP_BINARY_MODULO], ['<', OP_COMPARE_LT], ['<=', OP_COMPARE_LE], ['>', OP_COMPARE_GT], ['>=', OP_COMPARE_GE],
+    ['==', OP_COMPARE_EQ], ['!=', OP_COMPARE_NE]]);
+// COMPARE_JUMP_IF_FALSE packs the comparison into the low bits of its jump target.
+const COMPARE_KINDS = [OP_COMPARE_LT, OP_COMPARE_LE, OP_COMPARE_GT, OP_COMPARE_GE, OP_COMPARE_EQ, OP_COMPARE_NE];
+const COMPARE_OPERATORS = ['<', '<=', '>', '>=', '==', '!='];
+const UNARY_OPCODES = new Map([['not', OP_UNARY_NOT], ['-', OP_UNARY_NEGATIVE], ['+', OP_UNARY_POSITIVE], ['~', OP_UNARY_INVERT]]);
+const CALL_EX_METHOD = 1;
+const CALL_EX_KEYWORDS = 2;
+const VM_FUNCTION = Symbol('VM_FUNCTION');
+// Class prototypes point back at their class; shared method wrappers at the function they call.
+const PY_CLASS = Symbol('PY_CLASS');
+const METHOD_FUNCTION = Symbol('METHOD_FUNCTION');
+const BOUND_METHODS = Symbol('BOUND_METHODS');
+// Compiled functions can also be entered with a frame their caller has filled in.
+const FRAME_FUNCTION = Symbol('FRAME_FUNCTION');
+const FRAME_POOL_SIZE = 64;
+// With a time limit, the clock is read once every this many steps.
+const TIME_CHECK_STEPS = 1000;
+// While a SamplingProfiler is active, the clock is read once every this many steps on average.
+const SAMPLE_CHECK_STEPS = 100;
+
+function hashSource(code) {
+    // 32-bit FNV-1a over UTF-16 code units, combined with the length.
+    let hash = 0x811c9dc5;
+    for (let i = 0; i < code.length; i++) {
+        hash ^= code.charCodeAt(i);
+        hash = Math.imul(hash, 0x01000193);
     }
+    return `${(hash >>> 0).toString(16).padStart(8, '0')}:${code.length}`;
+}
 
-    writeToRealFileSystem(filename, content, append = false) {
-        console.log('Writing to file:', filename, 'Content:', content);
-        return fetch('write_data.php', {
-            method: 'POST',
-            headers: {'Content-Type': 'application/json'},
-            body: JSON.stringify({filename, content, append})
-        }).then(response => response.json())
-        .then(data => {
-            console.log('PHP write result:', data);
-            return data;
-        })
-        .catch(error => {
-            console.log('PHP write error:', error);
-            throw error;
-        });
+class ASTCache {
+    constructor({ maxEntries = DEFAULT_AST_CACHE_ENTRIES, maxBytes = DEFAULT_AST_CACHE_BYTES } = {}) {
+        this.maxEntries = maxEntries;
+        this.maxBytes = maxBytes;
+        this.entries = new Map();
+        this.bytes = 0;
+        this.hits = 0;
+        this.misses = 0;
+        this.evictions = 0;
     }
 
-    initializeBuiltins() {
-        this.builtins.range = function(start, stop, step = 1) {
-            if (stop === undefined) {
-                stop = start;
-                start = 0;
-            }
-            const result = [];
-            if (step > 0) {
-                for (let i = start; i < stop; i += step) {
-                    result.push(i);
-                }
-            } else if (step < 0) {
-                for (let i = start; i > stop; i += step) {
-                    result.push(i);
-                }
-            }
-            return result;
-        };
+    get(key, code) {
+        const entry = this.entries.get(key);
+        if (!entry || entry.code !== code) {
+            this.misses++;
+            return null;
+        }
+        // Re-insert to mark as most recently used.
+        this.entries.delete(key);
+        this.entries.set(key, entry);
+        this.hits++;
+        return entry.statements;
+    }
 
-        this.builtins.print = (...args) => {
-            const output = args.map(arg => this.toString(arg)).join(' ');
-            this.printOutput.push(output);
-            return output;
-        };
+    set(key, code, statements) {
+        const size = code.length * 2;
+        if (this.maxEntries <= 0 || size > this.maxBytes) return;
+        this.delete(key);
+        this.entries.set(key, { code, statements, size });
+        this.bytes += size;
+        while (this.entries.size > this.maxEntries || this.bytes > this.maxBytes) {
+            this.delete(this.entries.keys().next().value);
+            this.evictions++;
+        }
+    }
 
-        this.builtins.len = (obj) => {
-            if (Array.isArray(obj) || typeof obj === 'string') {
-                return obj.length;
-            }
-            if (obj && typeof obj === 'object' && obj.__len__) {
-                return obj.__len__();
-            }
-            return 0;
-        };
+    delete(key) {
+        const entry = this.entries.get(key);
+        if (!entry) return false;
+        this.entries.delete(key);
+        this.bytes -= entry.size;
+        return true;
+    }
 
-        this.builtins.str = (obj) => this.toString(obj);
-        this.builtins.int = (obj) => {
-            if (typeof obj === 'string') {
-                const parsed = parseInt(obj);
-                if (isNaN(parsed)) throw new Error(`invalid literal for int() with base 10: '${obj}'`);
-                return parsed;
-            }
-            return Math.floor(Number(obj));
-        };
-        this.builtins.float = (obj) => {
-            if (typeof obj === 'string') {
-                const parsed = parseFloat(obj);
-                if (isNaN(parsed)) throw new Error(`could not convert string to float: '${obj}'`);
-                return parsed;
-            }
-            return Number(obj);
-        };
-        this.builtins.bool = (obj) => Boolean(obj);
-        this.builtins.list = (iterable) => {
-            if (Array.isArray(iterable)) return [...iterable];
-            if (typeof iterable === 'string') return [...iterable];
-            if (iterable && iterable[Symbol.iterator]) return [...iterable];
-            return [];
-        };
-        this.builtins.tuple = (iterable) => {
-            const arr = this.builtins.list(iterable);
-            arr.__class__ = 'tuple';
-            return arr;
-        };
-        this.builtins.dict = (iterable) => {
-            if (iterable) {
-                const result = {};
-                for (const [key, value] of iterable) {
-                    result[key] = value;
-                }
-                return result;
-            }
-            return {};
-        };
-        this.builtins.set = (iterable) => {
-            return new Set(iterable || []);
-        };
-        this.builtins.abs = Math.abs;
-        this.builtins.max = (...args) => {
-            if (args.length === 1 && Array.isArray(args[0])) {
-                return Math.max(...args[0]);
-            }
-            return Math.max(...args);
-        };
-        this.builtins.min = (...args) => {
-            if (args.length === 1 && Array.isArray(args[0])) {
-                return Math.min(...args[0]);
-            }
-            return Math.min(...args);
-        };
-        this.builtins.sum = (iterable, start = 0) => {
-            return iterable.reduce((acc, val) => acc + val, start);
-        };
-        this.builtins.sorted = (iterable, reverse = false) => {
-            const arr = [...iterable];
-            return reverse ? arr.sort().reverse() : arr.sort();
-        };
-        this.builtins.reversed = (iterable) => {
-            return [...iterable].reverse();
-        };
-        this.builtins.enumerate = function*(iterable, start = 0) {
-            let index = start;
-            for (const item of iterable) {
-                yield [index++, item];
-            }
-        };
-        this.builtins.zip = function*(...iterables) {
-            const iterators = iterables.map(iter => iter[Symbol.iterator]());
-            while (true) {
-                const results = iterators.map(iter => iter.next());
-                if (results.some(result => result.done)) break;
-                yield results.map(result => result.value);
-            }
-        };
-        
-        this.builtins.open = (filename, mode = 'r', encoding = 'utf-8') => {
-            return this.createFileObject(filename, mode, encoding);
-        };
-        
-        this.builtins.type = (obj) => {
-            if (obj === null || obj === undefined) return 'NoneType';
-            if (typeof obj === 'boolean') return 'bool';
-            if (typeof obj === 'number') return Number.isInteger(obj) ? 'int' : 'float';
-            if (typeof obj === 'string') return 'str';
-            if (Array.isArray(obj)) return obj.__class__ || 'list';
-            if (typeof obj === 'object') return 'dict';
-            if (typeof obj === 'function') return 'function';
-            return 'object';
-        };
-        this.builtins.map = function*(func, iterable) {
-            for (const item of iterable) {
-                yield func(item);
-            }
-        };
-        this.builtins.filter = function*(func, iterable) {
-            for (const item of iterable) {
-                if (func(item)) yield item;
-            }
-        };
-        this.builtins.any = (iterable) => {
-            for (const item of iterable) {
-                if (item) return true;
-            }
-            return false;
-        };
-        this.builtins.all = (iterable) => {
-            for (const item of iterable) {
-                if (!item) return false;
-            }
-            return true;
-        };
-        this.builtins.round = (number, ndigits = 0) => {
-            const factor = Math.pow(10, ndigits);
-            return Math.round(number * factor) / factor;
-        };
-        this.builtins.pow = Math.pow;
-        this.builtins.isinstance = (obj, classinfo) => {
-            if (Array.isArray(classinfo)) {
-                return classinfo.some(cls => this.builtins.isinstance(obj, cls));
-            }
-            if (typeof classinfo === 'string') {
-                return typeof obj === classinfo || (obj && obj.__class__ === classinfo);
-            }
-            return obj instanceof classinfo;
-        };
-        this.builtins.hasattr = (obj, name) => {
-            return obj && (name in obj);
-        };
-        this.builtins.getattr = (obj, name, defaultValue) => {
-            if (obj && name in obj) return obj[name];
-            if (defaultValue !== undefined) return defaultValue;
-            throw new Error(`'${typeof obj}' object has no attribute '${name}'`);
-        };
-        this.builtins.setattr = (obj, name, value) => {
-            if (obj) obj[name] = value;
-        };
-        this.builtins.delattr = (obj, name) => {
-            if (obj && name in obj) delete obj[name];
-        };
-        this.builtins.dir = (obj) => {
-            if (!obj) return Object.keys(this.getCurrentScope());
-            return Object.keys(obj);
-        };
-        this.builtins.type = (obj) => {
-            if (obj === null) return 'NoneType';
-            if (Array.isArray(obj)) return obj.__class__ || 'list';
-            return typeof obj;
-        };
+    clear() {
+        this.entries.clear();
+        this.bytes = 0;
     }
 
-    initializeStandardTypes() {
-        this.builtins.ValueError = class ValueError extends Error {
-            constructor(message) {
-                super(message);
-                this.name = 'ValueError';
-            }
-        };
-        this.builtins.TypeError = class TypeError extends Error {
-            constructor(message) {
-                super(message);
-                this.name = 'TypeError';
-            }
+    stats() {
+        const lookups = this.hits + this.misses;
+        return {
+            entries: this.entries.size,
+            bytes: this.bytes,
+            maxEntries: this.maxEntries,
+            maxBytes: this.maxBytes,
+            hits: this.hits,
+            misses: this.misses,
+            evictions: this.evictions,
+            hitRate: lookups === 0 ? 0 : this.hits / lookups
         };
-        this.builtins.IndexError = class IndexError extends Error {
-            constructor(message) {
-                super(message);
-                this.name = 'IndexError';
+    }
+}
+
+class ScopeInfo {
+    constructor(kind, node, parent) {
+        this.kind = kind;
+        this.node = node;
+        this.parent = parent;
+        this.params = [];
+        this.bound = new Set();
+        this.used = new Set();
+        this.globals = new Set();
+        this.nonlocals = new Set();
+        this.free = new Set();
+        this.cells = new Set();
+        this.concatenated = new Set();
+        this.stringBuilders = null;
+        this.starImport = false;
+        this.generator = false;
+        this.children = new Map();
+        this.resolution = new Map();
+        this.slots = new Map();
+        this.size = 1;
+        // Frames of calls that returned, ready for the next call.
+        this.frames = [];
+    }
+}
+
+class Signature {
+    // A function's parameters, inspected once at compile time. Calls passing only positional
+    // arguments to a function without *args, **kwargs or keyword arguments bind them directly.
+    constructor(name, params) {
+        this.name = name;
+        this.params = params;
+        this.simple = params.every(param => param.kind === 'positional');
+        this.arity = params.length;
+        this.required = params.filter(param => !param.default).length;
+    }
+
+    accepts(count) {
+        return this.simple && count >= this.required && count <= this.arity;
+    }
+}
+
+class CodeObject {
+    constructor(builder, instructions, lineTable) {
+        this.name = builder.name;
+        this.kind = builder.kind;
+        this.isFunction = builder.kind === 'function';
+        this.instructions = instructions;
+        this.constants = builder.constants;
+        this.names = builder.names;
+        this.caches = builder.caches;
+        this.lineTable = lineTable;
+        this.stackSize = builder.maxDepth + 1;
+        this.stacks = [];
+        this.slotNames = [];
+        this.freeNames = builder.scope.free;
+        for (const [name, slot] of builder.scope.slots) this.slotNames[slot] = name;
+    }
+
+    lineAt(pc) {
+        // The line table holds (pc, line) pairs sorted by pc.
+        const table = this.lineTable;
+        let low = 0;
+        let high = table.length / 2 - 1;
+        let line = 0;
+        while (low <= high) {
+            const middle = (low + high) >> 1;
+            if (table[middle * 2] <= pc) {
+                line = table[middle * 2 + 1];
+                low = middle + 1;
+            } else {
+                high = middle - 1;
             }
-        };
-        this.builtins.KeyError = class KeyError extends Error {
-            constructor(message) {
-                super(message);
-                this.name = 'KeyError';
+        }
+        return line;
+    }
+}
+
+function yieldToEventLoop() {
+    // setTimeout(0) waits at least a millisecond, which would dominate short time slices.
+    if (typeof setImmediate === 'function') return new Promise(resolve => setImmediate(resolve));
+    if (typeof MessageChannel === 'function') {
+        return new Promise(resolve => {
+            const channel = new MessageChannel();
+            channel.port1.onmessage = () => {
+                channel.port1.close();
+                resolve();
+            };
+            channel.port2.postMessage(null);
+        });
+    }
+    return new Promise(resolve => setTimeout(resolve, 0));
+}
+
+class VMSuspension {
+    // A paused outermost VM run: the registers of the running code and the callers below it.
+    constructor(code, frame, stack, sp, pc, scope, activations, delay) {
+        this.code = code;
+        this.frame = frame;
+        this.stack = stack;
+        this.sp = sp;
+        this.pc = pc;
+        this.scope = scope;
+        this.activations = activations;
+        this.delay = delay;
+    }
+}
+
+class CodeBuilder {
+    constructor(name, kind, scope) {
+        this.name = name;
+        this.kind = kind;
+        this.scope = scope;
+        this.code = [];
+        this.constants = [];
+        this.names = [];
+        this.nameIds = new Map();
+        this.caches = [];
+        this.lines = [];
+        this.line = -1;
+        this.labels = [];
+        this.targets = [];
+        this.loops = [];
+        this.depth = 0;
+        this.maxDepth = 0;
+        this.barrier = 0;
+    }
+
+    emit(op, arg = 0, effect = 0) {
+        this.adjust(effect);
+        // Fuse with the previous instruction unless a label or a new line starts here.
+        const last = this.code.length - 2;
+        if (last >= 0 && this.barrier !== this.code.length) {
+            const previous = this.code[last];
+            const previousArg = this.code[last + 1];
+            if (previous === OP_LOAD_FAST && previousArg < 0x10000 && arg < 0x10000 &&
+                (op === OP_LOAD_FAST || op === OP_LOAD_CONST)) {
+                this.code[last] = op === OP_LOAD_FAST ? OP_LOAD_FAST_LOAD_FAST : OP_LOAD_FAST_CONST;
+                this.code[last + 1] = previousArg | (arg << 16);
+                return;
             }
-        };
-        this.builtins.AttributeError = class AttributeError extends Error {
-            constructor(message) {
-                super(message);
-                this.name = 'AttributeError';
+            if (op === OP_POP_JUMP_IF_FALSE && COMPARE_KINDS.includes(previous)) {
+                this.code[last] = OP_COMPARE_JUMP_IF_FALSE;
+                this.code[last + 1] = (arg << 3) | COMPARE_KINDS.indexOf(previous);
+                return;
             }
-        };
+        }
+        this.code.push(op, arg);
     }
 
-    initializeFileSystem() {
-        // Initialize with some basic directories
-        this.fileSystem.set('/workspace', {
-            type: 'directory',
-            name: 'workspace',
-            created: new Date()
-        });
-        this.fileSystem.set('/tmp', {
-            type: 'directory',
-            name: 'tmp',
-            created: new Date()
-        });
-        this.fileSystem.set('/home', {
-            type: 'directory',
-            name: 'home',
-            created: new Date()
-        });
-        this.fileSystem.set('/home/user', {
-            type: 'directory',
-            name: 'user',
-            created: new Date()
-        });
+    adjust(effect) {
+        this.depth += effect;
+        if (this.depth > this.maxDepth) this.maxDepth = this.depth;
     }
 
-    createFileObject(filename, mode = 'r', encoding = 'utf-8') {
-        const fileId = `${filename}_${mode}_${Date.now()}`;
-        
-        const fileObj = {
-            __class__: 'file',
-            name: filename,
-            mode: mode,
-            encoding: encoding,
-            closed: false,
-            readable: mode.includes('r') || mode.includes('+'),
-            writable: mode.includes('w') || mode.includes('a') || mode.includes('+'),
-            _content: '',
-            _position: 0,
-            
-            read: (size = -1) => {
-                if (fileObj.closed) {
-                    throw new Error('I/O operation on closed file');
-                }
-                if (!fileObj.readable) {
-                    throw new Error('File not open for reading');
-                }
-                
-                const entry = this.fileSystem.get(filename);
-                if (entry && entry.type === 'file') {
-                    fileObj._content = entry.content || '';
-                }
-                
-                if (size === -1) {
-                    const result = fileObj._content.substring(fileObj._position);
-                    fileObj._position = fileObj._content.length;
-                    return result;
-                } else {
-                    const result = fileObj._content.substring(fileObj._position, fileObj._position + size);
-                    fileObj._position += result.length;
-                    return result;
-                }
-            },
-            
-            readline: () => {
-                if (fileObj.closed) {
-                    throw new Error('I/O operation on closed file');
-                }
-                if (!fileObj.readable) {
-                    throw new Error('File not open for reading');
-                }
-                
-                const entry = this.fileSystem.get(filename);
-                if (entry && entry.type === 'file') {
-                    fileObj._content = entry.content || '';
-                }
-                
-                const startPos = fileObj._position;
-                const newlineIndex = fileObj._content.indexOf('\n', startPos);
-                
-                if (newlineIndex === -1) {
-                    const result = fileObj._content.substring(startPos);
-                    fileObj._position = fileObj._content.length;
-                    return result;
-                } else {
-                    const result = fileObj._content.substring(startPos, newlineIndex + 1);
-                    fileObj._position = newlineIndex + 1;
-                    return result;
-                }
-            },
-            
-            readlines: () => {
-                if (fileObj.closed) {
-                    throw new Error('I/O operation on closed file');
-                }
-                if (!fileObj.readable) {
-                    throw new Error('File not open for reading');
-                }
-                
-                const entry = this.fileSystem.get(filename);
-                if (entry && entry.type === 'file') {
-                    fileObj._content = entry.content || '';
-                }
-                
-                const lines = fileObj._content.split('\n');
-                if (lines[lines.length - 1] === '') lines.pop();
-                return lines.map(line => line + '\n');
-            },
-            
-            write: (data) => {
-                if (fileObj.closed) {
-                    throw new Error('I/O operation on closed file');
-                }
-                if (!fileObj.writable) {
-                    throw new Error('File not open for writing');
-                }
-                
-                const strData = String(data);
-                
-                if (mode.includes('a')) {
-                    // Append mode
-                    const entry = this.fileSystem.get(filename);
-                    if (entry && entry.type === 'file') {
-                        fileObj._content = (entry.content || '') + strData;
-                    } else {
-                        fileObj._content = strData;
-                    }
-                } else {
-                    // Write mode
-                    if (fileObj._position === 0 && mode.includes('w')) {
-                        fileObj._content = strData;
-                    } else {
-                        const before = fileObj._content.substring(0, fileObj._position);
-                        const after = fileObj._content.substring(fileObj._position + strData.length);
-                        fileObj._content = before + strData + after;
-                    }
-                }
-                
-                fileObj._position += strData.length;
-                
-                // Update file system
-                this.fileSystem.set(filename, {
-                    type: 'file',
-                    name: filename.split('/').pop(),
-                    content: fileObj._content,
-                    modified: new Date()
-                });
-                
-                // Write to real file system
-                this.writeToRealFileSystem(filename, fileObj._content, mode.includes('a'));
-                
-                return strData.length;
-            },
-            
-            writelines: (lines) => {
-                if (fileObj.closed) {
-                    throw new Error('I/O operation on closed file');
-                }
-                if (!fileObj.writable) {
-                    throw new Error('File not open for writing');
-                }
-                
-                const content = lines.join('');
-                return fileObj.write(content);
-            },
-            
-            seek: (offset, whence = 0) => {
-                if (fileObj.closed) {
-                    throw new Error('I/O operation on closed file');
-                }
-                
-                const entry = this.fileSystem.get(filename);
-                if (entry && entry.type === 'file') {
-                    fileObj._content = entry.content || '';
-                }
-                
-                if (whence === 0) {
-                    fileObj._position = offset;
-                } else if (whence === 1) {
-                    fileObj._position += offset;
-                } else if (whence === 2) {
-                    fileObj._position = fileObj._content.length + offset;
-                }
-                
-                fileObj._position = Math.max(0, Math.min(fileObj._position, fileObj._content.length));
-                return fileObj._position;
-            },
-            
-            tell: () => {
-                if (fileObj.closed) {
-                    throw new Error('I/O operation on closed file');
-                }
-                return fileObj._position;
-            },
-            
-            flush: () => {
-                if (fileObj.closed) {
-                    throw new Error('I/O operation on closed file');
-                }
-                // In memory implementation, nothing to flush
-            },
-            
-            close: () => {
-                fileObj.closed = true;
-                this.openFiles.delete(fileId);
-            },
-            
-            __enter__: () => fileObj,
-            
-            __exit__: (exc_type, exc_val, exc_tb) => {
-                fileObj.close();
-                return false;
-            }
-        };
-        
-        // Initialize file content if it exists
-        const entry = this.fileSystem.get(filename);
-        if (entry && entry.type === 'file') {
-            fileObj._content = entry.content || '';
-        } else if (mode.includes('r') && !mode.includes('+') && !mode.includes('w') && !mode.includes('a')) {
-            throw new Error(`FileNotFoundError: [Errno 2] No such file or directory: '${filename}'`);
-        }
-        
-        this.openFiles.set(fileId, fileObj);
-        return fileObj;
+    constant(value) {
+        this.constants.push(value);
+        return this.constants.length - 1;
     }
 
-    toString(obj) {
-        if (obj === null || obj === undefined) return 'None';
-        if (typeof obj === 'string') return obj;
-        if (typeof obj === 'boolean') return obj ? 'True' : 'False';
-        if (Array.isArray(obj)) {
-            if (obj.__class__ === 'tuple') {
-                return `(${obj.map(item => this.toString(item)).join(', ')})`;
-            }
-            return `[${obj.map(item => this.toString(item)).join(', ')}]`;
+    nameIndex(text) {
+        let id = this.nameIds.get(text);
+        if (id === undefined) {
+            id = this.names.length;
+            this.names.push(text);
+            this.nameIds.set(text, id);
         }
-        if (obj instanceof Set) {
-            return `{${[...obj].map(item => this.toString(item)).join(', ')}}`;
-        }
-        if (typeof obj === 'object') {
-            const pairs = Object.entries(obj).map(([k, v]) => `'${k}': ${this.toString(v)}`);
-            return `{${pairs.join(', ')}}`;
-        }
-        return String(obj);
+        return id;
     }
 
-    getCurrentScope() {
-        return this.scopeStack[this.scopeStack.length - 1];
+    // LOAD_ATTR and LOAD_METHOD index a per-instruction AttributeCache instead of the name table.
+    cache(entry) {
+        this.caches.push(entry);
+        return this.caches.length - 1;
     }
 
-    pushScope(scope = {}) {
-        this.scopeStack.push(scope);
+    label() {
+        this.labels.push(-1);
+        return this.labels.length - 1;
     }
 
-    popScope() {
-        if (this.scopeStack.length > 1) {
-            return this.scopeStack.pop();
-        }
-        return this.scopeStack[0];
+    mark(label) {
+        this.labels[label] = this.code.length;
+        this.barrier = this.code.length;
     }
 
-    getVariable(name) {
-        for (let i = this.scopeStack.length - 1; i >= 0; i--) {
-            if (name in this.scopeStack[i]) {
-                return this.scopeStack[i][name];
+    jump(op, label, effect = 0) {
+        this.emit(op, label, effect);
+    }
+
+    // Constant-pool entries (e.g. EXEC's break/continue targets) that refer to labels.
+    target(entry, key, label) {
+        this.targets.push([entry, key, label]);
+    }
+
+    setLine(line) {
+        if (line === undefined || line === this.line) return;
+        this.line = line;
+        this.lines.push(this.code.length, line);
+        this.barrier = this.code.length;
+    }
+
+    finish() {
+        const instructions = new Int32Array(this.code);
+        for (let pc = 0; pc < instructions.length; pc += 2) {
+            const op = instructions[pc];
+            if (JUMP_OPCODES.has(op)) {
+                instructions[pc + 1] = this.labels[instructions[pc + 1]];
+            } else if (op === OP_COMPARE_JUMP_IF_FALSE) {
+                const arg = instructions[pc + 1];
+                instructions[pc + 1] = (this.labels[arg >> 3] << 3) | (arg & 7);
             }
         }
-        if (name in this.globals) {
-            return this.globals[name];
-        }
-        if (name in this.builtins) {
-            return this.builtins[name];
+        for (const [entry, key, label] of this.targets) {
+            entry[key] = label === null ? -1 : this.labels[label];
         }
-        throw new Error(`name '${name}' is not defined`);
+        return new CodeObject(this, instructions, new Int32Array(this.lines));
     }
+}
 
-    setVariable(name, value) {
-        this.getCurrentScope()[name] = value;
+class Cell {
+    constructor(value) {
+        this.value = value;
     }
+}
 
-    async loadModule(moduleName) {
-        if (this.importedModules.has(moduleName)) {
-            return this.importedModules.get(moduleName);
+class PyRange {
+    // Python's range: an immutable arithmetic sequence that never materializes its elements.
+    // Ranges whose bounds or span leave the safe-integer range compute with BigInt; their
+    // length and items are normalized ints like every other int.
+    constructor(start, stop, step) {
+        this.start = start;
+        this.stop = stop;
+        this.step = step;
+        this.big = typeof start === 'bigint' || typeof stop === 'bigint' || typeof step === 'bigint' ||
+            !Number.isSafeInteger(stop - start);
+        if (this.big) {
+            const by = BigInt(step);
+            const span = by > 0n ? BigInt(stop) - BigInt(start) : BigInt(start) - BigInt(stop);
+            const size = by > 0n ? by : -by;
+            this.length = span > 0n ? normalizeInt((span + size - 1n) / size) : 0;
+        } else {
+            this.length = step > 0
+                ? Math.max(0, Math.ceil((stop - start) / step))
+                : Math.max(0, Math.ceil((start - stop) / -step));
         }
+    }
 
-        if (this.modules.has(moduleName)) {
-            return this.modules.get(moduleName);
+    at(index) {
+        if (!this.big && typeof index === 'number') return this.start + index * this.step;
+        return normalizeInt(BigInt(this.start) + BigInt(index) * BigInt(this.step));
+    }
+
+    get(index) {
+        // The item at a Python index, or undefined when the index is out of range.
+        if (!this.big && typeof index === 'number') {
+            const idx = index < 0 ? this.length + index : index;
+            return Number.isInteger(idx) && idx >= 0 && idx < this.length ? this.at(idx) : undefined;
         }
+        if (typeof index !== 'bigint' && !Number.isInteger(index)) return undefined;
+        const length = BigInt(this.length);
+        let idx = BigInt(index);
+        if (idx < 0n) idx += length;
+        return idx >= 0n && idx < length ? this.at(idx) : undefined;
+    }
 
-        // Handle built-in modules
-        const builtinModules = {
-            'sys': this.createSysModule(),
-            'math': this.createMathModule(),
-            'time': this.createTimeModule(),
-            'json': this.createJsonModule(),
-            'collections': this.createCollectionsModule(),
-            'random': this.createRandomModule(),
-            'os': this.createOsModule(),
-            'io': this.createIoModule()
-        };
+    __len__() {
+        return this.length;
+    }
 
-        if (builtinModules[moduleName]) {
-            const module = builtinModules[moduleName];
-            this.modules.set(moduleName, module);
-            this.importedModules.set(moduleName, module);
-            return module;
+    __contains__(value) {
+        if (typeof value === 'boolean') value = Number(value);
+        if (!this.big && typeof value === 'number') {
+            if (!Number.isInteger(value)) return false;
+            const offset = value - this.start;
+            if (offset % this.step !== 0) return false;
+            const index = offset / this.step;
+            return index >= 0 && index < this.length;
         }
+        if (typeof value === 'number' ? !Number.isInteger(value) : typeof value !== 'bigint') return false;
+        const offset = BigInt(value) - BigInt(this.start);
+        const step = BigInt(this.step);
+        if (offset % step !== 0n) return false;
+        const index = offset / step;
+        return index >= 0n && index < BigInt(this.length);
+    }
 
-        try {
-            let modulePath = `${this.stdlibPath}${moduleName}.py`;
-            let response = await fetch(modulePath);
-            
-            if (!response.ok) {
-                modulePath = `py_files/${moduleName}.py`;
-                response = await fetch(modulePath);
-            }
-            
-            if (!response.ok) {
-                throw new Error(`No module named '${moduleName}'`);
-            }
-            
-            const moduleCode = await response.text();
-            const moduleObj = await this.createModuleObject(moduleName, moduleCode);
-            this.modules.set(moduleName, moduleObj);
-            this.importedModules.set(moduleName, moduleObj);
-            return moduleObj;
-        } catch (error) {
-            this.logExecution(`Failed to load module ${moduleName}: ${error.message}`);
-            throw new Error(`No module named '${moduleName}'`);
+    __reversed__() {
+        if (this.big) {
+            const last = BigInt(this.start) + (BigInt(this.length) - 1n) * BigInt(this.step);
+            return this.bigItems(last, -BigInt(this.step), BigInt(this.length));
         }
+        return new RangeIterator(this.at(this.length - 1), -this.step, this.length);
     }
 
-    createSysModule() {
-        return {
-            __name__: 'sys',
-            version: '3.11.0 (emscripten)',
-            platform: 'emscripten',
-            path: ['', 'python_stdlib'],
-            modules: this.modules,
-            builtin_module_names: ['builtins', 'sys', 'math', 'time', 'json', 'collections', 'random', 'os'],
-            exit: (code = 0) => { throw new Error(`SystemExit: ${code}`); },
-            getrefcount: (obj) => 1,
-            getsizeof: (obj) => JSON.stringify(obj).length
-        };
+    __eq__(other) {
+        // Ranges are equal when they hold the same items: the step only matters past one item
+        // and the start only past none, so range(0) == range(2, 2) and range(1, 2, 5) == range(1, 3, 7).
+        if (!(other instanceof PyRange) || !pyEquals(this.length, other.length)) return false;
+        return pyEquals(this.length, 0) || (pyEquals(this.start, other.start) && (pyEquals(this.length, 1) || pyEquals(this.step, other.step)));
     }
 
-    createMathModule() {
-        return {
-            __name__: 'math',
-            pi: Math.PI,
-            e: Math.E,
-            tau: 2 * Math.PI,
-            inf: Infinity,
-            nan: NaN,
-            sqrt: Math.sqrt,
-            pow: Math.pow,
-            log: Math.log,
-            log10: (x) => Math.log(x) / Math.log(10),
-            log2: (x) => Math.log(x) / Math.log(2),
-            exp: Math.exp,
-            sin: Math.sin,
-            cos: Math.cos,
-            tan: Math.tan,
-            asin: Math.asin,
-            acos: Math.acos,
-            atan: Math.atan,
-            atan2: Math.atan2,
-            degrees: (x) => x * 180 / Math.PI,
-            radians: (x) => x * Math.PI / 180,
-            ceil: Math.ceil,
-            floor: Math.floor,
-            trunc: Math.trunc,
-            fabs: Math.abs,
-            factorial: (n) => {
-                if (n < 0 || !Number.isInteger(n)) throw new Error('factorial() only accepts integral values');
-                if (n <= 1) return 1;
-                let result = 1;
-                for (let i = 2; i <= n; i++) result *= i;
-                return result;
-            },
-            gcd: (a, b) => {
-                while (b) [a, b] = [b, a % b];
-                return Math.abs(a);
-            },
-            isfinite: Number.isFinite,
-            isinf: (x) => !Number.isFinite(x) && !Number.isNaN(x),
-            isnan: Number.isNaN
-        };
+    __hash__() {
+        // Keyed on what __eq__ compares, so equal ranges share a dict or set slot.
+        const length = this.length;
+        if (pyEquals(length, 0)) return 'range(0)';
+        const start = encodeKeyPart(this.start);
+        return pyEquals(length, 1) ? `range(1,${start})` : `range(${length},${start},${encodeKeyPart(this.step)})`;
     }
 
-    createTimeModule() {
-        return {
-            __name__: 'time',
-            time: () => Date.now() / 1000,
-            sleep: (seconds) => {
-                // Note: This is a no-op in this environment
-                return Promise.resolve();
-            },
-            perf_counter: () => performance.now() / 1000,
-            process_time: () => performance.now() / 1000,
-            monotonic: () => performance.now() / 1000,
-            strftime: (format, t) => {
-                const date = t ? new Date(t * 1000) : new Date();
-                return format
-                    .replace('%Y', date.getFullYear())
-                    .replace('%m', String(date.getMonth() + 1).padStart(2, '0'))
-                    .replace('%d', String(date.getDate()).padStart(2, '0'))
-                    .replace('%H', String(date.getHours()).padStart(2, '0'))
-                    .replace('%M', String(date.getMinutes()).padStart(2, '0'))
-                    .replace('%S', String(date.getSeconds()).padStart(2, '0'));
-            }
-        };
+    __repr__() {
+        return this.step === 1 ? `range(${this.start}, ${this.stop})` : `range(${this.start}, ${this.stop}, ${this.step})`;
     }
 
-    createJsonModule() {
-        return {
-            __name__: 'json',
-            dumps: (obj, indent) => {
-                if (indent !== undefined) {
-                    return JSON.stringify(obj, null, indent);
-                }
-                return JSON.stringify(obj);
-            },
-            loads: JSON.parse,
-            dump: (obj, fp, indent) => {
-                const jsonStr = indent !== undefined ? JSON.stringify(obj, null, indent) : JSON.stringify(obj);
-                fp.write(jsonStr);
-            },
-            load: (fp) => JSON.parse(fp.read())
-        };
+    index(value) {
+        if (!this.__contains__(value)) throw new Error(`ValueError: ${value} is not in range`);
+        if (!this.big && typeof value !== 'bigint') return (value - this.start) / this.step;
+        return normalizeInt((BigInt(value) - BigInt(this.start)) / BigInt(this.step));
     }
 
-    createCollectionsModule() {
-        return {
-            __name__: 'collections',
-            namedtuple: (typename, field_names) => {
-                const fields = typeof field_names === 'string' ? field_names.split() : field_names;
-                
-                function NamedTuple(...args) {
-                    for (let i = 0; i < fields.length; i++) {
-                        this[fields[i]] = args[i];
-                    }
-                }
-                
-                NamedTuple.prototype._fields = fields;
-                NamedTuple.prototype._asdict = function() {
-                    const result = {};
-                    for (const field of fields) {
-                        result[field] = this[field];
-                    }
-                    return result;
-                };
-                
-                return NamedTuple;
-            },
-            defaultdict: class DefaultDict extends Map {
-                constructor(defaultFactory) {
-                    super();
-                    this.default_factory = defaultFactory;
-                }
-                
-                get(key) {
-                    if (!this.has(key) && this.default_factory) {
-                        this.set(key, this.default_factory());
-                    }
-                    return super.get(key);
-                }
-            },
-            Counter: class Counter extends Map {
-                constructor(iterable) {
-                    super();
-                    if (iterable) {
-                        for (const item of iterable) {
-                            this.set(item, (this.get(item) || 0) + 1);
-                        }
-                    }
-                }
-                
-                most_common(n) {
-                    const entries = Array.from(this.entries()).sort((a, b) => b[1] - a[1]);
-                    return n ? entries.slice(0, n) : entries;
-                }
-            }
-        };
+    count(value) {
+        return this.__contains__(value) ? 1 : 0;
     }
 
-    createRandomModule() {
-        return {
-            __name__: 'random',
-            random: Math.random,
-            randint: (a, b) => Math.floor(Math.random() * (b - a + 1)) + a,
-            choice: (seq) => seq[Math.floor(Math.random() * seq.length)],
-            shuffle: (array) => {
-                for (let i = array.length - 1; i > 0; i--) {
-                    const j = Math.floor(Math.random() * (i + 1));
-                    [array[i], array[j]] = [array[j], array[i]];
-                }
-                return array;
-            },
-            sample: (population, k) => {
-                const result = [];
-                const indices = new Set();
-                while (result.length < k && indices.size < population.length) {
-                    const index = Math.floor(Math.random() * population.length);
-                    if (!indices.has(index)) {
-                        indices.add(index);
-                        result.push(population[index]);
-                    }
+    *bigItems(current, step, remaining) {
+        for (; remaining > 0n; remaining--, current += step) yield normalizeInt(current);
+    }
+
+    [Symbol.iterator]() {
+        if (this.big) return this.bigItems(BigInt(this.start), BigInt(this.step), BigInt(this.length));
+        return new RangeIterator(this.start, this.step, this.length);
+    }
+}
+
+class RangeIterator {
+    constructor(current, step, remaining) {
+        this.current = current;
+        this.step = step;
+        this.remaining = remaining;
+    }
+
+    next() {
+        if (this.remaining <= 0) return { value: undefined, done: true };
+        const value = this.current;
+        this.current += this.step;
+        this.remaining--;
+        return { value, done: false };
+    }
+
+    [Symbol.iterator]() {
+        return this;
+    }
+}
+
+class PyGenerator {
+    // A Python generator object driving a suspended JS generator; `next` is the JS iterator protocol.
+    constructor(name, iterator, StopIteration) {
+        this.__name__ = name;
+        this.iterator = iterator;
+        this.StopIteration = StopIteration;
+    }
+
+    next(value) {
+        return this.iterator.next(value);
+    }
+
+    resume(step) {
+        if (!step.done) return step.value;
+        const error = new this.StopIteration();
+        error.value = step.value === undefined ? null : step.value;
+        throw error;
+    }
+
+    send(value) {
+        return this.resume(this.iterator.next(value));
+    }
+
+    __next__() {
+        return this.send(null);
+    }
+
+    throw(error) {
+        return this.resume(this.iterator.throw(typeof error === 'function' ? new error() : error));
+    }
+
+    close() {
+        this.iterator.return(null);
+        return null;
+    }
+
+    __iter__() {
+        return this;
+    }
+
+    __repr__() {
+        return `<generator object ${this.__name__}>`;
+    }
+
+    [Symbol.iterator]() {
+        return this;
+    }
+}
+
+// Python ints are JS numbers while they are safe integers and BigInts beyond that,
+// so each int value has exactly one representation and === still compares ints.
+// Hot paths test Number.MAX_SAFE_INTEGER directly, which V8 folds to a constant.
+const MAX_SAFE_BIGINT = BigInt(Number.MAX_SAFE_INTEGER);
+
+function normalizeInt(value) {
+    return value >= -MAX_SAFE_BIGINT && value <= MAX_SAFE_BIGINT ? Number(value) : value;
+}
+
+function isIntValue(value) {
+    return typeof value === 'bigint' || Number.isSafeInteger(value) || typeof value === 'boolean';
+}
+
+// The exact int for an integral double, as int(1e20) gives 100000000000000000000.
+function intFromNumber(value) {
+    return Number.isSafeInteger(value) || !Number.isFinite(value) ? value : BigInt(value);
+}
+
+function invertInt(value) {
+    if (typeof value === 'number' && (value | 0) === value) return ~value;
+    if (!isIntValue(value)) {
+        throw new Error(`TypeError: bad operand type for unary ~: '${typeof value === 'number' ? 'float' : typeof value}'`);
+    }
+    return normalizeInt(~BigInt(value));
+}
+
+const BIGINT_OPERATIONS = {
+    '+': (a, b) => a + b,
+    '-': (a, b) => a - b,
+    '*': (a, b) => a * b,
+    '//': (a, b) => (a % b !== 0n && (a < 0n) !== (b < 0n) ? a / b - 1n : a / b),
+    '%': (a, b) => {
+        const remainder = a % b;
+        return remainder !== 0n && (remainder < 0n) !== (b < 0n) ? remainder + b : remainder;
+    },
+    '**': (a, b) => a ** b,
+    '<<': (a, b) => a << b,
+    '>>': (a, b) => a >> b,
+    '&': (a, b) => a & b,
+    '|': (a, b) => a | b,
+    '^': (a, b) => a ^ b
+};
+const FLOAT_OPERATORS = new Set(['+', '-', '*', '/', '//', '%', '**']);
+
+// Identities for arbitrary objects nested in tuple keys, which hash by content.
+const keyIdentities = new WeakMap();
+let nextKeyIdentity = 0;
+
+function unhashable(key) {
+    const name = Array.isArray(key) ? 'list' : key instanceof PySet ? 'set' : 'dict';
+    return new Error(`TypeError: unhashable type: '${name}'`);
+}
+
+// A float holding an integer past 2**53 must hash like the equal int, which is a BigInt there.
+function integralKey(number) {
+    return (number <= Number.MAX_SAFE_INTEGER && number >= Number.MIN_SAFE_INTEGER) || !Number.isInteger(number) ? number : BigInt(number);
+}
+
+function encodeKeyPart(part) {
+    switch (typeof part) {
+        case 'number': return String(integralKey(part));
+        case 'boolean': return part ? '1' : '0';
+        case 'string': return JSON.stringify(part);
+        case 'bigint': return String(part);
+        case 'undefined': return 'N';
+    }
+    if (part === null) return 'N';
+    if (Array.isArray(part)) {
+        if (part.__class__ !== 'tuple') throw unhashable(part);
+        return `(${part.map(encodeKeyPart).join(',')})`;
+    }
+    if (part instanceof PyFrozenSet) return part.hash();
+    if (part instanceof PyRange) return part.__hash__();
+    if (part instanceof PySet || part instanceof PyDict) throw unhashable(part);
+    let id = keyIdentities.get(part);
+    if (id === undefined) {
+        id = nextKeyIdentity++;
+        keyIdentities.set(part, id);
+    }
+    return `#${id}`;
+}
+
+// Maps a Python key to a Map key so that keys Python considers equal collide:
+// True and 1 share a slot, and tuples compare by content. Composite keys start
+// with "\0(" and strings that already start with "\0" get a second one, so the
+// two can never meet.
+function hashKey(key) {
+    switch (typeof key) {
+        case 'number': return integralKey(key);
+        case 'string': return key.charCodeAt(0) === 0 ? '\0' + key : key;
+        case 'boolean': return key ? 1 : 0;
+        case 'bigint': return Number.isSafeInteger(Number(key)) ? Number(key) : key;
+        case 'undefined': return null;
+    }
+    if (key === null) return key;
+    if (Array.isArray(key)) {
+        if (key.__class__ !== 'tuple') throw unhashable(key);
+        return `\0(${key.map(encodeKeyPart).join(',')})`;
+    }
+    if (key instanceof PyFrozenSet) return `\0${key.hash()}`;
+    if (key instanceof PyRange) return `\0${key.__hash__()}`;
+    if (key instanceof PySet || key instanceof PyDict) throw unhashable(key);
+    return key;
+}
+
+class CheckedIterator {
+    // Iteration over a dict or set, which Python does not allow to gain or lose keys meanwhile:
+    // a JS Map iterator would carry on over keys added during the loop, possibly forever.
+    // `project` turns each Map item into what Python sees, or is null to pass it on.
+    constructor(container, iterator, project, kind) {
+        this.container = container;
+        this.iterator = iterator;
+        this.project = project;
+        this.kind = kind;
+        this.version = container.version;
+        this.size = container.size;
+    }
+
+    next() {
+        if (this.container.version !== this.version) {
+            const change = this.container.size !== this.size || this.kind === 'Set' ? 'changed size' : 'keys changed';
+            throw new Error(`RuntimeError: ${this.kind} ${change} during iteration`);
+        }
+        const step = this.iterator.next();
+        if (!step.done && this.project !== null) step.value = this.project(step.value);
+        return step;
+    }
+
+    [Symbol.iterator]() {
+        return this;
+    }
+}
+
+class PyDict {
+    // Python's dict: hashed key -> value in an insertion-ordered Map. Keys whose
+    // hash differs from the key itself (tuples, booleans) are remembered so that
+    // iteration hands back the original key objects.
+    constructor() {
+        this.map = new Map();
+        this.originals = null;
+        // Bumped whenever a key is added or removed, so iterators can tell the dict changed under them.
+        this.version = 0;
+    }
+
+    static fromObject(obj) {
+        const dict = new PyDict();
+        for (const key in obj) dict.set(key, obj[key]);
+        return dict;
+    }
+
+    get size() {
+        return this.map.size;
+    }
+
+    has(key) {
+        return this.map.has(hashKey(key));
+    }
+
+    get(key) {
+        return this.map.get(hashKey(key));
+    }
+
+    set(key, value) {
+        const hashed = hashKey(key);
+        if (hashed !== key && !this.map.has(hashed)) {
+            (this.originals || (this.originals = new Map())).set(hashed, key);
+        }
+        const size = this.map.size;
+        this.map.set(hashed, value);
+        if (this.map.size !== size) this.version++;
+    }
+
+    delete(key) {
+        const hashed = hashKey(key);
+        if (this.originals) this.originals.delete(hashed);
+        const deleted = this.map.delete(hashed);
+        if (deleted) this.version++;
+        return deleted;
+    }
+
+    clear() {
+        if (this.map.size > 0) this.version++;
+        this.map.clear();
+        this.originals = null;
+    }
+
+    originalKey(hashed) {
+        if (this.originals) {
+            const key = this.originals.get(hashed);
+            if (key !== undefined) return key;
+        }
+        return hashed;
+    }
+
+    keys() {
+        if (!this.originals) return this.map.keys();
+        return this.mapEntries((hashed) => this.originalKey(hashed));
+    }
+
+    values() {
+        return this.map.values();
+    }
+
+    // [key, value] tuples, as items() yields them.
+    entries() {
+        return this.mapEntries((hashed, value) => {
+            const pair = [this.originalKey(hashed), value];
+            pair.__class__ = 'tuple';
+            return pair;
+        });
+    }
+
+    *mapEntries(project) {
+        for (const [hashed, value] of this.map) yield project(hashed, value);
+    }
+
+    update(other) {
+        const size = this.map.size;
+        this.updateMap(other);
+        if (this.map.size !== size) this.version++;
+        return this;
+    }
+
+    updateMap(other) {
+        if (other instanceof PyDict && this.map.size === 0) {
+            this.map = new Map(other.map);
+            this.originals = other.originals && new Map(other.originals);
+        } else if (other instanceof PyDict) {
+            for (const [hashed, value] of other.map) {
+                if (other.originals && other.originals.has(hashed) && !this.map.has(hashed)) {
+                    (this.originals || (this.originals = new Map())).set(hashed, other.originals.get(hashed));
                 }
-                return result;
-            },
-            uniform: (a, b) => Math.random() * (b - a) + a,
-            seed: (x) => { /* No-op in this implementation */ },
-            gauss: (mu, sigma) => {
-                // Box-Muller transform
-                const u1 = Math.random();
-                const u2 = Math.random();
-                const z0 = Math.sqrt(-2 * Math.log(u1)) * Math.cos(2 * Math.PI * u2);
-                return z0 * sigma + mu;
+                this.map.set(hashed, value);
             }
-        };
+        } else if (other !== null && typeof other === 'object' && typeof other[Symbol.iterator] !== 'function') {
+            for (const key in other) this.set(key, other[key]);
+        } else {
+            for (const pair of other) {
+                const [key, value] = pair;
+                this.set(key, value);
+            }
+        }
     }
 
-    createOsModule() {
+    copy() {
+        return new PyDict().update(this);
+    }
+
+    equals(other) {
+        if (!(other instanceof PyDict) || other.map.size !== this.map.size) return false;
+        for (const [hashed, value] of this.map) {
+            if (!other.map.has(hashed) || !pyEquals(value, other.map.get(hashed))) return false;
+        }
+        return true;
+    }
+
+    __len__() {
+        return this.map.size;
+    }
+
+    __contains__(key) {
+        return this.map.has(hashKey(key));
+    }
+
+    toJSON() {
+        const result = {};
+        for (const [key, value] of this.entries()) result[key === null ? 'null' : String(key)] = value;
+        return result;
+    }
+
+    // What `for` loops over the dict and its views use.
+    iterate(kind) {
+        if (kind === 'values') return new CheckedIterator(this, this.map.values(), null, 'dictionary');
+        if (kind === 'items') {
+            return new CheckedIterator(this, this.map.entries(), (entry) => {
+                entry[0] = this.originalKey(entry[0]);
+                entry.__class__ = 'tuple';
+                return entry;
+            }, 'dictionary');
+        }
+        const project = this.originals ? (hashed) => this.originalKey(hashed) : null;
+        return new CheckedIterator(this, this.map.keys(), project, 'dictionary');
+    }
+
+    [Symbol.iterator]() {
+        return this.iterate('keys');
+    }
+}
+
+// JSON.parse reviver that turns JSON objects into dicts.
+function jsonObjectHook(key, value) {
+    return value !== null && typeof value === 'object' && !Array.isArray(value) ? PyDict.fromObject(value) : value;
+}
+
+class DictView {
+    // The live keys()/values()/items() views: nothing is copied until iterated.
+    constructor(dict, kind) {
+        this.dict = dict;
+        this.kind = kind;
+    }
+
+    __len__() {
+        return this.dict.size;
+    }
+
+    __contains__(item) {
+        if (this.kind === 'keys') return this.dict.has(item);
+        if (this.kind === 'items') {
+            if (!Array.isArray(item) || item.__class__ !== 'tuple' || item.length !== 2 || !this.dict.has(item[0])) return false;
+            return pyEquals(this.dict.get(item[0]), item[1]);
+        }
+        for (const value of this.dict.values()) {
+            if (pyEquals(value, item)) return true;
+        }
+        return false;
+    }
+
+    [Symbol.iterator]() {
+        return this.dict.iterate(this.kind);
+    }
+}
+
+class PySetBase {
+    // Shared by set and frozenset: hashed element -> element in an insertion-ordered
+    // Map, hashed like dict keys. Operations build results of the receiver's type.
+    constructor(iterable) {
+        this.map = new Map();
+        this.version = 0;
+        if (iterable !== undefined && iterable !== null) this.addAll(iterable);
+    }
+
+    static of(iterable) {
+        return iterable instanceof PySetBase ? iterable : new PyFrozenSet(iterable);
+    }
+
+    get size() {
+        return this.map.size;
+    }
+
+    has(item) {
+        return this.map.has(hashKey(item));
+    }
+
+    add(item) {
+        const hashed = hashKey(item);
+        if (!this.map.has(hashed)) {
+            this.map.set(hashed, item);
+            this.version++;
+        }
+    }
+
+    addAll(iterable) {
+        const size = this.map.size;
+        if (iterable instanceof PySetBase) {
+            for (const [hashed, item] of iterable.map) {
+                if (!this.map.has(hashed)) this.map.set(hashed, item);
+            }
+        } else {
+            for (const item of iterable) this.add(item);
+        }
+        if (this.map.size !== size) this.version++;
+        return this;
+    }
+
+    empty() {
+        return new this.constructor();
+    }
+
+    copy() {
+        const copy = this.empty();
+        copy.map = new Map(this.map);
+        return copy;
+    }
+
+    union(other) {
+        return this.copy().addAll(other);
+    }
+
+    intersection(other) {
+        other = PySetBase.of(other);
+        const [smaller, larger] = this.size <= other.size ? [this, other] : [other, this];
+        const result = this.empty();
+        for (const [hashed, item] of smaller.map) {
+            if (larger.map.has(hashed)) result.map.set(hashed, item);
+        }
+        return result;
+    }
+
+    difference(other) {
+        other = PySetBase.of(other);
+        const result = this.empty();
+        for (const [hashed, item] of this.map) {
+            if (!other.map.has(hashed)) result.map.set(hashed, item);
+        }
+        return result;
+    }
+
+    symmetricDifference(other) {
+        other = PySetBase.of(other);
+        const result = this.difference(other);
+        for (const [hashed, item] of other.map) {
+            if (!this.map.has(hashed)) result.map.set(hashed, item);
+        }
+        return result;
+    }
+
+    isSubset(other) {
+        other = PySetBase.of(other);
+        if (this.size > other.size) return false;
+        for (const hashed of this.map.keys()) {
+            if (!other.map.has(hashed)) return false;
+        }
+        return true;
+    }
+
+    isDisjoint(other) {
+        return this.intersection(other).size === 0;
+    }
+
+    equals(other) {
+        // A set and a frozenset with the same members are equal.
+        return other instanceof PySetBase && other.size === this.size && this.isSubset(other);
+    }
+
+    __len__() {
+        return this.map.size;
+    }
+
+    __contains__(item) {
+        return this.map.has(hashKey(item));
+    }
+
+    toJSON() {
+        return Array.from(this.map.values());
+    }
+
+    [Symbol.iterator]() {
+        return new CheckedIterator(this, this.map.values(), null, 'Set');
+    }
+}
+
+class PySet extends PySetBase {
+    delete(item) {
+        const deleted = this.map.delete(hashKey(item));
+        if (deleted) this.version++;
+        return deleted;
+    }
+
+    clear() {
+        if (this.map.size > 0) this.version++;
+        this.map.clear();
+    }
+
+    differenceUpdate(other) {
+        const size = this.map.size;
+        if (other instanceof PySetBase && other.size > this.size) {
+            for (const hashed of this.map.keys()) {
+                if (other.map.has(hashed)) this.map.delete(hashed);
+            }
+        } else {
+            for (const item of other) this.map.delete(hashKey(item));
+        }
+        if (this.map.size !== size) this.version++;
+        return this;
+    }
+
+    intersectionUpdate(other) {
+        const map = this.intersection(other).map;
+        if (map.size !== this.map.size) this.version++;
+        this.map = map;
+        return this;
+    }
+
+    symmetricDifferenceUpdate(other) {
+        const items = PySetBase.of(other).map;
+        if (items.size > 0) this.version++;
+        for (const [hashed, item] of items) {
+            if (!this.map.delete(hashed)) this.map.set(hashed, item);
+        }
+        return this;
+    }
+}
+
+class PyFrozenSet extends PySetBase {
+    // Element hashes in sorted order, so equal frozensets hash alike whatever their insertion order.
+    hash() {
+        if (this.hashed === undefined) {
+            this.hashed = `{${Array.from(this.map.values(), encodeKeyPart).sort().join(',')}}`;
+        }
+        return this.hashed;
+    }
+}
+
+// Python's ==. Values whose identity is not their equality compare by content: ints across
+// number and BigInt, bools with ints, lists and tuples item by item, dicts by their items,
+// sets by their members and ranges by the items they hold.
+function pyEquals(left, right) {
+    if (left === right) return true;
+    if (left === null || right === null || typeof left !== 'object' || typeof right !== 'object') {
+        if (typeof left === 'boolean') left = Number(left);
+        if (typeof right === 'boolean') right = Number(right);
+        const numeric = (value) => typeof value === 'number' || typeof value === 'bigint';
+        return numeric(left) && numeric(right) && left == right;
+    }
+    if (Array.isArray(left)) {
+        if (!Array.isArray(right) || left.length !== right.length || (left.__class__ === 'tuple') !== (right.__class__ === 'tuple')) {
+            return false;
+        }
+        for (let i = 0; i < left.length; i++) {
+            if (!pyEquals(left[i], right[i])) return false;
+        }
+        return true;
+    }
+    if (left instanceof PySetBase || left instanceof PyDict) return left.equals(right);
+    if (left instanceof PyRange) return left.__eq__(right);
+    return false;
+}
+
+// list.index and `in` by Python equality; identity is tried first since it is the common hit.
+function sequenceIndex(items, item) {
+    const index = items.indexOf(item);
+    return index !== -1 || typeof item === 'string' ? index : items.findIndex(value => pyEquals(item, value));
+}
+
+const BUILDER_SCAN_CHUNKS = 32;
+
+class StringBuilder {
+    // A str local grown by `+=`: appended pieces stay in a chunk list and are joined onto `flat`
+    // only when the whole value is loaded. len(), indexing near the end and endswith() read the
+    // chunks directly, so checking the text while building it never flattens the string.
+    constructor(flat) {
+        this.flat = flat;
+        this.chunks = [];
+        this.length = flat.length;
+    }
+
+    append(text) {
+        this.chunks.push(text);
+        this.length += text.length;
+    }
+
+    toString() {
+        const chunks = this.chunks;
+        if (chunks.length > 0) {
+            this.flat += chunks.length === 1 ? chunks[0] : chunks.join('');
+            this.chunks = [];
+        }
+        return this.flat;
+    }
+
+    charAt(index) {
+        const chunks = this.chunks;
+        let end = this.length;
+        for (let i = chunks.length - 1; i >= 0 && i >= chunks.length - BUILDER_SCAN_CHUNKS; i--) {
+            const start = end - chunks[i].length;
+            if (index >= start) return chunks[i][index - start];
+            end = start;
+        }
+        return this.toString()[index];
+    }
+
+    endsWith(suffix) {
+        const chunks = this.chunks;
+        let tail = '';
+        for (let i = chunks.length - 1; i >= 0 && tail.length < suffix.length; i--) {
+            if (chunks.length - i > BUILDER_SCAN_CHUNKS) return this.toString().endsWith(suffix);
+            tail = chunks[i] + tail;
+        }
+        if (tail.length < suffix.length) return this.toString().endsWith(suffix);
+        return tail.endsWith(suffix);
+    }
+}
+
+const INLINE_CACHE_SIZE = 4;
+
+class PyObject {
+    // Root of every class prototype, so a single instanceof tells class instances from other values.
+    // It is Python's `object`, the last class of every MRO.
+}
+PyObject.__name__ = 'object';
+
+class AttributeCache {
+    // One attribute-access site. It records up to INLINE_CACHE_SIZE methods the site resolved to,
+    // each shared by one class through its prototype, with the Python function behind it.
+    constructor(attribute) {
+        this.attribute = attribute;
+        this.methods = [];
+        this.functions = [];
+    }
+}
+
+class OutputStream {
+    // What a script writes to stdout or stderr. With a sink, text is passed on in batches: once
+    // `batchSize` characters are waiting, or `batchDelay` ms after the oldest of them was written.
+    // A sink may return a promise; until it settles the stream is busy and text keeps waiting.
+    // Only the last `maxRetained` characters are kept for the result.
+    constructor(sink = null, { batchSize = 8192, batchDelay = 50, maxRetained = Infinity } = {}) {
+        this.sink = sink;
+        this.batchSize = batchSize;
+        this.batchDelay = batchDelay;
+        this.maxRetained = maxRetained;
+        this.retained = [];
+        this.retainedStart = 0;
+        this.retainedSize = 0;
+        this.dropped = 0;
+        this.pending = [];
+        this.pendingSize = 0;
+        this.pendingSince = 0;
+        this.timer = null;
+        this.busy = null;
+    }
+
+    // A busy sink with a full batch waiting: the writer should pause until drain() settles.
+    get blocked() {
+        return this.busy !== null && this.pendingSize >= this.batchSize;
+    }
+
+    write(text) {
+        if (text.length === 0) return;
+        this.retain(text);
+        if (this.sink === null) return;
+        if (this.pendingSize === 0) this.pendingSince = performance.now();
+        this.pending.push(text);
+        this.pendingSize += text.length;
+        if (this.busy !== null) return;
+        // Timers cannot fire during a synchronous run, so the delay is also checked here: on every
+        // write while a batch is small, then on every 32nd.
+        const pieces = this.pending.length;
+        if (this.pendingSize >= this.batchSize ||
+            ((pieces < 32 || (pieces & 31) === 0) && performance.now() - this.pendingSince >= this.batchDelay)) {
+            this.flush();
+        } else if (this.timer === null) {
+            this.timer = setTimeout(() => {
+                this.timer = null;
+                this.flush();
+            }, this.batchDelay);
+        }
+    }
+
+    retain(text) {
+        this.retained.push(text);
+        this.retainedSize += text.length;
+        let excess = this.retainedSize - this.maxRetained;
+        if (excess <= 0) return;
+        this.dropped += excess;
+        this.retainedSize -= excess;
+        const retained = this.retained;
+        let start = this.retainedStart;
+        while (excess >= retained[start].length) excess -= retained[start++].length;
+        if (excess > 0) retained[start] = retained[start].slice(excess);
+        // Dropped pieces are skipped, and cut off only once they make up half of the array.
+        if (start > 1024 && start * 2 > retained.length) {
+            this.retained = retained.slice(start);
+            start = 0;
+        }
+        this.retainedStart = start;
+    }
+
+    flush() {
+        if (this.timer !== null) {
+            clearTimeout(this.timer);
+            this.timer = null;
+        }
+        if (this.busy !== null || this.pendingSize === 0) return;
+        const chunk = this.pending.length === 1 ? this.pending[0] : this.pending.join('');
+        this.pending = [];
+        this.pendingSize = 0;
+        const result = this.sink(chunk);
+        if (result && typeof result.then === 'function') {
+            const settle = () => {
+                this.busy = null;
+                if (this.pendingSize >= this.batchSize) this.flush();
+                else if (this.pendingSize > 0 && this.timer === null) {
+                    this.timer = setTimeout(() => {
+                        this.timer = null;
+                        this.flush();
+                    }, this.batchDelay);
+                }
+            };
+            this.busy = Promise.resolve(result).then(settle, settle);
+        }
+    }
+
+    async drain() {
+        this.flush();
+        while (this.busy !== null) {
+            await this.busy;
+            this.flush();
+        }
+    }
+
+    text() {
+        if (this.retainedStart > 0 || this.retained.length > 1) {
+            const retained = this.retainedStart > 0 ? this.retained.slice(this.retainedStart) : this.retained;
+            this.retained = [retained.join('')];
+            this.retainedStart = 0;
+        }
+        return this.retained.length > 0 ? this.retained[0] : '';
+    }
+}
+
+class Profiler {
+    // Deterministic profile of profiled programs: every statement and every call of a Python
+    // function is timed. Lines and functions keep separate stacks, so a line's self time excludes
+    // the lines run inside it (loop bodies, called functions) and a function's self time excludes
+    // the functions it calls. Recursive lines and calls count towards cumulative time only once.
+    constructor() {
+        this.lines = new Map();
+        this.functions = new Map();
+        this.sources = new Map();
+        this.lineStack = [];
+        this.lineStarts = [];
+        this.lineChildren = [];
+        this.lineDepth = 0;
+        this.functionStack = [];
+        this.functionStarts = [];
+        this.functionChildren = [];
+        this.functionEdges = [];
+        this.functionDepth = 0;
+    }
+
+    addSource(file, code) {
+        this.sources.set(file, code.split('\n'));
+    }
+
+    lineStats(file, line) {
+        const key = `${file}:${line}`;
+        let stats = this.lines.get(key);
+        if (stats === undefined) {
+            stats = { file, line, hits: 0, self: 0, cumulative: 0, active: 0 };
+            this.lines.set(key, stats);
+        }
+        return stats;
+    }
+
+    functionStats(file, line, name) {
+        const key = `${file}:${line}(${name})`;
+        let stats = this.functions.get(key);
+        if (stats === undefined) {
+            stats = { file, line, name, calls: 0, primitiveCalls: 0, self: 0, cumulative: 0, active: 0, callers: new Map() };
+            this.functions.set(key, stats);
+        }
+        return stats;
+    }
+
+    enterLine(stats) {
+        const depth = this.lineDepth++;
+        stats.hits++;
+        stats.active++;
+        this.lineStack[depth] = stats;
+        this.lineChildren[depth] = 0;
+        this.lineStarts[depth] = performance.now();
+    }
+
+    exitLine() {
+        const depth = --this.lineDepth;
+        const elapsed = performance.now() - this.lineStarts[depth];
+        const stats = this.lineStack[depth];
+        stats.self += elapsed - this.lineChildren[depth];
+        if (--stats.active === 0) stats.cumulative += elapsed;
+        if (depth > 0) this.lineChildren[depth - 1] += elapsed;
+        this.lineStack[depth] = null;
+    }
+
+    enterFunction(stats) {
+        const depth = this.functionDepth++;
+        const caller = depth > 0 ? this.functionStack[depth - 1] : null;
+        let edge = stats.callers.get(caller);
+        if (edge === undefined) {
+            edge = { calls: 0, primitiveCalls: 0, self: 0, cumulative: 0 };
+            stats.callers.set(caller, edge);
+        }
+        stats.calls++;
+        edge.calls++;
+        if (stats.active++ === 0) {
+            stats.primitiveCalls++;
+            edge.primitiveCalls++;
+        }
+        this.functionStack[depth] = stats;
+        this.functionEdges[depth] = edge;
+        this.functionChildren[depth] = 0;
+        this.functionStarts[depth] = performance.now();
+    }
+
+    exitFunction() {
+        const depth = --this.functionDepth;
+        const elapsed = performance.now() - this.functionStarts[depth];
+        const stats = this.functionStack[depth];
+        const edge = this.functionEdges[depth];
+        const self = elapsed - this.functionChildren[depth];
+        stats.self += self;
+        edge.self += self;
+        if (--stats.active === 0) {
+            stats.cumulative += elapsed;
+            edge.cumulative += elapsed;
+        }
+        if (depth > 0) this.functionChildren[depth - 1] += elapsed;
+        this.functionStack[depth] = this.functionEdges[depth] = null;
+    }
+
+    sourceLine(file, line) {
+        const lines = this.sources.get(file);
+        return lines && lines[line - 1] !== undefined ? lines[line - 1].trim() : '';
+    }
+
+    sorted(entries, sort) {
+        const keys = {
+            cumulative: (a, b) => b.cumulative - a.cumulative,
+            self: (a, b) => b.self - a.self,
+            calls: (a, b) => (b.calls !== undefined ? b.calls - a.calls : b.hits - a.hits),
+            line: (a, b) => (a.file < b.file ? -1 : a.file > b.file ? 1 : a.line - b.line)
+        };
+        if (!keys[sort]) throw new Error(`Unknown sort key '${sort}'; expected one of ${Object.keys(keys).join(', ')}`);
+        return [...entries].sort(keys[sort]);
+    }
+
+    toText({ sort = 'cumulative', limit = 30 } = {}) {
+        // Functions in the layout of pstats.Stats.print_stats, then the lines.
+        const functions = [...this.functions.values()];
+        let calls = 0;
+        let primitiveCalls = 0;
+        let total = 0;
+        for (const stats of functions) {
+            calls += stats.calls;
+            primitiveCalls += stats.primitiveCalls;
+            total += stats.self;
+        }
+        const seconds = (ms) => (ms / 1000).toFixed(3).padStart(8);
+        const ms = (value) => value.toFixed(3).padStart(10);
+        const out = [
+            `         ${calls} function calls${calls !== primitiveCalls ? ` (${primitiveCalls} primitive calls)` : ''} in ${(total / 1000).toFixed(3)} seconds`,
+            '',
+            `   Ordered by: ${sort}`,
+            '',
+            '   ncalls  tottime  percall  cumtime  percall filename:lineno(function)'
+        ];
+        for (const stats of this.sorted(functions, sort).slice(0, limit)) {
+            const ncalls = stats.calls === stats.primitiveCalls ? `${stats.calls}` : `${stats.calls}/${stats.primitiveCalls}`;
+            out.push(`${ncalls.padStart(9)} ${seconds(stats.self)} ${seconds(stats.self / stats.calls)} ` +
+                `${seconds(stats.cumulative)} ${seconds(stats.cumulative / stats.primitiveCalls)} ${stats.file}:${stats.line}(${stats.name})`);
+        }
+        out.push('', '     hits   time(ms)   self(ms)  line');
+        for (const stats of this.sorted(this.lines.values(), sort).slice(0, limit)) {
+            out.push(`${String(stats.hits).padStart(9)} ${ms(stats.cumulative)} ${ms(stats.self)}  ` +
+                `${stats.file}:${stats.line}  ${this.sourceLine(stats.file, stats.line)}`);
+        }
+        return out.join('\n');
+    }
+
+    toJSON() {
+        // Times in milliseconds.
+        const label = (stats) => stats === null ? null : { file: stats.file, line: stats.line, name: stats.name };
         return {
-            __name__: 'os',
-            name: 'posix',
-            path: {
-                join: (...paths) => paths.join('/'),
-                dirname: (path) => {
-                    const parts = path.split('/');
-                    return parts.slice(0, -1).join('/') || '/';
-                },
-                basename: (path) => {
-                    const parts = path.split('/');
-                    return parts[parts.length - 1];
-                },
-                exists: (path) => {
-                    return this.fileSystem.has(path);
-                },
-                isfile: (path) => {
-                    const entry = this.fileSystem.get(path);
-                    return entry && entry.type === 'file';
-                },
-                isdir: (path) => {
-                    const entry = this.fileSystem.get(path);
-                    return entry && entry.type === 'directory';
-                },
-                abspath: (path) => {
-                    if (path.startsWith('/')) return path;
-                    return this.currentDir + '/' + path;
-                },
-                splitext: (path) => {
-                    const lastDot = path.lastIndexOf('.');
-                    if (lastDot === -1) return [path, ''];
-                    return [path.substring(0, lastDot), path.substring(lastDot)];
+            functions: [...this.functions.values()].map(stats => ({
+                file: stats.file,
+                line: stats.line,
+                name: stats.name,
+                calls: stats.calls,
+                primitiveCalls: stats.primitiveCalls,
+                selfTime: stats.self,
+                cumulativeTime: stats.cumulative,
+                callers: [...stats.callers].map(([caller, edge]) => ({
+                    caller: label(caller),
+                    calls: edge.calls,
+                    primitiveCalls: edge.primitiveCalls,
+                    selfTime: edge.self,
+                    cumulativeTime: edge.cumulative
+                }))
+            })),
+            lines: this.sorted(this.lines.values(), 'line').map(stats => ({
+                file: stats.file,
+                line: stats.line,
+                hits: stats.hits,
+                selfTime: stats.self,
+                cumulativeTime: stats.cumulative,
+                source: this.sourceLine(stats.file, stats.line)
+            }))
+        };
+    }
+
+    toPstats() {
+        // The marshal-encoded dict cProfile writes with dump_stats, readable by pstats.Stats:
+        // {(file, line, name): (primitive calls, calls, tottime, cumtime, {caller: (calls, primitive calls, tottime, cumtime)})}
+        const bytes = [];
+        const int32 = (value) => bytes.push(value & 0xff, (value >> 8) & 0xff, (value >> 16) & 0xff, (value >>> 24) & 0xff);
+        const float = (ms) => {
+            const view = new DataView(new ArrayBuffer(8));
+            view.setFloat64(0, ms / 1000, true);
+            bytes.push(0x67, ...new Uint8Array(view.buffer));
+        };
+        const int = (value) => {
+            bytes.push(0x69);
+            int32(value);
+        };
+        const str = (value) => {
+            const encoded = new TextEncoder().encode(value);
+            bytes.push(0x75);
+            int32(encoded.length);
+            for (const byte of encoded) bytes.push(byte);
+        };
+        const key = (stats) => {
+            bytes.push(0x29, 3);
+            str(stats.file);
+            int(stats.line);
+            str(stats.name);
+        };
+        bytes.push(0x7b);
+        for (const stats of this.functions.values()) {
+            key(stats);
+            bytes.push(0x29, 5);
+            int(stats.primitiveCalls);
+            int(stats.calls);
+            float(stats.self);
+            float(stats.cumulative);
+            bytes.push(0x7b);
+            for (const [caller, edge] of stats.callers) {
+                if (caller === null) continue;
+                key(caller);
+                bytes.push(0x29, 4);
+                int(edge.calls);
+                int(edge.primitiveCalls);
+                float(edge.self);
+                float(edge.cumulative);
+            }
+            bytes.push(0x30);
+        }
+        bytes.push(0x30);
+        return Uint8Array.from(bytes);
+    }
+}
+
+class SamplingProfiler {
+    // Statistical profile of bytecode runs. Once every `interval` ms of execution, at the next loop
+    // iteration or call, the Python call stack is read from the VM's activations and counted;
+    // each sample weighs the time since the one before it. Stacks are kept as a prefix tree whose
+    // node 0 is the root, so a sample is the node of its innermost frame; a child is found under
+    // the key node * 2^21 + frame id, as no program has two million distinct lines.
+    constructor({ interval = 1 } = {}) {
+        this.interval = interval;
+        this.frames = [];
+        this.frameIds = new Map();
+        this.codeFrames = new Map();
+        this.parents = [-1];
+        this.nodeFrames = [-1];
+        this.children = new Map();
+        this.lastChild = [0];
+        this.samples = [];
+        this.weights = [];
+        this.ids = [];
+        this.cost = 0;
+        this.resume();
+    }
+
+    resume() {
+        // Time that passes outside a run (between runs, while a run is paused) is not sampled.
+        this.last = performance.now();
+        this.next = this.last + this.interval;
+    }
+
+    frameId(code, frame, pc) {
+        const file = frame[0].__file__ || '<string>';
+        const line = code.lineAt(pc);
+        let lines = this.codeFrames.get(code);
+        if (lines === undefined) {
+            lines = new Map();
+            this.codeFrames.set(code, lines);
+        }
+        let id = lines.get(line);
+        if (id !== undefined && this.frames[id].file === file) return id;
+        const key = `${file}:${line}:${code.name}`;
+        id = this.frameIds.get(key);
+        if (id === undefined) {
+            id = this.frames.length;
+            this.frames.push({ name: code.name, file, line });
+            this.frameIds.set(key, id);
+        }
+        lines.set(line, id);
+        return id;
+    }
+
+    sample(activations, depth, code, frame, pc, now) {
+        // Callers are stored with the pc after their call instruction. A block run by a try or
+        // with statement shares its function's frame and replaces it with the more precise line.
+        // Recursion repeats the same caller many times over, so the last frame id is reused.
+        const ids = this.ids;
+        let count = 0;
+        let previous = null;
+        let lastCode = null;
+        let lastPc = -1;
+        let lastGlobals = null;
+        let id = -1;
+        for (let i = 0; i <= depth; i++) {
+            const activation = i < depth ? activations[i] : null;
+            const current = activation !== null ? activation.frame : frame;
+            if (current === null) continue;
+            const currentCode = activation !== null ? activation.code : code;
+            const currentPc = activation !== null ? activation.pc : pc;
+            if (currentCode !== lastCode || currentPc !== lastPc || current[0] !== lastGlobals) {
+                id = this.frameId(currentCode, current, currentPc - 2);
+                lastCode = currentCode;
+                lastPc = currentPc;
+                lastGlobals = current[0];
+            }
+            if (current === previous) ids[count - 1] = id;
+            else ids[count++] = id;
+            previous = current;
+        }
+        if (count > 0) {
+            let node = 0;
+            for (let i = 0; i < count; i++) {
+                let child = this.lastChild[node];
+                if (child === 0 || this.nodeFrames[child] !== ids[i]) {
+                    const key = node * 0x200000 + ids[i];
+                    child = this.children.get(key);
+                    if (child === undefined) {
+                        child = this.parents.length;
+                        this.parents.push(node);
+                        this.nodeFrames.push(ids[i]);
+                        this.lastChild.push(0);
+                        this.children.set(key, child);
+                    }
+                    this.lastChild[node] = child;
+                }
+                node = child;
+            }
+            this.samples.push(node);
+            this.weights.push(now - this.last);
+        }
+        // Deep stacks take a while to read: waiting at least 20 times as long as sampling takes keeps
+        // it under 5% of the run. The cheaper of the last two samples is the estimate, as the first
+        // sample of a new stack also builds its nodes.
+        const done = performance.now();
+        const cost = Math.min(done - now, this.cost);
+        this.cost = done - now;
+        this.last = now;
+        this.next = done + Math.max(this.interval, cost * 20);
+    }
+
+    stackOf(node) {
+        // Frame ids from the outermost frame to the innermost.
+        const stack = [];
+        for (; node > 0; node = this.parents[node]) stack.push(this.nodeFrames[node]);
+        return stack.reverse();
+    }
+
+    label(id) {
+        const frame = this.frames[id];
+        return `${frame.name} (${frame.file}:${frame.line})`;
+    }
+
+    toCollapsed() {
+        // Brendan Gregg's collapsed stacks, read by flamegraph.pl, speedscope and most flame graph
+        // tools: one line per distinct stack, root first, with its weight in sampling intervals.
+        const totals = new Map();
+        for (let i = 0; i < this.samples.length; i++) {
+            totals.set(this.samples[i], (totals.get(this.samples[i]) || 0) + this.weights[i]);
+        }
+        const out = [];
+        for (const [node, total] of totals) {
+            const count = Math.max(1, Math.round(total / this.interval));
+            out.push(`${this.stackOf(node).map(id => this.label(id)).join(';')} ${count}`);
+        }
+        return out.join('\n');
+    }
+
+    toSpeedscope({ name = 'python' } = {}) {
+        // A speedscope file holding one sampled profile, with weights in milliseconds.
+        let total = 0;
+        for (const weight of this.weights) total += weight;
+        const stacks = new Map();
+        return {
+            $schema: 'https://www.speedscope.app/file-format-schema.json',
+            shared: { frames: this.frames.map(frame => ({ name: frame.name, file: frame.file, line: frame.line })) },
+            profiles: [{
+                type: 'sampled',
+                name,
+                unit: 'milliseconds',
+                startValue: 0,
+                endValue: total,
+                samples: this.samples.map(node => {
+                    let stack = stacks.get(node);
+                    if (stack === undefined) {
+                        stack = this.stackOf(node);
+                        stacks.set(node, stack);
+                    }
+                    return stack;
+                }),
+                weights: this.weights
+            }],
+            name,
+            activeProfileIndex: 0,
+            exporter: 'python_interpreter.js'
+        };
+    }
+}
+
+class KeywordArguments {
+    constructor(values) {
+        this.values = values;
+    }
+}
+
+function detachReturn(result) {
+    // Return statements reuse one signal object. Before more Python code runs while a return is
+    // under way (a finally block or __exit__, which may run the same statement), the value moves
+    // to a signal of its own.
+    return result && result.type === 'return' ? { type: 'return', value: result.value } : result;
+}
+
+function splitKeywordArguments(args) {
+    if (args.length > 0 && args[args.length - 1] instanceof KeywordArguments) {
+        return [args.slice(0, -1), args[args.length - 1].values];
+    }
+    return [args, {}];
+}
+
+class PythonInterpreter {
+    constructor(options = {}) {
+        this.globals = {};
+        this.builtins = {};
+        this.stdlibPath = 'python_stdlib/';
+        this.modules = new Map();
+        this.executionLog = [];
+        this.functions = new Map();
+        this.classes = new Map();
+        this.importedModules = new Map();
+        this.scopeStack = [{ __name__: '__main__' }];
+        this.fileSystem = new Map();
+        this.currentDir = '/workspace';
+        this.openFiles = new Map();
+        this.identifierTable = new Map();
+        this.astCache = new ASTCache({
+            maxEntries: options.astCacheEntries,
+            maxBytes: options.astCacheBytes
+        });
+        this.activeExceptions = [];
+        this.optimize = options.optimize !== false;
+        this.inlineCaches = options.inlineCaches !== false;
+        this.inlineCacheStats = { sites: 0, hits: 0, misses: 0, resets: 0 };
+        this.engine = options.engine || 'closure';
+        if (this.engine !== 'closure' && this.engine !== 'vm') {
+            throw new Error(`Unknown engine '${this.engine}'; expected 'closure' or 'vm'`);
+        }
+        this.compiledPrograms = new WeakMap();
+        this.compileScope = null;
+        // While a Profiler is active, programs are compiled again with timed statements and functions.
+        this.profiler = null;
+        this.profiledPrograms = new WeakMap();
+        this.compileProfile = null;
+        // While a SamplingProfiler is active, programs are compiled to bytecode, whose call stack it reads.
+        this.sampler = null;
+        this.sampledPrograms = new WeakMap();
+        // The VM keeps the callers of running bytecode functions here rather than on the JS stack.
+        this.activations = [];
+        this.callDepth = 0;
+        // Calls that run on the JS stack: closure-engine functions and bytecode functions called from
+        // outside the VM loop. With callDepth they count towards the recursion limit.
+        this.nestedCalls = 0;
+        this.vmRuns = 0;
+        this.recursionLimit = options.recursionLimit || 1000;
+        this.suspendable = false;
+        this.pendingSuspend = -1;
+        this.cancelRequested = false;
+        // Output sinks receive text in batches as it is written; the result keeps up to maxOutput
+        // characters of stdout.
+        this.onStdout = options.onStdout || null;
+        this.onStderr = options.onStderr || null;
+        this.outputOptions = {
+            batchSize: options.outputBatchSize || 8192,
+            batchDelay: options.outputBatchDelay !== undefined ? options.outputBatchDelay : 50,
+            maxRetained: options.maxOutput || Infinity
+        };
+        this.openOutput();
+        // Every loop iteration and function call is a step. checkSteps runs once this.steps reaches
+        // this.stepCheck, which stays at Infinity unless a budget or time slicing applies to the run.
+        this.maxSteps = options.maxSteps || 0;
+        this.timeLimit = options.timeLimit || 0;
+        this.sliceSteps = options.sliceSteps || 0;
+        this.steps = 0;
+        this.stepCheck = Infinity;
+        this.nextSlice = 0;
+        this.cpuTime = 0;
+        this.sliceStart = 0;
+        this.loadingModules = new Map();
+        this.pendingWrites = new Set();
+        this.binaryOperators = this.createBinaryOperators();
+        this.initializeBuiltins();
+        this.initializeStandardTypes();
+        this.initializeFileSystem();
+    }
+
+    writeToRealFileSystem(filename, content, append = false) {
+        console.log('Writing to file:', filename, 'Content:', content);
+        const write = fetch('write_data.php', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({filename, content, append})
+        }).then(response => response.json())
+        .then(data => {
+            console.log('PHP write result:', data);
+            return data;
+        })
+        .catch(error => {
+            console.log('PHP write error:', error);
+            throw error;
+        });
+        // Writes run in the background; executeCode awaits them before returning.
+        this.pendingWrites.add(write);
+        write.then(() => this.pendingWrites.delete(write), () => this.pendingWrites.delete(write));
+        return write;
+    }
+
+    async flushRealFileSystemWrites() {
+        const writes = [...this.pendingWrites];
+        const results = await Promise.allSettled(writes);
+        for (const result of results) {
+            if (result.status === 'rejected') {
+                this.logExecution(`Real file system write failed: ${result.reason && result.reason.message}`);
+            }
+        }
+    }
+
+    initializeBuiltins() {
+        const rangeArgument = (value) => {
+            if (typeof value === 'boolean') return Number(value);
+            if (typeof value === 'bigint') return normalizeInt(value);
+            if (typeof value !== 'number' || !Number.isInteger(value)) {
+                throw new this.builtins.TypeError(`'${typeof value === 'number' ? 'float' : this.builtins.type(value)}' object cannot be interpreted as an integer`);
+            }
+            return value;
+        };
+        this.builtins.range = (start, stop, step = 1) => {
+            if (stop === undefined) {
+                stop = start;
+                start = 0;
+            }
+            step = rangeArgument(step);
+            if (step === 0) throw new this.builtins.ValueError('range() arg 3 must not be zero');
+            return new PyRange(rangeArgument(start), rangeArgument(stop), step);
+        };
+        // Lets isinstance(x, range) work although range() is called rather than constructed.
+        this.builtins.range.prototype = PyRange.prototype;
+
+        this.builtins.print = (...args) => {
+            const [values, options] = splitKeywordArguments(args);
+            const sep = options.sep === undefined || options.sep === null ? ' ' : options.sep;
+            const end = options.end === undefined || options.end === null ? '\n' : options.end;
+            const output = values.map(arg => this.toString(arg)).join(sep);
+            const file = options.file === undefined || options.file === null ? this.stdoutFile : options.file;
+            const stream = file === this.stdoutFile ? this.stdout : file === this.stderrFile ? this.stderr : null;
+            if (stream !== null) {
+                stream.write(output + end);
+                if (options.flush) stream.flush();
+                if (stream.blocked) this.suspend(0);
+            } else {
+                this.callFunction(this.getAttribute(file, 'write'), [output + end]);
+            }
+            return output;
+        };
+
+        this.builtins.len = (obj) => {
+            if (Array.isArray(obj) || typeof obj === 'string') {
+                return obj.length;
+            }
+            if (obj && typeof obj === 'object' && obj.__len__) {
+                return obj.__len__();
+            }
+            return 0;
+        };
+
+        this.builtins.str = (obj) => this.toString(obj);
+        this.builtins.repr = (obj) => this.repr(obj);
+        this.builtins.ascii = (obj) => this.ascii(obj);
+        this.builtins.format = (value, spec = '') => this.formatValue(value, spec);
+        this.builtins.int = (obj = 0, base = 10) => {
+            if (typeof obj === 'string') return this.parseIntText(obj, base);
+            if (typeof obj === 'bigint') return obj;
+            if (typeof obj !== 'number' && typeof obj !== 'boolean') {
+                throw new this.builtins.TypeError(`int() argument must be a string or a real number, not '${this.builtins.type(obj)}'`);
+            }
+            const value = Math.trunc(Number(obj));
+            if (Number.isNaN(value)) throw new this.builtins.ValueError('cannot convert float NaN to integer');
+            if (!Number.isFinite(value)) throw new this.builtins.OverflowError('cannot convert float infinity to integer');
+            return intFromNumber(value);
+        };
+        this.builtins.float = (obj = 0) => {
+            if (typeof obj === 'string') {
+                const parsed = parseFloat(obj);
+                if (isNaN(parsed)) throw new Error(`could not convert string to float: '${obj}'`);
+                return parsed;
+            }
+            return Number(obj);
+        };
+        this.builtins.bool = (obj) => Boolean(obj);
+        this.builtins.list = (iterable) => {
+            if (Array.isArray(iterable)) return [...iterable];
+            if (typeof iterable === 'string') return [...iterable];
+            if (iterable && iterable[Symbol.iterator]) return [...iterable];
+            return [];
+        };
+        this.builtins.tuple = (iterable) => {
+            const arr = this.builtins.list(iterable);
+            arr.__class__ = 'tuple';
+            return arr;
+        };
+        this.builtins.dict = (...args) => {
+            const [[iterable], options] = splitKeywordArguments(args);
+            const result = new PyDict();
+            if (iterable !== undefined && iterable !== null) result.update(iterable);
+            return result.update(options);
+        };
+        this.builtins.dict.prototype = PyDict.prototype;
+        this.builtins.dict.fromkeys = (iterable, value = null) => {
+            const result = new PyDict();
+            for (const key of this.iterate(iterable)) result.set(key, value);
+            return result;
+        };
+        this.builtins.set = (iterable) => new PySet(iterable === undefined ? undefined : this.iterate(iterable));
+        this.builtins.set.prototype = PySet.prototype;
+        this.builtins.frozenset = (iterable) => new PyFrozenSet(iterable === undefined ? undefined : this.iterate(iterable));
+        this.builtins.frozenset.prototype = PyFrozenSet.prototype;
+        this.builtins.abs = (value) => typeof value === 'bigint' ? (value < 0n ? -value : value) : Math.abs(value);
+        // Reduce without spreading, so long iterables do not overflow the call stack.
+        const extreme = (name, args, better) => {
+            const values = args.length === 1 && args[0] && typeof args[0] === 'object' ? this.iterate(args[0]) : args;
+            let result;
+            let empty = true;
+            for (const value of values) {
+                if (empty || better(value, result)) result = value;
+                empty = false;
+            }
+            if (empty) throw new this.builtins.ValueError(`${name}() arg is an empty sequence`);
+            return result;
+        };
+        this.builtins.max = (...args) => extreme('max', args, (value, best) => value > best);
+        this.builtins.min = (...args) => extreme('min', args, (value, best) => value < best);
+        this.builtins.sum = (iterable, start = 0) => {
+            const add = this.binaryOperators['+'];
+            let total = start;
+            for (const value of this.iterate(iterable)) {
+                total = add(total, value);
+            }
+            return total;
+        };
+        this.builtins.sorted = (...args) => {
+            const [[iterable], options] = splitKeywordArguments(args);
+            const arr = [];
+            for (const value of iterable) {
+                arr.push([options.key ? options.key(value) : value, value]);
+            }
+            arr.sort((a, b) => (a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : 0));
+            const result = arr.map(pair => pair[1]);
+            return options.reverse ? result.reverse() : result;
+        };
+        this.builtins.reversed = (iterable) => {
+            if (iterable instanceof PyRange) return iterable.__reversed__();
+            return [...iterable].reverse();
+        };
+        this.builtins.iter = (obj) => {
+            if (obj && typeof obj.__iter__ === 'function') return obj.__iter__();
+            return this.iterate(obj)[Symbol.iterator]();
+        };
+        this.builtins.next = (iterator, ...fallback) => {
+            if (!iterator || typeof iterator.next !== 'function') {
+                throw new this.builtins.TypeError(`'${this.builtins.type(iterator)}' object is not an iterator`);
+            }
+            const step = iterator.next();
+            if (!step.done) return step.value;
+            if (fallback.length > 0) return fallback[0];
+            throw new this.builtins.StopIteration();
+        };
+        this.builtins.enumerate = function*(...args) {
+            const [[iterable, start = 0], options] = splitKeywordArguments(args);
+            let index = options.start === undefined ? start : options.start;
+            for (const item of iterable) {
+                yield [index++, item];
+            }
+        };
+        this.builtins.zip = function*(...iterables) {
+            const iterators = iterables.map(iter => iter[Symbol.iterator]());
+            while (true) {
+                const results = iterators.map(iter => iter.next());
+                if (results.some(result => result.done)) break;
+                yield results.map(result => result.value);
+            }
+        };
+        
+        this.builtins.open = (filename, mode = 'r', encoding = 'utf-8') => {
+            return this.createFileObject(filename, mode, encoding);
+        };
+        
+        this.builtins.type = (obj) => {
+            if (obj === null || obj === undefined) return 'NoneType';
+            if (typeof obj === 'boolean') return 'bool';
+            if (typeof obj === 'number') return Number.isInteger(obj) ? 'int' : 'float';
+            if (typeof obj === 'bigint') return 'int';
+            if (typeof obj === 'string') return 'str';
+            if (Array.isArray(obj)) return obj.__class__ || 'list';
+            if (typeof obj === 'object') return 'dict';
+            if (typeof obj === 'function') return 'function';
+            return 'object';
+        };
+        this.builtins.map = function*(func, iterable) {
+            for (const item of iterable) {
+                yield func(item);
+            }
+        };
+        this.builtins.filter = function*(func, iterable) {
+            for (const item of iterable) {
+                if (func(item)) yield item;
+            }
+        };
+        this.builtins.any = (iterable) => {
+            for (const item of iterable) {
+                if (item) return true;
+            }
+            return false;
+        };
+        this.builtins.all = (iterable) => {
+            for (const item of iterable) {
+                if (!item) return false;
+            }
+            return true;
+        };
+        this.builtins.round = (number, ndigits = 0) => {
+            if (typeof number === 'bigint') return number;
+            const factor = Math.pow(10, ndigits);
+            return Math.round(number * factor) / factor;
+        };
+        this.builtins.pow = (base, exponent, modulus = null) => {
+            if (modulus === null || modulus === undefined) return this.binaryOperators['**'](base, exponent);
+            if (!isIntValue(base) || !isIntValue(exponent) || !isIntValue(modulus)) {
+                throw new this.builtins.TypeError('pow() 3rd argument not allowed unless all arguments are integers');
+            }
+            let m = BigInt(modulus);
+            if (m === 0n) throw new this.builtins.ValueError('pow() 3rd argument cannot be 0');
+            let e = BigInt(exponent);
+            if (e < 0n) throw new this.builtins.ValueError('pow() negative exponent is not supported');
+            let b = BigInt(base) % m;
+            let result = 1n % m;
+            for (; e > 0n; e >>= 1n) {
+                if (e & 1n) result = (result * b) % m;
+                b = (b * b) % m;
+            }
+            if (result !== 0n && (result < 0n) !== (m < 0n)) result += m;
+            return normalizeInt(result);
+        };
+        this.builtins.object = PyObject;
+        this.builtins.isinstance = (obj, classinfo) => {
+            if (classinfo === PyObject) return true;
+            if (Array.isArray(classinfo)) {
+                return classinfo.some(cls => this.builtins.isinstance(obj, cls));
+            }
+            if (typeof classinfo === 'string') {
+                return typeof obj === classinfo || (obj && obj.__class__ === classinfo);
+            }
+            return obj instanceof classinfo;
+        };
+        this.builtins.hasattr = (obj, name) => {
+            return obj && (name in obj) && obj[name] !== undefined;
+        };
+        this.builtins.getattr = (obj, name, defaultValue) => {
+            if (obj && name in obj && obj[name] !== undefined) return this.getAttribute(obj, name);
+            if (defaultValue !== undefined) return defaultValue;
+            throw new Error(`'${typeof obj}' object has no attribute '${name}'`);
+        };
+        this.builtins.setattr = (obj, name, value) => {
+            if (obj) this.setAttribute(obj, name, value);
+        };
+        this.builtins.delattr = (obj, name) => {
+            if (obj && name in obj) this.deleteAttribute(obj, name);
+        };
+        this.builtins.dir = (obj) => {
+            if (!obj) return Object.keys(this.getCurrentScope());
+            if (obj[PY_CLASS] !== undefined) {
+                // Instances list what their classes define too, as Python's dir() does.
+                const names = [];
+                for (const key in obj) names.push(key);
+                return names.sort();
+            }
+            return Object.keys(obj);
+        };
+        this.builtins.type = (obj) => {
+            if (obj === null || obj === undefined) return 'NoneType';
+            if (Array.isArray(obj)) return obj.__class__ || 'list';
+            if (typeof obj === 'boolean') return 'bool';
+            if (typeof obj === 'number') return Number.isInteger(obj) ? 'int' : 'float';
+            if (typeof obj === 'bigint') return 'int';
+            if (typeof obj === 'string') return 'str';
+            if (obj instanceof PyRange) return 'range';
+            if (obj instanceof PyGenerator) return 'generator';
+            if (obj instanceof PyDict) return 'dict';
+            if (obj instanceof PySetBase) return obj instanceof PyFrozenSet ? 'frozenset' : 'set';
+            if (obj instanceof DictView) return `dict_${obj.kind}`;
+            return typeof obj;
+        };
+    }
+
+    initializeStandardTypes() {
+        const define = (name, Base) => {
+            const cls = class extends Base {
+                constructor(...args) {
+                    if (args.length > 0 && args[args.length - 1] instanceof KeywordArguments) {
+                        args = args.slice(0, -1);
+                    }
+                    super(args.length > 0 ? String(args[0]) : '');
+                    this.name = name;
+                    this.args = args;
+                }
+            };
+            Object.defineProperty(cls, 'name', { value: name });
+            cls.__name__ = name;
+            this.builtins[name] = cls;
+            return cls;
+        };
+
+        const BaseException = define('BaseException', Error);
+        const Exception = define('Exception', BaseException);
+        define('KeyboardInterrupt', BaseException);
+        define('SystemExit', BaseException);
+        define('StopIteration', Exception);
+        const ArithmeticError = define('ArithmeticError', Exception);
+        define('ZeroDivisionError', ArithmeticError);
+        define('OverflowError', ArithmeticError);
+        define('AssertionError', Exception);
+        define('AttributeError', Exception);
+        const LookupError = define('LookupError', Exception);
+        define('IndexError', LookupError);
+        define('KeyError', LookupError);
+        const NameError = define('NameError', Exception);
+        define('UnboundLocalError', NameError);
+        const OSError = define('OSError', Exception);
+        this.builtins.IOError = OSError;
+        define('FileNotFoundError', OSError);
+        define('FileExistsError', OSError);
+        define('PermissionError', OSError);
+        define('TimeoutError', OSError);
+        define('IsADirectoryError', OSError);
+        const ImportError = define('ImportError', Exception);
+        define('ModuleNotFoundError', ImportError);
+        const RuntimeError = define('RuntimeError', Exception);
+        define('NotImplementedError', RuntimeError);
+        define('RecursionError', RuntimeError);
+        define('TypeError', Exception);
+        const ValueError = define('ValueError', Exception);
+        define('UnicodeError', ValueError);
+    }
+
+    initializeFileSystem() {
+        // Initialize with some basic directories
+        this.fileSystem.set('/workspace', {
+            type: 'directory',
+            name: 'workspace',
+            created: new Date()
+        });
+        this.fileSystem.set('/tmp', {
+            type: 'directory',
+            name: 'tmp',
+            created: new Date()
+        });
+        this.fileSystem.set('/home', {
+            type: 'directory',
+            name: 'home',
+            created: new Date()
+        });
+        this.fileSystem.set('/home/user', {
+            type: 'directory',
+            name: 'user',
+            created: new Date()
+        });
+    }
+
+    createFileObject(filename, mode = 'r', encoding = 'utf-8') {
+        const fileId = `${filename}_${mode}_${Date.now()}`;
+        
+        const fileObj = {
+            __class__: 'file',
+            name: filename,
+            mode: mode,
+            encoding: encoding,
+            closed: false,
+            readable: mode.includes('r') || mode.includes('+'),
+            writable: mode.includes('w') || mode.includes('a') || mode.includes('+'),
+            _content: '',
+            _position: 0,
+            
+            read: (size = -1) => {
+                if (fileObj.closed) {
+                    throw new Error('I/O operation on closed file');
+                }
+                if (!fileObj.readable) {
+                    throw new Error('File not open for reading');
+                }
+                
+                const entry = this.fileSystem.get(filename);
+                if (entry && entry.type === 'file') {
+                    fileObj._content = entry.content || '';
+                }
+                
+                if (size === -1) {
+                    const result = fileObj._content.substring(fileObj._position);
+                    fileObj._position = fileObj._content.length;
+                    return result;
+                } else {
+                    const result = fileObj._content.substring(fileObj._position, fileObj._position + size);
+                    fileObj._position += result.length;
+                    return result;
+                }
+            },
+            
+            readline: () => {
+                if (fileObj.closed) {
+                    throw new Error('I/O operation on closed file');
+                }
+                if (!fileObj.readable) {
+                    throw new Error('File not open for reading');
+                }
+                
+                const entry = this.fileSystem.get(filename);
+                if (entry && entry.type === 'file') {
+                    fileObj._content = entry.content || '';
+                }
+                
+                const startPos = fileObj._position;
+                const newlineIndex = fileObj._content.indexOf('\n', startPos);
+                
+                if (newlineIndex === -1) {
+                    const result = fileObj._content.substring(startPos);
+                    fileObj._position = fileObj._content.length;
+                    return result;
+                } else {
+                    const result = fileObj._content.substring(startPos, newlineIndex + 1);
+                    fileObj._position = newlineIndex + 1;
+                    return result;
+                }
+            },
+            
+            readlines: () => {
+                if (fileObj.closed) {
+                    throw new Error('I/O operation on closed file');
+                }
+                if (!fileObj.readable) {
+                    throw new Error('File not open for reading');
+                }
+                
+                const entry = this.fileSystem.get(filename);
+                if (entry && entry.type === 'file') {
+                    fileObj._content = entry.content || '';
+                }
+                
+                const lines = fileObj._content.split('\n');
+                if (lines[lines.length - 1] === '') lines.pop();
+                return lines.map(line => line + '\n');
+            },
+            
+            write: (data) => {
+                if (fileObj.closed) {
+                    throw new Error('I/O operation on closed file');
+                }
+                if (!fileObj.writable) {
+                    throw new Error('File not open for writing');
+                }
+                
+                const strData = String(data);
+                
+                if (mode.includes('a')) {
+                    // Append mode
+                    const entry = this.fileSystem.get(filename);
+                    if (entry && entry.type === 'file') {
+                        fileObj._content = (entry.content || '') + strData;
+                    } else {
+                        fileObj._content = strData;
+                    }
+                } else {
+                    // Write mode
+                    if (fileObj._position === 0 && mode.includes('w')) {
+                        fileObj._content = strData;
+                    } else {
+                        const before = fileObj._content.substring(0, fileObj._position);
+                        const after = fileObj._content.substring(fileObj._position + strData.length);
+                        fileObj._content = before + strData + after;
+                    }
+                }
+                
+                fileObj._position += strData.length;
+                
+                // Update file system
+                this.fileSystem.set(filename, {
+                    type: 'file',
+                    name: filename.split('/').pop(),
+                    content: fileObj._content,
+                    modified: new Date()
+                });
+                
+                // Write to real file system
+                this.writeToRealFileSystem(filename, fileObj._content, mode.includes('a'));
+                
+                return strData.length;
+            },
+            
+            writelines: (lines) => {
+                if (fileObj.closed) {
+                    throw new Error('I/O operation on closed file');
+                }
+                if (!fileObj.writable) {
+                    throw new Error('File not open for writing');
+                }
+                
+                const content = lines.join('');
+                return fileObj.write(content);
+            },
+            
+            seek: (offset, whence = 0) => {
+                if (fileObj.closed) {
+                    throw new Error('I/O operation on closed file');
+                }
+                
+                const entry = this.fileSystem.get(filename);
+                if (entry && entry.type === 'file') {
+                    fileObj._content = entry.content || '';
+                }
+                
+                if (whence === 0) {
+                    fileObj._position = offset;
+                } else if (whence === 1) {
+                    fileObj._position += offset;
+                } else if (whence === 2) {
+                    fileObj._position = fileObj._content.length + offset;
+                }
+                
+                fileObj._position = Math.max(0, Math.min(fileObj._position, fileObj._content.length));
+                return fileObj._position;
+            },
+            
+            tell: () => {
+                if (fileObj.closed) {
+                    throw new Error('I/O operation on closed file');
+                }
+                return fileObj._position;
+            },
+            
+            flush: () => {
+                if (fileObj.closed) {
+                    throw new Error('I/O operation on closed file');
+                }
+                // In memory implementation, nothing to flush
+            },
+            
+            close: () => {
+                fileObj.closed = true;
+                this.openFiles.delete(fileId);
+            },
+            
+            __enter__: () => fileObj,
+            
+            __exit__: (exc_type, exc_val, exc_tb) => {
+                fileObj.close();
+                return false;
+            }
+        };
+        
+        // Initialize file content if it exists
+        const entry = this.fileSystem.get(filename);
+        if (entry && entry.type === 'file') {
+            fileObj._content = entry.content || '';
+        } else if (mode.includes('r') && !mode.includes('+') && !mode.includes('w') && !mode.includes('a')) {
+            throw new Error(`FileNotFoundError: [Errno 2] No such file or directory: '${filename}'`);
+        }
+        
+        // Iterating a file yields one line at a time.
+        fileObj[Symbol.iterator] = function* () {
+            for (let line = fileObj.readline(); line !== ''; line = fileObj.readline()) {
+                yield line;
+            }
+        };
+
+        this.openFiles.set(fileId, fileObj);
+        return fileObj;
+    }
+
+    toString(obj) {
+        if (obj === null || obj === undefined) return 'None';
+        if (typeof obj === 'string') return obj;
+        if (obj instanceof Error) return obj.message;
+        if (typeof obj === 'function') return `<function ${obj.__name__ || obj.name}>`;
+        if (typeof obj === 'boolean') return obj ? 'True' : 'False';
+        if (Array.isArray(obj)) {
+            if (obj.__class__ === 'tuple') {
+                return `(${obj.map(item => this.toString(item)).join(', ')})`;
+            }
+            return `[${obj.map(item => this.toString(item)).join(', ')}]`;
+        }
+        if (obj instanceof PySetBase) return this.repr(obj);
+        if (obj instanceof PyRange || obj instanceof PyGenerator) return obj.__repr__();
+        if (obj instanceof PyDict || obj instanceof DictView) return this.repr(obj);
+        if (typeof obj === 'object') {
+            const pairs = Object.entries(obj).map(([k, v]) => `'${k}': ${this.toString(v)}`);
+            return `{${pairs.join(', ')}}`;
+        }
+        return String(obj);
+    }
+
+    repr(obj) {
+        if (typeof obj === 'string') {
+            const quote = obj.includes("'") && !obj.includes('"') ? '"' : "'";
+            const escaped = obj.replace(/[\\\n\r\t]/g, char => ({ '\\': '\\\\', '\n': '\\n', '\r': '\\r', '\t': '\\t' })[char]);
+            return quote + (quote === "'" ? escaped.replace(/'/g, "\\'") : escaped) + quote;
+        }
+        if (obj === null || obj === undefined || typeof obj !== 'object') return this.toString(obj);
+        if (typeof obj.__repr__ === 'function') return this.toString(obj.__repr__());
+        if (obj instanceof Error) return `${obj.constructor.name}(${this.repr(obj.message)})`;
+        if (Array.isArray(obj)) {
+            const items = obj.map(item => this.repr(item));
+            if (obj.__class__ === 'tuple') return items.length === 1 ? `(${items[0]},)` : `(${items.join(', ')})`;
+            return `[${items.join(', ')}]`;
+        }
+        if (obj instanceof PySetBase) {
+            const items = Array.from(obj, item => this.repr(item)).join(', ');
+            if (obj instanceof PyFrozenSet) return obj.size === 0 ? 'frozenset()' : `frozenset({${items}})`;
+            return obj.size === 0 ? 'set()' : `{${items}}`;
+        }
+        if (obj instanceof PyDict) {
+            const pairs = [];
+            for (const [key, value] of obj.entries()) pairs.push(`${this.repr(key)}: ${this.repr(value)}`);
+            return `{${pairs.join(', ')}}`;
+        }
+        if (obj instanceof DictView) {
+            return `dict_${obj.kind}([${Array.from(obj, item => this.repr(item)).join(', ')}])`;
+        }
+        const pairs = Object.entries(obj).map(([k, v]) => `${this.repr(k)}: ${this.repr(v)}`);
+        return `{${pairs.join(', ')}}`;
+    }
+
+    ascii(obj) {
+        return this.repr(obj).replace(/[^\x00-\x7f]/gu, char => {
+            const code = char.codePointAt(0);
+            if (code <= 0xff) return `\\x${code.toString(16).padStart(2, '0')}`;
+            if (code <= 0xffff) return `\\u${code.toString(16).padStart(4, '0')}`;
+            return `\\U${code.toString(16).padStart(8, '0')}`;
+        });
+    }
+
+    formatValue(value, spec) {
+        // Implements the format-spec mini-language: [[fill]align][sign][#][0][width][grouping][.precision][type]
+        if (value && typeof value === 'object' && typeof value.__format__ === 'function') {
+            return this.toString(value.__format__(spec));
+        }
+        if (spec === '') return this.toString(value);
+
+        const match = /^(?:([\s\S])?([<>=^]))?([+\- ])?(#)?(0)?(\d+)?([,_])?(?:\.(\d+))?([bcdeEfFgGnosxX%])?$/.exec(spec);
+        if (!match) throw new this.builtins.ValueError('Invalid format specifier');
+        let [, fill, align, sign = '-', alternate, zero, width, grouping, precision, type] = match;
+        width = width === undefined ? 0 : Number(width);
+        precision = precision === undefined ? undefined : Number(precision);
+        if (zero && !align) {
+            fill = fill || '0';
+            align = '=';
+        }
+        fill = fill || ' ';
+
+        const typeName = this.builtins.type(value);
+        if (typeof value === 'boolean' && type) value = Number(value);
+        if (typeof value === 'bigint' && (type ? !'bdoxX'.includes(type) : precision !== undefined)) value = Number(value);
+        if (typeof value !== 'number' && typeof value !== 'bigint') {
+            if (type && type !== 's') {
+                throw new this.builtins.ValueError(`Unknown format code '${type}' for object of type '${typeName}'`);
+            }
+            let text = this.toString(value);
+            if (precision !== undefined) text = text.slice(0, precision);
+            return this.alignText(text, '', fill, align || '<', width);
+        }
+
+        if (type === 's') throw new this.builtins.ValueError(`Unknown format code 's' for object of type '${typeName}'`);
+        if ((type === 'd' || type === 'b' || type === 'o' || type === 'x' || type === 'X' || type === 'c') && typeof value === 'number' && !Number.isInteger(value)) {
+            throw new this.builtins.ValueError(`Unknown format code '${type}' for object of type 'float'`);
+        }
+
+        const negative = value < 0 || Object.is(value, -0);
+        const magnitude = this.builtins.abs(value);
+        let prefix = '';
+        let digits;
+        switch (type) {
+            case 'b': case 'o': case 'x': case 'X': {
+                const base = { b: 2, o: 8, x: 16, X: 16 }[type];
+                digits = magnitude.toString(base);
+                if (type === 'X') digits = digits.toUpperCase();
+                if (alternate) prefix = type === 'X' ? '0X' : `0${type}`;
+                break;
+            }
+            case 'c':
+                return this.alignText(String.fromCodePoint(value), '', fill, align || '<', width);
+            case 'e': case 'E':
+                digits = this.formatExponent(magnitude, precision === undefined ? 6 : precision, alternate);
+                if (type === 'E') digits = digits.toUpperCase();
+                break;
+            case 'f': case 'F':
+                digits = Number.isFinite(magnitude) ? magnitude.toFixed(precision === undefined ? 6 : precision) : String(magnitude);
+                if (alternate && !digits.includes('.')) digits += '.';
+                if (type === 'F') digits = digits.toUpperCase();
+                break;
+            case '%':
+                digits = `${(magnitude * 100).toFixed(precision === undefined ? 6 : precision)}%`;
+                break;
+            case 'g': case 'G': case 'n':
+                digits = this.formatGeneral(magnitude, precision === undefined ? 6 : precision, alternate);
+                if (type === 'G') digits = digits.toUpperCase();
+                break;
+            default:
+                if (precision !== undefined && !(type === 'd')) {
+                    digits = this.formatGeneral(magnitude, precision, alternate);
+                    if (!Number.isInteger(value) && !/[.e]/.test(digits) && Number.isFinite(magnitude)) digits += '.0';
+                } else {
+                    digits = this.toString(magnitude);
+                }
+        }
+        if (!Number.isFinite(magnitude)) digits = digits.replace(/infinity/i, type && type === type.toUpperCase() && type !== '%' ? 'INF' : 'inf');
+        if (Number.isNaN(value)) digits = type && type === type.toUpperCase() && type !== '%' ? 'NAN' : 'nan';
+
+        if (grouping) {
+            const radix = type === 'b' || type === 'o' || type === 'x' || type === 'X';
+            const interval = radix ? 4 : 3;
+            digits = digits.replace(radix ? /^[0-9a-fA-F]+/ : /^\d+/, whole => {
+                const groups = [];
+                for (let end = whole.length; end > 0; end -= interval) groups.unshift(whole.slice(Math.max(0, end - interval), end));
+                return groups.join(grouping);
+            });
+        }
+
+        const signText = negative && !Number.isNaN(value) ? '-' : sign === '-' ? '' : sign;
+        return this.alignText(digits, signText + prefix, fill, align || '>', width);
+    }
+
+    formatExponent(value, precision, alternate) {
+        const [mantissa, exponent] = value.toExponential(precision).split('e');
+        const power = Number(exponent);
+        const dot = alternate && !mantissa.includes('.') ? '.' : '';
+        return `${mantissa}${dot}e${power < 0 ? '-' : '+'}${String(Math.abs(power)).padStart(2, '0')}`;
+    }
+
+    formatGeneral(value, precision, alternate) {
+        if (!Number.isFinite(value)) return String(value);
+        const digits = precision === 0 ? 1 : precision;
+        const exponent = value === 0 ? 0 : Number(value.toExponential(digits - 1).split('e')[1]);
+        let text = exponent >= -4 && exponent < digits
+            ? value.toFixed(digits - 1 - exponent)
+            : this.formatExponent(value, digits - 1, alternate);
+        if (alternate) return text;
+        const [mantissa, power] = text.split('e');
+        const trimmed = mantissa.includes('.') ? mantissa.replace(/\.?0+$/, '') : mantissa;
+        return power === undefined ? trimmed : `${trimmed}e${power}`;
+    }
+
+    alignText(text, sign, fill, align, width) {
+        const padding = width - sign.length - text.length;
+        if (padding <= 0) return sign + text;
+        switch (align) {
+            case '<': return sign + text + fill.repeat(padding);
+            case '^': {
+                const left = Math.floor(padding / 2);
+                return fill.repeat(left) + sign + text + fill.repeat(padding - left);
+            }
+            case '=': return sign + fill.repeat(padding) + text;
+            default: return fill.repeat(padding) + sign + text;
+        }
+    }
+
+    getCurrentScope() {
+        return this.scopeStack[this.scopeStack.length - 1];
+    }
+
+    getVariable(name) {
+        for (let i = this.scopeStack.length - 1; i >= 0; i--) {
+            if (name in this.scopeStack[i]) {
+                return this.scopeStack[i][name];
+            }
+        }
+        if (name in this.globals) {
+            return this.globals[name];
+        }
+        if (name in this.builtins) {
+            return this.builtins[name];
+        }
+        throw new this.builtins.NameError(`name '${name}' is not defined`);
+    }
+
+    setVariable(name, value) {
+        this.getCurrentScope()[name] = value;
+    }
+
+    getLoadedModule(moduleName) {
+        if (this.importedModules.has(moduleName)) {
+            return this.importedModules.get(moduleName);
+        }
+
+        if (this.modules.has(moduleName)) {
+            return this.modules.get(moduleName);
+        }
+
+        // Handle built-in modules
+        const builtinModules = {
+            'sys': () => this.createSysModule(),
+            'math': () => this.createMathModule(),
+            'time': () => this.createTimeModule(),
+            'json': () => this.createJsonModule(),
+            'collections': () => this.createCollectionsModule(),
+            'random': () => this.createRandomModule(),
+            'os': () => this.createOsModule(),
+            'io': () => this.createIoModule()
+        };
+
+        if (builtinModules[moduleName]) {
+            const module = builtinModules[moduleName]();
+            this.modules.set(moduleName, module);
+            this.importedModules.set(moduleName, module);
+            return module;
+        }
+
+        return null;
+    }
+
+    importModule(moduleName) {
+        const module = this.getLoadedModule(moduleName);
+        if (module) return module;
+        if (this.loadingModules.has(moduleName)) {
+            throw new this.builtins.ImportError(`cannot import partially initialized module '${moduleName}' (most likely due to a circular import)`);
+        }
+        throw new this.builtins.ModuleNotFoundError(`No module named '${moduleName}'`);
+    }
+
+    async prefetchModules(moduleNames) {
+        for (const moduleName of moduleNames) {
+            if (this.getLoadedModule(moduleName) || this.loadingModules.has(moduleName)) continue;
+            try {
+                await this.loadModule(moduleName);
+            } catch (error) {
+                // The import statement raises ModuleNotFoundError if it actually runs.
+            }
+        }
+    }
+
+    async loadModule(moduleName) {
+        const loaded = this.getLoadedModule(moduleName);
+        if (loaded) return loaded;
+        if (this.loadingModules.has(moduleName)) {
+            return this.loadingModules.get(moduleName);
+        }
+
+        const loading = this.fetchModule(moduleName);
+        this.loadingModules.set(moduleName, loading);
+        try {
+            return await loading;
+        } finally {
+            this.loadingModules.delete(moduleName);
+        }
+    }
+
+    async fetchModule(moduleName) {
+        try {
+            const relativePath = moduleName.replace(/\./g, '/');
+            let basePath = `${this.stdlibPath}${relativePath}`;
+            let artifactRequest = this.fetchASTArtifact(basePath);
+            let response = await fetch(`${basePath}.py`);
+            
+            if (!response.ok) {
+                basePath = `py_files/${relativePath}`;
+                artifactRequest = this.fetchASTArtifact(basePath);
+                response = await fetch(`${basePath}.py`);
+            }
+            
+            if (!response.ok) {
+                throw new Error(`No module named '${moduleName}'`);
+            }
+            
+            const moduleCode = await response.text();
+            const statements = await this.loadASTArtifact(artifactRequest, moduleCode, basePath);
+            const moduleObj = await this.createModuleObject(moduleName, moduleCode, statements);
+            this.modules.set(moduleName, moduleObj);
+            this.importedModules.set(moduleName, moduleObj);
+            return moduleObj;
+        } catch (error) {
+            this.logExecution(`Failed to load module ${moduleName}: ${error.message}`);
+            throw new Error(`No module named '${moduleName}'`);
+        }
+    }
+
+    createSysModule() {
+        return {
+            __name__: 'sys',
+            version: '3.11.0 (emscripten)',
+            platform: 'emscripten',
+            path: ['', 'python_stdlib'],
+            modules: this.modules,
+            builtin_module_names: ['builtins', 'sys', 'math', 'time', 'json', 'collections', 'random', 'os'],
+            exit: (code = 0) => { throw new Error(`SystemExit: ${code}`); },
+            getrefcount: (obj) => 1,
+            getsizeof: (obj) => JSON.stringify(obj).length,
+            stdout: this.stdoutFile,
+            stderr: this.stderrFile,
+            getrecursionlimit: () => this.recursionLimit,
+            setrecursionlimit: (limit) => {
+                if (typeof limit !== 'number' || limit < 1) {
+                    throw new this.builtins.ValueError('recursion limit must be greater or equal than 1');
+                }
+                this.recursionLimit = limit;
+                return null;
+            }
+        };
+    }
+
+    createMathModule() {
+        return {
+            __name__: 'math',
+            pi: Math.PI,
+            e: Math.E,
+            tau: 2 * Math.PI,
+            inf: Infinity,
+            nan: NaN,
+            sqrt: (x) => Math.sqrt(Number(x)),
+            pow: (x, y) => Math.pow(Number(x), Number(y)),
+            log: (x, base) => base === undefined ? Math.log(Number(x)) : Math.log(Number(x)) / Math.log(Number(base)),
+            log10: (x) => Math.log10(Number(x)),
+            log2: (x) => Math.log2(Number(x)),
+            exp: (x) => Math.exp(Number(x)),
+            sin: Math.sin,
+            cos: Math.cos,
+            tan: Math.tan,
+            asin: Math.asin,
+            acos: Math.acos,
+            atan: Math.atan,
+            atan2: Math.atan2,
+            degrees: (x) => x * 180 / Math.PI,
+            radians: (x) => x * Math.PI / 180,
+            ceil: (x) => typeof x === 'bigint' ? x : intFromNumber(Math.ceil(x)),
+            floor: (x) => typeof x === 'bigint' ? x : intFromNumber(Math.floor(x)),
+            trunc: (x) => typeof x === 'bigint' ? x : intFromNumber(Math.trunc(x)),
+            fabs: Math.abs,
+            factorial: (n) => {
+                if (n < 0 || !Number.isInteger(n)) throw new Error('factorial() only accepts integral values');
+                let result = 1;
+                let i = 2;
+                for (; i <= n && result * i <= Number.MAX_SAFE_INTEGER; i++) result *= i;
+                if (i > n) return result;
+                let exact = BigInt(result);
+                for (; i <= n; i++) exact *= BigInt(i);
+                return exact;
+            },
+            gcd: (a, b) => {
+                if (typeof a === 'bigint' || typeof b === 'bigint') {
+                    a = BigInt(a);
+                    b = BigInt(b);
+                    while (b) [a, b] = [b, a % b];
+                    return normalizeInt(a < 0n ? -a : a);
+                }
+                while (b) [a, b] = [b, a % b];
+                return Math.abs(a);
+            },
+            isfinite: Number.isFinite,
+            isinf: (x) => !Number.isFinite(x) && !Number.isNaN(x),
+            isnan: Number.isNaN
+        };
+    }
+
+    createTimeModule() {
+        return {
+            __name__: 'time',
+            time: () => Date.now() / 1000,
+            sleep: (seconds) => {
+                // The VM gives the event loop the time under executeCode; elsewhere this is a no-op.
+                this.suspend(Number(seconds) * 1000);
+                return null;
+            },
+            perf_counter: () => performance.now() / 1000,
+            process_time: () => performance.now() / 1000,
+            monotonic: () => performance.now() / 1000,
+            strftime: (format, t) => {
+                const date = t ? new Date(t * 1000) : new Date();
+                return format
+                    .replace('%Y', date.getFullYear())
+                    .replace('%m', String(date.getMonth() + 1).padStart(2, '0'))
+                    .replace('%d', String(date.getDate()).padStart(2, '0'))
+                    .replace('%H', String(date.getHours()).padStart(2, '0'))
+                    .replace('%M', String(date.getMinutes()).padStart(2, '0'))
+                    .replace('%S', String(date.getSeconds()).padStart(2, '0'));
+            }
+        };
+    }
+
+    createJsonModule() {
+        return {
+            __name__: 'json',
+            dumps: (obj, indent) => {
+                if (indent !== undefined) {
+                    return JSON.stringify(obj, null, indent);
+                }
+                return JSON.stringify(obj);
+            },
+            loads: (text) => JSON.parse(text, jsonObjectHook),
+            dump: (obj, fp, indent) => {
+                const jsonStr = indent !== undefined ? JSON.stringify(obj, null, indent) : JSON.stringify(obj);
+                fp.write(jsonStr);
+            },
+            load: (fp) => JSON.parse(fp.read(), jsonObjectHook)
+        };
+    }
+
+    createCollectionsModule() {
+        const interpreter = this;
+        return {
+            __name__: 'collections',
+            namedtuple: (typename, field_names) => {
+                const fields = typeof field_names === 'string' ? field_names.split() : field_names;
+                
+                function NamedTuple(...args) {
+                    for (let i = 0; i < fields.length; i++) {
+                        this[fields[i]] = args[i];
+                    }
+                }
+                
+                NamedTuple.prototype._fields = fields;
+                NamedTuple.prototype._asdict = function() {
+                    const result = new PyDict();
+                    for (const field of fields) {
+                        result.set(field, this[field]);
+                    }
+                    return result;
+                };
+                
+                return NamedTuple;
+            },
+            defaultdict: class DefaultDict extends PyDict {
+                constructor(defaultFactory = null, ...args) {
+                    super();
+                    this.default_factory = defaultFactory;
+                    if (args.length > 0) this.update(interpreter.builtins.dict(...args));
+                }
+
+                __missing__(key) {
+                    if (this.default_factory === null) throw new interpreter.builtins.KeyError(interpreter.repr(key));
+                    const value = interpreter.callFunction(this.default_factory, []);
+                    this.set(key, value);
+                    return value;
+                }
+
+                __repr__() {
+                    const factory = this.default_factory === null ? 'None' : interpreter.repr(this.default_factory);
+                    return `defaultdict(${factory}, ${interpreter.repr(PyDict.prototype.copy.call(this))})`;
+                }
+            },
+            Counter: class Counter extends PyDict {
+                constructor(iterable) {
+                    super();
+                    if (iterable instanceof PyDict) {
+                        this.update(iterable);
+                    } else if (iterable) {
+                        for (const item of interpreter.iterate(iterable)) {
+                            this.set(item, (this.get(item) || 0) + 1);
+                        }
+                    }
+                }
+
+                __missing__(key) {
+                    return 0;
+                }
+
+                __repr__() {
+                    return `Counter(${interpreter.repr(PyDict.prototype.copy.call(this))})`;
+                }
+
+                most_common(n) {
+                    const entries = Array.from(this.entries()).sort((a, b) => b[1] - a[1]);
+                    return n === undefined || n === null ? entries : entries.slice(0, n);
+                }
+
+                total() {
+                    let total = 0;
+                    for (const count of this.values()) total += count;
+                    return total;
+                }
+            }
+        };
+    }
+
+    createRandomModule() {
+        return {
+            __name__: 'random',
+            random: Math.random,
+            randint: (a, b) => Math.floor(Math.random() * (b - a + 1)) + a,
+            choice: (seq) => this.getItem(seq, Math.floor(Math.random() * seq.length)),
+            shuffle: (array) => {
+                for (let i = array.length - 1; i > 0; i--) {
+                    const j = Math.floor(Math.random() * (i + 1));
+                    [array[i], array[j]] = [array[j], array[i]];
+                }
+                return array;
+            },
+            sample: (population, k) => {
+                const result = [];
+                const indices = new Set();
+                while (result.length < k && indices.size < population.length) {
+                    const index = Math.floor(Math.random() * population.length);
+                    if (!indices.has(index)) {
+                        indices.add(index);
+                        result.push(this.getItem(population, index));
+                    }
+                }
+                return result;
+            },
+            uniform: (a, b) => Math.random() * (b - a) + a,
+            seed: (x) => { /* No-op in this implementation */ },
+            gauss: (mu, sigma) => {
+                // Box-Muller transform
+                const u1 = Math.random();
+                const u2 = Math.random();
+                const z0 = Math.sqrt(-2 * Math.log(u1)) * Math.cos(2 * Math.PI * u2);
+                return z0 * sigma + mu;
+            }
+        };
+    }
+
+    createOsModule() {
+        return {
+            __name__: 'os',
+            name: 'posix',
+            path: {
+                join: (...paths) => paths.join('/'),
+                dirname: (path) => {
+                    const parts = path.split('/');
+                    return parts.slice(0, -1).join('/') || '/';
+                },
+                basename: (path) => {
+                    const parts = path.split('/');
+                    return parts[parts.length - 1];
+                },
+                exists: (path) => {
+                    return this.fileSystem.has(path);
+                },
+                isfile: (path) => {
+                    const entry = this.fileSystem.get(path);
+                    return entry && entry.type === 'file';
+                },
+                isdir: (path) => {
+                    const entry = this.fileSystem.get(path);
+                    return entry && entry.type === 'directory';
+                },
+                abspath: (path) => {
+                    if (path.startsWith('/')) return path;
+                    return this.currentDir + '/' + path;
+                },
+                splitext: (path) => {
+                    const lastDot = path.lastIndexOf('.');
+                    if (lastDot === -1) return [path, ''];
+                    return [path.substring(0, lastDot), path.substring(lastDot)];
+                }
+            },
+            environ: {
+                get: (key, default_value = null) => {
+                    const env = {
+                        'HOME': '/home/user',
+                        'PATH': '/usr/bin:/bin',
+                        'USER': 'user',
+                        'PYTHONPATH': '/workspace'
+                    };
+                    return env[key] || default_value;
+                },
+                __getitem__: (key) => {
+                    const value = this.environ.get(key);
+                    if (value === null) throw new Error(`KeyError: '${key}'`);
+                    return value;
+                }
+            },
+            getcwd: () => this.currentDir,
+            chdir: (path) => {
+                if (this.fileSystem.get(path)?.type === 'directory') {
+                    this.currentDir = path;
+                } else {
+                    throw new Error(`OSError: [Errno 2] No such file or directory: '${path}'`);
+                }
+            },
+            listdir: (path = '.') => {
+                const targetPath = path === '.' ? this.currentDir : path;
+                const entries = [];
+                for (const [filePath, entry] of this.fileSystem) {
+                    if (filePath.startsWith(targetPath + '/') && 
+                        !filePath.substring(targetPath.length + 1).includes('/')) {
+                        entries.push(entry.name);
+                    }
+                }
+                return entries;
+            },
+            makedirs: (path, exist_ok = false) => {
+                if (this.fileSystem.has(path)) {
+                    if (!exist_ok) throw new Error(`OSError: [Errno 17] File exists: '${path}'`);
+                    return;
+                }
+                this.fileSystem.set(path, {
+                    type: 'directory',
+                    name: path.split('/').pop(),
+                    created: new Date()
+                });
+            },
+            mkdir: (path) => {
+                if (this.fileSystem.has(path)) {
+                    throw new Error(`OSError: [Errno 17] File exists: '${path}'`);
+                }
+                this.fileSystem.set(path, {
+                    type: 'directory',
+                    name: path.split('/').pop(),
+                    created: new Date()
+                });
+            },
+            remove: (path) => {
+                const entry = this.fileSystem.get(path);
+                if (!entry) {
+                    throw new Error(`OSError: [Errno 2] No such file or directory: '${path}'`);
+                }
+                if (entry.type === 'directory') {
+                    throw new Error(`OSError: [Errno 21] Is a directory: '${path}'`);
+                }
+                this.fileSystem.delete(path);
+            },
+            rmdir: (path) => {
+                const entry = this.fileSystem.get(path);
+                if (!entry) {
+                    throw new Error(`OSError: [Errno 2] No such file or directory: '${path}'`);
+                }
+                if (entry.type !== 'directory') {
+                    throw new Error(`OSError: [Errno 20] Not a directory: '${path}'`);
+                }
+                this.fileSystem.delete(path);
+            },
+            rename: (src, dst) => {
+                const entry = this.fileSystem.get(src);
+                if (!entry) {
+                    throw new Error(`OSError: [Errno 2] No such file or directory: '${src}'`);
+                }
+                this.fileSystem.delete(src);
+                entry.name = dst.split('/').pop();
+                this.fileSystem.set(dst, entry);
+            }
+        };
+    }
+
+    createIoModule() {
+        return {
+            __name__: 'io',
+            DEFAULT_BUFFER_SIZE: 8192,
+            SEEK_SET: 0,
+            SEEK_CUR: 1,
+            SEEK_END: 2,
+            
+            IOError: class IOError extends Error {
+                constructor(message) {
+                    super(message);
+                    this.name = 'IOError';
+                }
+            },
+            
+            BlockingIOError: class BlockingIOError extends Error {
+                constructor(message) {
+                    super(message);
+                    this.name = 'BlockingIOError';
+                }
+            },
+            
+            UnsupportedOperation: class UnsupportedOperation extends Error {
+                constructor(message) {
+                    super(message);
+                    this.name = 'UnsupportedOperation';
+                }
+            },
+            
+            StringIO: class StringIO {
+                constructor(initial_value = '') {
+                    this._buffer = initial_value;
+                    this._position = 0;
+                    this._closed = false;
+                }
+                
+                read(size = -1) {
+                    if (this._closed) {
+                        throw new Error('I/O operation on closed file');
+                    }
+                    if (size === -1) {
+                        const result = this._buffer.substring(this._position);
+                        this._position = this._buffer.length;
+                        return result;
+                    } else {
+                        const result = this._buffer.substring(this._position, this._position + size);
+                        this._position += result.length;
+                        return result;
+                    }
+                }
+                
+                readline(size = -1) {
+                    if (this._closed) {
+                        throw new Error('I/O operation on closed file');
+                    }
+                    const start = this._position;
+                    let end = this._buffer.indexOf('\n', start);
+                    if (end === -1) {
+                        end = this._buffer.length;
+                    } else {
+                        end += 1;
+                    }
+                    if (size !== -1 && end - start > size) {
+                        end = start + size;
+                    }
+                    const result = this._buffer.substring(start, end);
+                    this._position = end;
+                    return result;
+                }
+                
+                readlines(hint = -1) {
+                    if (this._closed) {
+                        throw new Error('I/O operation on closed file');
+                    }
+                    const lines = [];
+                    let total_size = 0;
+                    while (true) {
+                        const line = this.readline();
+                        if (!line) break;
+                        lines.push(line);
+                        total_size += line.length;
+                        if (hint !== -1 && total_size >= hint) break;
+                    }
+                    return lines;
+                }
+                
+                write(s) {
+                    if (this._closed) {
+                        throw new Error('I/O operation on closed file');
+                    }
+                    s = String(s);
+                    if (this._position === this._buffer.length) {
+                        this._buffer += s;
+                    } else {
+                        this._buffer = this._buffer.substring(0, this._position) + 
+                                      s + 
+                                      this._buffer.substring(this._position + s.length);
+                    }
+                    this._position += s.length;
+                    return s.length;
+                }
+                
+                writelines(lines) {
+                    for (const line of lines) {
+                        this.write(line);
+                    }
+                }
+                
+                seek(pos, whence = 0) {
+                    if (this._closed) {
+                        throw new Error('I/O operation on closed file');
+                    }
+                    if (whence === 0) {
+                        this._position = pos;
+                    } else if (whence === 1) {
+                        this._position += pos;
+                    } else if (whence === 2) {
+                        this._position = this._buffer.length + pos;
+                    }
+                    this._position = Math.max(0, Math.min(this._position, this._buffer.length));
+                    return this._position;
+                }
+                
+                tell() {
+                    if (this._closed) {
+                        throw new Error('I/O operation on closed file');
+                    }
+                    return this._position;
+                }
+                
+                close() {
+                    this._closed = true;
+                }
+                
+                get closed() {
+                    return this._closed;
+                }
+                
+                getvalue() {
+                    return this._buffer;
+                }
+                
+                truncate(size = null) {
+                    if (this._closed) {
+                        throw new Error('I/O operation on closed file');
+                    }
+                    if (size === null) {
+                        size = this._position;
+                    }
+                    this._buffer = this._buffer.substring(0, size);
+                    if (this._position > size) {
+                        this._position = size;
+                    }
+                    return size;
+                }
+            },
+            
+            BytesIO: class BytesIO {
+                constructor(initial_bytes = '') {
+                    if (typeof initial_bytes === 'string') {
+                        this._buffer = initial_bytes;
+                    } else {
+                        this._buffer = String(initial_bytes);
+                    }
+                    this._position = 0;
+                    this._closed = false;
+                }
+                
+                read(size = -1) {
+                    if (this._closed) {
+                        throw new Error('I/O operation on closed file');
+                    }
+                    if (size === -1) {
+                        const result = this._buffer.substring(this._position);
+                        this._position = this._buffer.length;
+                        return result;
+                    } else {
+                        const result = this._buffer.substring(this._position, this._position + size);
+                        this._position += result.length;
+                        return result;
+                    }
+                }
+                
+                write(b) {
+                    if (this._closed) {
+                        throw new Error('I/O operation on closed file');
+                    }
+                    const strData = String(b);
+                    if (this._position === this._buffer.length) {
+                        this._buffer += strData;
+                    } else {
+                        this._buffer = this._buffer.substring(0, this._position) + 
+                                      strData + 
+                                      this._buffer.substring(this._position + strData.length);
+                    }
+                    this._position += strData.length;
+                    return strData.length;
+                }
+                
+                seek(pos, whence = 0) {
+                    if (this._closed) {
+                        throw new Error('I/O operation on closed file');
+                    }
+                    if (whence === 0) {
+                        this._position = pos;
+                    } else if (whence === 1) {
+                        this._position += pos;
+                    } else if (whence === 2) {
+                        this._position = this._buffer.length + pos;
+                    }
+                    this._position = Math.max(0, Math.min(this._position, this._buffer.length));
+                    return this._position;
+                }
+                
+                tell() {
+                    if (this._closed) {
+                        throw new Error('I/O operation on closed file');
+                    }
+                    return this._position;
+                }
+                
+                close() {
+                    this._closed = true;
+                }
+                
+                get closed() {
+                    return this._closed;
+                }
+                
+                getvalue() {
+                    return this._buffer;
+                }
+            },
+            
+            open: (file, mode = 'r', buffering = -1, encoding = null, errors = null, newline = null, closefd = true, opener = null) => {
+                return this.createFileObject(file, mode, encoding || 'utf-8');
+            }
+        };
+    }
+
+    fetchASTArtifact(basePath) {
+        return fetch(`${basePath}${AST_ARTIFACT_SUFFIX}`).catch(() => null);
+    }
+
+    async loadASTArtifact(artifactRequest, code, basePath) {
+        const response = await artifactRequest;
+        if (!response || !response.ok) return null;
+
+        try {
+            const artifact = this.deserializeAST(await response.text());
+            const key = hashSource(code);
+            if (artifact.format !== AST_ARTIFACT_FORMAT || artifact.version !== AST_ARTIFACT_VERSION || artifact.sourceHash !== key) {
+                this.logExecution(`Ignoring stale AST artifact for ${basePath}.py`);
+                return null;
+            }
+            this.astCache.set(key, code, artifact.body);
+            return artifact.body;
+        } catch (error) {
+            this.logExecution(`Ignoring unreadable AST artifact for ${basePath}.py: ${error.message}`);
+            return null;
+        }
+    }
+
+    serializeAST(code) {
+        // The tree is flattened into a stream of small integers stored as one string
+        // (one UTF-16 unit per value, two for large values), with node shapes, strings
+        // and numbers kept in side tables.
+        const shapes = [];
+        const shapeIds = new Map();
+        const strings = [];
+        const stringIds = new Map();
+        const numbers = [];
+        const units = [];
+
+        const emit = (value) => {
+            if (value < AST_STREAM_SHORT_LIMIT) {
+                units.push(value + AST_STREAM_OFFSET);
+            } else {
+                units.push(AST_STREAM_SHORT_LIMIT + AST_STREAM_OFFSET + Math.floor(value / AST_STREAM_SHORT_LIMIT),
+                    (value % AST_STREAM_SHORT_LIMIT) + AST_STREAM_OFFSET);
+            }
+        };
+        const intern = (text) => {
+            let id = stringIds.get(text);
+            if (id === undefined) {
+                id = strings.length;
+                strings.push(text);
+                stringIds.set(text, id);
+            }
+            return id;
+        };
+        const encode = (value) => {
+            if (value === null || value === undefined) return emit(AST_TAG_NULL);
+            if (value === true) return emit(AST_TAG_TRUE);
+            if (value === false) return emit(AST_TAG_FALSE);
+            if (typeof value === 'string') {
+                emit(AST_TAG_STRING);
+                return emit(intern(value));
+            }
+            if (typeof value === 'number') {
+                emit(AST_TAG_NUMBER);
+                numbers.push(Number.isFinite(value) ? value : String(value));
+                return emit(numbers.length - 1);
+            }
+            if (typeof value === 'bigint') {
+                emit(AST_TAG_BIGINT);
+                return emit(intern(value.toString()));
+            }
+            if (Array.isArray(value)) {
+                emit(AST_TAG_LIST);
+                emit(value.length);
+                for (const item of value) encode(item);
+                return;
+            }
+
+            const keys = Object.keys(value).filter(key => key !== 'type');
+            const signature = `${value.type || ''}|${keys.join(',')}`;
+            let id = shapeIds.get(signature);
+            if (id === undefined) {
+                id = shapes.length;
+                shapes.push([value.type || null, ...keys]);
+                shapeIds.set(signature, id);
+            }
+            emit(AST_TAG_SHAPE_BASE + id);
+            for (const key of keys) encode(value[key]);
+        };
+
+        encode(this.parseStatements(code));
+        let stream = '';
+        for (let i = 0; i < units.length; i += 8192) {
+            stream += String.fromCharCode(...units.slice(i, i + 8192));
+        }
+
+        return JSON.stringify({
+            format: AST_ARTIFACT_FORMAT,
+            version: AST_ARTIFACT_VERSION,
+            sourceHash: hashSource(code),
+            shapes,
+            strings,
+            numbers,
+            stream
+        });
+    }
+
+    deserializeAST(text) {
+        const artifact = JSON.parse(text);
+        const { shapes, strings, numbers, stream } = artifact;
+        let position = 0;
+
+        const read = () => {
+            const unit = stream.charCodeAt(position++) - AST_STREAM_OFFSET;
+            if (unit < AST_STREAM_SHORT_LIMIT) return unit;
+            return (unit - AST_STREAM_SHORT_LIMIT) * AST_STREAM_SHORT_LIMIT + stream.charCodeAt(position++) - AST_STREAM_OFFSET;
+        };
+        const decode = () => {
+            const tag = read();
+            switch (tag) {
+                case AST_TAG_NULL: return null;
+                case AST_TAG_TRUE: return true;
+                case AST_TAG_FALSE: return false;
+                case AST_TAG_STRING: return strings[read()];
+                case AST_TAG_NUMBER: return Number(numbers[read()]);
+                case AST_TAG_BIGINT: return BigInt(strings[read()]);
+                case AST_TAG_LIST: {
+                    const list = new Array(read());
+                    for (let i = 0; i < list.length; i++) list[i] = decode();
+                    return list;
+                }
+            }
+            const shape = shapes[tag - AST_TAG_SHAPE_BASE];
+            const node = shape[0] === null ? {} : { type: shape[0] };
+            for (let i = 1; i < shape.length; i++) node[shape[i]] = decode();
+            return node;
+        };
+
+        return {
+            format: artifact.format,
+            version: artifact.version,
+            sourceHash: artifact.sourceHash,
+            body: decode()
+        };
+    }
+
+    async createModuleObject(name, code, statements = null) {
+        const moduleScope = {
+            __name__: name,
+            __file__: `${this.stdlibPath}${name}.py`,
+        };
+        if (this.profiler !== null && code) this.profiler.addSource(moduleScope.__file__, code);
+        const program = this.compileProgram(statements || this.getStatements(code), moduleScope.__file__);
+        await this.prefetchModules(program.imports);
+
+        program([moduleScope]);
+        return { ...moduleScope };
+    }
+
+    tokenize(code) {
+        const tokens = [];
+        const indentStack = [0];
+        const length = code.length;
+        let position = 0;
+        let line = 1;
+        let lineStart = 0;
+        let depth = 0;
+        let atLineStart = true;
+        let lineHasContent = false;
+
+        while (position < length) {
+            if (atLineStart && depth === 0) {
+                let indent = 0;
+                let scan = position;
+                while (scan < length) {
+                    const ch = code.charCodeAt(scan);
+                    if (ch === 32) indent++;
+                    else if (ch === 9) indent = (indent + 8) & ~7;
+                    else if (ch !== 12) break;
+                    scan++;
+                }
+                const next = code.charCodeAt(scan);
+                atLineStart = false;
+                if (scan < length && next !== 10 && next !== 13 && next !== 35 && !(next === 92 && this.isLineContinuation(code, scan))) {
+                    const current = indentStack[indentStack.length - 1];
+                    if (indent > current) {
+                        indentStack.push(indent);
+                        tokens.push({ type: 'INDENT', value: code.slice(position, scan), line, column: 1 });
+                    } else if (indent < current) {
+                        while (indent < indentStack[indentStack.length - 1]) {
+                            indentStack.pop();
+                            tokens.push({ type: 'DEDENT', value: '', line, column: 1 });
+                        }
+                        if (indent !== indentStack[indentStack.length - 1]) {
+                            throw new Error(`IndentationError: unindent does not match any outer indentation level (line ${line})`);
+                        }
+                    }
+                }
+                position = scan;
+                continue;
+            }
+
+            const ch = code.charCodeAt(position);
+            const charClass = ch < 128 ? CHAR_CLASS[ch] : CHAR_IDENT;
+            const column = position - lineStart + 1;
+
+            if (charClass === CHAR_SPACE) {
+                position++;
+                continue;
+            }
+            if (ch === 10 || ch === 13) {
+                if (depth === 0 && lineHasContent) {
+                    tokens.push({ type: 'NEWLINE', value: '\n', line, column });
+                    lineHasContent = false;
+                }
+                position += ch === 13 && code.charCodeAt(position + 1) === 10 ? 2 : 1;
+                line++;
+                lineStart = position;
+                atLineStart = depth === 0;
+                continue;
+            }
+            if (ch === 35) {
+                const end = code.indexOf('\n', position);
+                position = end === -1 ? length : (code.charCodeAt(end - 1) === 13 ? end - 1 : end);
+                continue;
+            }
+            if (ch === 92 && this.isLineContinuation(code, position)) {
+                position += code.charCodeAt(position + 1) === 13 ? 3 : 2;
+                line++;
+                lineStart = position;
+                continue;
+            }
+
+            let type = null;
+            let value;
+            if (charClass === CHAR_IDENT) {
+                const next = code.charCodeAt(position + 1);
+                const stringStart = next === 34 || next === 39 ||
+                    ((CHAR_CLASS[next] === CHAR_IDENT) && (code.charCodeAt(position + 2) === 34 || code.charCodeAt(position + 2) === 39));
+                if (stringStart) {
+                    STRING_PATTERN.lastIndex = position;
+                    if (STRING_PATTERN.test(code)) {
+                        value = code.slice(position, STRING_PATTERN.lastIndex);
+                        type = value.endsWith('"""') || value.endsWith("'''") ? this.stringTokenType(value) : 'STRING';
+                    }
+                }
+                if (type === null) {
+                    let end = position + 1;
+                    while (end < length) {
+                        const c = code.charCodeAt(end);
+                        if (c < 128 ? (CHAR_CLASS[c] !== CHAR_IDENT && CHAR_CLASS[c] !== CHAR_DIGIT) : true) break;
+                        end++;
+                    }
+                    if (end < length && code.charCodeAt(end) >= 128 || ch >= 128) {
+                        IDENTIFIER_PATTERN.lastIndex = position;
+                        if (!IDENTIFIER_PATTERN.test(code)) {
+                            throw new Error(`Unexpected character '${code[position]}' at line ${line}, column ${column}`);
+                        }
+                        end = IDENTIFIER_PATTERN.lastIndex;
+                    }
+                    type = 'IDENTIFIER';
+                    value = this.internIdentifier(code.slice(position, end));
+                }
+            } else if (charClass === CHAR_DIGIT || (ch === 46 && CHAR_CLASS[code.charCodeAt(position + 1)] === CHAR_DIGIT)) {
+                NUMBER_PATTERN.lastIndex = position;
+                NUMBER_PATTERN.test(code);
+                type = 'NUMBER';
+                value = code.slice(position, NUMBER_PATTERN.lastIndex);
+            } else if (charClass === CHAR_QUOTE) {
+                STRING_PATTERN.lastIndex = position;
+                if (!STRING_PATTERN.test(code)) {
+                    throw new Error(`SyntaxError: unterminated string literal (detected at line ${line})`);
+                }
+                value = code.slice(position, STRING_PATTERN.lastIndex);
+                type = this.stringTokenType(value);
+            } else if (ch === 58 && code.charCodeAt(position + 1) === 61) {
+                type = 'OPERATOR';
+                value = ':=';
+            } else if (charClass === CHAR_DELIMITER) {
+                type = 'DELIMITER';
+                if (ch === 46 && code.charCodeAt(position + 1) === 46 && code.charCodeAt(position + 2) === 46) {
+                    value = '...';
+                } else {
+                    value = code[position];
+                    if (ch === 40 || ch === 91 || ch === 123) depth++;
+                    else if ((ch === 41 || ch === 93 || ch === 125) && depth > 0) depth--;
+                }
+            } else if (charClass === CHAR_OPERATOR) {
+                OPERATOR_PATTERN.lastIndex = position;
+                OPERATOR_PATTERN.test(code);
+                type = 'OPERATOR';
+                value = code.slice(position, OPERATOR_PATTERN.lastIndex);
+            } else {
+                throw new Error(`Unexpected character '${code[position]}' at line ${line}, column ${column}`);
+            }
+
+            tokens.push({ type, value, line, column });
+            lineHasContent = true;
+            position += value.length;
+
+            if (type === 'MULTILINE_STRING' || (type === 'STRING' && value.indexOf('\\') !== -1)) {
+                let newline = value.indexOf('\n');
+                while (newline !== -1) {
+                    line++;
+                    lineStart = position - value.length + newline + 1;
+                    newline = value.indexOf('\n', newline + 1);
+                }
+            }
+        }
+
+        if (lineHasContent) {
+            tokens.push({ type: 'NEWLINE', value: '\n', line, column: position - lineStart + 1 });
+        }
+        while (indentStack.length > 1) {
+            indentStack.pop();
+            tokens.push({ type: 'DEDENT', value: '', line, column: 1 });
+        }
+
+        return tokens;
+    }
+
+    stringTokenType(value) {
+        const last = value.charCodeAt(value.length - 1);
+        return value.length >= 6 && value.charCodeAt(value.length - 2) === last && value.charCodeAt(value.length - 3) === last &&
+            /^[a-zA-Z]*("""|''')/.test(value) ? 'MULTILINE_STRING' : 'STRING';
+    }
+
+    isLineContinuation(code, index) {
+        const next = code.charCodeAt(index + 1);
+        return next === 10 || (next === 13 && code.charCodeAt(index + 2) === 10);
+    }
+
+    internIdentifier(name) {
+        const interned = this.identifierTable.get(name);
+        if (interned !== undefined) return interned;
+        this.identifierTable.set(name, name);
+        return name;
+    }
+
+    parseNumberLiteral(text) {
+        const clean = text.replace(/_/g, '');
+        const prefix = clean.slice(0, 2).toLowerCase();
+        let value;
+        if (prefix === '0x') value = parseInt(clean.slice(2), 16);
+        else if (prefix === '0o') value = parseInt(clean.slice(2), 8);
+        else if (prefix === '0b') value = parseInt(clean.slice(2), 2);
+        else value = Number(clean);
+        // Integer literals beyond 2**53 are exact ints rather than rounded doubles.
+        if (!Number.isSafeInteger(value) && /^(0[xob][0-9a-f]+|\d+)$/i.test(clean)) return BigInt(clean);
+        return value;
+    }
+
+    decodeStringLiteral(text) {
+        let prefixLength = 0;
+        while (text[prefixLength] !== '"' && text[prefixLength] !== "'") prefixLength++;
+        const prefix = text.slice(0, prefixLength).toLowerCase();
+        const quoteLength = text.startsWith(text[prefixLength].repeat(3), prefixLength) && text.length - prefixLength >= 6 ? 3 : 1;
+        const body = text.slice(prefixLength + quoteLength, text.length - quoteLength);
+        const raw = prefix.includes('r');
+        return { prefix, body, value: raw ? body : this.unescapeString(body) };
+    }
+
+    unescapeString(body) {
+        if (body.indexOf('\\') === -1) return body;
+        return body.replace(/\\(\r?\n|x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|N\{[^}]*\}|[0-7]{1,3}|[\s\S])/g, (match, esc) => {
+            switch (esc[0]) {
+                case '\n': case '\r': return '';
+                case 'n': return '\n';
+                case 't': return '\t';
+                case 'r': return '\r';
+                case '0': case '1': case '2': case '3': case '4': case '5': case '6': case '7':
+                    return String.fromCharCode(parseInt(esc, 8));
+                case 'a': return '\x07';
+                case 'b': return '\b';
+                case 'f': return '\f';
+                case 'v': return '\v';
+                case 'x': case 'u': case 'U':
+                    return esc.length > 1 ? String.fromCodePoint(parseInt(esc.slice(1), 16)) : match;
+                case '\\': case "'": case '"': return esc;
+                default: return match;
+            }
+        });
+    }
+
+    syntaxError(token, message = 'invalid syntax') {
+        const location = token ? ` (line ${token.line})` : ' (unexpected end of input)';
+        return new Error(`SyntaxError: ${message}${location}`);
+    }
+
+    expectToken(tokens, index, value) {
+        const token = tokens[index];
+        if (!token || token.value !== value || token.type === 'STRING' || token.type === 'MULTILINE_STRING') {
+            throw this.syntaxError(token, `expected '${value === '\n' ? 'newline' : value}'`);
+        }
+        return index + 1;
+    }
+
+    expectName(tokens, index) {
+        const token = tokens[index];
+        if (!token || token.type !== 'IDENTIFIER' || PYTHON_KEYWORDS.has(token.value)) {
+            throw this.syntaxError(token, 'expected name');
+        }
+        return token.value;
+    }
+
+    isKeyword(token, value) {
+        return token !== undefined && token.type === 'IDENTIFIER' && token.value === value;
+    }
+
+    startsExpression(token) {
+        if (!token) return false;
+        switch (token.type) {
+            case 'NUMBER':
+            case 'STRING':
+            case 'MULTILINE_STRING':
+                return true;
+            case 'IDENTIFIER':
+                return !PYTHON_KEYWORDS.has(token.value) || EXPRESSION_KEYWORDS.has(token.value);
+            case 'OPERATOR':
+                return token.value === '-' || token.value === '+' || token.value === '~' || token.value === '*' || token.value === '**';
+            case 'DELIMITER':
+                return token.value === '(' || token.value === '[' || token.value === '{' || token.value === '...';
+            default:
+                return false;
+        }
+    }
+
+    parseExpression(tokens, index = 0) {
+        const token = tokens[index];
+        if (this.isKeyword(token, 'lambda')) {
+            return this.parseLambda(tokens, index);
+        }
+        if (token && token.type === 'IDENTIFIER' && tokens[index + 1] && tokens[index + 1].value === ':=') {
+            const name = this.expectName(tokens, index);
+            const [value, newIndex] = this.parseExpression(tokens, index + 2);
+            return [{ type: 'NamedExpression', name, value }, newIndex];
+        }
+
+        const [expr, newIndex] = this.parseOrExpression(tokens, index);
+        if (this.isKeyword(tokens[newIndex], 'if')) {
+            const [condition, elseIndex] = this.parseOrExpression(tokens, newIndex + 1);
+            const bodyIndex = this.expectToken(tokens, elseIndex, 'else');
+            const [orelse, endIndex] = this.parseExpression(tokens, bodyIndex);
+            return [{ type: 'IfExpression', condition, body: expr, orelse }, endIndex];
+        }
+        return [expr, newIndex];
+    }
+
+    parseStarredOrExpression(tokens, index) {
+        const token = tokens[index];
+        if (token && token.type === 'OPERATOR' && token.value === '*') {
+            const [value, newIndex] = this.parseBitwiseOr(tokens, index + 1);
+            return [{ type: 'Starred', value }, newIndex];
+        }
+        return this.parseExpression(tokens, index);
+    }
+
+    parseTestList(tokens, index) {
+        const [first, newIndex] = this.parseStarredOrExpression(tokens, index);
+        if (!tokens[newIndex] || tokens[newIndex].value !== ',' || tokens[newIndex].type !== 'DELIMITER') {
+            return [first, newIndex];
+        }
+
+        const elements = [first];
+        index = newIndex;
+        while (tokens[index] && tokens[index].value === ',' && tokens[index].type === 'DELIMITER') {
+            index++;
+            if (!this.startsExpression(tokens[index])) break;
+            const [element, nextIndex] = this.parseStarredOrExpression(tokens, index);
+            elements.push(element);
+            index = nextIndex;
+        }
+        return [{ type: 'Tuple', elements }, index];
+    }
+
+    parseTargetList(tokens, index) {
+        const elements = [];
+        let trailingComma = false;
+        while (true) {
+            const token = tokens[index];
+            let target;
+            if (token && token.type === 'OPERATOR' && token.value === '*') {
+                const [value, nextIndex] = this.parseBitwiseOr(tokens, index + 1);
+                target = { type: 'Starred', value };
+                index = nextIndex;
+            } else {
+                [target, index] = this.parseBitwiseOr(tokens, index);
+            }
+            elements.push(this.toAssignmentTarget(target, token));
+            trailingComma = false;
+            if (tokens[index] && tokens[index].value === ',' && tokens[index].type === 'DELIMITER') {
+                index++;
+                trailingComma = true;
+                if (this.isKeyword(tokens[index], 'in') || tokens[index].value === '=') break;
+                continue;
+            }
+            break;
+        }
+        if (elements.length === 1 && !trailingComma) return [elements[0], index];
+        return [{ type: 'Tuple', elements }, index];
+    }
+
+    toAssignmentTarget(node, token) {
+        switch (node && node.type) {
+            case 'Identifier':
+            case 'Attribute':
+            case 'Subscript':
+                return node;
+            case 'Tuple':
+            case 'List':
+                node.elements = node.elements.map(element => this.toAssignmentTarget(element, token));
+                return node;
+            case 'Starred':
+                node.value = this.toAssignmentTarget(node.value, token);
+                return node;
+            default:
+                throw this.syntaxError(token, 'cannot assign to expression');
+        }
+    }
+
+    parseLambda(tokens, index) {
+        const [params, colonIndex] = this.parseParameters(tokens, index + 1, ':');
+        const [body, newIndex] = this.parseExpression(tokens, colonIndex + 1);
+        return [{ type: 'Lambda', params, body }, newIndex];
+    }
+
+    parseParameters(tokens, index, closer) {
+        const params = [];
+        let kind = 'positional';
+        while (tokens[index] && tokens[index].value !== closer) {
+            const token = tokens[index];
+            if (token.value === '/') {
+                index++;
+            } else if (token.value === '*' || token.value === '**') {
+                const starKind = token.value === '*' ? 'varargs' : 'varkw';
+                index++;
+                if (starKind === 'varargs' && tokens[index] && tokens[index].value === ',') {
+                    kind = 'kwonly';
+                } else {
+                    const name = this.expectName(tokens, index);
+                    index++;
+                    if (closer === ')' && tokens[index] && tokens[index].value === ':') {
+                        [, index] = this.parseExpression(tokens, index + 1);
+                    }
+                    params.push({ name, default: null, kind: starKind });
+                    if (starKind === 'varargs') kind = 'kwonly';
+                }
+            } else {
+                const name = this.expectName(tokens, index);
+                index++;
+                if (closer === ')' && tokens[index] && tokens[index].value === ':') {
+                    [, index] = this.parseExpression(tokens, index + 1);
+                }
+                let defaultValue = null;
+                if (tokens[index] && tokens[index].value === '=') {
+                    [defaultValue, index] = this.parseExpression(tokens, index + 1);
+                }
+                params.push({ name, default: defaultValue, kind });
+            }
+
+            if (tokens[index] && tokens[index].value === ',') {
+                index++;
+            } else if (!tokens[index] || tokens[index].value !== closer) {
+                throw this.syntaxError(tokens[index], 'invalid parameter list');
+            }
+        }
+        this.expectToken(tokens, index, closer);
+        return [params, index];
+    }
+
+    parseOrExpression(tokens, index) {
+        let [left, newIndex] = this.parseAndExpression(tokens, index);
+
+        while (this.isKeyword(tokens[newIndex], 'or')) {
+            newIndex++;
+            const [right, nextIndex] = this.parseAndExpression(tokens, newIndex);
+            left = { type: 'BinaryOp', operator: 'or', left, right };
+            newIndex = nextIndex;
+        }
+
+        return [left, newIndex];
+    }
+
+    parseAndExpression(tokens, index) {
+        let [left, newIndex] = this.parseNotExpression(tokens, index);
+
+        while (this.isKeyword(tokens[newIndex], 'and')) {
+            newIndex++;
+            const [right, nextIndex] = this.parseNotExpression(tokens, newIndex);
+            left = { type: 'BinaryOp', operator: 'and', left, right };
+            newIndex = nextIndex;
+        }
+
+        return [left, newIndex];
+    }
+
+    parseNotExpression(tokens, index) {
+        if (this.isKeyword(tokens[index], 'not')) {
+            const [operand, newIndex] = this.parseNotExpression(tokens, index + 1);
+            return [{ type: 'UnaryOp', operator: 'not', operand }, newIndex];
+        }
+        return this.parseComparison(tokens, index);
+    }
+
+    parseComparison(tokens, index) {
+        let [left, newIndex] = this.parseBitwiseOr(tokens, index);
+        const operators = [];
+        const comparators = [];
+
+        while (newIndex < tokens.length) {
+            const token = tokens[newIndex];
+            let operator = null;
+            if (token.type === 'OPERATOR' && COMPARISON_OPERATORS.has(token.value)) {
+                operator = token.value;
+                newIndex++;
+            } else if (token.type === 'IDENTIFIER') {
+                if (token.value === 'in') {
+                    operator = 'in';
+                    newIndex++;
+                } else if (token.value === 'not' && this.isKeyword(tokens[newIndex + 1], 'in')) {
+                    operator = 'not in';
+                    newIndex += 2;
+                } else if (token.value === 'is') {
+                    const negated = this.isKeyword(tokens[newIndex + 1], 'not');
+                    operator = negated ? 'is not' : 'is';
+                    newIndex += negated ? 2 : 1;
+                }
+            }
+            if (operator === null) break;
+
+            const [right, nextIndex] = this.parseBitwiseOr(tokens, newIndex);
+            operators.push(operator);
+            comparators.push(right);
+            newIndex = nextIndex;
+        }
+
+        if (operators.length === 0) return [left, newIndex];
+        if (operators.length === 1) {
+            return [{ type: 'BinaryOp', operator: operators[0], left, right: comparators[0] }, newIndex];
+        }
+        return [{ type: 'Compare', left, operators, comparators }, newIndex];
+    }
+
+    parseLeftAssociative(tokens, index, operators, parseOperand) {
+        let [left, newIndex] = parseOperand.call(this, tokens, index);
+
+        while (newIndex < tokens.length && tokens[newIndex].type === 'OPERATOR' && operators.includes(tokens[newIndex].value)) {
+            const operator = tokens[newIndex].value;
+            const [right, nextIndex] = parseOperand.call(this, tokens, newIndex + 1);
+            left = { type: 'BinaryOp', operator, left, right };
+            newIndex = nextIndex;
+        }
+
+        return [left, newIndex];
+    }
+
+    parseBitwiseOr(tokens, index) {
+        return this.parseLeftAssociative(tokens, index, ['|'], this.parseBitwiseXor);
+    }
+
+    parseBitwiseXor(tokens, index) {
+        return this.parseLeftAssociative(tokens, index, ['^'], this.parseBitwiseAnd);
+    }
+
+    parseBitwiseAnd(tokens, index) {
+        return this.parseLeftAssociative(tokens, index, ['&'], this.parseShift);
+    }
+
+    parseShift(tokens, index) {
+        return this.parseLeftAssociative(tokens, index, ['<<', '>>'], this.parseArithmeticExpression);
+    }
+
+    parseArithmeticExpression(tokens, index) {
+        return this.parseLeftAssociative(tokens, index, ['+', '-'], this.parseTerm);
+    }
+
+    parseTerm(tokens, index) {
+        return this.parseLeftAssociative(tokens, index, ['*', '/', '//', '%', '@'], this.parseFactor);
+    }
+
+    parseFactor(tokens, index) {
+        const token = tokens[index];
+        if (!token) throw this.syntaxError(token, 'unexpected end of expression');
+
+        if (token.type === 'OPERATOR' && (token.value === '+' || token.value === '-' || token.value === '~')) {
+            const [operand, newIndex] = this.parseFactor(tokens, index + 1);
+            return [{ type: 'UnaryOp', operator: token.value, operand }, newIndex];
+        }
+        if (this.isKeyword(token, 'await')) {
+            const [value, newIndex] = this.parsePower(tokens, index + 1);
+            return [{ type: 'Await', value }, newIndex];
+        }
+
+        return this.parsePower(tokens, index);
+    }
+
+    parsePower(tokens, index) {
+        let [left, newIndex] = this.parseAtomExpression(tokens, index);
+
+        if (newIndex < tokens.length && tokens[newIndex].value === '**' && tokens[newIndex].type === 'OPERATOR') {
+            const [right, nextIndex] = this.parseFactor(tokens, newIndex + 1);
+            left = { type: 'BinaryOp', operator: '**', left, right };
+            newIndex = nextIndex;
+        }
+
+        return [left, newIndex];
+    }
+
+    parseAtomExpression(tokens, index) {
+        let [node, newIndex] = this.parseAtom(tokens, index);
+
+        while (newIndex < tokens.length && tokens[newIndex].type === 'DELIMITER') {
+            const value = tokens[newIndex].value;
+            if (value === '(') {
+                const [args, keywords, nextIndex] = this.parseArguments(tokens, newIndex + 1);
+                node = { type: 'FunctionCall', function: node, arguments: args, keywords };
+                newIndex = nextIndex;
+            } else if (value === '[') {
+                const [subscript, nextIndex] = this.parseSubscript(tokens, newIndex + 1);
+                node = { type: 'Subscript', object: node, index: subscript };
+                newIndex = nextIndex;
+            } else if (value === '.') {
+                const attribute = this.expectName(tokens, newIndex + 1);
+                node = { type: 'Attribute', object: node, attribute };
+                newIndex += 2;
+            } else {
+                break;
+            }
+        }
+
+        return [node, newIndex];
+    }
+
+    parseAtom(tokens, index) {
+        const token = tokens[index];
+        if (!token) throw this.syntaxError(token, 'unexpected end of expression');
+
+        if (token.type === 'NUMBER') {
+            return [{ type: 'Literal', value: this.parseNumberLiteral(token.value) }, index + 1];
+        }
+
+        if (token.type === 'STRING' || token.type === 'MULTILINE_STRING') {
+            return this.parseStringLiterals(tokens, index);
+        }
+
+        if (token.type === 'IDENTIFIER') {
+            if (token.value === 'True') return [{ type: 'Literal', value: true }, index + 1];
+            if (token.value === 'False') return [{ type: 'Literal', value: false }, index + 1];
+            if (token.value === 'None') return [{ type: 'Literal', value: null }, index + 1];
+            if (token.value === 'yield') return this.parseYield(tokens, index);
+            if (PYTHON_KEYWORDS.has(token.value)) throw this.syntaxError(token);
+            return [{ type: 'Identifier', name: token.value }, index + 1];
+        }
+
+        if (token.value === '(') {
+            if (tokens[index + 1] && tokens[index + 1].value === ')') {
+                return [{ type: 'Tuple', elements: [] }, index + 2];
+            }
+            if (this.isKeyword(tokens[index + 1], 'yield')) {
+                const [expr, newIndex] = this.parseYield(tokens, index + 1);
+                return [expr, this.expectToken(tokens, newIndex, ')')];
+            }
+            const [first, newIndex] = this.parseStarredOrExpression(tokens, index + 1);
+            if (this.isKeyword(tokens[newIndex], 'for')) {
+                const [generators, endIndex] = this.parseComprehensionClauses(tokens, newIndex);
+                return [{ type: 'GeneratorExpression', element: first, generators }, this.expectToken(tokens, endIndex, ')')];
+            }
+            if (tokens[newIndex] && tokens[newIndex].value === ',') {
+                const [elements, endIndex] = this.parseSequenceElements(tokens, newIndex, first, ')');
+                return [{ type: 'Tuple', elements }, endIndex];
+            }
+            return [first, this.expectToken(tokens, newIndex, ')')];
+        }
+
+        if (token.value === '[') {
+            return this.parseList(tokens, index + 1);
+        }
+
+        if (token.value === '{') {
+            return this.parseDictOrSet(tokens, index + 1);
+        }
+
+        if (token.value === '...') {
+            return [{ type: 'Literal', value: null }, index + 1];
+        }
+
+        throw this.syntaxError(token, `unexpected token '${token.value}'`);
+    }
+
+    parseStringLiterals(tokens, index) {
+        const pieces = [];
+        let formatted = false;
+        while (tokens[index] && (tokens[index].type === 'STRING' || tokens[index].type === 'MULTILINE_STRING')) {
+            const text = tokens[index].value;
+            if (/^[a-zA-Z]*[fF]/.test(text)) {
+                formatted = true;
+                pieces.push(this.parseFString(text, tokens[index]));
+            } else {
+                pieces.push({ type: 'Literal', value: this.decodeStringLiteral(text).value });
+            }
+            index++;
+        }
+
+        if (!formatted) {
+            return [{ type: 'Literal', value: pieces.map(piece => piece.value).join('') }, index];
+        }
+        const parts = [];
+        for (const piece of pieces) {
+            if (piece.type === 'FString') parts.push(...piece.parts);
+            else if (piece.value) parts.push({ type: 'literal', value: piece.value });
+        }
+        return [{ type: 'FString', parts }, index];
+    }
+
+    parseYield(tokens, index) {
+        if (this.isKeyword(tokens[index + 1], 'from')) {
+            const [value, newIndex] = this.parseExpression(tokens, index + 2);
+            return [{ type: 'YieldFrom', value }, newIndex];
+        }
+        if (!this.startsExpression(tokens[index + 1])) {
+            return [{ type: 'YieldExpression', value: null }, index + 1];
+        }
+        const [value, newIndex] = this.parseTestList(tokens, index + 1);
+        return [{ type: 'YieldExpression', value }, newIndex];
+    }
+
+    parseSequenceElements(tokens, index, first, closer) {
+        const elements = [first];
+
+        while (tokens[index] && tokens[index].value === ',') {
+            index++;
+            if (tokens[index] && tokens[index].value === closer) break;
+            const [element, nextIndex] = this.parseStarredOrExpression(tokens, index);
+            elements.push(element);
+            index = nextIndex;
+        }
+
+        return [elements, this.expectToken(tokens, index, closer)];
+    }
+
+    parseComprehensionClauses(tokens, index) {
+        const generators = [];
+
+        while (this.isKeyword(tokens[index], 'for')) {
+            const [target, inIndex] = this.parseTargetList(tokens, index + 1);
+            const iterIndex = this.expectToken(tokens, inIndex, 'in');
+            const [iterable, nextIndex] = this.parseOrExpression(tokens, iterIndex);
+            const conditions = [];
+            index = nextIndex;
+            while (this.isKeyword(tokens[index], 'if')) {
+                const [condition, conditionIndex] = this.parseOrExpression(tokens, index + 1);
+                conditions.push(condition);
+                index = conditionIndex;
+            }
+            generators.push({ target, iterable, conditions });
+        }
+
+        return [generators, index];
+    }
+
+    parseArguments(tokens, index) {
+        const args = [];
+        const keywords = [];
+
+        while (tokens[index] && tokens[index].value !== ')') {
+            const token = tokens[index];
+            if (token.type === 'OPERATOR' && token.value === '*') {
+                const [value, nextIndex] = this.parseExpression(tokens, index + 1);
+                args.push({ type: 'Starred', value });
+                index = nextIndex;
+            } else if (token.type === 'OPERATOR' && token.value === '**') {
+                const [value, nextIndex] = this.parseExpression(tokens, index + 1);
+                keywords.push({ name: null, value });
+                index = nextIndex;
+            } else if (token.type === 'IDENTIFIER' && tokens[index + 1] && tokens[index + 1].value === '=') {
+                const [value, nextIndex] = this.parseExpression(tokens, index + 2);
+                keywords.push({ name: token.value, value });
+                index = nextIndex;
+            } else {
+                const [expr, nextIndex] = this.parseExpression(tokens, index);
+                index = nextIndex;
+                if (this.isKeyword(tokens[index], 'for')) {
+                    const [generators, endIndex] = this.parseComprehensionClauses(tokens, index);
+                    args.push({ type: 'GeneratorExpression', element: expr, generators });
+                    index = endIndex;
+                } else {
+                    args.push(expr);
+                }
+            }
+
+            if (tokens[index] && tokens[index].value === ',') {
+                index++;
+            } else if (!tokens[index] || tokens[index].value !== ')') {
+                throw this.syntaxError(tokens[index], 'expected "," or ")" in argument list');
+            }
+        }
+
+        return [args, keywords, this.expectToken(tokens, index, ')')];
+    }
+
+    parseSubscript(tokens, index) {
+        const items = [];
+        let trailingComma = false;
+
+        while (tokens[index] && tokens[index].value !== ']') {
+            const [item, nextIndex] = this.parseSliceItem(tokens, index);
+            items.push(item);
+            index = nextIndex;
+            trailingComma = false;
+            if (tokens[index] && tokens[index].value === ',') {
+                index++;
+                trailingComma = true;
+            } else {
+                break;
+            }
+        }
+
+        index = this.expectToken(tokens, index, ']');
+        if (items.length === 1 && !trailingComma) return [items[0], index];
+        return [{ type: 'Tuple', elements: items }, index];
+    }
+
+    parseSliceItem(tokens, index) {
+        let lower = null;
+        if (tokens[index].value !== ':') {
+            [lower, index] = this.parseStarredOrExpression(tokens, index);
+            if (!tokens[index] || tokens[index].value !== ':') return [lower, index];
+        }
+
+        index++;
+        let upper = null;
+        let step = null;
+        if (this.startsExpression(tokens[index])) {
+            [upper, index] = this.parseExpression(tokens, index);
+        }
+        if (tokens[index] && tokens[index].value === ':') {
+            index++;
+            if (this.startsExpression(tokens[index])) {
+                [step, index] = this.parseExpression(tokens, index);
+            }
+        }
+        return [{ type: 'Slice', lower, upper, step }, index];
+    }
+
+    parseList(tokens, index) {
+        if (tokens[index] && tokens[index].value === ']') {
+            return [{ type: 'List', elements: [] }, index + 1];
+        }
+
+        const [first, newIndex] = this.parseStarredOrExpression(tokens, index);
+        if (this.isKeyword(tokens[newIndex], 'for')) {
+            const [generators, endIndex] = this.parseComprehensionClauses(tokens, newIndex);
+            return [{ type: 'ListComprehension', element: first, generators }, this.expectToken(tokens, endIndex, ']')];
+        }
+
+        const [elements, endIndex] = this.parseSequenceElements(tokens, newIndex, first, ']');
+        return [{ type: 'List', elements }, endIndex];
+    }
+
+    parseDictOrSet(tokens, index) {
+        if (tokens[index] && tokens[index].value === '}') {
+            return [{ type: 'Dict', pairs: [] }, index + 1];
+        }
+
+        let firstKey = null;
+        let firstValue;
+        if (tokens[index].value === '**') {
+            [firstValue, index] = this.parseBitwiseOr(tokens, index + 1);
+        } else {
+            const [firstExpr, newIndex] = this.parseStarredOrExpression(tokens, index);
+            index = newIndex;
+
+            if (!tokens[index] || tokens[index].value !== ':') {
+                if (this.isKeyword(tokens[index], 'for')) {
+                    const [generators, endIndex] = this.parseComprehensionClauses(tokens, index);
+                    return [{ type: 'SetComprehension', element: firstExpr, generators }, this.expectToken(tokens, endIndex, '}')];
+                }
+                const [elements, endIndex] = this.parseSequenceElements(tokens, index, firstExpr, '}');
+                return [{ type: 'Set', elements }, endIndex];
+            }
+
+            firstKey = firstExpr;
+            [firstValue, index] = this.parseExpression(tokens, index + 1);
+            if (this.isKeyword(tokens[index], 'for')) {
+                const [generators, endIndex] = this.parseComprehensionClauses(tokens, index);
+                return [{ type: 'DictComprehension', key: firstKey, value: firstValue, generators }, this.expectToken(tokens, endIndex, '}')];
+            }
+        }
+
+        const pairs = [{ key: firstKey, value: firstValue }];
+        while (tokens[index] && tokens[index].value === ',') {
+            index++;
+            if (tokens[index] && tokens[index].value === '}') break;
+            if (tokens[index].value === '**') {
+                const [value, nextIndex] = this.parseBitwiseOr(tokens, index + 1);
+                pairs.push({ key: null, value });
+                index = nextIndex;
+                continue;
+            }
+            const [key, keyIndex] = this.parseExpression(tokens, index);
+            const valueIndex = this.expectToken(tokens, keyIndex, ':');
+            const [value, nextIndex] = this.parseExpression(tokens, valueIndex);
+            pairs.push({ key, value });
+            index = nextIndex;
+        }
+
+        return [{ type: 'Dict', pairs }, this.expectToken(tokens, index, '}')];
+    }
+
+    resolveScopes(statements) {
+        const module = new ScopeInfo('module', statements, null);
+        this.resolveNode(statements, module);
+        this.analyzeScope(module);
+        this.layoutScope(module);
+        return module;
+    }
+
+    resolveNode(node, scope) {
+        if (Array.isArray(node)) {
+            for (const child of node) this.resolveNode(child, scope);
+            return;
+        }
+        if (!node || typeof node !== 'object') return;
+
+        switch (node.type) {
+            case 'Identifier':
+                scope.used.add(node.name);
+                return;
+
+            case 'FunctionDef':
+                this.resolveNode(node.decorators, scope);
+                this.resolveParameterDefaults(node.params, scope);
+                scope.bound.add(node.name);
+                this.resolveFunctionScope(node, node.params, node.body, scope);
+                return;
+
+            case 'Lambda':
+                this.resolveParameterDefaults(node.params, scope);
+                this.resolveFunctionScope(node, node.params, node.body, scope);
+                return;
+
+            case 'ClassDef': {
+                this.resolveNode(node.decorators, scope);
+                this.resolveNode(node.bases, scope);
+                this.resolveNode(node.keywords, scope);
+                scope.bound.add(node.name);
+                const inner = new ScopeInfo('class', node, scope);
+                scope.children.set(node, inner);
+                this.resolveNode(node.body, inner);
+                return;
+            }
+
+            case 'ListComprehension':
+            case 'GeneratorExpression':
+            case 'SetComprehension':
+            case 'DictComprehension': {
+                // The outermost iterable is evaluated in the enclosing scope.
+                this.resolveNode(node.generators[0].iterable, scope);
+                const inner = new ScopeInfo('comprehension', node, scope);
+                scope.children.set(node, inner);
+                node.generators.forEach((generator, depth) => {
+                    if (depth > 0) this.resolveNode(generator.iterable, inner);
+                    this.resolveTarget(generator.target, inner);
+                    this.resolveNode(generator.conditions, inner);
+                });
+                this.resolveNode([node.element, node.key, node.value], inner);
+                return;
+            }
+
+            case 'NamedExpression': {
+                this.resolveNode(node.value, scope);
+                // Walrus targets inside comprehensions bind in the enclosing function or module.
+                let owner = scope;
+                while (owner.kind === 'comprehension') owner = owner.parent;
+                owner.bound.add(node.name);
+                for (let inner = scope; inner !== owner; inner = inner.parent) {
+                    (owner.kind === 'function' ? inner.nonlocals : inner.globals).add(node.name);
+                }
+                return;
+            }
+
+            case 'Assignment':
+                this.resolveNode(node.value, scope);
+                for (const target of node.targets) this.resolveTarget(target, scope);
+                return;
+
+            case 'AugmentedAssignment':
+                this.resolveNode(node.value, scope);
+                this.resolveNode(node.target, scope);
+                this.resolveTarget(node.target, scope);
+                if (node.operator === '+' && node.target.type === 'Identifier') scope.concatenated.add(node.target.name);
+                return;
+
+            case 'ForLoop':
+                this.resolveNode(node.iterable, scope);
+                this.resolveTarget(node.target, scope);
+                this.resolveNode(node.body, scope);
+                this.resolveNode(node.elseBranch, scope);
+                return;
+
+            case 'WithStatement':
+                for (const item of node.items) {
+                    this.resolveNode(item.context, scope);
+                    if (item.target) this.resolveTarget(item.target, scope);
+                }
+                this.resolveNode(node.body, scope);
+                return;
+
+            case 'TryStatement':
+                this.resolveNode(node.body, scope);
+                for (const clause of node.exceptClauses) {
+                    this.resolveNode(clause.exceptionType, scope);
+                    if (clause.name) scope.bound.add(clause.name);
+                    this.resolveNode(clause.body, scope);
+                }
+                this.resolveNode(node.elseBranch, scope);
+                this.resolveNode(node.finallyBranch, scope);
+                return;
+
+            case 'Import':
+                for (const { name, alias } of node.modules) {
+                    scope.bound.add(alias || name.split('.')[0]);
+                }
+                return;
+
+            case 'FromImport':
+                for (const item of node.items) {
+                    if (item.name === '*') scope.starImport = true;
+                    else scope.bound.add(item.alias || item.name);
+                }
+                return;
+
+            case 'Yield':
+            case 'YieldExpression':
+            case 'YieldFrom':
+                scope.generator = true;
+                this.resolveNode(node.value, scope);
+                return;
+
+            case 'Global':
+                for (const name of node.names) scope.globals.add(name);
+                return;
+
+            case 'Nonlocal':
+                for (const name of node.names) scope.nonlocals.add(name);
+                return;
+
+            case 'Delete':
+                for (const target of node.targets) this.resolveTarget(target, scope);
+                return;
+        }
+
+        for (const key in node) {
+            const value = node[key];
+            if (value && typeof value === 'object') this.resolveNode(value, scope);
+        }
+    }
+
+    resolveTarget(target, scope) {
+        switch (target.type) {
+            case 'Identifier':
+                scope.bound.add(target.name);
+                return;
+            case 'Tuple':
+            case 'List':
+                for (const element of target.elements) this.resolveTarget(element, scope);
+                return;
+            case 'Starred':
+                this.resolveTarget(target.value, scope);
+                return;
+            default:
+                this.resolveNode(target, scope);
+        }
+    }
+
+    resolveParameterDefaults(params, scope) {
+        for (const param of params) {
+            if (param.default) this.resolveNode(param.default, scope);
+        }
+    }
+
+    resolveFunctionScope(node, params, body, parent) {
+        const inner = new ScopeInfo('function', node, parent);
+        parent.children.set(node, inner);
+        for (const param of params) {
+            inner.params.push(param.name);
+            inner.bound.add(param.name);
+        }
+        this.resolveNode(body, inner);
+    }
+
+    analyzeScope(scope) {
+        const names = new Set([...scope.bound, ...scope.used, ...scope.nonlocals]);
+        for (const name of names) {
+            scope.resolution.set(name, this.classifyName(scope, name));
+        }
+        for (const child of scope.children.values()) {
+            this.analyzeScope(child);
+        }
+    }
+
+    classifyName(scope, name) {
+        if (scope.kind === 'module' || scope.globals.has(name)) return 'global';
+
+        const declaredNonlocal = scope.nonlocals.has(name);
+        if (scope.bound.has(name) && !declaredNonlocal) {
+            return scope.kind === 'class' ? 'class' : 'local';
+        }
+
+        // Free variable: find the nearest enclosing function that binds it (class bodies are skipped).
+        for (let owner = scope.parent; owner && owner.kind !== 'module'; owner = owner.parent) {
+            if (owner.kind === 'class') continue;
+            if (owner.globals.has(name)) break;
+            if (owner.bound.has(name) && !owner.nonlocals.has(name)) {
+                owner.cells.add(name);
+                for (let inner = scope; inner !== owner; inner = inner.parent) {
+                    inner.free.add(name);
+                }
+                return 'free';
+            }
+        }
+
+        if (declaredNonlocal) {
+            throw new Error(`SyntaxError: no binding for nonlocal '${name}' found`);
+        }
+        return 'global';
+    }
+
+    layoutScope(scope) {
+        // Slot 0 of every frame holds the module globals; class frames keep their namespace in slot 1.
+        let next = scope.kind === 'class' ? 2 : 1;
+        if (scope.kind === 'function' || scope.kind === 'comprehension') {
+            for (const name of scope.params) {
+                if (!scope.slots.has(name)) scope.slots.set(name, next++);
+            }
+            for (const [name, kind] of scope.resolution) {
+                if (kind === 'local' && !scope.slots.has(name)) scope.slots.set(name, next++);
+            }
+        }
+        if (scope.kind !== 'module') {
+            for (const name of scope.free) {
+                scope.slots.set(name, next++);
+            }
+        }
+        scope.size = next;
+        for (const child of scope.children.values()) {
+            this.layoutScope(child);
+        }
+    }
+
+    prepareFrame(scope, frame) {
+        // Captured locals live in cells; uncaptured locals and parameters stay in plain slots.
+        for (const name of scope.cells) {
+            const slot = scope.slots.get(name);
+            frame[slot] = new Cell(frame[slot]);
+        }
+    }
+
+    acquireFrame(scope) {
+        const frames = scope.frames;
+        return frames.length > 0 ? frames.pop() : new Array(scope.size);
+    }
+
+    releaseFrame(scope, frame) {
+        // Only calls that returned normally give their frame back. Nothing can still refer to it:
+        // closures capture cells, and only tracebacks, which come from raising calls, keep frames.
+        if (scope.frames.length < FRAME_POOL_SIZE) {
+            for (let i = 1; i < frame.length; i++) frame[i] = undefined;
+            scope.frames.push(frame);
+        }
+    }
+
+    captureCells(scope, outerScope, frame) {
+        const cells = [];
+        for (const name of scope.free) {
+            cells.push(frame[outerScope.slots.get(name)]);
+        }
+        return cells;
+    }
+
+    installCells(scope, frame, cells) {
+        let slot = scope.size - cells.length;
+        for (const cell of cells) {
+            frame[slot++] = cell;
+        }
+    }
+
+    compileNameLoad(name) {
+        const scope = this.compileScope;
+        const kind = scope.resolution.get(name) || 'global';
+        const builtins = this.builtins;
+
+        const loadGlobal = (frame) => {
+            const globals = frame[0];
+            const value = globals[name];
+            if (value !== undefined || name in globals) return value;
+            if (name in builtins) return builtins[name];
+            throw new this.builtins.NameError(`name '${name}' is not defined`);
+        };
+
+        if (kind === 'global') return loadGlobal;
+        if (kind === 'class') {
+            return (frame) => {
+                const namespace = frame[1];
+                return name in namespace ? namespace[name] : loadGlobal(frame);
+            };
+        }
+
+        const slot = scope.slots.get(name);
+        if (kind === 'free' || scope.cells.has(name)) {
+            return (frame) => {
+                const value = frame[slot].value;
+                if (value === undefined) throw this.unboundError(name, kind === 'free');
+                return value;
+            };
+        }
+        if (scope.stringBuilders && scope.stringBuilders.has(name)) {
+            return (frame) => {
+                const value = frame[slot];
+                if (value === undefined) throw this.unboundError(name, false);
+                return value instanceof StringBuilder ? value.toString() : value;
+            };
+        }
+        return (frame) => {
+            const value = frame[slot];
+            if (value === undefined) throw this.unboundError(name, false);
+            return value;
+        };
+    }
+
+    unboundError(name, free) {
+        if (free) {
+            return new this.builtins.NameError(`cannot access free variable '${name}' where it is not associated with a value in enclosing scope`);
+        }
+        return new this.builtins.UnboundLocalError(`cannot access local variable '${name}' where it is not associated with a value`);
+    }
+
+    compileNameStore(name) {
+        const scope = this.compileScope;
+        const kind = scope.resolution.get(name) || 'global';
+
+        if (kind === 'global') return (frame, value) => { frame[0][name] = value; };
+        if (kind === 'class') return (frame, value) => { frame[1][name] = value; };
+
+        const slot = scope.slots.get(name);
+        if (kind === 'free' || scope.cells.has(name)) {
+            return (frame, value) => { frame[slot].value = value; };
+        }
+        return (frame, value) => { frame[slot] = value; };
+    }
+
+    compileNameDelete(name) {
+        const scope = this.compileScope;
+        const kind = scope.resolution.get(name) || 'global';
+        const load = this.compileNameLoad(name);
+        const store = this.compileNameStore(name);
+
+        if (kind === 'global' || kind === 'class') {
+            const index = kind === 'global' ? 0 : 1;
+            return (frame) => {
+                if (!(name in frame[index])) throw new this.builtins.NameError(`name '${name}' is not defined`);
+                delete frame[index][name];
+            };
+        }
+        return (frame) => {
+            load(frame);
+            store(frame, undefined);
+        };
+    }
+
+    withCompileScope(scope, compile) {
+        const outer = this.compileScope;
+        this.compileScope = scope;
+        try {
+            return compile();
+        } finally {
+            this.compileScope = outer;
+        }
+    }
+
+    optimizeProgram(statements, scope) {
+        // Runs after scope resolution, so pruned code still counts towards each scope's bindings.
+        // The cached AST is never mutated: changed nodes are copied and unchanged subtrees shared.
+        return this.optimizeBlock(statements, scope, this.findModuleConstants(statements, scope));
+    }
+
+    findModuleConstants(statements, scope) {
+        // Module names bound exactly once, by a top-level `NAME = <literal>`, can be propagated into
+        // later module-level code. Function bodies are left alone since importers may rebind the name.
+        const constants = { definitions: new Map(), values: new Map() };
+        const declared = new Set();
+        const pending = [scope];
+        while (pending.length > 0) {
+            const current = pending.pop();
+            if (DYNAMIC_NAMESPACE_BUILTINS.some(name => current.used.has(name))) return constants;
+            for (const name of current.globals) declared.add(name);
+            pending.push(...current.children.values());
+        }
+
+        const counts = new Map();
+        for (const statement of statements) {
+            const bindings = new ScopeInfo('module', statement, null);
+            this.resolveNode(statement, bindings);
+            if (bindings.starImport) return constants;
+            for (const name of bindings.bound) counts.set(name, (counts.get(name) || 0) + 1);
+        }
+        for (const statement of statements) {
+            if (statement.type !== 'Assignment' || statement.targets.length !== 1 || statement.targets[0].type !== 'Identifier') continue;
+            const name = statement.targets[0].name;
+            if (counts.get(name) === 1 && !declared.has(name)) constants.definitions.set(statement, name);
+        }
+        return constants;
+    }
+
+    optimizeBlock(statements, scope, constants) {
+        const result = [];
+        let changed = false;
+        for (let i = 0; i < statements.length; i++) {
+            const statement = statements[i];
+            const optimized = this.optimizeNode(statement, scope, constants);
+            if (optimized !== statement) changed = true;
+            if (Array.isArray(optimized)) result.push(...optimized);
+            else result.push(optimized);
+
+            const name = constants && constants.definitions.get(statement);
+            if (name && optimized.value.type === 'Literal' && this.isPrimitiveLiteral(optimized.value)) {
+                constants.values.set(name, optimized.value.value);
+            }
+            // Code after return/raise/break/continue is unreachable.
+            if (TERMINAL_STATEMENTS.has(statement.type) && i < statements.length - 1) {
+                changed = true;
+                break;
+            }
+        }
+        return changed ? result : statements;
+    }
+
+    optimizeNode(node, scope, constants) {
+        if (Array.isArray(node)) {
+            let result = node;
+            node.forEach((child, i) => {
+                const optimized = this.optimizeNode(child, scope, constants);
+                if (optimized !== child) {
+                    if (result === node) result = [...node];
+                    result[i] = optimized;
+                }
+            });
+            return result;
+        }
+        if (!node || typeof node !== 'object') return node;
+
+        if (node.type === 'Identifier') {
+            return constants && constants.values.has(node.name) ? { type: 'Literal', value: constants.values.get(node.name) } : node;
+        }
+
+        const inner = scope.children.get(node);
+        let result = node;
+        for (const key in node) {
+            const value = node[key];
+            if (!value || typeof value !== 'object' || key === 'target' || key === 'targets') continue;
+            // Decorators, defaults and bases belong to the enclosing scope, as does a comprehension's first iterable.
+            const enclosing = !inner || OUTER_SCOPE_KEYS.has(key);
+            const childScope = enclosing ? scope : inner;
+            const childConstants = enclosing ? constants : null;
+            let optimized;
+            if (inner && key === 'generators') {
+                optimized = this.optimizeGenerators(value, scope, inner, constants);
+            } else if (BLOCK_KEYS.has(key) && Array.isArray(value)) {
+                optimized = this.optimizeBlock(value, childScope, childConstants);
+            } else {
+                optimized = this.optimizeNode(value, childScope, childConstants);
+            }
+            if (optimized !== value) {
+                if (result === node) result = { ...node };
+                result[key] = optimized;
+            }
+        }
+        if (inner) {
+            if (result !== node) scope.children.set(result, inner);
+            return result;
+        }
+
+        if (result.iterable) {
+            const iterable = this.hoistLiteralContainer(result.iterable, true);
+            if (iterable !== result.iterable) result = { ...result, iterable };
+        }
+        return this.foldNode(result);
+    }
+
+    optimizeGenerators(generators, scope, inner, constants) {
+        let changed = false;
+        const result = generators.map((generator, depth) => {
+            const iterable = this.hoistLiteralContainer(depth === 0
+                ? this.optimizeNode(generator.iterable, scope, constants)
+                : this.optimizeNode(generator.iterable, inner, null), true);
+            const conditions = this.optimizeNode(generator.conditions, inner, null);
+            if (iterable === generator.iterable && conditions === generator.conditions) return generator;
+            changed = true;
+            return { ...generator, iterable, conditions };
+        });
+        return changed ? result : generators;
+    }
+
+    foldNode(node) {
+        switch (node.type) {
+            case 'BinaryOp': {
+                if ((node.operator === 'in' || node.operator === 'not in') && node.right.type !== 'Literal') {
+                    const container = this.hoistLiteralContainer(node.right, false);
+                    if (container !== node.right) return this.foldNode({ ...node, right: container });
+                }
+                const { left, right, operator } = node;
+                if (left.type !== 'Literal' || !this.isPrimitiveLiteral(left)) return node;
+                if (operator === 'and') return left.value ? right : left;
+                if (operator === 'or') return left.value ? left : right;
+                if (right.type !== 'Literal') return node;
+                return this.foldOperation(node, operator, left.value, right.value);
+            }
+
+            case 'Compare': {
+                const comparators = node.comparators.map((comparator, i) => {
+                    const operator = node.operators[i];
+                    return operator === 'in' || operator === 'not in' ? this.hoistLiteralContainer(comparator, false) : comparator;
+                });
+                const folded = comparators.some((comparator, i) => comparator !== node.comparators[i])
+                    ? { ...node, comparators } : node;
+                if (node.operators.length !== 1 || folded.left.type !== 'Literal' || comparators[0].type !== 'Literal') return folded;
+                return this.foldOperation(folded, node.operators[0], folded.left.value, comparators[0].value);
+            }
+
+            case 'UnaryOp': {
+                const { operand, operator } = node;
+                if (operand.type !== 'Literal' || !this.isPrimitiveLiteral(operand)) return node;
+                if (operator === 'not') return { type: 'Literal', value: !operand.value };
+                if (typeof operand.value !== 'number' && typeof operand.value !== 'bigint') return node;
+                const value = operator === '-' ? -operand.value : operator === '+' ? operand.value : invertInt(operand.value);
+                return { type: 'Literal', value };
+            }
+
+            case 'Tuple': {
+                if (!node.elements.every(element => element.type === 'Literal')) return node;
+                const value = node.elements.map(element => element.value);
+                value.__class__ = 'tuple';
+                return { type: 'Literal', value };
+            }
+
+            case 'IfExpression':
+                if (node.condition.type !== 'Literal' || !this.isPrimitiveLiteral(node.condition)) return node;
+                return node.condition.value ? node.body : node.orelse;
+
+            case 'IfStatement':
+                return this.pruneIfStatement(node);
+
+            case 'WhileLoop':
+                if (node.condition.type === 'Literal' && this.isPrimitiveLiteral(node.condition) && !node.condition.value) {
+                    return node.elseBranch || [];
+                }
+                return node;
+
+            default:
+                return node;
+        }
+    }
+
+    foldOperation(node, operator, left, right) {
+        if (!FOLDABLE_OPERATORS.has(operator)) return node;
+        const numeric = (typeof left === 'number' || typeof left === 'bigint') && (typeof right === 'number' || typeof right === 'bigint');
+        const textual = typeof left === 'string' && (typeof right === 'string' || (operator === '*' && typeof right === 'number'));
+        if (!numeric && !textual) return node;
+        if ((operator === 'in' || operator === 'not in') && !(typeof left === 'string' && typeof right === 'string')) return node;
+        if (operator === '*' && textual && left.length * right > MAX_FOLDED_STRING_LENGTH) return node;
+
+        let value;
+        try {
+            value = this.applyBinaryOperator(operator, left, right);
+        } catch (error) {
+            // Leave the operation in place so the error is raised at run time, where Python raises it.
+            return node;
+        }
+        return { type: 'Literal', value };
+    }
+
+    hoistLiteralContainer(node, iteration) {
+        // A literal list or set that is only iterated or searched can be built once at compile time,
+        // like CPython turning `x in [1, 2]` into a constant tuple and `x in {1, 2}` into a frozenset.
+        if ((node.type !== 'List' && node.type !== 'Set') || !node.elements.every(element => element.type === 'Literal')) {
+            return node;
+        }
+        const values = node.elements.map(element => element.value);
+        if (node.type === 'Set' && !iteration && values.every(value => this.isPrimitiveValue(value))) {
+            return { type: 'Literal', value: new PyFrozenSet(values) };
+        }
+        if (node.type === 'Set') return node;
+        values.__class__ = 'tuple';
+        return { type: 'Literal', value: values };
+    }
+
+    pruneIfStatement(node) {
+        const branches = [{ condition: node.condition, body: node.body }, ...node.elifBranches];
+        const live = [];
+        let elseBranch = node.elseBranch;
+        for (const branch of branches) {
+            const constant = branch.condition.type === 'Literal' && this.isPrimitiveLiteral(branch.condition);
+            if (constant && !branch.condition.value) continue;
+            if (constant) {
+                elseBranch = branch.body;
+                break;
+            }
+            live.push(branch);
+        }
+
+        if (live.length === branches.length && elseBranch === node.elseBranch) return node;
+        if (live.length === 0) return elseBranch || [];
+        const [first, ...elifBranches] = live;
+        return { type: 'IfStatement', condition: first.condition, body: first.body, elifBranches, elseBranch, line: node.line };
+    }
+
+    isPrimitiveLiteral(node) {
+        return this.isPrimitiveValue(node.value);
+    }
+
+    isPrimitiveValue(value) {
+        return value === null || typeof value === 'number' || typeof value === 'bigint' || typeof value === 'string' || typeof value === 'boolean';
+    }
+
+    evaluateNode(node) {
+        if (!node) return null;
+        const scope = this.resolveScopes([{ type: 'ExpressionStatement', expression: node }]);
+        const expression = this.withCompileScope(scope, () => this.compileExpression(node));
+        return expression([this.scopeStack[0]]);
+    }
+
+    compileExpression(node) {
+        if (!node) return (frame) => null;
+
+        switch (node.type) {
+            case 'Literal': {
+                const value = node.value;
+                return (frame) => value;
+            }
+
+            case 'Identifier':
+                return this.compileNameLoad(node.name);
+
+            case 'BinaryOp':
+                return this.compileBinaryOp(node);
+
+            case 'Compare':
+                return this.compileCompare(node);
+
+            case 'UnaryOp':
+                return this.compileUnaryOp(node);
+
+            case 'FunctionCall':
+                return this.compileFunctionCall(node);
+
+            case 'Attribute': {
+                const object = this.compileExpression(node.object);
+                const attribute = node.attribute;
+                if (this.inlineCaches) {
+                    const cache = this.createAttributeCache(attribute);
+                    return (frame) => this.loadCachedAttribute(cache, object(frame));
+                }
+                return (frame) => this.getAttribute(object(frame), attribute);
+            }
+
+            case 'Subscript':
+                return this.compileSubscript(node);
+
+            case 'List':
+                return this.compileElements(node.elements);
+
+            case 'Tuple': {
+                const elements = this.compileElements(node.elements);
+                return (frame) => {
+                    const tuple = elements(frame);
+                    tuple.__class__ = 'tuple';
+                    return tuple;
+                };
+            }
+
+            case 'Dict':
+                return this.compileDict(node);
+
+            case 'Set': {
+                const elements = this.compileElements(node.elements);
+                return (frame) => new PySet(elements(frame));
+            }
+
+            case 'FString':
+                return this.compileFString(node);
+
+            case 'ListComprehension':
+                return this.compileListComprehension(node);
+
+            case 'GeneratorExpression':
+                return this.compileGeneratorExpression(node);
+
+            case 'SetComprehension': {
+                const comprehension = this.compileListComprehension(node);
+                return (frame) => new PySet(comprehension(frame));
+            }
+
+            case 'DictComprehension':
+                return this.compileDictComprehension(node);
+
+            case 'IfExpression': {
+                const condition = this.compileExpression(node.condition);
+                const body = this.compileExpression(node.body);
+                const orelse = this.compileExpression(node.orelse);
+                return (frame) => (condition(frame)) ? body(frame) : orelse(frame);
+            }
+
+            case 'Lambda':
+                return this.compileFunction('<lambda>', node, node.params, node.body, true);
+
+            case 'NamedExpression': {
+                const value = this.compileExpression(node.value);
+                const store = this.compileNameStore(node.name);
+                return (frame) => {
+                    const result = value(frame);
+                    store(frame, result);
+                    return result;
+                };
+            }
+
+            case 'Await': {
+                const value = this.compileExpression(node.value);
+                return (frame) => value(frame);
+            }
+
+            case 'YieldExpression':
+            case 'YieldFrom': {
+                const value = this.compileExpression(node.value);
+                return (frame) => {
+                    value(frame);
+                    return null;
+                };
+            }
+
+            case 'Starred':
+                throw new Error("SyntaxError: can't use starred expression here");
+
+            default:
+                throw new Error(`Unknown node type: ${node.type}`);
+        }
+    }
+
+    compileElements(elements) {
+        const compiled = elements.map(element => element.type === 'Starred'
+            ? { starred: true, value: this.compileExpression(element.value) }
+            : { starred: false, value: this.compileExpression(element) });
+
+        if (!compiled.some(element => element.starred)) {
+            const values = compiled.map(element => element.value);
+            const evaluate = (frame) => {
+                const result = new Array(values.length);
+                for (let i = 0; i < values.length; i++) {
+                    result[i] = values[i](frame);
+                }
+                return result;
+            };
+            // Call sites evaluate the elements one by one into the callee's frame.
+            evaluate.values = values;
+            return evaluate;
+        }
+
+        return (frame) => {
+            const result = [];
+            for (const element of compiled) {
+                if (element.starred) {
+                    result.push(...this.iterate(element.value(frame)));
+                } else {
+                    result.push(element.value(frame));
+                }
+            }
+            return result;
+        };
+    }
+
+    compileDict(node) {
+        const pairs = node.pairs.map(pair => ({
+            key: pair.key === null ? null : this.compileExpression(pair.key),
+            value: this.compileExpression(pair.value)
+        }));
+        return (frame) => {
+            const dict = new PyDict();
+            for (const pair of pairs) {
+                if (pair.key === null) {
+                    dict.update(pair.value(frame));
+                    continue;
+                }
+                const key = pair.key(frame);
+                dict.set(key, pair.value(frame));
+            }
+            return dict;
+        };
+    }
+
+    iterate(iterable) {
+        if (iterable === null || iterable === undefined || typeof iterable[Symbol.iterator] !== 'function') {
+            throw new this.builtins.TypeError(`'${this.builtins.type(iterable)}' object is not iterable`);
+        }
+        return iterable;
+    }
+
+    compileFString(node) {
+        const parts = node.parts.map(part => part.type === 'literal' ? part.value : this.compileFStringField(part));
+        if (parts.length === 1 && typeof parts[0] === 'function') return parts[0];
+        return (frame) => {
+            let result = '';
+            for (const part of parts) {
+                result += typeof part === 'string' ? part : part(frame);
+            }
+            return result;
+        };
+    }
+
+    compileFStringField(part) {
+        const value = this.compileExpression(part.expression);
+        const convert = part.conversion === 'r' ? (item) => this.repr(item)
+            : part.conversion === 'a' ? (item) => this.ascii(item)
+            : part.conversion === 's' ? (item) => this.toString(item)
+            : null;
+
+        if (!part.format) {
+            const render = convert || ((item) => this.toString(item));
+            return (frame) => render(value(frame));
+        }
+        const spec = this.compileFString(part.format);
+        return (frame) => {
+            const item = value(frame);
+            return this.formatValue(convert ? convert(item) : item, spec(frame));
+        };
+    }
+
+    compileListComprehension(node) {
+        return this.compileComprehensionScope(node, (element) => {
+            return (frame, result) => {
+                result.push(element[0](frame));
+            };
+        }, () => []);
+    }
+
+    compileGeneratorExpression(node) {
+        // Like a comprehension, but the loops run inside a JS generator and values stream out one at a time.
+        const outerScope = this.compileScope;
+        const scope = outerScope.children.get(node);
+        const iterable = this.compileExpression(node.generators[0].iterable);
+        const run = this.withCompileScope(scope, () => {
+            const element = this.compileExpression(node.element);
+            const iterate = (value) => this.iterate(value);
+            const step = () => {
+                if (++this.steps >= this.stepCheck) this.checkSteps();
+            };
+            let inner = null;
+            for (let depth = node.generators.length - 1; depth >= 0; depth--) {
+                const generator = node.generators[depth];
+                const nextIterable = depth + 1 < node.generators.length ? this.compileExpression(node.generators[depth + 1].iterable) : null;
+                const assign = this.compileTarget(generator.target);
+                const conditions = generator.conditions.map(condition => this.compileExpression(condition));
+                const accepts = (frame) => {
+                    for (const condition of conditions) {
+                        if (!condition(frame)) return false;
+                    }
+                    return true;
+                };
+                const next = inner;
+                // The innermost clause yields elements itself rather than delegating once per element.
+                inner = next === null
+                    ? function* (frame, items) {
+                        for (const item of iterate(items)) {
+                            step();
+                            assign(frame, item);
+                            if (accepts(frame)) yield element(frame);
+                        }
+                    }
+                    : function* (frame, items) {
+                        for (const item of iterate(items)) {
+                            step();
+                            assign(frame, item);
+                            if (accepts(frame)) yield* next(frame, nextIterable(frame));
+                        }
+                    };
+            }
+            return inner;
+        });
+
+        return (frame) => {
+            const inner = new Array(scope.size);
+            inner[0] = frame[0];
+            this.prepareFrame(scope, inner);
+            this.installCells(scope, inner, this.captureCells(scope, outerScope, frame));
+            // The outermost iterable is evaluated immediately, as in Python.
+            const items = this.iterate(iterable(frame));
+            return new PyGenerator('<genexpr>', run(inner, items), this.builtins.StopIteration);
+        };
+    }
+
+    compileDictComprehension(node) {
+        return this.compileComprehensionScope(node, (element) => {
+            return (frame, result) => {
+                result.set(element[0](frame), element[1](frame));
+            };
+        }, () => new PyDict());
+    }
+
+    compileComprehensionScope(node, makeEmit, createResult) {
+        // Comprehensions run in their own frame; only the outermost iterable sees the enclosing scope.
+        const outerScope = this.compileScope;
+        const scope = outerScope.children.get(node);
+        const iterable = this.compileExpression(node.generators[0].iterable);
+        const [run, emit] = this.withCompileScope(scope, () => {
+            const elements = node.type === 'DictComprehension'
+                ? [this.compileExpression(node.key), this.compileExpression(node.value)]
+                : [this.compileExpression(node.element)];
+            return [this.compileComprehension(node.generators), makeEmit(elements)];
+        });
+
+        return (frame) => {
+            const inner = new Array(scope.size);
+            inner[0] = frame[0];
+            this.prepareFrame(scope, inner);
+            this.installCells(scope, inner, this.captureCells(scope, outerScope, frame));
+
+            const result = createResult();
+            run(inner, iterable(frame), () => emit(inner, result));
+            return result;
+        };
+    }
+
+    compileComprehension(generators) {
+        // Build the nested loops from the innermost clause outwards.
+        let inner = (frame, iterable, emit) => emit();
+        for (let depth = generators.length - 1; depth >= 0; depth--) {
+            const generator = generators[depth];
+            const nextIterable = depth + 1 < generators.length ? this.compileExpression(generators[depth + 1].iterable) : null;
+            const assign = this.compileTarget(generator.target);
+            const conditions = generator.conditions.map(condition => this.compileExpression(condition));
+            const next = inner;
+            inner = (frame, iterable, emit) => {
+                for (const item of this.iterate(iterable)) {
+                    if (++this.steps >= this.stepCheck) this.checkSteps();
+                    assign(frame, item);
+                    let accepted = true;
+                    for (const condition of conditions) {
+                        if (!(condition(frame))) {
+                            accepted = false;
+                            break;
+                        }
+                    }
+                    if (accepted) next(frame, nextIterable ? nextIterable(frame) : null, emit);
+                }
+            };
+        }
+        return inner;
+    }
+
+    compileBinaryOp(node) {
+        const left = this.compileExpression(node.left);
+        const right = this.compileExpression(node.right);
+
+        if (node.operator === 'and') {
+            return (frame) => {
+                const value = left(frame);
+                return value ? right(frame) : value;
+            };
+        }
+        if (node.operator === 'or') {
+            return (frame) => {
+                const value = left(frame);
+                return value ? value : right(frame);
+            };
+        }
+
+        const operator = this.getBinaryOperator(node.operator);
+        if (node.right.type === 'Literal') {
+            const constant = node.right.value;
+            return (frame) => operator(left(frame), constant);
+        }
+        return (frame) => operator(left(frame), right(frame));
+    }
+
+    getBinaryOperator(operator) {
+        const implementation = this.binaryOperators[operator];
+        if (!implementation) throw new Error(`Unknown binary operator: ${operator}`);
+        return implementation;
+    }
+
+    createBinaryOperators() {
+        const contains = (container, item) => {
+            if (Array.isArray(container)) return sequenceIndex(container, item) !== -1;
+            if (typeof container === 'string') return container.includes(item);
+            if (container instanceof PyDict) return container.has(item);
+            if (container instanceof PyRange) return container.__contains__(item);
+            if (container instanceof PySetBase || container instanceof Map) return container.has(item);
+            if (container instanceof DictView) return container.__contains__(item);
+            return item in container;
+        };
+        // Set comparisons are subset tests.
+        const setOrder = (operator, left, right) => {
+            if (!(right instanceof PySetBase)) {
+                throw new this.builtins.TypeError(`'${operator}' not supported between instances of '${this.builtins.type(left)}' and '${this.builtins.type(right)}'`);
+            }
+            switch (operator) {
+                case '<': return left.size < right.size && left.isSubset(right);
+                case '<=': return left.isSubset(right);
+                case '>': return right.size < left.size && right.isSubset(left);
+                default: return right.isSubset(left);
+            }
+        };
+        const setOperation = (operator, left, right) => {
+            if (!(right instanceof PySetBase)) {
+                throw new this.builtins.TypeError(`unsupported operand type(s) for ${operator}: '${this.builtins.type(left)}' and '${this.builtins.type(right)}'`);
+            }
+            return left;
+        };
+        // The slow path of int arithmetic: exact BigInt results once an operand or the result
+        // leaves the safe-integer range. `approximate` is the double result, kept when a float
+        // is involved.
+        const exact = (operator, left, right, approximate) => {
+            if (isIntValue(left) && isIntValue(right)) {
+                const a = BigInt(left);
+                const b = BigInt(right);
+                if (b === 0n && (operator === '//' || operator === '%')) {
+                    throw new this.builtins.ZeroDivisionError('integer division or modulo by zero');
+                }
+                if (b < 0n && operator === '**') return Math.pow(Number(a), Number(b));
+                if (b < 0n && (operator === '<<' || operator === '>>')) throw new this.builtins.ValueError('negative shift count');
+                return normalizeInt(BIGINT_OPERATIONS[operator](a, b));
+            }
+            if (approximate !== undefined) return approximate;
+            const numeric = (value) => typeof value === 'number' || typeof value === 'bigint' || typeof value === 'boolean';
+            if (FLOAT_OPERATORS.has(operator) && numeric(left) && numeric(right)) {
+                return operators[operator](Number(left), Number(right));
+            }
+            throw new this.builtins.TypeError(`unsupported operand type(s) for ${operator}: '${this.builtins.type(left)}' and '${this.builtins.type(right)}'`);
+        };
+        // Operands that fit in 32 bits can use JS's own bitwise operators.
+        const int32 = (left, right) => typeof left === 'number' && typeof right === 'number' && (left | 0) === left && (right | 0) === right;
+        const operators = {
+            '+': (left, right) => {
+                if (typeof left === 'number' && typeof right === 'number') {
+                    const result = left + right;
+                    return result <= Number.MAX_SAFE_INTEGER && result >= Number.MIN_SAFE_INTEGER ? result : exact('+', left, right, result);
                 }
-            },
-            environ: {
-                get: (key, default_value = null) => {
-                    const env = {
-                        'HOME': '/home/user',
-                        'PATH': '/usr/bin:/bin',
-                        'USER': 'user',
-                        'PYTHONPATH': '/workspace'
-                    };
-                    return env[key] || default_value;
-                },
-                __getitem__: (key) => {
-                    const value = this.environ.get(key);
-                    if (value === null) throw new Error(`KeyError: '${key}'`);
-                    return value;
+                if (typeof left === 'bigint' || typeof right === 'bigint') return exact('+', left, right);
+                if (Array.isArray(left) && Array.isArray(right)) {
+                    const result = left.concat(right);
+                    if (left.__class__ === 'tuple') result.__class__ = 'tuple';
+                    return result;
                 }
+                return left + right;
             },
-            getcwd: () => this.currentDir,
-            chdir: (path) => {
-                if (this.fileSystem.get(path)?.type === 'directory') {
-                    this.currentDir = path;
-                } else {
-                    throw new Error(`OSError: [Errno 2] No such file or directory: '${path}'`);
+            '-': (left, right) => {
+                if (typeof left === 'number' && typeof right === 'number') {
+                    const result = left - right;
+                    return result <= Number.MAX_SAFE_INTEGER && result >= Number.MIN_SAFE_INTEGER ? result : exact('-', left, right, result);
                 }
+                if (left instanceof PySetBase) return setOperation('-', left, right).difference(right);
+                if (typeof left === 'bigint' || typeof right === 'bigint') return exact('-', left, right);
+                return left - right;
             },
-            listdir: (path = '.') => {
-                const targetPath = path === '.' ? this.currentDir : path;
-                const entries = [];
-                for (const [filePath, entry] of this.fileSystem) {
-                    if (filePath.startsWith(targetPath + '/') && 
-                        !filePath.substring(targetPath.length + 1).includes('/')) {
-                        entries.push(entry.name);
-                    }
+            '*': (left, right) => {
+                if (typeof left === 'number' && typeof right === 'number') {
+                    const result = left * right;
+                    return result <= Number.MAX_SAFE_INTEGER && result >= Number.MIN_SAFE_INTEGER ? result : exact('*', left, right, result);
                 }
-                return entries;
+                if (typeof left === 'string' || Array.isArray(left)) return this.repeatSequence(left, right);
+                if (typeof right === 'string' || Array.isArray(right)) return this.repeatSequence(right, left);
+                if (typeof left === 'bigint' || typeof right === 'bigint') return exact('*', left, right);
+                return left * right;
             },
-            makedirs: (path, exist_ok = false) => {
-                if (this.fileSystem.has(path)) {
-                    if (!exist_ok) throw new Error(`OSError: [Errno 17] File exists: '${path}'`);
-                    return;
+            '/': (left, right) => {
+                if (typeof left === 'bigint' || typeof right === 'bigint') {
+                    left = Number(left);
+                    right = Number(right);
                 }
-                this.fileSystem.set(path, {
-                    type: 'directory',
-                    name: path.split('/').pop(),
-                    created: new Date()
-                });
+                if (right === 0) throw new this.builtins.ZeroDivisionError('division by zero');
+                return left / right;
             },
-            mkdir: (path) => {
-                if (this.fileSystem.has(path)) {
-                    throw new Error(`OSError: [Errno 17] File exists: '${path}'`);
-                }
-                this.fileSystem.set(path, {
-                    type: 'directory',
-                    name: path.split('/').pop(),
-                    created: new Date()
-                });
+            '//': (left, right) => {
+                if (right === 0) throw new this.builtins.ZeroDivisionError('integer division or modulo by zero');
+                if (typeof left === 'number' && typeof right === 'number') return Math.floor(left / right);
+                return exact('//', left, right);
             },
-            remove: (path) => {
-                const entry = this.fileSystem.get(path);
-                if (!entry) {
-                    throw new Error(`OSError: [Errno 2] No such file or directory: '${path}'`);
+            '%': (left, right) => {
+                if (right === 0) throw new this.builtins.ZeroDivisionError('integer division or modulo by zero');
+                if (typeof left === 'number' && typeof right === 'number') {
+                    const result = left % right;
+                    return result !== 0 && (result < 0) !== (right < 0) ? result + right : result;
                 }
-                if (entry.type === 'directory') {
-                    throw new Error(`OSError: [Errno 21] Is a directory: '${path}'`);
-                }
-                this.fileSystem.delete(path);
+                if (typeof left === 'string') return left % right;
+                return exact('%', left, right);
             },
-            rmdir: (path) => {
-                const entry = this.fileSystem.get(path);
-                if (!entry) {
-                    throw new Error(`OSError: [Errno 2] No such file or directory: '${path}'`);
+            '**': (left, right) => {
+                if (typeof left === 'number' && typeof right === 'number') {
+                    const result = Math.pow(left, right);
+                    return Number.isSafeInteger(result) ? result : exact('**', left, right, result);
                 }
-                if (entry.type !== 'directory') {
-                    throw new Error(`OSError: [Errno 20] Not a directory: '${path}'`);
+                return exact('**', left, right);
+            },
+            '@': (left, right) => {
+                throw new this.builtins.TypeError("unsupported operand type(s) for @");
+            },
+            '<<': (left, right) => {
+                if (Number.isSafeInteger(left) && Number.isInteger(right) && right >= 0 && right < 53) {
+                    const result = left * Math.pow(2, right);
+                    if (Number.isSafeInteger(result)) return result;
                 }
-                this.fileSystem.delete(path);
+                return exact('<<', left, right);
             },
-            rename: (src, dst) => {
-                const entry = this.fileSystem.get(src);
-                if (!entry) {
-                    throw new Error(`OSError: [Errno 2] No such file or directory: '${src}'`);
+            '>>': (left, right) => {
+                if (int32(left, right) && right >= 0 && right < 32) return left >> right;
+                return exact('>>', left, right);
+            },
+            '&': (left, right) => {
+                if (int32(left, right)) return left & right;
+                return left instanceof PySetBase ? setOperation('&', left, right).intersection(right) : exact('&', left, right);
+            },
+            '|': (left, right) => {
+                if (int32(left, right)) return left | right;
+                return left instanceof PySetBase ? setOperation('|', left, right).union(right) : exact('|', left, right);
+            },
+            '^': (left, right) => {
+                if (int32(left, right)) return left ^ right;
+                return left instanceof PySetBase ? setOperation('^', left, right).symmetricDifference(right) : exact('^', left, right);
+            },
+            '<': (left, right) => left instanceof PySetBase ? setOrder('<', left, right) : left < right,
+            '>': (left, right) => left instanceof PySetBase ? setOrder('>', left, right) : left > right,
+            '<=': (left, right) => left instanceof PySetBase ? setOrder('<=', left, right) : left <= right,
+            '>=': (left, right) => left instanceof PySetBase ? setOrder('>=', left, right) : left >= right,
+            '==': (left, right) => left === right || pyEquals(left, right),
+            '!=': (left, right) => left !== right && !pyEquals(left, right),
+            'in': (left, right) => contains(right, left),
+            'not in': (left, right) => !contains(right, left),
+            'is': (left, right) => left === right,
+            'is not': (left, right) => left !== right,
+            // Augmented assignment on a set updates it in place.
+            '&=': (left, right) => left instanceof PySet ? setOperation('&=', left, right).intersectionUpdate(right) : operators['&'](left, right),
+            '|=': (left, right) => left instanceof PySet ? setOperation('|=', left, right).addAll(right) : operators['|'](left, right),
+            '^=': (left, right) => left instanceof PySet ? setOperation('^=', left, right).symmetricDifferenceUpdate(right) : operators['^'](left, right),
+            '-=': (left, right) => left instanceof PySet ? setOperation('-=', left, right).differenceUpdate(right) : operators['-'](left, right)
+        };
+        return operators;
+    }
+
+    getInPlaceOperator(operator) {
+        return this.binaryOperators[`${operator}=`] || this.getBinaryOperator(operator);
+    }
+
+    applyBinaryOperator(operator, left, right) {
+        return this.getBinaryOperator(operator)(left, right);
+    }
+
+    repeatSequence(sequence, count) {
+        if (typeof sequence === 'string') return count > 0 ? sequence.repeat(count) : '';
+        const result = [];
+        for (let i = 0; i < count; i++) result.push(...sequence);
+        return result;
+    }
+
+    compileCompare(node) {
+        const left = this.compileExpression(node.left);
+        const operators = node.operators.map(operator => this.getBinaryOperator(operator));
+        const comparators = node.comparators.map(comparator => this.compileExpression(comparator));
+        return (frame) => {
+            let current = left(frame);
+
+            for (let i = 0; i < operators.length; i++) {
+                const right = comparators[i](frame);
+                if (!operators[i](current, right)) {
+                    return false;
                 }
-                this.fileSystem.delete(src);
-                entry.name = dst.split('/').pop();
-                this.fileSystem.set(dst, entry);
+                current = right;
             }
+
+            return true;
         };
     }
 
-    createIoModule() {
-        return {
-            __name__: 'io',
-            DEFAULT_BUFFER_SIZE: 8192,
-            SEEK_SET: 0,
-            SEEK_CUR: 1,
-            SEEK_END: 2,
-            
-            IOError: class IOError extends Error {
-                constructor(message) {
-                    super(message);
-                    this.name = 'IOError';
-                }
-            },
-            
-            BlockingIOError: class BlockingIOError extends Error {
-                constructor(message) {
-                    super(message);
-                    this.name = 'BlockingIOError';
-                }
-            },
-            
-            UnsupportedOperation: class UnsupportedOperation extends Error {
-                constructor(message) {
-                    super(message);
-                    this.name = 'UnsupportedOperation';
-                }
-            },
-            
-            StringIO: class StringIO {
-                constructor(initial_value = '') {
-                    this._buffer = initial_value;
-                    this._position = 0;
-                    this._closed = false;
-                }
-                
-                read(size = -1) {
-                    if (this._closed) {
-                        throw new Error('I/O operation on closed file');
-                    }
-                    if (size === -1) {
-                        const result = this._buffer.substring(this._position);
-                        this._position = this._buffer.length;
-                        return result;
-                    } else {
-                        const result = this._buffer.substring(this._position, this._position + size);
-                        this._position += result.length;
-                        return result;
-                    }
-                }
-                
-                readline(size = -1) {
-                    if (this._closed) {
-                        throw new Error('I/O operation on closed file');
-                    }
-                    const start = this._position;
-                    let end = this._buffer.indexOf('\n', start);
-                    if (end === -1) {
-                        end = this._buffer.length;
-                    } else {
-                        end += 1;
-                    }
-                    if (size !== -1 && end - start > size) {
-                        end = start + size;
-                    }
-                    const result = this._buffer.substring(start, end);
-                    this._position = end;
-                    return result;
-                }
-                
-                readlines(hint = -1) {
-                    if (this._closed) {
-                        throw new Error('I/O operation on closed file');
-                    }
-                    const lines = [];
-                    let total_size = 0;
-                    while (true) {
-                        const line = this.readline();
-                        if (!line) break;
-                        lines.push(line);
-                        total_size += line.length;
-                        if (hint !== -1 && total_size >= hint) break;
-                    }
-                    return lines;
-                }
-                
-                write(s) {
-                    if (this._closed) {
-                        throw new Error('I/O operation on closed file');
-                    }
-                    s = String(s);
-                    if (this._position === this._buffer.length) {
-                        this._buffer += s;
-                    } else {
-                        this._buffer = this._buffer.substring(0, this._position) + 
-                                      s + 
-                                      this._buffer.substring(this._position + s.length);
-                    }
-                    this._position += s.length;
-                    return s.length;
-                }
-                
-                writelines(lines) {
-                    for (const line of lines) {
-                        this.write(line);
-                    }
-                }
-                
-                seek(pos, whence = 0) {
-                    if (this._closed) {
-                        throw new Error('I/O operation on closed file');
-                    }
-                    if (whence === 0) {
-                        this._position = pos;
-                    } else if (whence === 1) {
-                        this._position += pos;
-                    } else if (whence === 2) {
-                        this._position = this._buffer.length + pos;
-                    }
-                    this._position = Math.max(0, Math.min(this._position, this._buffer.length));
-                    return this._position;
-                }
-                
-                tell() {
-                    if (this._closed) {
-                        throw new Error('I/O operation on closed file');
-                    }
-                    return this._position;
-                }
-                
-                close() {
-                    this._closed = true;
-                }
-                
-                get closed() {
-                    return this._closed;
-                }
-                
-                getvalue() {
-                    return this._buffer;
-                }
-                
-                truncate(size = null) {
-                    if (this._closed) {
-                        throw new Error('I/O operation on closed file');
-                    }
-                    if (size === null) {
-                        size = this._position;
-                    }
-                    this._buffer = this._buffer.substring(0, size);
-                    if (this._position > size) {
-                        this._position = size;
-                    }
-                    return size;
+    compileUnaryOp(node) {
+        const operand = this.compileExpression(node.operand);
+
+        switch (node.operator) {
+            case '+': return (frame) => {
+                const value = operand(frame);
+                return typeof value === 'bigint' ? value : +value;
+            };
+            case '-': return (frame) => -(operand(frame));
+            case '~': return (frame) => invertInt(operand(frame));
+            case 'not': return (frame) => !(operand(frame));
+            default: throw new Error(`Unknown unary operator: ${node.operator}`);
+        }
+    }
+
+    compileFunctionCall(node) {
+        const args = this.compileElements(node.arguments);
+        const keywords = node.keywords && node.keywords.length > 0
+            ? node.keywords.map(keyword => ({ name: keyword.name, value: this.compileExpression(keyword.value) }))
+            : null;
+        const evaluateKeywords = (frame) => {
+            if (!keywords) return null;
+            const values = {};
+            for (const keyword of keywords) {
+                const value = keyword.value(frame);
+                if (keyword.name === null) {
+                    this.mergeKeywords(values, value);
+                } else {
+                    values[keyword.name] = value;
                 }
-            },
-            
-            BytesIO: class BytesIO {
-                constructor(initial_bytes = '') {
-                    if (typeof initial_bytes === 'string') {
-                        this._buffer = initial_bytes;
-                    } else {
-                        this._buffer = String(initial_bytes);
+            }
+            return values;
+        };
+
+        const positional = keywords ? undefined : args.values;
+        const builderSlot = !keywords && node.arguments.length === 1
+            ? this.stringBuilderSlot(node.function.type === 'Attribute' ? node.function.object : node.arguments[0])
+            : undefined;
+
+        if (node.function.type === 'Attribute') {
+            const object = this.compileExpression(node.function.object);
+            const attribute = node.function.attribute;
+            if (builderSlot !== undefined && attribute === 'endswith') {
+                return (frame) => {
+                    const builder = frame[builderSlot];
+                    const values = args(frame);
+                    if (builder instanceof StringBuilder && values.length === 1 && typeof values[0] === 'string') return builder.endsWith(values[0]);
+                    const thisArg = object(frame);
+                    return this.callFunction(this.getAttribute(thisArg, attribute), values, null, thisArg);
+                };
+            }
+            const cache = this.inlineCaches ? this.createAttributeCache(attribute) : null;
+            return (frame) => {
+                const thisArg = object(frame);
+                const entry = cache !== null ? this.cachedMethodEntry(cache, thisArg) : -1;
+                if (entry >= 0) {
+                    const target = positional !== undefined ? cache.functions[entry][FRAME_FUNCTION] : undefined;
+                    if (target !== undefined && target.signature.accepts(positional.length + 1)) {
+                        return this.enterFunction(target, frame, positional, thisArg);
                     }
-                    this._position = 0;
-                    this._closed = false;
+                    const values = args(frame);
+                    const keywordValues = evaluateKeywords(frame);
+                    if (keywordValues) values.push(new KeywordArguments(keywordValues));
+                    return cache.functions[entry](thisArg, ...values);
                 }
-                
-                read(size = -1) {
-                    if (this._closed) {
-                        throw new Error('I/O operation on closed file');
-                    }
-                    if (size === -1) {
-                        const result = this._buffer.substring(this._position);
-                        this._position = this._buffer.length;
-                        return result;
-                    } else {
-                        const result = this._buffer.substring(this._position, this._position + size);
-                        this._position += result.length;
-                        return result;
-                    }
+                const func = this.getMethod(thisArg, attribute);
+                return this.callFunction(func, args(frame), evaluateKeywords(frame), thisArg);
+            };
+        }
+
+        const func = this.compileExpression(node.function);
+        if (builderSlot !== undefined && node.function.type === 'Identifier' && node.function.name === 'len') {
+            return (frame) => {
+                const callee = func(frame);
+                const builder = frame[builderSlot];
+                if (callee === this.builtins.len && builder instanceof StringBuilder) return builder.length;
+                return this.callFunction(callee, args(frame), null);
+            };
+        }
+        if (positional !== undefined) {
+            return (frame) => {
+                const callee = func(frame);
+                const target = typeof callee === 'function' ? callee[FRAME_FUNCTION] : undefined;
+                if (target !== undefined && target.signature.accepts(positional.length)) {
+                    return this.enterFunction(target, frame, positional, undefined);
                 }
-                
-                write(b) {
-                    if (this._closed) {
-                        throw new Error('I/O operation on closed file');
+                return this.callFunction(callee, args(frame), null);
+            };
+        }
+        return (frame) => {
+            const callee = func(frame);
+            return this.callFunction(callee, args(frame), evaluateKeywords(frame));
+        };
+    }
+
+    enterFunction(target, frame, positional, self) {
+        // Evaluates the arguments straight into a frame for the callee, without an argument list.
+        // A frame left behind by an argument that raises is simply not reused.
+        const inner = this.acquireFrame(target.scope);
+        let slot = 1;
+        if (self !== undefined) inner[slot++] = self;
+        for (let i = 0; i < positional.length; i++) inner[slot++] = positional[i](frame);
+        for (; slot <= target.signature.arity; slot++) inner[slot] = target.defaults[slot - 1];
+        return target.enter(inner);
+    }
+
+    mergeKeywords(values, mapping) {
+        if (!(mapping instanceof PyDict)) return Object.assign(values, mapping);
+        for (const [key, value] of mapping.entries()) {
+            if (typeof key !== 'string') throw new this.builtins.TypeError('keywords must be strings');
+            values[key] = value;
+        }
+        return values;
+    }
+
+    compileSubscript(node) {
+        const object = this.compileExpression(node.object);
+
+        if (node.index.type === 'Slice') {
+            const slice = this.compileSlice(node.index);
+            return (frame) => {
+                const obj = object(frame);
+                return this.sliceSequence(obj, slice(frame));
+            };
+        }
+
+        const index = this.compileExpression(node.index);
+        const slot = this.stringBuilderSlot(node.object);
+        if (slot !== undefined) {
+            return (frame) => {
+                const builder = frame[slot];
+                if (builder instanceof StringBuilder) {
+                    const key = index(frame);
+                    const idx = key < 0 ? builder.length + key : key;
+                    if (Number.isInteger(idx) && idx >= 0 && idx < builder.length) return builder.charAt(idx);
+                    return this.getItem(builder.toString(), key);
+                }
+                return this.getItem(object(frame), index(frame));
+            };
+        }
+        return (frame) => {
+            const obj = object(frame);
+            return this.getItem(obj, index(frame));
+        };
+    }
+
+    getItem(obj, index) {
+        if (Array.isArray(obj) || typeof obj === 'string') {
+            const len = obj.length;
+            const idx = index < 0 ? len + index : index;
+            if (idx < 0 || idx >= len) {
+                throw new this.builtins.IndexError(`${Array.isArray(obj) ? 'list' : 'string'} index out of range`);
+            }
+            return obj[idx];
+        }
+
+        if (obj instanceof PyDict) {
+            const value = obj.get(index);
+            if (value !== undefined || obj.has(index)) return value;
+            if (typeof obj.__missing__ === 'function') return obj.__missing__(index);
+            throw new this.builtins.KeyError(this.repr(index));
+        }
+
+        if (obj instanceof PyRange) {
+            const item = obj.get(index);
+            if (item === undefined) throw new this.builtins.IndexError('range object index out of range');
+            return item;
+        }
+
+        if (typeof obj === 'object' && obj !== null) {
+            if (typeof obj.__getitem__ === 'function') {
+                return obj.__getitem__(index);
+            }
+            if (!(index in obj)) {
+                throw new this.builtins.KeyError(`'${index}'`);
+            }
+            return obj[index];
+        }
+
+        throw new this.builtins.TypeError(`'${typeof obj}' object is not subscriptable`);
+    }
+
+    compileSlice(node) {
+        const lower = this.compileExpression(node.lower);
+        const upper = this.compileExpression(node.upper);
+        const step = this.compileExpression(node.step);
+        return (frame) => ({
+            lower: lower(frame),
+            upper: upper(frame),
+            step: step(frame)
+        });
+    }
+
+    callFunction(func, args, keywords = null, thisArg = undefined) {
+        if (typeof func !== 'function') {
+            throw new this.builtins.TypeError(`'${this.builtins.type(func)}' object is not callable`);
+        }
+        if (keywords) {
+            args.push(new KeywordArguments(keywords));
+        }
+        if (this.isClassConstructor(func)) {
+            return new func(...args);
+        }
+        return func.apply(thisArg, args);
+    }
+
+    isClassConstructor(func) {
+        const descriptor = Object.getOwnPropertyDescriptor(func, 'prototype');
+        return descriptor !== undefined && descriptor.writable === false && func !== Symbol && func !== BigInt;
+    }
+
+    getAttribute(obj, attribute) {
+        if (Array.isArray(obj) || typeof obj === 'string') {
+            const method = this.getBuiltinMethod(obj, attribute);
+            if (method) return method;
+        }
+        if (obj instanceof PyDict || obj instanceof PySetBase) {
+            const method = this.getBuiltinMethod(obj, attribute);
+            if (method) return method;
+            // Their JS internals stay hidden; only what subclasses such as Counter add is visible.
+            if (obj.constructor === PyDict || obj instanceof PySetBase) {
+                throw new this.builtins.AttributeError(`'${this.builtins.type(obj)}' object has no attribute '${attribute}'`);
+            }
+        }
+        if (obj !== null && obj !== undefined && (typeof obj === 'object' || typeof obj === 'function') && attribute in obj) {
+            const value = obj[attribute];
+            if (value === undefined) {
+                // A __slots__ field that was never assigned; the cached paths end up here too.
+                throw new this.builtins.AttributeError(`'${this.builtins.type(obj)}' object has no attribute '${attribute}'`);
+            }
+            if (typeof value === 'function' && value[METHOD_FUNCTION] !== undefined && typeof obj === 'object') {
+                return this.bindMethod(obj, attribute, value);
+            }
+            return value;
+        }
+        if (obj !== null && typeof obj === 'object' && !(obj instanceof PySetBase) && !(obj instanceof Map)) {
+            const method = this.getBuiltinMethod(obj, attribute);
+            if (method) return method;
+        }
+
+        throw new this.builtins.AttributeError(`'${this.builtins.type(obj)}' object has no attribute '${attribute}'`);
+    }
+
+    emitAttributeCache(attribute) {
+        return this.inlineCaches ? this.createAttributeCache(attribute) : new AttributeCache(attribute);
+    }
+
+    createAttributeCache(attribute) {
+        this.inlineCacheStats.sites++;
+        return new AttributeCache(attribute);
+    }
+
+    cacheMethod(cache, value) {
+        const stats = this.inlineCacheStats;
+        stats.misses++;
+        if (typeof value !== 'function' || value[METHOD_FUNCTION] === undefined) return;
+        if (cache.methods.length === INLINE_CACHE_SIZE) {
+            // Re-running a script defines its classes anew, so a full site starts over instead
+            // of giving up on caching.
+            cache.methods.length = 0;
+            cache.functions.length = 0;
+            stats.resets++;
+        }
+        cache.methods.push(value);
+        cache.functions.push(value[METHOD_FUNCTION]);
+    }
+
+    loadCachedAttribute(cache, obj) {
+        // Class instances skip the receiver type checks of getAttribute: their attributes are
+        // plain properties, and only methods the site has not seen yet need a closer look.
+        if (obj instanceof PyObject) {
+            const value = obj[cache.attribute];
+            if (typeof value !== 'function') {
+                if (value !== undefined) {
+                    this.inlineCacheStats.hits++;
+                    return value;
+                }
+            } else if (cache.methods.includes(value)) {
+                this.inlineCacheStats.hits++;
+                return this.bindMethod(obj, cache.attribute, value);
+            } else {
+                this.cacheMethod(cache, value);
+                return this.getAttribute(obj, cache.attribute);
+            }
+        }
+        this.inlineCacheStats.misses++;
+        return this.getAttribute(obj, cache.attribute);
+    }
+
+    cachedMethodEntry(cache, obj) {
+        // Entry of the method a call at this site resolves to, or -1 when the receiver is not a
+        // class instance or the method is new to the site. An instance attribute shadowing the
+        // method resolves to something else, so it never matches.
+        if (!(obj instanceof PyObject)) {
+            this.inlineCacheStats.misses++;
+            return -1;
+        }
+        const value = obj[cache.attribute];
+        const methods = cache.methods;
+        for (let i = 0; i < methods.length; i++) {
+            if (methods[i] === value) {
+                this.inlineCacheStats.hits++;
+                return i;
+            }
+        }
+        this.cacheMethod(cache, value);
+        return -1;
+    }
+
+    getMethod(obj, attribute) {
+        // Call sites pass the receiver along, so methods shared through a class prototype stay unbound.
+        if (obj !== null && typeof obj === 'object') {
+            const value = obj[attribute];
+            if (typeof value === 'function' && value[METHOD_FUNCTION] !== undefined) return value;
+        }
+        return this.getAttribute(obj, attribute);
+    }
+
+    setAttribute(obj, attribute, value) {
+        try {
+            obj[attribute] = value;
+        } catch (error) {
+            if (error instanceof TypeError && obj !== null && typeof obj === 'object' && !Object.isExtensible(obj)) {
+                throw new this.builtins.AttributeError(`'${obj.__class__}' object has no attribute '${attribute}'`);
+            }
+            throw error;
+        }
+        if (this.isPythonClass(obj)) {
+            // Instances read class attributes through the prototype, so it follows the class.
+            // Attribute caches hold the method wrappers they saw, and a new wrapper is a new entry.
+            obj.prototype[attribute] = this.isPythonFunction(value) ? this.createMethod(value) : value;
+        }
+    }
+
+    deleteAttribute(obj, attribute) {
+        if (Object.isExtensible(obj)) {
+            delete obj[attribute];
+        } else {
+            // A deleted __slots__ field keeps its place so that it can be assigned again.
+            this.setAttribute(obj, attribute, undefined);
+        }
+        if (this.isPythonClass(obj)) delete obj.prototype[attribute];
+    }
+
+    getBuiltinMethod(obj, attribute) {
+        if (Array.isArray(obj)) {
+            switch (attribute) {
+                case 'append': return (item) => { obj.push(item); return null; };
+                case 'extend': return (items) => { obj.push(...this.iterate(items)); return null; };
+                case 'insert': return (index, item) => { obj.splice(index < 0 ? Math.max(0, obj.length + index) : index, 0, item); return null; };
+                case 'pop': return (index = obj.length - 1) => {
+                    if (obj.length === 0) throw new this.builtins.IndexError('pop from empty list');
+                    return obj.splice(index < 0 ? obj.length + index : index, 1)[0];
+                };
+                case 'remove': return (item) => {
+                    const index = sequenceIndex(obj, item);
+                    if (index === -1) throw new this.builtins.ValueError('list.remove(x): x not in list');
+                    obj.splice(index, 1);
+                    return null;
+                };
+                case 'index': return (item) => {
+                    const index = sequenceIndex(obj, item);
+                    if (index === -1) throw new this.builtins.ValueError(`${this.toString(item)} is not in list`);
+                    return index;
+                };
+                case 'count': return (item) => obj.filter(value => pyEquals(item, value)).length;
+                case 'sort': return (...args) => {
+                    const sorted = this.builtins.sorted(obj, ...args);
+                    obj.splice(0, obj.length, ...sorted);
+                    return null;
+                };
+                case 'reverse': return () => { obj.reverse(); return null; };
+                case 'copy': return () => [...obj];
+                case 'clear': return () => { obj.length = 0; return null; };
+            }
+            return null;
+        }
+        if (typeof obj === 'string') {
+            switch (attribute) {
+                case 'upper': return () => obj.toUpperCase();
+                case 'lower': return () => obj.toLowerCase();
+                case 'strip': return (chars) => this.stripString(obj, chars, true, true);
+                case 'lstrip': return (chars) => this.stripString(obj, chars, true, false);
+                case 'rstrip': return (chars) => this.stripString(obj, chars, false, true);
+                case 'split': return (sep = null, maxsplit = -1) => {
+                    if (sep === null) return obj.split(/\s+/).filter(part => part !== '');
+                    const parts = obj.split(sep);
+                    return maxsplit < 0 || parts.length <= maxsplit + 1 ? parts : [...parts.slice(0, maxsplit), parts.slice(maxsplit).join(sep)];
+                };
+                case 'splitlines': return () => obj.split(/\r?\n/).filter((line, i, lines) => i < lines.length - 1 || line !== '');
+                case 'join': return (items) => {
+                    // Lists are joined in place; other iterables stream into one chunk list.
+                    const parts = Array.isArray(items) ? items : [];
+                    let index = 0;
+                    for (const item of parts === items ? items : this.iterate(items)) {
+                        if (typeof item !== 'string') throw new this.builtins.TypeError(`sequence item ${index}: expected str instance, ${this.builtins.type(item)} found`);
+                        if (parts !== items) parts.push(item);
+                        index++;
                     }
-                    const strData = String(b);
-                    if (this._position === this._buffer.length) {
-                        this._buffer += strData;
-                    } else {
-                        this._buffer = this._buffer.substring(0, this._position) + 
-                                      strData + 
-                                      this._buffer.substring(this._position + strData.length);
+                    return parts.join(obj);
+                };
+                case 'replace': return (old, replacement) => obj.split(old).join(replacement);
+                case 'startswith': return (prefix) => Array.isArray(prefix) ? prefix.some(p => obj.startsWith(p)) : obj.startsWith(prefix);
+                case 'endswith': return (suffix) => Array.isArray(suffix) ? suffix.some(s => obj.endsWith(s)) : obj.endsWith(suffix);
+                case 'find': return (sub) => obj.indexOf(sub);
+                case 'rfind': return (sub) => obj.lastIndexOf(sub);
+                case 'count': return (sub) => obj.split(sub).length - 1;
+                case 'isdigit': return () => /^[0-9]+$/.test(obj);
+                case 'isalpha': return () => /^[A-Za-z]+$/.test(obj);
+                case 'isspace': return () => /^\s+$/.test(obj);
+                case 'title': return () => obj.replace(/\w\S*/g, word => word[0].toUpperCase() + word.slice(1).toLowerCase());
+                case 'capitalize': return () => obj.charAt(0).toUpperCase() + obj.slice(1).toLowerCase();
+                case 'encode': return () => obj;
+            }
+            return null;
+        }
+        if (obj instanceof PyDict) {
+            switch (attribute) {
+                case 'keys': return () => new DictView(obj, 'keys');
+                case 'values': return () => new DictView(obj, 'values');
+                case 'items': return () => new DictView(obj, 'items');
+                case 'get': return (key, defaultValue = null) => {
+                    const value = obj.get(key);
+                    return value !== undefined || obj.has(key) ? value : defaultValue;
+                };
+                case 'update': return (...args) => {
+                    const [[other], options] = splitKeywordArguments(args);
+                    if (other !== undefined && other !== null) obj.update(other);
+                    obj.update(options);
+                    return null;
+                };
+                case 'setdefault': return (key, defaultValue = null) => {
+                    if (obj.has(key)) return obj.get(key);
+                    obj.set(key, defaultValue);
+                    return defaultValue;
+                };
+                case 'pop': return (key, ...fallback) => {
+                    const value = obj.get(key);
+                    if (obj.delete(key)) return value;
+                    if (fallback.length > 0) return fallback[0];
+                    throw new this.builtins.KeyError(this.repr(key));
+                };
+                case 'popitem': return () => {
+                    if (obj.size === 0) throw new this.builtins.KeyError("'popitem(): dictionary is empty'");
+                    let last;
+                    for (last of obj.map.keys());
+                    const pair = [obj.originalKey(last), obj.map.get(last)];
+                    pair.__class__ = 'tuple';
+                    obj.delete(pair[0]);
+                    return pair;
+                };
+                case 'copy': return () => obj.copy();
+                case 'clear': return () => { obj.clear(); return null; };
+            }
+            return null;
+        }
+        if (obj instanceof PySetBase) {
+            const combine = (method) => (...others) => others.reduce((result, other) => result[method](this.iterate(other)), obj.copy());
+            switch (attribute) {
+                case 'union': return combine('addAll');
+                case 'intersection': return combine('intersection');
+                case 'difference': return combine('difference');
+                case 'symmetric_difference': return (other) => obj.symmetricDifference(this.iterate(other));
+                case 'issubset': return (other) => obj.isSubset(this.iterate(other));
+                case 'issuperset': return (other) => PySetBase.of(this.iterate(other)).isSubset(obj);
+                case 'isdisjoint': return (other) => obj.isDisjoint(this.iterate(other));
+                case 'copy': return () => obj.copy();
+            }
+            if (!(obj instanceof PySet)) return null;
+            switch (attribute) {
+                case 'add': return (item) => { obj.add(item); return null; };
+                case 'remove': return (item) => {
+                    if (!obj.delete(item)) throw new this.builtins.KeyError(this.repr(item));
+                    return null;
+                };
+                case 'discard': return (item) => { obj.delete(item); return null; };
+                case 'pop': return () => {
+                    if (obj.size === 0) throw new this.builtins.KeyError("'pop from an empty set'");
+                    const item = obj.map.values().next().value;
+                    obj.delete(item);
+                    return item;
+                };
+                case 'clear': return () => { obj.clear(); return null; };
+                case 'update': return (...others) => { for (const other of others) obj.addAll(this.iterate(other)); return null; };
+                case 'difference_update': return (...others) => { for (const other of others) obj.differenceUpdate(this.iterate(other)); return null; };
+                case 'intersection_update': return (...others) => { for (const other of others) obj.intersectionUpdate(this.iterate(other)); return null; };
+                case 'symmetric_difference_update': return (other) => { obj.symmetricDifferenceUpdate(this.iterate(other)); return null; };
+            }
+            return null;
+        }
+        switch (attribute) {
+            case 'keys': return () => Object.keys(obj);
+            case 'values': return () => Object.values(obj);
+            case 'items': return () => Object.entries(obj).map(pair => { pair.__class__ = 'tuple'; return pair; });
+            case 'get': return (key, defaultValue = null) => (key in obj ? obj[key] : defaultValue);
+            case 'update': return (other) => { Object.assign(obj, other); return null; };
+            case 'setdefault': return (key, defaultValue = null) => {
+                if (!(key in obj)) obj[key] = defaultValue;
+                return obj[key];
+            };
+            case 'pop': return (key, ...fallback) => {
+                if (key in obj) {
+                    const value = obj[key];
+                    delete obj[key];
+                    return value;
+                }
+                if (fallback.length > 0) return fallback[0];
+                throw new this.builtins.KeyError(`'${key}'`);
+            };
+            case 'copy': return () => ({ ...obj });
+            case 'clear': return () => { for (const key of Object.keys(obj)) delete obj[key]; return null; };
+        }
+        return null;
+    }
+
+    parseIntText(text, base = 10) {
+        const invalid = () => new this.builtins.ValueError(`invalid literal for int() with base ${base}: ${this.repr(text)}`);
+        let digits = text.trim().toLowerCase();
+        const negative = digits[0] === '-';
+        if (digits[0] === '-' || digits[0] === '+') digits = digits.slice(1);
+        const prefixBase = { '0x': 16, '0o': 8, '0b': 2 }[digits.slice(0, 2)];
+        let radix = base === 0 ? prefixBase || 10 : base;
+        if (prefixBase !== undefined && prefixBase === radix) digits = digits.slice(2).replace(/^_/, '');
+        if (radix < 2 || radix > 36) throw new this.builtins.ValueError('int() base must be >= 2 and <= 36, or 0');
+        const alphabet = '0123456789abcdefghijklmnopqrstuvwxyz'.slice(0, radix);
+        if (!/^[0-9a-z]+(_[0-9a-z]+)*$/.test(digits)) throw invalid();
+        digits = digits.replace(/_/g, '');
+        for (const digit of digits) {
+            if (!alphabet.includes(digit)) throw invalid();
+        }
+        let value = parseInt(digits, radix);
+        if (!Number.isSafeInteger(value)) {
+            value = 0n;
+            for (const digit of digits) value = value * BigInt(radix) + BigInt(alphabet.indexOf(digit));
+        }
+        return negative ? (typeof value === 'bigint' ? -value : 0 - value) : value;
+    }
+
+    stripString(text, chars, left, right) {
+        const set = chars === null || chars === undefined ? null : new Set(chars);
+        const strip = set ? (c => set.has(c)) : (c => /\s/.test(c));
+        let start = 0;
+        let end = text.length;
+        while (left && start < end && strip(text[start])) start++;
+        while (right && end > start && strip(text[end - 1])) end--;
+        return text.slice(start, end);
+    }
+
+    sliceIndices(length, slice) {
+        // Indices come out as BigInts when length is one, and as numbers otherwise.
+        const one = typeof length === 'bigint' ? 1n : 1;
+        const zero = one - one;
+        const step = slice.step === null || slice.step === undefined ? one : slice.step;
+        if (step == 0) throw new this.builtins.ValueError('slice step cannot be zero');
+        const clamp = (value, fallback, low, high) => {
+            if (value === null || value === undefined) return fallback;
+            if (value < 0) value += length;
+            return value < low ? low : value > high ? high : value;
+        };
+        if (step > 0) {
+            return [clamp(slice.lower, zero, zero, length), clamp(slice.upper, length, zero, length), step];
+        }
+        return [clamp(slice.lower, length - one, -one, length - one), clamp(slice.upper, -one, -one, length - one), step];
+    }
+
+    sliceSequence(obj, slice) {
+        if (obj instanceof PyRange) {
+            if (obj.big || typeof slice.lower === 'bigint' || typeof slice.upper === 'bigint' || typeof slice.step === 'bigint') {
+                const big = (value) => value === null || value === undefined ? value : BigInt(value);
+                const [start, stop, step] = this.sliceIndices(BigInt(obj.length), { lower: big(slice.lower), upper: big(slice.upper), step: big(slice.step) });
+                return new PyRange(obj.at(start), obj.at(stop), normalizeInt(BigInt(obj.step) * step));
+            }
+            const [start, stop, step] = this.sliceIndices(obj.length, slice);
+            return new PyRange(obj.at(start), obj.at(stop), obj.step * step);
+        }
+        if (!Array.isArray(obj) && typeof obj !== 'string') {
+            throw new this.builtins.TypeError(`'${typeof obj}' object is not subscriptable`);
+        }
+        const [start, stop, step] = this.sliceIndices(obj.length, slice);
+        let result;
+        if (step === 1) {
+            result = obj.slice(start, Math.max(start, stop));
+        } else {
+            const items = [];
+            for (let i = start; step > 0 ? i < stop : i > stop; i += step) {
+                items.push(obj[i]);
+            }
+            result = typeof obj === 'string' ? items.join('') : items;
+        }
+        if (Array.isArray(obj) && obj.__class__ === 'tuple') {
+            result.__class__ = 'tuple';
+        }
+        return result;
+    }
+
+    parseFString(text, token) {
+        const { prefix, body } = this.decodeStringLiteral(text);
+        const content = prefix.includes('r') ? body : this.unescapeString(body);
+        return { type: 'FString', parts: this.parseFStringParts(content, 0, content.length, token) };
+    }
+
+    parseFStringParts(content, start, end, token) {
+        // Literal text and replacement fields; each field's expression is parsed here, once.
+        const parts = [];
+        let literal = '';
+        let index = start;
+        while (index < end) {
+            const char = content[index];
+            if ((char === '{' || char === '}') && content[index + 1] === char) {
+                literal += char;
+                index += 2;
+            } else if (char === '}') {
+                throw this.syntaxError(token, "f-string: single '}' is not allowed");
+            } else if (char === '{') {
+                const [field, next] = this.parseFStringField(content, index + 1, end, token);
+                literal += field.debug || '';
+                if (literal) parts.push({ type: 'literal', value: literal });
+                literal = '';
+                parts.push({ type: 'expression', expression: field.expression, conversion: field.conversion, format: field.format });
+                index = next;
+            } else {
+                literal += char;
+                index++;
+            }
+        }
+        if (literal) parts.push({ type: 'literal', value: literal });
+        return parts;
+    }
+
+    parseFStringField(content, start, end, token) {
+        let index = start;
+        let depth = 0;
+        let quote = null;
+        for (; index < end; index++) {
+            const char = content[index];
+            if (quote) {
+                if (char === quote) quote = null;
+            } else if (char === "'" || char === '"') {
+                quote = char;
+            } else if (char === '(' || char === '[' || char === '{') {
+                depth++;
+            } else if (char === ')' || char === ']' || char === '}') {
+                if (depth === 0) break;
+                depth--;
+            } else if (depth === 0 && (char === ':' || (char === '!' && content[index + 1] !== '='))) {
+                break;
+            }
+        }
+
+        let source = content.slice(start, index);
+        let debug = null;
+        const self = /^([\s\S]*?[^=!<>])=\s*$/.exec(source);
+        if (self) {
+            debug = source;
+            source = self[1];
+        }
+        if (!source.trim()) throw this.syntaxError(token, 'f-string: empty expression not allowed');
+
+        let conversion = null;
+        if (content[index] === '!') {
+            conversion = content[index + 1];
+            if (conversion !== 'r' && conversion !== 's' && conversion !== 'a') {
+                throw this.syntaxError(token, "f-string: invalid conversion character: expected 's', 'r', or 'a'");
+            }
+            index += 2;
+        }
+
+        let format = null;
+        if (content[index] === ':') {
+            const specStart = index + 1;
+            let nested = 0;
+            for (index = specStart; index < end; index++) {
+                if (content[index] === '{') nested++;
+                else if (content[index] === '}' && nested-- === 0) break;
+            }
+            format = { type: 'FString', parts: this.parseFStringParts(content, specStart, index, token) };
+        }
+        if (content[index] !== '}') throw this.syntaxError(token, "f-string: expecting '}'");
+
+        if (debug && conversion === null && format === null) conversion = 'r';
+        return [{ expression: this.parseFStringExpression(source, token), conversion, format, debug }, index + 1];
+    }
+
+    parseFStringExpression(source, token) {
+        // Parenthesizing lets the expression span lines and makes `a, b` a tuple, as in Python.
+        let tokens;
+        let expression;
+        let index;
+        try {
+            tokens = this.tokenize(`(${source})`);
+            [expression, index] = this.parseExpression(tokens, 0);
+        } catch (error) {
+            throw this.syntaxError(token, `f-string: invalid expression '${source.trim()}'`);
+        }
+        if (tokens[index] && tokens[index].type !== 'NEWLINE') {
+            throw this.syntaxError(token, `f-string: invalid expression '${source.trim()}'`);
+        }
+        return expression;
+    }
+
+    getStatements(code) {
+        const key = hashSource(code);
+        const cached = this.astCache.get(key, code);
+        if (cached) return cached;
+
+        const statements = this.parseStatements(code);
+        this.astCache.set(key, code, statements);
+        return statements;
+    }
+
+    invalidateASTCache(code) {
+        if (code === undefined) {
+            this.astCache.clear();
+            return true;
+        }
+        return this.astCache.delete(hashSource(code));
+    }
+
+    getASTCacheStats() {
+        return this.astCache.stats();
+    }
+
+    getInlineCacheStats() {
+        const stats = this.inlineCacheStats;
+        const lookups = stats.hits + stats.misses;
+        return { ...stats, hitRate: lookups === 0 ? 0 : stats.hits / lookups };
+    }
+
+    parseStatements(code) {
+        const tokens = this.tokenize(code);
+        const statements = [];
+        let index = 0;
+
+        while (index < tokens.length) {
+            index = this.parseStatement(tokens, index, statements);
+        }
+
+        return statements;
+    }
+
+    parseStatement(tokens, index, statements) {
+        const token = tokens[index];
+
+        if (token.type === 'INDENT') {
+            throw new Error(`IndentationError: unexpected indent (line ${token.line})`);
+        }
+        if (token.type === 'NEWLINE') {
+            return index + 1;
+        }
+
+        let compound = null;
+        if (token.type === 'IDENTIFIER') {
+            switch (token.value) {
+                case 'if': compound = this.parseIfStatement(tokens, index); break;
+                case 'while': compound = this.parseWhileLoop(tokens, index); break;
+                case 'for': compound = this.parseForLoop(tokens, index); break;
+                case 'try': compound = this.parseTryStatement(tokens, index); break;
+                case 'with': compound = this.parseWithStatement(tokens, index); break;
+                case 'def': compound = this.parseFunction(tokens, index, []); break;
+                case 'class': compound = this.parseClass(tokens, index, []); break;
+                case 'async': compound = this.parseAsyncStatement(tokens, index); break;
+            }
+        } else if (token.type === 'OPERATOR' && token.value === '@') {
+            compound = this.parseDecorated(tokens, index);
+        }
+
+        if (compound) {
+            const [node, newIndex] = compound;
+            node.line = token.line;
+            statements.push(node);
+            return newIndex;
+        }
+
+        return this.parseSimpleStatements(tokens, index, statements);
+    }
+
+    parseSimpleStatements(tokens, index, statements) {
+        while (true) {
+            const token = tokens[index];
+            const [statement, newIndex] = this.parseSmallStatement(tokens, index);
+            statement.line = token.line;
+            statements.push(statement);
+            index = newIndex;
+
+            if (tokens[index] && tokens[index].value === ';') {
+                index++;
+                if (tokens[index] && tokens[index].type === 'NEWLINE') return index + 1;
+                continue;
+            }
+            if (tokens[index] && tokens[index].type === 'NEWLINE') return index + 1;
+            throw this.syntaxError(tokens[index]);
+        }
+    }
+
+    parseSmallStatement(tokens, index) {
+        const token = tokens[index];
+
+        if (token.type === 'IDENTIFIER') {
+            switch (token.value) {
+                case 'pass':
+                case 'break':
+                case 'continue':
+                case 'return':
+                case 'raise':
+                case 'global':
+                case 'nonlocal':
+                case 'del':
+                case 'assert':
+                    return this.parseControlStatement(tokens, index);
+                case 'import':
+                case 'from':
+                    return this.parseImport(tokens, index);
+                case 'yield': {
+                    const [expr, newIndex] = this.parseYield(tokens, index);
+                    if (expr.type === 'YieldExpression') {
+                        return [{ type: 'Yield', value: expr.value }, newIndex];
                     }
-                    this._position += strData.length;
-                    return strData.length;
+                    return [{ type: 'ExpressionStatement', expression: expr }, newIndex];
                 }
-                
-                seek(pos, whence = 0) {
-                    if (this._closed) {
-                        throw new Error('I/O operation on closed file');
-                    }
-                    if (whence === 0) {
-                        this._position = pos;
-                    } else if (whence === 1) {
-                        this._position += pos;
-                    } else if (whence === 2) {
-                        this._position = this._buffer.length + pos;
-                    }
-                    this._position = Math.max(0, Math.min(this._position, this._buffer.length));
-                    return this._position;
+            }
+        }
+
+        return this.parseAssignment(tokens, index);
+    }
+
+    parseBlock(tokens, index) {
+        index = this.expectToken(tokens, index, ':');
+
+        if (tokens[index] && tokens[index].type !== 'NEWLINE') {
+            const statements = [];
+            return [statements, this.parseSimpleStatements(tokens, index, statements)];
+        }
+
+        index++;
+        if (!tokens[index] || tokens[index].type !== 'INDENT') {
+            const token = tokens[index] || tokens[index - 1];
+            throw new Error(`IndentationError: expected an indented block (line ${token.line})`);
+        }
+        index++;
+
+        const statements = [];
+        while (index < tokens.length && tokens[index].type !== 'DEDENT') {
+            index = this.parseStatement(tokens, index, statements);
+        }
+
+        return [statements, index + 1];
+    }
+
+    parseAsyncStatement(tokens, index) {
+        const next = tokens[index + 1];
+        let result;
+        if (this.isKeyword(next, 'def')) result = this.parseFunction(tokens, index + 1, []);
+        else if (this.isKeyword(next, 'for')) result = this.parseForLoop(tokens, index + 1);
+        else if (this.isKeyword(next, 'with')) result = this.parseWithStatement(tokens, index + 1);
+        else throw this.syntaxError(next);
+        result[0].isAsync = true;
+        return result;
+    }
+
+    parseDecorated(tokens, index) {
+        const decorators = [];
+
+        while (tokens[index] && tokens[index].value === '@' && tokens[index].type === 'OPERATOR') {
+            const [decorator, newIndex] = this.parseExpression(tokens, index + 1);
+            decorators.push(decorator);
+            index = this.expectToken(tokens, newIndex, '\n');
+        }
+
+        if (this.isKeyword(tokens[index], 'async') && this.isKeyword(tokens[index + 1], 'def')) {
+            const result = this.parseFunction(tokens, index + 1, decorators);
+            result[0].isAsync = true;
+            return result;
+        }
+        if (this.isKeyword(tokens[index], 'def')) return this.parseFunction(tokens, index, decorators);
+        if (this.isKeyword(tokens[index], 'class')) return this.parseClass(tokens, index, decorators);
+        throw this.syntaxError(tokens[index], 'expected function or class after decorator');
+    }
+
+    parseImport(tokens, index) {
+        if (this.isKeyword(tokens[index], 'import')) {
+            const modules = [];
+            index++;
+            while (true) {
+                const [name, nameIndex] = this.parseDottedName(tokens, index);
+                index = nameIndex;
+                let alias = null;
+                if (this.isKeyword(tokens[index], 'as')) {
+                    alias = this.expectName(tokens, index + 1);
+                    index += 2;
                 }
-                
-                tell() {
-                    if (this._closed) {
-                        throw new Error('I/O operation on closed file');
-                    }
-                    return this._position;
+                modules.push({ name, alias });
+                if (!tokens[index] || tokens[index].value !== ',') break;
+                index++;
+            }
+            return [{ type: 'Import', modules }, index];
+        }
+
+        index++;
+        let level = 0;
+        while (tokens[index] && (tokens[index].value === '.' || tokens[index].value === '...')) {
+            level += tokens[index].value.length;
+            index++;
+        }
+        let module = '';
+        if (!this.isKeyword(tokens[index], 'import')) {
+            [module, index] = this.parseDottedName(tokens, index);
+        }
+        index = this.expectToken(tokens, index, 'import');
+
+        const items = [];
+        if (tokens[index] && tokens[index].value === '*') {
+            items.push({ name: '*' });
+            index++;
+        } else {
+            const parenthesized = tokens[index] && tokens[index].value === '(';
+            if (parenthesized) index++;
+            while (tokens[index] && tokens[index].type === 'IDENTIFIER') {
+                const name = this.expectName(tokens, index);
+                index++;
+                const item = { name };
+                if (this.isKeyword(tokens[index], 'as')) {
+                    item.alias = this.expectName(tokens, index + 1);
+                    index += 2;
                 }
-                
-                close() {
-                    this._closed = true;
+                items.push(item);
+                if (!tokens[index] || tokens[index].value !== ',') break;
+                index++;
+            }
+            if (parenthesized) index = this.expectToken(tokens, index, ')');
+        }
+        if (items.length === 0) throw this.syntaxError(tokens[index], 'expected import list');
+
+        return [{ type: 'FromImport', module, items, level }, index];
+    }
+
+    parseDottedName(tokens, index) {
+        let name = this.expectName(tokens, index);
+        index++;
+        while (tokens[index] && tokens[index].value === '.' && tokens[index + 1] && tokens[index + 1].type === 'IDENTIFIER') {
+            name += '.' + this.expectName(tokens, index + 1);
+            index += 2;
+        }
+        return [name, index];
+    }
+
+    parseFunction(tokens, index, decorators) {
+        const name = this.expectName(tokens, index + 1);
+        index = this.expectToken(tokens, index + 2, '(');
+        const [params, closeIndex] = this.parseParameters(tokens, index, ')');
+        index = closeIndex + 1;
+
+        let returnType = null;
+        if (tokens[index] && tokens[index].value === '->') {
+            [returnType, index] = this.parseExpression(tokens, index + 1);
+        }
+
+        const [body, endIndex] = this.parseBlock(tokens, index);
+        return [{ type: 'FunctionDef', name, params, returnType, body, decorators }, endIndex];
+    }
+
+    parseClass(tokens, index, decorators) {
+        const name = this.expectName(tokens, index + 1);
+        index += 2;
+
+        let bases = [];
+        let keywords = [];
+        if (tokens[index] && tokens[index].value === '(') {
+            [bases, keywords, index] = this.parseArguments(tokens, index + 1);
+        }
+
+        const [body, endIndex] = this.parseBlock(tokens, index);
+        return [{ type: 'ClassDef', name, bases, keywords, body, decorators }, endIndex];
+    }
+
+    parseForLoop(tokens, index) {
+        const [target, inIndex] = this.parseTargetList(tokens, index + 1);
+        const iterIndex = this.expectToken(tokens, inIndex, 'in');
+        const [iterable, colonIndex] = this.parseTestList(tokens, iterIndex);
+
+        const [body, endIndex] = this.parseBlock(tokens, colonIndex);
+        const [elseBranch, finalIndex] = this.parseElseClause(tokens, endIndex);
+
+        return [{ type: 'ForLoop', target, iterable, body, elseBranch }, finalIndex];
+    }
+
+    parseWhileLoop(tokens, index) {
+        const [condition, colonIndex] = this.parseExpression(tokens, index + 1);
+
+        const [body, endIndex] = this.parseBlock(tokens, colonIndex);
+        const [elseBranch, finalIndex] = this.parseElseClause(tokens, endIndex);
+
+        return [{ type: 'WhileLoop', condition, body, elseBranch }, finalIndex];
+    }
+
+    parseElseClause(tokens, index) {
+        if (this.isKeyword(tokens[index], 'else')) {
+            return this.parseBlock(tokens, index + 1);
+        }
+        return [null, index];
+    }
+
+    parseIfStatement(tokens, index) {
+        const [condition, colonIndex] = this.parseExpression(tokens, index + 1);
+        const [body, nextIndex] = this.parseBlock(tokens, colonIndex);
+        let currentIndex = nextIndex;
+
+        const elifBranches = [];
+        let elseBranch = null;
+
+        while (this.isKeyword(tokens[currentIndex], 'elif')) {
+            const [elifCondition, elifColonIndex] = this.parseExpression(tokens, currentIndex + 1);
+            const [elifBody, elifEndIndex] = this.parseBlock(tokens, elifColonIndex);
+            elifBranches.push({ condition: elifCondition, body: elifBody });
+            currentIndex = elifEndIndex;
+        }
+
+        [elseBranch, currentIndex] = this.parseElseClause(tokens, currentIndex);
+
+        return [{ type: 'IfStatement', condition, body, elifBranches, elseBranch }, currentIndex];
+    }
+
+    parseTryStatement(tokens, index) {
+        const [body, nextIndex] = this.parseBlock(tokens, index + 1);
+        let currentIndex = nextIndex;
+
+        const exceptClauses = [];
+        let elseBranch = null;
+        let finallyBranch = null;
+
+        while (this.isKeyword(tokens[currentIndex], 'except')) {
+            currentIndex++;
+            let exceptionType = null;
+            let name = null;
+            if (tokens[currentIndex] && tokens[currentIndex].value !== ':') {
+                [exceptionType, currentIndex] = this.parseTestList(tokens, currentIndex);
+                if (this.isKeyword(tokens[currentIndex], 'as')) {
+                    name = this.expectName(tokens, currentIndex + 1);
+                    currentIndex += 2;
                 }
-                
-                get closed() {
-                    return this._closed;
+            }
+            const [exceptBody, exceptEndIndex] = this.parseBlock(tokens, currentIndex);
+            exceptClauses.push({ exceptionType, name, body: exceptBody });
+            currentIndex = exceptEndIndex;
+        }
+
+        [elseBranch, currentIndex] = this.parseElseClause(tokens, currentIndex);
+
+        if (this.isKeyword(tokens[currentIndex], 'finally')) {
+            [finallyBranch, currentIndex] = this.parseBlock(tokens, currentIndex + 1);
+        }
+
+        if (exceptClauses.length === 0 && !finallyBranch) {
+            throw this.syntaxError(tokens[currentIndex], "expected 'except' or 'finally' block");
+        }
+
+        return [{ type: 'TryStatement', body, exceptClauses, elseBranch, finallyBranch }, currentIndex];
+    }
+
+    parseWithStatement(tokens, index) {
+        const items = [];
+        index++;
+        const parenthesized = tokens[index].value === '(' && this.hasParenthesizedWithItems(tokens, index);
+        if (parenthesized) index++;
+
+        while (true) {
+            const [context, newIndex] = this.parseExpression(tokens, index);
+            index = newIndex;
+            let target = null;
+            if (this.isKeyword(tokens[index], 'as')) {
+                const targetToken = tokens[index + 1];
+                [target, index] = this.parseBitwiseOr(tokens, index + 1);
+                target = this.toAssignmentTarget(target, targetToken);
+            }
+            items.push({ context, target });
+            if (!tokens[index] || tokens[index].value !== ',') break;
+            index++;
+            if (parenthesized && tokens[index].value === ')') break;
+        }
+        if (parenthesized) index = this.expectToken(tokens, index, ')');
+
+        const [body, endIndex] = this.parseBlock(tokens, index);
+        return [{ type: 'WithStatement', items, body }, endIndex];
+    }
+
+    hasParenthesizedWithItems(tokens, index) {
+        let depth = 0;
+        for (let i = index; i < tokens.length; i++) {
+            const value = tokens[i].value;
+            if (value === '(' || value === '[' || value === '{') depth++;
+            else if (value === ')' || value === ']' || value === '}') {
+                depth--;
+                if (depth === 0) return tokens[i + 1] && tokens[i + 1].value === ':';
+            } else if (depth === 1 && this.isKeyword(tokens[i], 'as')) {
+                return true;
+            }
+        }
+        return false;
+    }
+
+    parseControlStatement(tokens, index) {
+        const keyword = tokens[index].value;
+        index++;
+
+        switch (keyword) {
+            case 'pass':
+                return [{ type: 'Pass' }, index];
+            case 'break':
+                return [{ type: 'Break' }, index];
+            case 'continue':
+                return [{ type: 'Continue' }, index];
+            case 'return': {
+                if (!this.startsExpression(tokens[index])) return [{ type: 'Return', value: null }, index];
+                const [value, newIndex] = this.parseTestList(tokens, index);
+                return [{ type: 'Return', value }, newIndex];
+            }
+            case 'raise': {
+                if (!this.startsExpression(tokens[index])) return [{ type: 'Raise', exception: null, cause: null }, index];
+                const [exception, newIndex] = this.parseExpression(tokens, index);
+                if (this.isKeyword(tokens[newIndex], 'from')) {
+                    const [cause, causeIndex] = this.parseExpression(tokens, newIndex + 1);
+                    return [{ type: 'Raise', exception, cause }, causeIndex];
                 }
-                
-                getvalue() {
-                    return this._buffer;
+                return [{ type: 'Raise', exception, cause: null }, newIndex];
+            }
+            case 'global':
+            case 'nonlocal': {
+                const names = [this.expectName(tokens, index)];
+                index++;
+                while (tokens[index] && tokens[index].value === ',') {
+                    names.push(this.expectName(tokens, index + 1));
+                    index += 2;
                 }
+                return [{ type: keyword === 'global' ? 'Global' : 'Nonlocal', names }, index];
+            }
+            case 'del': {
+                const [target, newIndex] = this.parseTargetList(tokens, index);
+                const targets = target.type === 'Tuple' ? target.elements : [target];
+                return [{ type: 'Delete', targets }, newIndex];
+            }
+            case 'assert': {
+                const [test, newIndex] = this.parseExpression(tokens, index);
+                if (tokens[newIndex] && tokens[newIndex].value === ',') {
+                    const [message, messageIndex] = this.parseExpression(tokens, newIndex + 1);
+                    return [{ type: 'Assert', test, message }, messageIndex];
+                }
+                return [{ type: 'Assert', test, message: null }, newIndex];
+            }
+        }
+
+        throw this.syntaxError(tokens[index - 1], `unknown control statement '${keyword}'`);
+    }
+
+    parseAssignment(tokens, index) {
+        const startToken = tokens[index];
+        const [first, newIndex] = this.parseTestList(tokens, index);
+        index = newIndex;
+        const token = tokens[index];
+
+        if (token && token.type === 'OPERATOR' && AUGMENTED_OPERATORS.has(token.value)) {
+            const target = this.toAssignmentTarget(first, startToken);
+            if (target.type !== 'Identifier' && target.type !== 'Attribute' && target.type !== 'Subscript') {
+                throw this.syntaxError(startToken, "illegal expression for augmented assignment");
+            }
+            const [value, valueIndex] = this.isKeyword(tokens[index + 1], 'yield')
+                ? this.parseYield(tokens, index + 1)
+                : this.parseTestList(tokens, index + 1);
+            return [{ type: 'AugmentedAssignment', target, operator: token.value.slice(0, -1), value }, valueIndex];
+        }
+
+        if (token && token.value === ':' && token.type === 'DELIMITER') {
+            const target = this.toAssignmentTarget(first, startToken);
+            const [, annotationIndex] = this.parseExpression(tokens, index + 1);
+            if (!tokens[annotationIndex] || tokens[annotationIndex].value !== '=') {
+                return [{ type: 'Pass' }, annotationIndex];
+            }
+            const [value, valueIndex] = this.parseTestList(tokens, annotationIndex + 1);
+            return [{ type: 'Assignment', targets: [target], value }, valueIndex];
+        }
+
+        if (!token || token.value !== '=' || token.type !== 'OPERATOR') {
+            return [{ type: 'ExpressionStatement', expression: first }, index];
+        }
+
+        const targets = [this.toAssignmentTarget(first, startToken)];
+        let value = null;
+        while (tokens[index] && tokens[index].value === '=' && tokens[index].type === 'OPERATOR') {
+            const [expr, nextIndex] = this.isKeyword(tokens[index + 1], 'yield')
+                ? this.parseYield(tokens, index + 1)
+                : this.parseTestList(tokens, index + 1);
+            if (value !== null) targets.push(this.toAssignmentTarget(value, startToken));
+            value = expr;
+            index = nextIndex;
+        }
+
+        return [{ type: 'Assignment', targets, value }, index];
+    }
+
+    openOutput() {
+        this.stdout = new OutputStream(this.onStdout, this.outputOptions);
+        this.stderr = new OutputStream(this.onStderr, this.outputOptions);
+        if (!this.stdoutFile) {
+            this.stdoutFile = this.createOutputFile('<stdout>', 'stdout');
+            this.stderrFile = this.createOutputFile('<stderr>', 'stderr');
+        }
+    }
+
+    createOutputFile(name, stream) {
+        return {
+            name,
+            stream,
+            write: (text) => {
+                if (typeof text !== 'string') throw new this.builtins.TypeError(`write() argument must be str, not ${this.builtins.type(text)}`);
+                this[stream].write(text);
+                if (this[stream].blocked) this.suspend(0);
+                return text.length;
             },
-            
-            open: (file, mode = 'r', buffering = -1, encoding = null, errors = null, newline = null, closefd = true, opener = null) => {
-                return this.createFileObject(file, mode, encoding || 'utf-8');
+            flush: () => {
+                this[stream].flush();
+                return null;
             }
         };
     }
 
-    async createModuleObject(name, code) {
-        const moduleScope = {
-            __name__: name,
-            __file__: `${this.stdlibPath}${name}.py`,
-        };
-        
-        this.pushScope(moduleScope);
+    drainOutput() {
+        return Promise.all([this.stdout.drain(), this.stderr.drain()]);
+    }
+
+    getOutput() {
+        // Printed lines without the newline that ends the last one.
+        const text = this.stdout.text();
+        return text.endsWith('\n') ? text.slice(0, -1) : text;
+    }
+
+    async executeCode(code) {
+        this.openOutput();
+
         try {
-            await this.executeCode(code);
-            const moduleObj = { ...this.getCurrentScope() };
-            return moduleObj;
+            const statements = this.getStatements(code);
+            if (this.profiler !== null) this.profiler.addSource('<string>', code);
+            const program = this.compileProgram(statements);
+            if (program.imports.length > 0) {
+                await this.prefetchModules(program.imports);
+            }
+            // Only bytecode programs can pause; a profiled program is closure-compiled.
+            this.suspendable = program.code !== undefined;
+            this.beginSteps();
+            let result = program([this.scopeStack[0]]);
+            while (result instanceof VMSuspension) {
+                // Time spent paused does not count against the time limit.
+                this.cpuTime += performance.now() - this.sliceStart;
+                await (result.delay > 0 ? new Promise(resolve => setTimeout(resolve, result.delay)) : yieldToEventLoop());
+                if (this.stdout.blocked || this.stderr.blocked) await this.drainOutput();
+                if (this.cancelRequested) throw new this.builtins.KeyboardInterrupt('execution cancelled');
+                this.sliceStart = performance.now();
+                if (this.sampler !== null) this.sampler.resume();
+                result = this.resumeCode(result);
+            }
+            if (this.pendingWrites.size > 0) {
+                await this.flushRealFileSystemWrites();
+            }
+
+            this.logExecution(`Executed ${statements.length} statements`);
+            await this.drainOutput();
+            return this.getOutput();
+        } catch (caught) {
+            const error = this.pythonException(caught);
+            this.logExecution(`Execution error: ${error.message}`);
+            await this.drainOutput();
+            throw error;
         } finally {
-            this.popScope();
+            this.suspendable = false;
+            this.pendingSuspend = -1;
+            this.cancelRequested = false;
+            this.stepCheck = Infinity;
         }
     }
 
-    tokenize(code) {
-        const tokens = [];
-        const patterns = [
-            { type: 'WHITESPACE', regex: /^\s+/ },
-            { type: 'COMMENT', regex: /^#.*/ },
-            { type: 'NUMBER', regex: /^\d+\.?\d*/ },
-            { type: 'STRING', regex: /^["']([^"'\\]|\\.)*["']/ },
-            { type: 'MULTILINE_STRING', regex: /^(""".*?"""|'''.*?''')/s },
-            { type: 'IDENTIFIER', regex: /^[a-zA-Z_][a-zA-Z0-9_]*/ },
-            { type: 'OPERATOR', regex: /^(\*\*=|\*\*|\/\/=|\/\/|<<=|<<|>>=|>>|<=|>=|==|!=|<>|\+=|-=|\*=|\/=|%=|&=|\|=|\^=|&&|\|\||<<|>>|[+\-*\/%=<>&|^~!])/ },
-            { type: 'DELIMITER', regex: /^[(),\[\]{}:;.,]/ },
-            { type: 'NEWLINE', regex: /^\n/ },
-            { type: 'INDENT', regex: /^[ \t]+/ }
-        ];
+    executeCodeSync(code) {
+        this.openOutput();
 
-        let position = 0;
-        let line = 1;
-        let column = 1;
+        try {
+            const statements = this.getStatements(code);
+            if (this.profiler !== null) this.profiler.addSource('<string>', code);
+            const program = this.compileProgram(statements);
+            const missing = program.imports.filter(name => !this.getLoadedModule(name));
+            if (missing.length > 0) {
+                throw new Error(`executeCodeSync cannot load modules asynchronously: ${missing.join(', ')}; use executeCode`);
+            }
+            this.beginSteps();
+            program([this.scopeStack[0]]);
 
-        while (position < code.length) {
-            let matched = false;
-            
-            for (const pattern of patterns) {
-                const match = code.slice(position).match(pattern.regex);
-                if (match) {
-                    const value = match[0];
-                    if (pattern.type !== 'WHITESPACE' && pattern.type !== 'COMMENT') {
-                        tokens.push({
-                            type: pattern.type,
-                            value: value,
-                            line: line,
-                            column: column
-                        });
-                    }
-                    
-                    position += value.length;
-                    if (value.includes('\n')) {
-                        line += value.split('\n').length - 1;
-                        column = value.length - value.lastIndexOf('\n');
-                    } else {
-                        column += value.length;
-                    }
-                    matched = true;
-                    break;
-                }
+            this.logExecution(`Executed ${statements.length} statements`);
+            return this.getOutput();
+        } catch (caught) {
+            const error = this.pythonException(caught);
+            this.logExecution(`Execution error: ${error.message}`);
+            throw error;
+        } finally {
+            this.stepCheck = Infinity;
+            this.stdout.flush();
+            this.stderr.flush();
+        }
+    }
+
+    compileProgram(statements, file = '<string>') {
+        if (this.profiler !== null) return this.compileProfiledProgram(statements, file);
+        const engine = this.sampler !== null ? 'vm' : this.engine;
+        const programs = engine === this.engine ? this.compiledPrograms : this.sampledPrograms;
+        let program = programs.get(statements);
+        if (!program) {
+            const scope = this.resolveScopes(statements);
+            const optimized = this.optimize ? this.optimizeProgram(statements, scope) : statements;
+            if (engine === 'vm') {
+                const code = this.compileBytecode(optimized, scope, 'block', '<module>');
+                program = (frame) => this.runCode(code, frame);
+                program.code = code;
+            } else {
+                program = this.withCompileScope(scope, () => this.compileBlock(optimized));
             }
-            
-            if (!matched) {
-                throw new Error(`Unexpected character '${code[position]}' at line ${line}, column ${column}`);
+            program.imports = this.collectImports(optimized, new Set());
+            programs.set(statements, program);
+        }
+        return program;
+    }
+
+    compileProfiledProgram(statements, file) {
+        // Always closure-compiled, whatever the engine: the timing wraps statement and function closures.
+        let program = this.profiledPrograms.get(statements);
+        if (!program || program.file !== file) {
+            const scope = this.resolveScopes(statements);
+            const optimized = this.optimize ? this.optimizeProgram(statements, scope) : statements;
+            const outer = this.compileProfile;
+            this.compileProfile = { file, line: 1, statement: null };
+            try {
+                const block = this.withCompileScope(scope, () => this.compileBlock(optimized));
+                program = this.profileFunction('<module>', 1, block);
+            } finally {
+                this.compileProfile = outer;
             }
+            program.file = file;
+            program.imports = this.collectImports(optimized, new Set());
+            this.profiledPrograms.set(statements, program);
         }
-        
-        return tokens;
+        return program;
+    }
+
+    compileProfiledStatement(statement) {
+        const profile = this.compileProfile;
+        const { statement: outerStatement, line: outerLine } = profile;
+        profile.statement = statement;
+        if (statement.line !== undefined) profile.line = statement.line;
+        let run;
+        try {
+            run = this.compileStatement(statement);
+        } finally {
+            profile.statement = outerStatement;
+            profile.line = outerLine;
+        }
+        if (statement.line === undefined) return run;
+        const file = profile.file;
+        const line = statement.line;
+        let owner = null;
+        let stats = null;
+        return (frame) => {
+            const profiler = this.profiler;
+            if (profiler === null) return run(frame);
+            if (owner !== profiler) {
+                owner = profiler;
+                stats = profiler.lineStats(file, line);
+            }
+            profiler.enterLine(stats);
+            try {
+                return run(frame);
+            } finally {
+                profiler.exitLine();
+            }
+        };
+    }
+
+    profileFunction(name, line, body) {
+        const file = this.compileProfile.file;
+        let owner = null;
+        let stats = null;
+        return (frame) => {
+            const profiler = this.profiler;
+            if (profiler === null) return body(frame);
+            if (owner !== profiler) {
+                owner = profiler;
+                stats = profiler.functionStats(file, line, name);
+            }
+            profiler.enterFunction(stats);
+            try {
+                return body(frame);
+            } finally {
+                profiler.exitFunction();
+            }
+        };
+    }
+
+    startProfiling() {
+        this.profiler = new Profiler();
+        return this.profiler;
+    }
+
+    stopProfiling() {
+        const profiler = this.profiler;
+        this.profiler = null;
+        return profiler;
     }
 
-    parseExpression(tokens, index = 0) {
-        return this.parseOrExpression(tokens, index);
+    startSampling(options = {}) {
+        this.sampler = new SamplingProfiler(options);
+        this.stepCheck = this.nextStepCheck();
+        return this.sampler;
     }
 
-    parseOrExpression(tokens, index) {
-        let [left, newIndex] = this.parseAndExpression(tokens, index);
-        
-        while (newIndex < tokens.length && tokens[newIndex].value === 'or') {
-            newIndex++;
-            const [right, nextIndex] = this.parseAndExpression(tokens, newIndex);
-            left = { type: 'BinaryOp', operator: 'or', left, right };
-            newIndex = nextIndex;
-        }
-        
-        return [left, newIndex];
+    stopSampling() {
+        const sampler = this.sampler;
+        this.sampler = null;
+        this.stepCheck = this.nextStepCheck();
+        return sampler;
     }
 
-    parseAndExpression(tokens, index) {
-        let [left, newIndex] = this.parseNotExpression(tokens, index);
-        
-        while (newIndex < tokens.length && tokens[newIndex].value === 'and') {
-            newIndex++;
-            const [right, nextIndex] = this.parseNotExpression(tokens, newIndex);
-            left = { type: 'BinaryOp', operator: 'and', left, right };
-            newIndex = nextIndex;
-        }
-        
-        return [left, newIndex];
+    enterSampledCall(code, frame, pc) {
+        // While sampling, a frame that calls out of its run (into a builtin, a nested run or a
+        // closure-compiled statement) stays visible on the activation stack until the call returns.
+        // The call it makes is counted in its place, so the recursion limit is the same as unsampled.
+        this.pushActivation(code, frame, null, 0, pc, null);
+        this.nestedCalls--;
     }
 
-    parseNotExpression(tokens, index) {
-        if (index < tokens.length && tokens[index].value === 'not') {
-            const [operand, newIndex] = this.parseNotExpression(tokens, index + 1);
-            return [{ type: 'UnaryOp', operator: 'not', operand }, newIndex];
-        }
-        return this.parseComparison(tokens, index);
+    leaveSampledCall() {
+        this.activations[--this.callDepth].frame = null;
+        this.nestedCalls++;
     }
 
-    parseComparison(tokens, index) {
-        let [left, newIndex] = this.parseArithmeticExpression(tokens, index);
-        
-        const compOps = ['<', '>', '<=', '>=', '==', '!=', 'in', 'not in', 'is', 'is not'];
-        while (newIndex < tokens.length && compOps.includes(tokens[newIndex].value)) {
-            const operator = tokens[newIndex].value;
-            newIndex++;
-            if (operator === 'not' && newIndex < tokens.length && tokens[newIndex].value === 'in') {
-                newIndex++;
-                const [right, nextIndex] = this.parseArithmeticExpression(tokens, newIndex);
-                left = { type: 'BinaryOp', operator: 'not in', left, right };
-                newIndex = nextIndex;
-            } else if (operator === 'is' && newIndex < tokens.length && tokens[newIndex].value === 'not') {
-                newIndex++;
-                const [right, nextIndex] = this.parseArithmeticExpression(tokens, newIndex);
-                left = { type: 'BinaryOp', operator: 'is not', left, right };
-                newIndex = nextIndex;
-            } else {
-                const [right, nextIndex] = this.parseArithmeticExpression(tokens, newIndex);
-                left = { type: 'BinaryOp', operator, left, right };
-                newIndex = nextIndex;
+    collectImports(node, names) {
+        if (Array.isArray(node)) {
+            for (const child of node) this.collectImports(child, names);
+        } else if (node && typeof node === 'object') {
+            if (node.type === 'Import') {
+                for (const { name } of node.modules) {
+                    const parts = name.split('.');
+                    for (let i = 1; i <= parts.length; i++) names.add(parts.slice(0, i).join('.'));
+                }
+            } else if (node.type === 'FromImport') {
+                names.add(node.module);
+            }
+            for (const key in node) {
+                const value = node[key];
+                if (value && typeof value === 'object') this.collectImports(value, names);
             }
         }
-        
-        return [left, newIndex];
+        return [...names];
     }
 
-    parseArithmeticExpression(tokens, index) {
-        let [left, newIndex] = this.parseTerm(tokens, index);
-        
-        while (newIndex < tokens.length && ['+', '-'].includes(tokens[newIndex].value)) {
-            const operator = tokens[newIndex].value;
-            newIndex++;
-            const [right, nextIndex] = this.parseTerm(tokens, newIndex);
-            left = { type: 'BinaryOp', operator, left, right };
-            newIndex = nextIndex;
-        }
-        
-        return [left, newIndex];
+    compileBlock(statements) {
+        const compiled = statements.map(statement => this.compileStatement(statement));
+        if (compiled.length === 1) return compiled[0];
+        return (frame) => {
+            for (let i = 0; i < compiled.length; i++) {
+                const result = compiled[i](frame);
+                if (result) return result;
+            }
+            return null;
+        };
     }
 
-    parseTerm(tokens, index) {
-        let [left, newIndex] = this.parseFactor(tokens, index);
-        
-        while (newIndex < tokens.length && ['*', '/', '//', '%'].includes(tokens[newIndex].value)) {
-            const operator = tokens[newIndex].value;
-            newIndex++;
-            const [right, nextIndex] = this.parseFactor(tokens, newIndex);
-            left = { type: 'BinaryOp', operator, left, right };
-            newIndex = nextIndex;
+    compileStatement(statement) {
+        if (this.compileProfile !== null && this.compileProfile.statement !== statement) {
+            return this.compileProfiledStatement(statement);
         }
-        
-        return [left, newIndex];
-    }
+        switch (statement.type) {
+            case 'Import':
+                return this.compileImport(statement);
 
-    parseFactor(tokens, index) {
-        if (index >= tokens.length) return [null, index];
-        
-        const token = tokens[index];
-        
-        if (['+', '-', '~'].includes(token.value)) {
-            const [operand, newIndex] = this.parseFactor(tokens, index + 1);
-            return [{ type: 'UnaryOp', operator: token.value, operand }, newIndex];
+            case 'FromImport':
+                return this.compileFromImport(statement);
+
+            case 'Assignment':
+                return this.compileAssignment(statement);
+
+            case 'AugmentedAssignment':
+                return this.compileAugmentedAssignment(statement);
+
+            case 'ExpressionStatement': {
+                const expression = this.compileExpression(statement.expression);
+                return (frame) => {
+                    expression(frame);
+                    return null;
+                };
+            }
+
+            case 'FunctionDef':
+                return this.compileFunctionDef(statement);
+
+            case 'ClassDef':
+                return this.compileClassDef(statement);
+
+            case 'ForLoop':
+                return this.compileForLoop(statement);
+
+            case 'WhileLoop':
+                return this.compileWhileLoop(statement);
+
+            case 'IfStatement':
+                return this.compileIfStatement(statement);
+
+            case 'TryStatement':
+                return this.compileTryStatement(statement);
+
+            case 'WithStatement':
+                return this.compileWithStatement(statement);
+
+            case 'Return': {
+                const value = this.compileExpression(statement.value);
+                // Each return statement reuses one signal; see detachReturn.
+                const signal = { type: 'return', value: null };
+                return (frame) => {
+                    signal.value = value(frame);
+                    return signal;
+                };
+            }
+
+            case 'Yield': {
+                const value = this.compileExpression(statement.value);
+                return (frame) => {
+                    value(frame);
+                    return null;
+                };
+            }
+
+            case 'Break':
+                return (frame) => BREAK_SIGNAL;
+
+            case 'Continue':
+                return (frame) => CONTINUE_SIGNAL;
+
+            case 'Pass':
+                return (frame) => null;
+
+            case 'Raise':
+                return this.compileRaise(statement);
+
+            case 'Global':
+            case 'Nonlocal':
+                return (frame) => null;
+
+            case 'Delete': {
+                const targets = statement.targets.map(target => this.compileDeleteTarget(target));
+                return (frame) => {
+                    for (const target of targets) {
+                        target(frame);
+                    }
+                    return null;
+                };
+            }
+
+            case 'Assert': {
+                const test = this.compileExpression(statement.test);
+                const message = statement.message ? this.compileExpression(statement.message) : null;
+                return (frame) => {
+                    if (!(test(frame))) {
+                        throw new this.builtins.AssertionError(message ? this.toString(message(frame)) : '');
+                    }
+                    return null;
+                };
+            }
+
+            default:
+                throw new Error(`Unknown statement type: ${statement.type}`);
         }
-        
-        return this.parsePower(tokens, index);
     }
 
-    parsePower(tokens, index) {
-        let [left, newIndex] = this.parseAtom(tokens, index);
-        
-        if (newIndex < tokens.length && tokens[newIndex].value === '**') {
-            newIndex++;
-            const [right, nextIndex] = this.parseFactor(tokens, newIndex);
-            left = { type: 'BinaryOp', operator: '**', left, right };
-            newIndex = nextIndex;
-        }
-        
-        return [left, newIndex];
+    compileImport(statement) {
+        const imports = statement.modules.map(({ name, alias }) => ({
+            parts: name.split('.'),
+            store: this.compileNameStore(alias || name.split('.')[0]),
+            alias
+        }));
+        return (frame) => {
+            for (const { parts, store, alias } of imports) {
+                const root = this.importModule(parts[0]);
+                if (!alias) {
+                    store(frame, root);
+                    continue;
+                }
+                let module = root;
+                for (let i = 1; i < parts.length; i++) {
+                    module = module && parts[i] in module ? module[parts[i]] : this.importModule(parts.slice(0, i + 1).join('.'));
+                }
+                store(frame, module);
+            }
+            return null;
+        };
     }
 
-    parseAtom(tokens, index) {
-        if (index >= tokens.length) return [null, index];
-        
-        const token = tokens[index];
-        
-        if (token.type === 'NUMBER') {
-            const value = token.value.includes('.') ? parseFloat(token.value) : parseInt(token.value);
-            return [{ type: 'Literal', value }, index + 1];
-        }
-        
-        if (token.type === 'STRING' || token.type === 'MULTILINE_STRING') {
-            const value = token.value.slice(1, -1);
-            return [{ type: 'Literal', value }, index + 1];
-        }
-        
-        if (token.type === 'IDENTIFIER') {
-            let node = { type: 'Identifier', name: token.value };
-            let newIndex = index + 1;
-            
-            while (newIndex < tokens.length) {
-                if (tokens[newIndex].value === '(') {
-                    const [args, nextIndex] = this.parseArguments(tokens, newIndex + 1);
-                    node = { type: 'FunctionCall', function: node, arguments: args };
-                    newIndex = nextIndex;
-                } else if (tokens[newIndex].value === '[') {
-                    const [subscript, nextIndex] = this.parseSubscript(tokens, newIndex + 1);
-                    node = { type: 'Subscript', object: node, index: subscript };
-                    newIndex = nextIndex;
-                } else if (tokens[newIndex].value === '.') {
-                    newIndex++;
-                    if (newIndex < tokens.length && tokens[newIndex].type === 'IDENTIFIER') {
-                        node = { type: 'Attribute', object: node, attribute: tokens[newIndex].value };
-                        newIndex++;
-                    } else {
-                        throw new Error('Expected attribute name after "."');
+    compileFromImport(statement) {
+        const items = statement.items.map(item => ({
+            name: item.name,
+            store: item.name === '*' ? null : this.compileNameStore(item.alias || item.name)
+        }));
+        return (frame) => {
+            const module = this.importModule(statement.module);
+
+            for (const item of items) {
+                if (item.name === '*') {
+                    for (const [name, value] of Object.entries(module)) {
+                        if (!name.startsWith('_')) {
+                            frame[0][name] = value;
+                        }
                     }
                 } else {
-                    break;
+                    if (!(item.name in module)) {
+                        throw new this.builtins.ImportError(`cannot import name '${item.name}' from '${statement.module}'`);
+                    }
+                    item.store(frame, module[item.name]);
                 }
             }
-            
-            return [node, newIndex];
-        }
-        
-        if (token.value === '(') {
-            const [expr, newIndex] = this.parseExpression(tokens, index + 1);
-            if (newIndex >= tokens.length || tokens[newIndex].value !== ')') {
-                throw new Error('Expected closing parenthesis');
-            }
-            return [expr, newIndex + 1];
-        }
-        
-        if (token.value === '[') {
-            const [elements, newIndex] = this.parseList(tokens, index + 1);
-            return [{ type: 'List', elements }, newIndex];
-        }
-        
-        if (token.value === '{') {
-            const [result, newIndex] = this.parseDictOrSet(tokens, index + 1);
-            return [result, newIndex];
-        }
-        
-        if (['True', 'False', 'None'].includes(token.value)) {
-            const value = token.value === 'True' ? true : token.value === 'False' ? false : null;
-            return [{ type: 'Literal', value }, index + 1];
-        }
-        
-        throw new Error(`Unexpected token: ${token.value}`);
+            return null;
+        };
     }
 
-    parseArguments(tokens, index) {
-        const args = [];
-        
-        if (index < tokens.length && tokens[index].value === ')') {
-            return [args, index + 1];
+    compileAssignment(statement) {
+        const value = this.compileExpression(statement.value);
+        const targets = statement.targets.map(target => this.compileTarget(target));
+
+        if (targets.length === 1) {
+            const assign = targets[0];
+            return (frame) => {
+                assign(frame, value(frame));
+                return null;
+            };
         }
-        
-        while (index < tokens.length) {
-            const [expr, newIndex] = this.parseExpression(tokens, index);
-            args.push(expr);
-            index = newIndex;
-            
-            if (index < tokens.length && tokens[index].value === ',') {
-                index++;
-            } else if (index < tokens.length && tokens[index].value === ')') {
-                return [args, index + 1];
-            } else {
-                throw new Error('Expected "," or ")" in argument list');
+        return (frame) => {
+            const result = value(frame);
+            for (const assign of targets) {
+                assign(frame, result);
             }
-        }
-        
-        throw new Error('Unexpected end of input in argument list');
+            return null;
+        };
     }
 
-    parseSubscript(tokens, index) {
-        const [expr, newIndex] = this.parseExpression(tokens, index);
-        if (newIndex >= tokens.length || tokens[newIndex].value !== ']') {
-            throw new Error('Expected closing bracket');
+    compileTarget(target) {
+        switch (target.type) {
+            case 'Identifier':
+                return this.compileNameStore(target.name);
+
+            case 'Subscript': {
+                const object = this.compileExpression(target.object);
+                if (target.index.type === 'Slice') {
+                    const slice = this.compileSlice(target.index);
+                    return (frame, value) => {
+                        const obj = object(frame);
+                        const [start, stop, step] = this.sliceIndices(obj.length, slice(frame));
+                        if (step !== 1) throw new this.builtins.ValueError('extended slice assignment is not supported');
+                        obj.splice(start, Math.max(0, stop - start), ...this.iterate(value));
+                    };
+                }
+                const index = this.compileExpression(target.index);
+                return (frame, value) => this.setItem(object(frame), index(frame), value);
+            }
+
+            case 'Attribute': {
+                const object = this.compileExpression(target.object);
+                const attribute = target.attribute;
+                return (frame, value) => {
+                    this.setAttribute(object(frame), attribute, value);
+                };
+            }
+
+            case 'Tuple':
+            case 'List':
+                return this.compileUnpacking(target.elements);
+
+            default:
+                throw new Error(`Invalid assignment target: ${target.type}`);
         }
-        return [expr, newIndex + 1];
     }
 
-    parseList(tokens, index) {
-        const elements = [];
-        
-        if (index < tokens.length && tokens[index].value === ']') {
-            return [elements, index + 1];
+    setItem(obj, index, value) {
+        if (obj instanceof PyDict) {
+            obj.set(index, value);
+            return;
         }
-        
-        while (index < tokens.length) {
-            const [expr, newIndex] = this.parseExpression(tokens, index);
-            elements.push(expr);
-            index = newIndex;
-            
-            if (index < tokens.length && tokens[index].value === ',') {
-                index++;
-            } else if (index < tokens.length && tokens[index].value === ']') {
-                return [elements, index + 1];
-            } else {
-                throw new Error('Expected "," or "]" in list');
-            }
+        if (Array.isArray(obj) && index < 0) index += obj.length;
+        if (typeof obj.__setitem__ === 'function') {
+            obj.__setitem__(index, value);
+        } else {
+            obj[index] = value;
         }
-        
-        throw new Error('Unexpected end of input in list');
     }
 
-    parseDictOrSet(tokens, index) {
-        if (index < tokens.length && tokens[index].value === '}') {
-            return [{ type: 'Dict', pairs: [] }, index + 1];
-        }
-        
-        const [firstExpr, newIndex] = this.parseExpression(tokens, index);
-        index = newIndex;
-        
-        if (index < tokens.length && tokens[index].value === ':') {
-            index++;
-            const [value, nextIndex] = this.parseExpression(tokens, index);
-            const pairs = [{ key: firstExpr, value }];
-            index = nextIndex;
-            
-            while (index < tokens.length && tokens[index].value === ',') {
-                index++;
-                if (index < tokens.length && tokens[index].value === '}') {
-                    break;
+    compileUnpacking(targets) {
+        const assigns = targets.map(target => this.compileTarget(target.type === 'Starred' ? target.value : target));
+        const starIndex = targets.findIndex(target => target.type === 'Starred');
+
+        if (starIndex === -1) {
+            return (frame, value) => {
+                const values = Array.isArray(value) ? value : [...this.iterate(value)];
+                if (values.length !== assigns.length) {
+                    throw new this.builtins.ValueError(values.length > assigns.length
+                        ? `too many values to unpack (expected ${assigns.length})`
+                        : `not enough values to unpack (expected ${assigns.length}, got ${values.length})`);
                 }
-                const [keyExpr, keyIndex] = this.parseExpression(tokens, index);
-                if (keyIndex >= tokens.length || tokens[keyIndex].value !== ':') {
-                    throw new Error('Expected ":" in dictionary');
+                for (let i = 0; i < assigns.length; i++) {
+                    assigns[i](frame, values[i]);
                 }
-                const [valueExpr, valueIndex] = this.parseExpression(tokens, keyIndex + 1);
-                pairs.push({ key: keyExpr, value: valueExpr });
-                index = valueIndex;
+            };
+        }
+
+        const after = targets.length - starIndex - 1;
+        return (frame, value) => {
+            const values = Array.isArray(value) ? value : [...this.iterate(value)];
+            if (values.length < targets.length - 1) {
+                throw new this.builtins.ValueError(`not enough values to unpack (expected at least ${targets.length - 1}, got ${values.length})`);
             }
-            
-            if (index >= tokens.length || tokens[index].value !== '}') {
-                throw new Error('Expected closing brace');
+            for (let i = 0; i < starIndex; i++) {
+                assigns[i](frame, values[i]);
             }
-            
-            return [{ type: 'Dict', pairs }, index + 1];
-        } else {
-            const elements = [firstExpr];
-            
-            while (index < tokens.length && tokens[index].value === ',') {
-                index++;
-                if (index < tokens.length && tokens[index].value === '}') {
-                    break;
+            assigns[starIndex](frame, values.slice(starIndex, values.length - after));
+            for (let i = 0; i < after; i++) {
+                assigns[starIndex + 1 + i](frame, values[values.length - after + i]);
+            }
+        };
+    }
+
+    compileAugmentedAssignment(statement) {
+        const target = statement.target;
+        const operator = this.getInPlaceOperator(statement.operator);
+        const value = this.compileExpression(statement.value);
+
+        if (target.type === 'Identifier') {
+            const load = this.compileNameLoad(target.name);
+            const store = this.compileNameStore(target.name);
+            const slot = this.stringBuilderSlot(target);
+            if (slot !== undefined && statement.operator === '+') {
+                return (frame) => {
+                    const left = frame[slot];
+                    const right = value(frame);
+                    if (typeof right === 'string') {
+                        if (left instanceof StringBuilder) {
+                            left.append(right);
+                            frame[slot] = left;
+                            return null;
+                        }
+                        if (typeof left === 'string') {
+                            const builder = new StringBuilder(left);
+                            builder.append(right);
+                            frame[slot] = builder;
+                            return null;
+                        }
+                    }
+                    store(frame, operator(load(frame), right));
+                    return null;
+                };
+            }
+            return (frame) => {
+                const left = load(frame);
+                store(frame, operator(left, value(frame)));
+                return null;
+            };
+        }
+
+        const object = this.compileExpression(target.object);
+        if (target.type === 'Attribute') {
+            const attribute = target.attribute;
+            return (frame) => {
+                const obj = object(frame);
+                const right = value(frame);
+                this.setAttribute(obj, attribute, operator(this.getAttribute(obj, attribute), right));
+                return null;
+            };
+        }
+
+        const index = this.compileExpression(target.index);
+        return (frame) => {
+            const obj = object(frame);
+            let key = index(frame);
+            const right = value(frame);
+            if (Array.isArray(obj) && key < 0) key += obj.length;
+            this.setItem(obj, key, operator(this.getItem(obj, key), right));
+            return null;
+        };
+    }
+
+    compileDeleteTarget(target) {
+        switch (target.type) {
+            case 'Identifier':
+                return this.compileNameDelete(target.name);
+
+            case 'Subscript': {
+                const object = this.compileExpression(target.object);
+                if (target.index.type === 'Slice') {
+                    const slice = this.compileSlice(target.index);
+                    return (frame) => {
+                        const obj = object(frame);
+                        const [start, stop, step] = this.sliceIndices(obj.length, slice(frame));
+                        if (step !== 1) throw new this.builtins.ValueError('extended slice deletion is not supported');
+                        obj.splice(start, Math.max(0, stop - start));
+                    };
                 }
-                const [expr, nextIndex] = this.parseExpression(tokens, index);
-                elements.push(expr);
-                index = nextIndex;
+                const index = this.compileExpression(target.index);
+                return (frame) => {
+                    const obj = object(frame);
+                    let key = index(frame);
+                    if (Array.isArray(obj)) {
+                        if (key < 0) key += obj.length;
+                        if (key < 0 || key >= obj.length) throw new this.builtins.IndexError('list assignment index out of range');
+                        obj.splice(key, 1);
+                    } else if (obj instanceof PyDict) {
+                        if (!obj.delete(key)) throw new this.builtins.KeyError(this.repr(key));
+                    } else {
+                        if (!(key in obj)) throw new this.builtins.KeyError(`'${key}'`);
+                        delete obj[key];
+                    }
+                };
+            }
+
+            case 'Attribute': {
+                const object = this.compileExpression(target.object);
+                const attribute = target.attribute;
+                return (frame) => {
+                    this.deleteAttribute(object(frame), attribute);
+                };
             }
-            
-            if (index >= tokens.length || tokens[index].value !== '}') {
-                throw new Error('Expected closing brace');
+
+            case 'Tuple':
+            case 'List': {
+                const targets = target.elements.map(element => this.compileDeleteTarget(element));
+                return (frame) => {
+                    for (const element of targets) {
+                        element(frame);
+                    }
+                };
             }
-            
-            return [{ type: 'Set', elements }, index + 1];
+
+            default:
+                throw new Error(`Invalid delete target: ${target.type}`);
         }
     }
 
-    async evaluateNode(node) {
-        if (!node) return null;
-        
-        switch (node.type) {
-            case 'Literal':
-                return node.value;
-                
-            case 'Identifier':
-                return this.getVariable(node.name);
-                
-            case 'BinaryOp':
-                return await this.evaluateBinaryOp(node);
-                
-            case 'UnaryOp':
-                return await this.evaluateUnaryOp(node);
-                
-            case 'FunctionCall':
-                return await this.evaluateFunctionCall(node);
-                
-            case 'Attribute':
-                return await this.evaluateAttribute(node);
-                
-            case 'Subscript':
-                return await this.evaluateSubscript(node);
-                
-            case 'List':
-                const elements = [];
-                for (const element of node.elements) {
-                    elements.push(await this.evaluateNode(element));
-                }
-                return elements;
-                
-            case 'Dict':
-                const dict = {};
-                for (const pair of node.pairs) {
-                    const key = await this.evaluateNode(pair.key);
-                    const value = await this.evaluateNode(pair.value);
-                    dict[key] = value;
-                }
-                return dict;
-                
-            case 'Set':
-                const setElements = [];
-                for (const element of node.elements) {
-                    setElements.push(await this.evaluateNode(element));
+    compileRaise(statement) {
+        if (!statement.exception) {
+            return (frame) => {
+                if (this.activeExceptions.length === 0) {
+                    throw new this.builtins.RuntimeError('No active exception to reraise');
                 }
-                return new Set(setElements);
-                
-            case 'FString':
-                return await this.evaluateFString(node);
-                
-            case 'ListComprehension':
-                return await this.evaluateListComprehension(node);
-                
-            default:
-                throw new Error(`Unknown node type: ${node.type}`);
+                throw this.activeExceptions[this.activeExceptions.length - 1];
+            };
         }
+
+        const exceptionValue = this.compileExpression(statement.exception);
+        const cause = statement.cause ? this.compileExpression(statement.cause) : null;
+        return (frame) => {
+            let exception = exceptionValue(frame);
+            if (typeof exception === 'function') {
+                exception = this.callFunction(exception, []);
+            }
+            if (cause) {
+                exception.__cause__ = cause(frame);
+            }
+            throw exception;
+        };
     }
 
-    async evaluateFString(node) {
-        let result = '';
-        
-        for (const part of node.parts) {
-            if (part.type === 'literal') {
-                result += part.value;
-            } else if (part.type === 'expression') {
-                try {
-                    const expr = this.parseSimpleExpression(part.value);
-                    const value = await this.evaluateNode(expr);
-                    result += this.toString(value);
-                } catch (error) {
-                    result += `{${part.value}}`;
+    compileDefaults(params) {
+        const defaults = params.map(param => param.default ? this.compileExpression(param.default) : null);
+        return (frame) => {
+            const values = [];
+            for (const value of defaults) {
+                values.push(value ? value(frame) : NO_DEFAULT);
+            }
+            return values;
+        };
+    }
+
+    bindArguments(signature, defaults, args, frame) {
+        // Parameter i is stored in frame slot i + 1.
+        const count = args.length;
+        if (signature.accepts(count) && (count === 0 || !(args[count - 1] instanceof KeywordArguments))) {
+            for (let i = 0; i < count; i++) frame[i + 1] = args[i];
+            for (let i = count; i < signature.arity; i++) frame[i + 1] = defaults[i];
+            return;
+        }
+
+        const { name, params } = signature;
+        let keywords = null;
+        if (args.length > 0 && args[args.length - 1] instanceof KeywordArguments) {
+            keywords = { ...args[args.length - 1].values };
+            args = args.slice(0, -1);
+        }
+
+        let position = 0;
+        for (let i = 0; i < params.length; i++) {
+            const param = params[i];
+            const slot = i + 1;
+            if (param.kind === 'varargs') {
+                const rest = args.slice(position);
+                rest.__class__ = 'tuple';
+                frame[slot] = rest;
+                position = args.length;
+            } else if (param.kind === 'varkw') {
+                frame[slot] = PyDict.fromObject(keywords);
+                keywords = null;
+            } else if (param.kind === 'positional' && position < args.length) {
+                if (keywords && param.name in keywords) {
+                    throw new this.builtins.TypeError(`${name}() got multiple values for argument '${param.name}'`);
                 }
+                frame[slot] = args[position++];
+            } else if (keywords && param.name in keywords) {
+                frame[slot] = keywords[param.name];
+                delete keywords[param.name];
+            } else if (defaults[i] !== NO_DEFAULT) {
+                frame[slot] = defaults[i];
+            } else {
+                throw new this.builtins.TypeError(`${name}() missing required argument: '${param.name}'`);
             }
         }
-        
-        return result;
-    }
 
-    async evaluateListComprehension(node) {
-        const result = [];
-        const iterable = await this.evaluateNode(node.iterable);
-        
-        if (!iterable || typeof iterable[Symbol.iterator] !== 'function') {
-            throw new Error(`'${typeof iterable}' object is not iterable`);
+        if (position < args.length) {
+            throw new this.builtins.TypeError(`${name}() takes ${position} positional arguments but ${args.length} were given`);
         }
-        
-        this.pushScope();
-        try {
-            for (const item of iterable) {
-                this.setVariable(node.variable, item);
-                const value = await this.evaluateNode(node.element);
-                result.push(value);
+        if (keywords) {
+            const unexpected = Object.keys(keywords)[0];
+            if (unexpected !== undefined) {
+                throw new this.builtins.TypeError(`${name}() got an unexpected keyword argument '${unexpected}'`);
             }
-        } finally {
-            this.popScope();
         }
-        
-        return result;
     }
 
-    async evaluateBinaryOp(node) {
-        const left = await this.evaluateNode(node.left);
-        
-        if (node.operator === 'and') {
-            return left ? await this.evaluateNode(node.right) : left;
-        }
-        if (node.operator === 'or') {
-            return left ? left : await this.evaluateNode(node.right);
+    compileFunction(name, node, params, body, isExpression = false) {
+        const outerScope = this.compileScope;
+        const scope = outerScope.children.get(node);
+        const defaults = this.compileDefaults(params);
+        const signature = new Signature(name, params);
+        if (!isExpression) scope.stringBuilders = this.findStringBuilders(scope);
+        if (scope.generator && !isExpression) {
+            const run = this.withCompileScope(scope, () => this.compileGeneratorFunctionBody(body));
+            const start = (frame) => new PyGenerator(name, run(frame), this.builtins.StopIteration);
+            return (frame) => this.createFunction(name, scope, signature, defaults(frame), start, frame[0],
+                this.captureCells(scope, outerScope, frame), true);
         }
-        
-        const right = await this.evaluateNode(node.right);
-        
-        switch (node.operator) {
-            case '+': return left + right;
-            case '-': return left - right;
-            case '*': return left * right;
-            case '/': return left / right;
-            case '//': return Math.floor(left / right);
-            case '%': return left % right;
-            case '**': return Math.pow(left, right);
-            case '<': return left < right;
-            case '>': return left > right;
-            case '<=': return left <= right;
-            case '>=': return left >= right;
-            case '==': return left === right;
-            case '!=': return left !== right;
-            case 'in': return Array.isArray(right) ? right.includes(left) : (typeof right === 'string' ? right.includes(left) : left in right);
-            case 'not in': return !(Array.isArray(right) ? right.includes(left) : (typeof right === 'string' ? right.includes(left) : left in right));
-            case 'is': return left === right;
-            case 'is not': return left !== right;
-            default: throw new Error(`Unknown binary operator: ${node.operator}`);
-        }
-    }
-
-    async evaluateUnaryOp(node) {
-        const operand = await this.evaluateNode(node.operand);
-        
-        switch (node.operator) {
-            case '+': return +operand;
-            case '-': return -operand;
-            case '~': return ~operand;
-            case 'not': return !operand;
-            default: throw new Error(`Unknown unary operator: ${node.operator}`);
+        let compiledBody = this.withCompileScope(scope, () => isExpression ? this.compileExpression(body) : this.compileBlock(body));
+        if (this.compileProfile !== null) {
+            compiledBody = this.profileFunction(name, node.line !== undefined ? node.line : this.compileProfile.line, compiledBody);
         }
+        return (frame) => this.createFunction(name, scope, signature, defaults(frame), compiledBody, frame[0],
+            this.captureCells(scope, outerScope, frame), isExpression);
     }
 
-    async evaluateFunctionCall(node) {
-        const func = await this.evaluateNode(node.function);
-        const args = [];
-        for (const arg of node.arguments) {
-            args.push(await this.evaluateNode(arg));
+    findStringBuilders(scope) {
+        // Plain locals extended with `+=` may hold a StringBuilder. Only closure-compiled functions
+        // use them, so bytecode frames (and closures compiled into them) always see flat strings.
+        const names = [...scope.concatenated].filter(name => scope.resolution.get(name) === 'local' && !scope.cells.has(name));
+        return names.length > 0 ? new Set(names) : null;
+    }
+
+    stringBuilderSlot(node) {
+        const builders = this.compileScope.stringBuilders;
+        if (!builders || node.type !== 'Identifier' || !builders.has(node.name)) return undefined;
+        return this.compileScope.slots.get(node.name);
+    }
+
+    containsYield(node) {
+        if (Array.isArray(node)) return node.some(child => this.containsYield(child));
+        if (!node || typeof node !== 'object') return false;
+        switch (node.type) {
+            case 'Yield':
+            case 'YieldExpression':
+            case 'YieldFrom':
+                return true;
+            case 'FunctionDef':
+            case 'ClassDef':
+            case 'Lambda':
+            case 'ListComprehension':
+            case 'GeneratorExpression':
+            case 'SetComprehension':
+            case 'DictComprehension':
+                return false;
         }
-        
-        if (typeof func === 'function') {
-            return func(...args);
+        for (const key in node) {
+            const value = node[key];
+            if (value && typeof value === 'object' && this.containsYield(value)) return true;
         }
-        
-        throw new Error(`'${typeof func}' object is not callable`);
+        return false;
     }
 
-    async evaluateAttribute(node) {
-        const obj = await this.evaluateNode(node.object);
-        
-        if (obj && typeof obj === 'object' && node.attribute in obj) {
-            return obj[node.attribute];
-        }
-        
-        throw new Error(`'${typeof obj}' object has no attribute '${node.attribute}'`);
+    compileGeneratorFunctionBody(body) {
+        const block = this.compileGeneratorBlock(body);
+        return function* (frame) {
+            const result = yield* block(frame);
+            return result && result.type === 'return' ? result.value : null;
+        };
     }
 
-    async evaluateSubscript(node) {
-        const obj = await this.evaluateNode(node.object);
-        const index = await this.evaluateNode(node.index);
-        
-        if (Array.isArray(obj) || typeof obj === 'string') {
-            const len = obj.length;
-            const idx = index < 0 ? len + index : index;
-            if (idx < 0 || idx >= len) {
-                throw new Error(`${Array.isArray(obj) ? 'list' : 'string'} index out of range`);
+    compileGeneratorBlock(statements) {
+        // Statements without a yield keep their ordinary closures; the rest become JS generators.
+        const steps = statements.map(statement => {
+            if (statement.type === 'Yield' && !this.containsYield(statement.value)) {
+                return { kind: 'yield', run: this.compileExpression(statement.value) };
             }
-            return obj[idx];
-        }
-        
-        if (typeof obj === 'object' && obj !== null) {
-            if (!(index in obj)) {
-                throw new Error(`KeyError: '${index}'`);
+            return this.containsYield(statement)
+                ? { kind: 'suspend', run: this.compileGeneratorStatement(statement) }
+                : { kind: 'run', run: this.compileStatement(statement) };
+        });
+        const block = function* (frame) {
+            for (const step of steps) {
+                if (step.kind === 'yield') {
+                    yield step.run(frame);
+                    continue;
+                }
+                const result = step.kind === 'suspend' ? yield* step.run(frame) : step.run(frame);
+                if (result) return result;
             }
-            return obj[index];
-        }
-        
-        throw new Error(`'${typeof obj}' object is not subscriptable`);
+            return null;
+        };
+        // Loops run their body's steps inline rather than starting a generator per iteration.
+        block.steps = steps;
+        return block;
     }
 
-    parseStatements(code) {
-        const lines = code.split('\n');
-        const statements = [];
-        let i = 0;
-        
-        while (i < lines.length) {
-            const line = lines[i].trim();
-            
-            if (!line || line.startsWith('#')) {
-                i++;
-                continue;
+    compileGeneratorStatement(statement) {
+        switch (statement.type) {
+            case 'Yield':
+            case 'ExpressionStatement': {
+                const value = this.compileGeneratorValue(statement.type === 'Yield'
+                    ? { type: 'YieldExpression', value: statement.value }
+                    : statement.expression);
+                return function* (frame) {
+                    if (value.suspends) yield* value.run(frame);
+                    else value.run(frame);
+                    return null;
+                };
             }
-            
-            if (line.startsWith('import ') || line.startsWith('from ')) {
-                statements.push(this.parseImport(line));
-                i++;
-            } else if (line.startsWith('def ')) {
-                const [funcDef, newIndex] = this.parseFunction(lines, i);
-                statements.push(funcDef);
-                i = newIndex;
-            } else if (line.startsWith('class ')) {
-                const [classDef, newIndex] = this.parseClass(lines, i);
-                statements.push(classDef);
-                i = newIndex;
-            } else if (line.startsWith('for ')) {
-                const [forLoop, newIndex] = this.parseForLoop(lines, i);
-                statements.push(forLoop);
-                i = newIndex;
-            } else if (line.startsWith('while ')) {
-                const [whileLoop, newIndex] = this.parseWhileLoop(lines, i);
-                statements.push(whileLoop);
-                i = newIndex;
-            } else if (line.startsWith('if ')) {
-                const [ifStmt, newIndex] = this.parseIfStatement(lines, i);
-                statements.push(ifStmt);
-                i = newIndex;
-            } else if (line.startsWith('try:')) {
-                const [tryStmt, newIndex] = this.parseTryStatement(lines, i);
-                statements.push(tryStmt);
-                i = newIndex;
-            } else if (line.startsWith('with ')) {
-                const [withStmt, newIndex] = this.parseWithStatement(lines, i);
-                statements.push(withStmt);
-                i = newIndex;
-            } else if (line === 'pass' || line === 'break' || line === 'continue' || line.startsWith('return') || line.startsWith('yield') || line.startsWith('raise')) {
-                statements.push(this.parseControlStatement(line));
-                i++;
-            } else {
-                // Try to parse as assignment or expression
-                try {
-                    const tokens = this.tokenize(line);
-                    if (this.isAssignment(tokens)) {
-                        statements.push(this.parseAssignment(tokens));
-                    } else {
-                        const [expr] = this.parseExpression(tokens);
-                        statements.push({ type: 'ExpressionStatement', expression: expr });
+
+            case 'Assignment': {
+                const value = this.compileGeneratorValue(statement.value);
+                const targets = statement.targets.map(target => this.compileTarget(target));
+                return function* (frame) {
+                    const result = value.suspends ? yield* value.run(frame) : value.run(frame);
+                    for (const assign of targets) assign(frame, result);
+                    return null;
+                };
+            }
+
+            case 'Return': {
+                const value = this.compileGeneratorValue(statement.value);
+                return function* (frame) {
+                    return { type: 'return', value: value.suspends ? yield* value.run(frame) : value.run(frame) };
+                };
+            }
+
+            case 'IfStatement': {
+                const branches = [{ condition: statement.condition, body: statement.body }, ...statement.elifBranches]
+                    .map(branch => ({
+                        condition: this.compileGeneratorValue(branch.condition),
+                        body: this.compileGeneratorBlock(branch.body)
+                    }));
+                const elseBranch = statement.elseBranch ? this.compileGeneratorBlock(statement.elseBranch) : null;
+                return function* (frame) {
+                    for (const { condition, body } of branches) {
+                        if (condition.suspends ? yield* condition.run(frame) : condition.run(frame)) return yield* body(frame);
                     }
-                } catch (error) {
-                    // If parsing fails, try simple statement parsing
-                    if (line.includes('=') && !line.includes('==') && !line.includes('!=') && !line.includes('<=') && !line.includes('>=')) {
-                        const equalIndex = line.indexOf('=');
-                        const target = line.substring(0, equalIndex).trim();
-                        const value = line.substring(equalIndex + 1).trim();
-                        statements.push({
-                            type: 'Assignment',
-                            target: { type: 'Identifier', name: target },
-                            value: this.parseSimpleExpression(value)
-                        });
-                    } else {
-                        statements.push({
-                            type: 'ExpressionStatement',
-                            expression: this.parseSimpleExpression(line)
-                        });
+                    return elseBranch ? yield* elseBranch(frame) : null;
+                };
+            }
+
+            case 'WhileLoop': {
+                const condition = this.compileGeneratorValue(statement.condition);
+                const body = this.compileGeneratorBlock(statement.body);
+                const elseBranch = statement.elseBranch ? this.compileGeneratorBlock(statement.elseBranch) : null;
+                const step = () => {
+                    if (++this.steps >= this.stepCheck) this.checkSteps();
+                };
+                return function* (frame) {
+                    while (condition.suspends ? yield* condition.run(frame) : condition.run(frame)) {
+                        step();
+                        let result = null;
+                        for (const step of body.steps) {
+                            if (step.kind === 'yield') {
+                                yield step.run(frame);
+                                continue;
+                            }
+                            result = step.kind === 'suspend' ? yield* step.run(frame) : step.run(frame);
+                            if (result) break;
+                        }
+                        if (result === BREAK_SIGNAL) {
+                            return null;
+                        } else if (result && result.type === 'return') {
+                            return result;
+                        }
                     }
-                }
-                i++;
+                    return elseBranch ? yield* elseBranch(frame) : null;
+                };
             }
-        }
-        
-        return statements;
-    }
 
-    parseSimpleExpression(expr) {
-        expr = expr.trim();
-        
-        // Handle string literals
-        if ((expr.startsWith('"') && expr.endsWith('"')) || (expr.startsWith("'") && expr.endsWith("'"))) {
-            return { type: 'Literal', value: expr.slice(1, -1) };
-        }
-        
-        // Handle f-strings
-        if (expr.startsWith('f"') || expr.startsWith("f'")) {
-            return this.parseFString(expr);
-        }
-        
-        // Handle numbers
-        if (/^\d+\.?\d*$/.test(expr)) {
-            return { type: 'Literal', value: expr.includes('.') ? parseFloat(expr) : parseInt(expr) };
-        }
-        
-        // Handle boolean literals
-        if (expr === 'True') return { type: 'Literal', value: true };
-        if (expr === 'False') return { type: 'Literal', value: false };
-        if (expr === 'None') return { type: 'Literal', value: null };
-        
-        // Handle lists
-        if (expr.startsWith('[') && expr.endsWith(']')) {
-            const content = expr.slice(1, -1).trim();
-            if (!content) return { type: 'List', elements: [] };
-            
-            const elements = content.split(',').map(item => this.parseSimpleExpression(item.trim()));
-            return { type: 'List', elements };
-        }
-        
-        // Handle dictionaries
-        if (expr.startsWith('{') && expr.endsWith('}')) {
-            const content = expr.slice(1, -1).trim();
-            if (!content) return { type: 'Dict', pairs: [] };
-            
-            const pairs = [];
-            const items = content.split(',');
-            for (const item of items) {
-                const colonIndex = item.indexOf(':');
-                if (colonIndex > 0) {
-                    const key = this.parseSimpleExpression(item.substring(0, colonIndex).trim());
-                    const value = this.parseSimpleExpression(item.substring(colonIndex + 1).trim());
-                    pairs.push({ key, value });
-                }
+            case 'ForLoop': {
+                const iterable = this.compileGeneratorValue(statement.iterable);
+                const assign = this.compileTarget(statement.target);
+                const body = this.compileGeneratorBlock(statement.body);
+                const elseBranch = statement.elseBranch ? this.compileGeneratorBlock(statement.elseBranch) : null;
+                const iterate = (value) => this.iterate(value);
+                const step = () => {
+                    if (++this.steps >= this.stepCheck) this.checkSteps();
+                };
+                return function* (frame) {
+                    const items = iterate(iterable.suspends ? yield* iterable.run(frame) : iterable.run(frame));
+                    for (const item of items) {
+                        step();
+                        assign(frame, item);
+
+                        let result = null;
+                        for (const step of body.steps) {
+                            if (step.kind === 'yield') {
+                                yield step.run(frame);
+                                continue;
+                            }
+                            result = step.kind === 'suspend' ? yield* step.run(frame) : step.run(frame);
+                            if (result) break;
+                        }
+                        if (result === BREAK_SIGNAL) {
+                            return null;
+                        } else if (result && result.type === 'return') {
+                            return result;
+                        }
+                    }
+                    return elseBranch ? yield* elseBranch(frame) : null;
+                };
             }
-            return { type: 'Dict', pairs };
+
+            case 'TryStatement':
+                return this.compileGeneratorTry(statement);
+
+            case 'WithStatement':
+                return this.compileGeneratorWith(statement);
         }
-        
-        // Handle function calls
-        const funcCallMatch = expr.match(/^(\w+)\s*\(([^)]*)\)$/);
-        if (funcCallMatch) {
-            const funcName = funcCallMatch[1];
-            const argsStr = funcCallMatch[2].trim();
-            const args = argsStr ? argsStr.split(',').map(arg => this.parseSimpleExpression(arg.trim())) : [];
+        throw new Error(`SyntaxError: 'yield' is not supported inside ${statement.type}`);
+    }
+
+    compileGeneratorValue(node) {
+        // A yield can produce the value of an assignment or a return; other expressions stay plain closures.
+        if (node && node.type === 'YieldExpression') {
+            const value = this.compileExpression(node.value);
             return {
-                type: 'FunctionCall',
-                function: { type: 'Identifier', name: funcName },
-                arguments: args
+                suspends: true,
+                run: function* (frame) {
+                    const sent = yield value(frame);
+                    return sent === undefined ? null : sent;
+                }
             };
         }
-        
-        // Handle list comprehension
-        const listCompMatch = expr.match(/^\[(.+?)\s+for\s+(\w+)\s+in\s+(.+?)\]$/);
-        if (listCompMatch) {
+        if (node && node.type === 'YieldFrom') {
+            const value = this.compileExpression(node.value);
+            const iterate = (iterable) => this.iterate(iterable);
             return {
-                type: 'ListComprehension',
-                element: this.parseSimpleExpression(listCompMatch[1].trim()),
-                variable: listCompMatch[2],
-                iterable: this.parseSimpleExpression(listCompMatch[3].trim())
+                suspends: true,
+                run: function* (frame) {
+                    const result = yield* iterate(value(frame));
+                    return result === undefined ? null : result;
+                }
             };
         }
-        
-        // Handle subscript access
-        const subscriptMatch = expr.match(/^(\w+)\[(.+?)\]$/);
-        if (subscriptMatch) {
-            return {
-                type: 'Subscript',
-                object: { type: 'Identifier', name: subscriptMatch[1] },
-                index: this.parseSimpleExpression(subscriptMatch[2])
-            };
+        if (this.containsYield(node)) {
+            throw new Error("SyntaxError: 'yield' is only supported as a statement, an assignment value or a return value");
         }
-        
-        // Handle attribute access
-        if (expr.includes('.')) {
-            const parts = expr.split('.');
-            let result = { type: 'Identifier', name: parts[0] };
-            for (let i = 1; i < parts.length; i++) {
-                result = { type: 'Attribute', object: result, attribute: parts[i] };
+        const value = this.compileExpression(node);
+        return {
+            suspends: false,
+            run: value
+        };
+    }
+
+    compileGeneratorTry(statement) {
+        const body = this.compileGeneratorBlock(statement.body);
+        const clauses = statement.exceptClauses.map(clause => ({
+            exceptionType: clause.exceptionType ? this.compileExpression(clause.exceptionType) : null,
+            store: clause.name ? this.compileNameStore(clause.name) : null,
+            body: this.compileGeneratorBlock(clause.body)
+        }));
+        const elseBranch = statement.elseBranch ? this.compileGeneratorBlock(statement.elseBranch) : null;
+        const finallyBranch = statement.finallyBranch ? this.compileGeneratorBlock(statement.finallyBranch) : null;
+        const interpreter = this;
+
+        return function* (frame) {
+            let result = null;
+            try {
+                let raised = false;
+                try {
+                    result = yield* body(frame);
+                } catch (caught) {
+                    raised = true;
+                    const error = interpreter.pythonException(caught);
+                    const clause = interpreter.findExceptClause(frame, clauses, error);
+                    if (!clause) throw error;
+
+                    if (clause.store) clause.store(frame, error);
+                    interpreter.activeExceptions.push(error);
+                    try {
+                        result = yield* clause.body(frame);
+                    } finally {
+                        interpreter.activeExceptions.pop();
+                    }
+                }
+
+                if (!raised && !result && elseBranch) {
+                    result = yield* elseBranch(frame);
+                }
+            } finally {
+                if (finallyBranch) {
+                    result = detachReturn(result);
+                    const finallyResult = yield* finallyBranch(frame);
+                    if (finallyResult) return finallyResult;
+                }
             }
             return result;
-        }
-        
-        // Default to identifier
-        return { type: 'Identifier', name: expr };
+        };
     }
 
-    parseFString(expr) {
-        // Simple f-string parsing - extract variables in {}
-        const content = expr.slice(2, -1); // Remove f" and "
-        const parts = [];
-        let current = '';
-        let inBrace = false;
-        let braceCount = 0;
-        
-        for (let i = 0; i < content.length; i++) {
-            const char = content[i];
-            
-            if (char === '{' && !inBrace) {
-                if (current) {
-                    parts.push({ type: 'literal', value: current });
-                    current = '';
-                }
-                inBrace = true;
-                braceCount = 1;
-            } else if (char === '{' && inBrace) {
-                braceCount++;
-                current += char;
-            } else if (char === '}' && inBrace) {
-                braceCount--;
-                if (braceCount === 0) {
-                    parts.push({ type: 'expression', value: current });
-                    current = '';
-                    inBrace = false;
-                } else {
-                    current += char;
+    compileGeneratorWith(statement) {
+        let inner = this.compileGeneratorBlock(statement.body);
+        for (let i = statement.items.length - 1; i >= 0; i--) {
+            const context = this.compileExpression(statement.items[i].context);
+            const assign = statement.items[i].target ? this.compileTarget(statement.items[i].target) : null;
+            const body = inner;
+            inner = function* (frame) {
+                const manager = context(frame);
+                let value = manager;
+                if (manager && typeof manager.__enter__ === 'function') {
+                    value = manager.__enter__();
                 }
-            } else {
-                current += char;
-            }
-        }
-        
-        if (current) {
-            parts.push({ type: 'literal', value: current });
+                if (assign) {
+                    assign(frame, value);
+                }
+
+                let result;
+                try {
+                    result = yield* body(frame);
+                } catch (error) {
+                    if (manager && typeof manager.__exit__ === 'function') {
+                        const suppress = manager.__exit__(error.constructor, error, null);
+                        if (suppress) return null;
+                    }
+                    throw error;
+                }
+                if (manager && typeof manager.__exit__ === 'function') {
+                    result = detachReturn(result);
+                    manager.__exit__(null, null, null);
+                }
+                return result;
+            };
         }
-        
-        return { type: 'FString', parts };
+        return inner;
+    }
+
+    createFunction(name, scope, signature, defaults, body, globals, cells, isExpression) {
+        // A generator keeps its frame after the call returns, so only other frames are reused.
+        const pooled = !scope.generator;
+        const enter = (frame) => {
+            if (++this.steps >= this.stepCheck) this.checkSteps();
+            if (this.callDepth + this.nestedCalls >= this.recursionLimit) {
+                throw new this.builtins.RecursionError('maximum recursion depth exceeded');
+            }
+            frame[0] = globals;
+            if (scope.cells.size > 0) this.prepareFrame(scope, frame);
+            if (cells.length > 0) this.installCells(scope, frame, cells);
+
+            let result;
+            this.nestedCalls++;
+            try {
+                result = body(frame);
+            } finally {
+                this.nestedCalls--;
+            }
+            if (pooled) this.releaseFrame(scope, frame);
+            if (isExpression) return result;
+            return result && result.type === 'return' ? result.value : null;
+        };
+        const func = (...args) => {
+            const frame = this.acquireFrame(scope);
+            this.bindArguments(signature, defaults, args, frame);
+            return enter(frame);
+        };
+
+        func.__name__ = name;
+        func.__doc__ = null;
+        func[FRAME_FUNCTION] = { signature, scope, defaults, enter };
+        return func;
+    }
+
+    compileDecorators(decorators) {
+        const compiled = (decorators || []).map(decorator => this.compileExpression(decorator));
+        return (frame, value) => {
+            for (let i = compiled.length - 1; i >= 0; i--) {
+                const decorator = compiled[i](frame);
+                value = this.callFunction(decorator, [value]);
+            }
+            return value;
+        };
+    }
+
+    compileFunctionDef(statement) {
+        const create = this.compileFunction(statement.name, statement, statement.params, statement.body);
+        const decorate = this.compileDecorators(statement.decorators);
+        const store = this.compileNameStore(statement.name);
+        const first = statement.body[0];
+        const doc = first && first.type === 'ExpressionStatement' && first.expression.type === 'Literal' &&
+            typeof first.expression.value === 'string' ? first.expression.value : null;
+
+        return (frame) => {
+            let func = create(frame);
+            func.__doc__ = doc;
+            func = decorate(frame, func);
+
+            store(frame, func);
+            this.functions.set(statement.name, statement);
+            return null;
+        };
+    }
+
+    compileClassDef(statement) {
+        const outerScope = this.compileScope;
+        const scope = outerScope.children.get(statement);
+        const bases = statement.bases.map(base => this.compileExpression(base));
+        const body = this.withCompileScope(scope, () => this.compileBlock(statement.body));
+        const decorate = this.compileDecorators(statement.decorators);
+        const store = this.compileNameStore(statement.name);
+        return (frame) => {
+            const baseValues = [];
+            for (const base of bases) {
+                baseValues.push(base(frame));
+            }
+            const classFrame = new Array(scope.size);
+            classFrame[0] = frame[0];
+            classFrame[1] = {};
+            this.installCells(scope, classFrame, this.captureCells(scope, outerScope, frame));
+
+            let result = this.createClass(statement.name, baseValues, body, classFrame);
+            result = decorate(frame, result);
+
+            store(frame, result);
+            this.classes.set(statement.name, statement);
+            return null;
+        };
     }
 
-    parseImport(line) {
-        const importMatch = line.match(/^import\s+(.+)$/);
-        if (importMatch) {
-            const modules = importMatch[1].split(',').map(m => m.trim());
-            return { type: 'Import', modules };
-        }
-        
-        const fromMatch = line.match(/^from\s+(.+)\s+import\s+(.+)$/);
-        if (fromMatch) {
-            const module = fromMatch[1].trim();
-            const items = fromMatch[2].split(',').map(item => {
-                const asMatch = item.trim().match(/^(.+)\s+as\s+(.+)$/);
-                if (asMatch) {
-                    return { name: asMatch[1].trim(), alias: asMatch[2].trim() };
-                }
-                return { name: item.trim() };
-            });
-            return { type: 'FromImport', module, items };
+    createClass(name, bases, body, frame) {
+        let slots = null;
+        const classConstructor = function(...args) {
+            const instance = Object.create(prototype);
+            if (slots !== null) {
+                // Every instance gets the same fields in the same order, and no others.
+                for (const slot of slots) instance[slot] = undefined;
+                Object.preventExtensions(instance);
+            }
+            if (typeof instance.__init__ === 'function') {
+                instance.__init__(...args);
+            }
+            return instance;
+        };
+
+        const mro = this.linearize(classConstructor, bases);
+        const primary = bases.find(base => this.isPythonClass(base));
+        const prototype = Object.create(primary ? primary.prototype : PyObject.prototype);
+        if (primary) Object.setPrototypeOf(classConstructor, primary);
+        if (bases.length > 1) this.inheritAlongMro(classConstructor, prototype, mro);
+
+        Object.defineProperty(prototype, PY_CLASS, { value: classConstructor });
+        Object.defineProperty(classConstructor, Symbol.hasInstance, {
+            value: (obj) => obj !== null && typeof obj === 'object' && obj[PY_CLASS] !== undefined &&
+                obj[PY_CLASS].__mro__.includes(classConstructor)
+        });
+        prototype.__class__ = name;
+        classConstructor.prototype = prototype;
+        classConstructor.__name__ = name;
+        classConstructor.__bases__ = bases;
+        classConstructor.__mro__ = mro;
+
+        // Execute the class body with its own namespace, then copy it to the prototype.
+        // Functions are shared by all instances through one wrapper that passes the receiver as self.
+        const namespace = frame[1];
+        namespace.__module__ = frame[0].__name__;
+        body(frame);
+
+        for (const [key, value] of Object.entries(namespace)) {
+            prototype[key] = this.isPythonFunction(value) ? this.createMethod(value) : value;
+            classConstructor[key] = value;
         }
-        
-        throw new Error(`Invalid import statement: ${line}`);
+        slots = this.slotLayout(mro);
+        return classConstructor;
     }
 
-    parseFunction(lines, startIndex) {
-        const line = lines[startIndex].trim();
-        const match = line.match(/^def\s+(\w+)\s*\(([^)]*)\)\s*(?:->\s*(.+))?\s*:$/);
-        if (!match) {
-            throw new Error(`Invalid function definition: ${line}`);
-        }
-        
-        const name = match[1];
-        const params = match[2] ? match[2].split(',').map(p => p.trim()).filter(p => p) : [];
-        const returnType = match[3] ? match[3].trim() : null;
-        
-        const [body, endIndex] = this.parseBlock(lines, startIndex + 1);
-        
-        return [{ type: 'FunctionDef', name, params, returnType, body }, endIndex];
+    isPythonClass(value) {
+        return typeof value === 'function' && value.prototype !== undefined && value.prototype[PY_CLASS] === value;
     }
 
-    parseClass(lines, startIndex) {
-        const line = lines[startIndex].trim();
-        const match = line.match(/^class\s+(\w+)(?:\s*\(([^)]*)\))?\s*:$/);
-        if (!match) {
-            throw new Error(`Invalid class definition: ${line}`);
-        }
-        
-        const name = match[1];
-        const bases = match[2] ? match[2].split(',').map(b => b.trim()).filter(b => b) : [];
-        
-        const [body, endIndex] = this.parseBlock(lines, startIndex + 1);
-        
-        return [{ type: 'ClassDef', name, bases, body }, endIndex];
+    isPythonFunction(value) {
+        return typeof value === 'function' && value.__name__ !== undefined && !Object.prototype.hasOwnProperty.call(value, 'prototype');
     }
 
-    parseForLoop(lines, startIndex) {
-        const line = lines[startIndex].trim();
-        const match = line.match(/^for\s+(\w+)\s+in\s+(.+?)\s*:$/);
-        if (!match) {
-            throw new Error(`Invalid for loop: ${line}`);
-        }
-        
-        const variable = match[1];
-        const tokens = this.tokenize(match[2]);
-        const [iterable] = this.parseExpression(tokens);
-        
-        const [body, endIndex] = this.parseBlock(lines, startIndex + 1);
-        
-        return [{ type: 'ForLoop', variable, iterable, body }, endIndex];
+    createMethod(func) {
+        const method = function(...args) {
+            return func(this, ...args);
+        };
+        method[METHOD_FUNCTION] = func;
+        return method;
     }
 
-    parseWhileLoop(lines, startIndex) {
-        const line = lines[startIndex].trim();
-        const match = line.match(/^while\s+(.+?)\s*:$/);
-        if (!match) {
-            throw new Error(`Invalid while loop: ${line}`);
+    linearize(cls, bases) {
+        // C3 linearization, as in Python; builtin bases such as Exception are their own MRO
+        // followed by object, which also ends the MRO of a class without bases.
+        const parents = bases.length > 0 ? bases : [PyObject];
+        const sequences = parents.map(base => {
+            if (this.isPythonClass(base)) return [...base.__mro__];
+            return base === PyObject ? [base] : [base, PyObject];
+        });
+        sequences.push([...parents]);
+        const mro = [cls];
+        for (;;) {
+            const remaining = sequences.filter(sequence => sequence.length > 0);
+            if (remaining.length === 0) break;
+            const head = remaining.map(sequence => sequence[0])
+                .find(candidate => remaining.every(sequence => sequence.indexOf(candidate) <= 0));
+            if (head === undefined) {
+                const names = bases.map(base => base.__name__ || base.name).join(', ');
+                throw new this.builtins.TypeError(`Cannot create a consistent method resolution order (MRO) for bases ${names}`);
+            }
+            mro.push(head);
+            for (const sequence of remaining) {
+                if (sequence[0] === head) sequence.shift();
+            }
         }
-        
-        const tokens = this.tokenize(match[1]);
-        const [condition] = this.parseExpression(tokens);
-        
-        const [body, endIndex] = this.parseBlock(lines, startIndex + 1);
-        
-        return [{ type: 'WhileLoop', condition, body }, endIndex];
+        mro.__class__ = 'tuple';
+        return mro;
     }
 
-    parseIfStatement(lines, startIndex) {
-        const line = lines[startIndex].trim();
-        const match = line.match(/^if\s+(.+?)\s*:$/);
-        if (!match) {
-            throw new Error(`Invalid if statement: ${line}`);
-        }
-        
-        const tokens = this.tokenize(match[1]);
-        const [condition] = this.parseExpression(tokens);
-        
-        const [body, nextIndex] = this.parseBlock(lines, startIndex + 1);
-        let currentIndex = nextIndex;
-        
-        const elifBranches = [];
-        let elseBranch = null;
-        
-        while (currentIndex < lines.length) {
-            const nextLine = lines[currentIndex].trim();
-            
-            if (nextLine.startsWith('elif ')) {
-                const elifMatch = nextLine.match(/^elif\s+(.+?)\s*:$/);
-                if (!elifMatch) {
-                    throw new Error(`Invalid elif statement: ${nextLine}`);
-                }
-                
-                const elifTokens = this.tokenize(elifMatch[1]);
-                const [elifCondition] = this.parseExpression(elifTokens);
-                const [elifBody, elifEndIndex] = this.parseBlock(lines, currentIndex + 1);
-                
-                elifBranches.push({ condition: elifCondition, body: elifBody });
-                currentIndex = elifEndIndex;
-            } else if (nextLine === 'else:') {
-                const [elseBody, elseEndIndex] = this.parseBlock(lines, currentIndex + 1);
-                elseBranch = elseBody;
-                currentIndex = elseEndIndex;
-                break;
-            } else {
-                break;
+    inheritAlongMro(cls, prototype, mro) {
+        // The prototype chain only follows the first base; attributes the MRO resolves to a
+        // later base are copied onto the new prototype and class instead.
+        const classes = mro.slice(1).filter(base => this.isPythonClass(base));
+        const keys = new Set(classes.flatMap(base => Object.keys(base.prototype)));
+        for (const key of keys) {
+            const owner = classes.find(base => Object.prototype.hasOwnProperty.call(base.prototype, key));
+            if (prototype[key] !== owner.prototype[key]) {
+                prototype[key] = owner.prototype[key];
+                cls[key] = owner[key];
             }
         }
-        
-        return [{ type: 'IfStatement', condition, body, elifBranches, elseBranch }, currentIndex];
     }
 
-    parseTryStatement(lines, startIndex) {
-        const [body, nextIndex] = this.parseBlock(lines, startIndex + 1);
-        let currentIndex = nextIndex;
-        
-        const exceptClauses = [];
-        let elseBranch = null;
-        let finallyBranch = null;
-        
-        while (currentIndex < lines.length) {
-            const line = lines[currentIndex].trim();
-            
-            if (line.startsWith('except')) {
-                const exceptMatch = line.match(/^except(?:\s+(.+?))?\s*:$/);
-                const exceptionType = exceptMatch[1] || null;
-                const [exceptBody, exceptEndIndex] = this.parseBlock(lines, currentIndex + 1);
-                exceptClauses.push({ exceptionType, body: exceptBody });
-                currentIndex = exceptEndIndex;
-            } else if (line === 'else:') {
-                const [elseBody, elseEndIndex] = this.parseBlock(lines, currentIndex + 1);
-                elseBranch = elseBody;
-                currentIndex = elseEndIndex;
-            } else if (line === 'finally:') {
-                const [finallyBody, finallyEndIndex] = this.parseBlock(lines, currentIndex + 1);
-                finallyBranch = finallyBody;
-                currentIndex = finallyEndIndex;
-                break;
-            } else {
-                break;
+    slotLayout(mro) {
+        // Instances only get a fixed layout when every Python class in the MRO declares __slots__.
+        const layout = [];
+        for (const cls of mro) {
+            if (!this.isPythonClass(cls)) continue;
+            if (!Object.prototype.hasOwnProperty.call(cls, '__slots__')) return null;
+            const declared = cls.__slots__;
+            for (const slot of typeof declared === 'string' ? [declared] : this.iterate(declared)) {
+                if (!layout.includes(slot)) layout.push(slot);
             }
         }
-        
-        return [{ type: 'TryStatement', body, exceptClauses, elseBranch, finallyBranch }, currentIndex];
+        return layout;
     }
 
-    parseWithStatement(lines, startIndex) {
-        const line = lines[startIndex].trim();
-        const match = line.match(/^with\s+(.+?)\s*:$/);
-        if (!match) {
-            throw new Error(`Invalid with statement: ${line}`);
-        }
-        
-        const tokens = this.tokenize(match[1]);
-        const [context] = this.parseExpression(tokens);
-        
-        const [body, endIndex] = this.parseBlock(lines, startIndex + 1);
-        
-        return [{ type: 'WithStatement', context, body }, endIndex];
-    }
-
-    parseControlStatement(line) {
-        if (line === 'pass') {
-            return { type: 'Pass' };
-        } else if (line === 'break') {
-            return { type: 'Break' };
-        } else if (line === 'continue') {
-            return { type: 'Continue' };
-        } else if (line.startsWith('return')) {
-            const returnMatch = line.match(/^return(?:\s+(.+))?$/);
-            const value = returnMatch[1] ? this.parseExpression(this.tokenize(returnMatch[1]))[0] : null;
-            return { type: 'Return', value };
-        } else if (line.startsWith('yield')) {
-            const yieldMatch = line.match(/^yield(?:\s+(.+))?$/);
-            const value = yieldMatch[1] ? this.parseExpression(this.tokenize(yieldMatch[1]))[0] : null;
-            return { type: 'Yield', value };
-        } else if (line.startsWith('raise')) {
-            const raiseMatch = line.match(/^raise(?:\s+(.+))?$/);
-            const exception = raiseMatch[1] ? this.parseExpression(this.tokenize(raiseMatch[1]))[0] : null;
-            return { type: 'Raise', exception };
+    bindMethod(obj, attribute, method) {
+        // Bound methods are created on first access and cached on the instance.
+        const func = method[METHOD_FUNCTION];
+        let cache = obj[BOUND_METHODS];
+        let bound = cache !== undefined ? cache.get(attribute) : undefined;
+        if (bound !== undefined && bound.__func__ === func) return bound;
+        bound = (...args) => func(obj, ...args);
+        bound.__name__ = func.__name__;
+        bound.__self__ = obj;
+        bound.__func__ = func;
+        if (cache === undefined && Object.isExtensible(obj)) {
+            cache = new Map();
+            Object.defineProperty(obj, BOUND_METHODS, { value: cache });
         }
-        
-        throw new Error(`Unknown control statement: ${line}`);
+        if (cache !== undefined) cache.set(attribute, bound);
+        return bound;
     }
 
-    parseBlock(lines, startIndex) {
-        const statements = [];
-        let currentIndex = startIndex;
-        const expectedIndent = this.getIndentation(lines[startIndex] || '');
-        
-        while (currentIndex < lines.length) {
-            const line = lines[currentIndex];
-            const trimmedLine = line.trim();
-            
-            if (!trimmedLine || trimmedLine.startsWith('#')) {
-                currentIndex++;
-                continue;
+    compileForLoop(statement) {
+        const iterable = this.compileExpression(statement.iterable);
+        const assign = this.compileTarget(statement.target);
+        const body = this.compileBlock(statement.body);
+        const elseBranch = statement.elseBranch ? this.compileBlock(statement.elseBranch) : null;
+
+        return (frame) => {
+            const items = this.iterate(iterable(frame));
+            if (items instanceof PyRange && !items.big) {
+                // Step through the range arithmetically instead of through the iterator protocol.
+                for (let index = 0, item = items.start; index < items.length; index++, item += items.step) {
+                    if (++this.steps >= this.stepCheck) this.checkSteps();
+                    assign(frame, item);
+
+                    const result = body(frame);
+                    if (result === BREAK_SIGNAL) {
+                        return null;
+                    } else if (result && result.type === 'return') {
+                        return result;
+                    }
+                }
+                return elseBranch ? elseBranch(frame) : null;
             }
-            
-            const indent = this.getIndentation(line);
-            if (indent < expectedIndent) {
-                break;
+
+            for (const item of items) {
+                if (++this.steps >= this.stepCheck) this.checkSteps();
+                assign(frame, item);
+
+                const result = body(frame);
+                if (result === BREAK_SIGNAL) {
+                    return null;
+                } else if (result && result.type === 'return') {
+                    return result;
+                }
             }
-            
-            if (indent > expectedIndent) {
-                throw new Error(`Unexpected indentation at line ${currentIndex + 1}`);
+
+            return elseBranch ? elseBranch(frame) : null;
+        };
+    }
+
+    compileWhileLoop(statement) {
+        const condition = this.compileExpression(statement.condition);
+        const body = this.compileBlock(statement.body);
+        const elseBranch = statement.elseBranch ? this.compileBlock(statement.elseBranch) : null;
+
+        return (frame) => {
+            while (condition(frame)) {
+                if (++this.steps >= this.stepCheck) this.checkSteps();
+                const result = body(frame);
+                if (result === BREAK_SIGNAL) {
+                    return null;
+                } else if (result && result.type === 'return') {
+                    return result;
+                }
             }
-            
-            const subStatements = this.parseStatements(trimmedLine);
-            statements.push(...subStatements);
-            currentIndex++;
+
+            return elseBranch ? elseBranch(frame) : null;
+        };
+    }
+
+    compileIfStatement(statement) {
+        const branches = [
+            { condition: this.compileExpression(statement.condition), body: this.compileBlock(statement.body) },
+            ...statement.elifBranches.map(branch => ({
+                condition: this.compileExpression(branch.condition),
+                body: this.compileBlock(branch.body)
+            }))
+        ];
+        const elseBranch = statement.elseBranch ? this.compileBlock(statement.elseBranch) : null;
+
+        if (branches.length === 1) {
+            const [{ condition, body }] = branches;
+            return (frame) => (condition(frame)) ? body(frame) : (elseBranch ? elseBranch(frame) : null);
         }
-        
-        return [statements, currentIndex];
+        return (frame) => {
+            for (const branch of branches) {
+                if (branch.condition(frame)) {
+                    return branch.body(frame);
+                }
+            }
+            return elseBranch ? elseBranch(frame) : null;
+        };
     }
 
-    getIndentation(line) {
-        const match = line.match(/^(\s*)/);
-        return match ? match[1].length : 0;
+    compileTryStatement(statement, compileBody = (block) => this.compileBlock(block)) {
+        const body = compileBody(statement.body);
+        const clauses = statement.exceptClauses.map(clause => ({
+            exceptionType: clause.exceptionType ? this.compileExpression(clause.exceptionType) : null,
+            store: clause.name ? this.compileNameStore(clause.name) : null,
+            body: compileBody(clause.body)
+        }));
+        const elseBranch = statement.elseBranch ? compileBody(statement.elseBranch) : null;
+        const finallyBranch = statement.finallyBranch ? compileBody(statement.finallyBranch) : null;
+
+        return (frame) => {
+            let result = null;
+            try {
+                let raised = false;
+                try {
+                    result = body(frame);
+                } catch (caught) {
+                    raised = true;
+                    const error = this.pythonException(caught);
+                    const clause = this.findExceptClause(frame, clauses, error);
+                    if (!clause) throw error;
+
+                    if (clause.store) clause.store(frame, error);
+                    this.activeExceptions.push(error);
+                    try {
+                        result = clause.body(frame);
+                    } finally {
+                        this.activeExceptions.pop();
+                    }
+                }
+
+                if (!raised && !result && elseBranch) {
+                    result = elseBranch(frame);
+                }
+            } finally {
+                if (finallyBranch) {
+                    result = detachReturn(result);
+                    const finallyResult = finallyBranch(frame);
+                    if (finallyResult) return finallyResult;
+                }
+            }
+            return result;
+        };
     }
 
-    isAssignment(tokens) {
-        for (let i = 0; i < tokens.length; i++) {
-            if (tokens[i].value === '=' && (i === 0 || tokens[i-1].value !== '=' && tokens[i-1].value !== '!' && tokens[i-1].value !== '<' && tokens[i-1].value !== '>')) {
-                return true;
+    findExceptClause(frame, clauses, error) {
+        for (const clause of clauses) {
+            if (!clause.exceptionType) return clause;
+            const exceptionType = clause.exceptionType(frame);
+            const candidates = Array.isArray(exceptionType) ? exceptionType : [exceptionType];
+            if (candidates.some(candidate => this.exceptionMatches(error, candidate))) {
+                return clause;
             }
         }
-        return false;
+        return null;
     }
 
-    parseAssignment(tokens) {
-        let equalIndex = -1;
-        for (let i = 0; i < tokens.length; i++) {
-            if (tokens[i].value === '=' && (i === 0 || tokens[i-1].value !== '=' && tokens[i-1].value !== '!' && tokens[i-1].value !== '<' && tokens[i-1].value !== '>')) {
-                equalIndex = i;
-                break;
-            }
+    pythonException(error) {
+        // Interpreter-internal errors carry the Python type as a message prefix, as in
+        // "TypeError: unhashable type: 'list'". Python code sees them as that exception.
+        if (error instanceof RangeError && String(error.message).includes('call stack')) {
+            // Recursion that outruns the JS stack before reaching the recursion limit.
+            return new this.builtins.RecursionError('maximum recursion depth exceeded');
         }
-        
-        if (equalIndex === -1) {
-            throw new Error('Assignment operator not found');
+        if (!(error instanceof Error) || error.name !== 'Error' || typeof error.message !== 'string') return error;
+        const match = /^(\w+): /.exec(error.message);
+        const type = match && Object.prototype.hasOwnProperty.call(this.builtins, match[1]) ? this.builtins[match[1]] : null;
+        if (typeof type !== 'function' || !(type.prototype instanceof this.builtins.BaseException)) return error;
+        const converted = new type(error.message.slice(match[0].length));
+        if (error.pythonTraceback) {
+            Object.defineProperty(converted, 'pythonTraceback', { value: error.pythonTraceback, writable: true, configurable: true });
         }
-        
-        const targetTokens = tokens.slice(0, equalIndex);
-        const valueTokens = tokens.slice(equalIndex + 1);
-        
-        const [target] = this.parseExpression(targetTokens);
-        const [value] = this.parseExpression(valueTokens);
-        
-        return { type: 'Assignment', target, value };
+        return converted;
     }
 
-    async executeCode(code) {
-        this.printOutput = [];
-        
-        try {
-            const statements = this.parseStatements(code);
-            let result = null;
-            
-            for (const statement of statements) {
-                result = await this.executeStatement(statement);
-                if (result && (result.type === 'return' || result.type === 'break' || result.type === 'continue')) {
-                    break;
+    exceptionMatches(error, exceptionType) {
+        if (typeof exceptionType !== 'function') return false;
+        if (exceptionType === this.builtins.BaseException || exceptionType === this.builtins.Exception) {
+            return error instanceof Error || (error !== null && typeof error === 'object');
+        }
+        if (error instanceof exceptionType) return true;
+        // Interpreter-internal errors carry the Python type as a message prefix.
+        return error instanceof Error && error.name === 'Error' &&
+            typeof error.message === 'string' && error.message.startsWith(`${exceptionType.name}:`);
+    }
+
+    compileWithStatement(statement, compileBody = (block) => this.compileBlock(block)) {
+        // Nest the context managers from the innermost item outwards.
+        let inner = compileBody(statement.body);
+        for (let i = statement.items.length - 1; i >= 0; i--) {
+            const context = this.compileExpression(statement.items[i].context);
+            const assign = statement.items[i].target ? this.compileTarget(statement.items[i].target) : null;
+            const body = inner;
+            inner = (frame) => {
+                const manager = context(frame);
+                let value = manager;
+                if (manager && typeof manager.__enter__ === 'function') {
+                    value = manager.__enter__();
                 }
-            }
-            
-            this.logExecution(`Executed ${statements.length} statements`);
-            return this.printOutput.join('\n');
-        } catch (error) {
-            this.logExecution(`Execution error: ${error.message}`);
-            throw error;
+                if (assign) {
+                    assign(frame, value);
+                }
+
+                let result;
+                try {
+                    result = body(frame);
+                } catch (error) {
+                    if (manager && typeof manager.__exit__ === 'function') {
+                        const suppress = manager.__exit__(error.constructor, error, null);
+                        if (suppress) return null;
+                    }
+                    throw error;
+                }
+                if (manager && typeof manager.__exit__ === 'function') {
+                    result = detachReturn(result);
+                    manager.__exit__(null, null, null);
+                }
+                return result;
+            };
         }
+        return inner;
     }
 
-    async executeStatement(statement) {
-        if (!statement) return null;
-        
+    compileBytecode(statements, scope, kind, name) {
+        const builder = new CodeBuilder(name, kind, scope);
+        this.withCompileScope(scope, () => {
+            for (const statement of statements) this.emitStatement(builder, statement);
+        });
+        builder.emit(OP_RETURN_NONE);
+        return builder.finish();
+    }
+
+    compileBytecodeBlock(statements, name) {
+        // Blocks run by closure-compiled statements (try, with) share the enclosing frame.
+        const code = this.compileBytecode(statements, this.compileScope, 'block', name);
+        return (frame) => this.runCode(code, frame);
+    }
+
+    emitBlock(builder, statements) {
+        for (const statement of statements) this.emitStatement(builder, statement);
+    }
+
+    emitStatement(builder, statement) {
+        builder.setLine(statement.line);
         switch (statement.type) {
-            case 'Import':
-                return await this.executeImport(statement);
-                
-            case 'FromImport':
-                return await this.executeFromImport(statement);
-                
-            case 'Assignment':
-                return await this.executeAssignment(statement);
-                
             case 'ExpressionStatement':
-                return await this.evaluateNode(statement.expression);
-                
+                this.emitExpression(builder, statement.expression);
+                builder.emit(OP_POP_TOP, 0, -1);
+                return;
+
+            case 'Assignment':
+                this.emitExpression(builder, statement.value);
+                statement.targets.forEach((target, i) => {
+                    if (i < statement.targets.length - 1) builder.emit(OP_DUP_TOP, 0, 1);
+                    this.emitStore(builder, target);
+                });
+                return;
+
+            case 'AugmentedAssignment':
+                if (statement.target.type !== 'Identifier') break;
+                this.emitNameLoad(builder, statement.target.name);
+                this.emitExpression(builder, statement.value);
+                if (this.binaryOperators[`${statement.operator}=`]) {
+                    builder.emit(OP_BINARY_OP, builder.constant(this.getInPlaceOperator(statement.operator)), -1);
+                } else {
+                    this.emitBinaryOperator(builder, statement.operator);
+                }
+                this.emitNameStore(builder, statement.target.name);
+                return;
+
             case 'FunctionDef':
-                return this.executeFunctionDef(statement);
-                
+                // Generator bodies suspend, so they are compiled to JS generators by the closure compiler.
+                if (this.compileScope.children.get(statement).generator) break;
+                this.emitFunction(builder, statement.name, statement, statement.params, statement.body, false);
+                this.emitDecorators(builder, statement.decorators);
+                this.emitNameStore(builder, statement.name);
+                return;
+
             case 'ClassDef':
-                return this.executeClassDef(statement);
-                
-            case 'ForLoop':
-                return await this.executeForLoop(statement);
-                
-            case 'WhileLoop':
-                return await this.executeWhileLoop(statement);
-                
+                this.emitClass(builder, statement);
+                this.emitDecorators(builder, statement.decorators);
+                this.emitNameStore(builder, statement.name);
+                return;
+
             case 'IfStatement':
-                return await this.executeIfStatement(statement);
-                
-            case 'TryStatement':
-                return await this.executeTryStatement(statement);
-                
-            case 'WithStatement':
-                return await this.executeWithStatement(statement);
-                
+                this.emitIfStatement(builder, statement);
+                return;
+
+            case 'WhileLoop':
+                this.emitWhileLoop(builder, statement);
+                return;
+
+            case 'ForLoop':
+                this.emitForLoop(builder, statement);
+                return;
+
             case 'Return':
-                const returnValue = statement.value ? await this.evaluateNode(statement.value) : null;
-                return { type: 'return', value: returnValue };
-                
-            case 'Yield':
-                const yieldValue = statement.value ? await this.evaluateNode(statement.value) : null;
-                return { type: 'yield', value: yieldValue };
-                
+                this.emitExpression(builder, statement.value);
+                builder.emit(OP_RETURN_VALUE, 0, -1);
+                return;
+
             case 'Break':
-                return { type: 'break' };
-                
-            case 'Continue':
-                return { type: 'continue' };
-                
+            case 'Continue': {
+                const loop = builder.loops[builder.loops.length - 1];
+                if (!loop) {
+                    builder.emit(statement.type === 'Break' ? OP_BREAK_OUT : OP_CONTINUE_OUT);
+                } else {
+                    builder.jump(OP_JUMP, statement.type === 'Break' ? loop.breakLabel : loop.continueLabel);
+                }
+                return;
+            }
+
             case 'Pass':
-                return null;
-                
-            case 'Raise':
-                const exception = statement.exception ? await this.evaluateNode(statement.exception) : new Error('Exception');
-                throw exception;
-                
-            default:
-                throw new Error(`Unknown statement type: ${statement.type}`);
+            case 'Global':
+            case 'Nonlocal':
+                return;
+
+            case 'TryStatement':
+                this.emitExec(builder, this.compileTryStatement(statement, (block) => this.compileBytecodeBlock(block, builder.name)));
+                return;
+
+            case 'WithStatement':
+                this.emitExec(builder, this.compileWithStatement(statement, (block) => this.compileBytecodeBlock(block, builder.name)));
+                return;
+        }
+        this.emitExec(builder, this.compileStatement(statement));
+    }
+
+    emitExec(builder, run) {
+        // Closure-compiled statements report break/continue/return as signals; EXEC maps them onto this code.
+        const loop = builder.loops[builder.loops.length - 1];
+        const entry = { run, breakTarget: -1, continueTarget: -1 };
+        builder.target(entry, 'breakTarget', loop ? loop.breakLabel : null);
+        builder.target(entry, 'continueTarget', loop ? loop.continueLabel : null);
+        builder.emit(OP_EXEC, builder.constant(entry));
+    }
+
+    emitIfStatement(builder, statement) {
+        const branches = [{ condition: statement.condition, body: statement.body }, ...statement.elifBranches];
+        const end = builder.label();
+        branches.forEach((branch, i) => {
+            const next = builder.label();
+            this.emitExpression(builder, branch.condition);
+            builder.jump(OP_POP_JUMP_IF_FALSE, next, -1);
+            this.emitBlock(builder, branch.body);
+            if (i < branches.length - 1 || statement.elseBranch) builder.jump(OP_JUMP, end);
+            builder.mark(next);
+        });
+        if (statement.elseBranch) this.emitBlock(builder, statement.elseBranch);
+        builder.mark(end);
+    }
+
+    emitWhileLoop(builder, statement) {
+        const top = builder.label();
+        const exhausted = builder.label();
+        const end = builder.label();
+        builder.mark(top);
+        const condition = statement.condition;
+        if (!(condition.type === 'Literal' && condition.value === true)) {
+            this.emitExpression(builder, condition);
+            builder.jump(OP_POP_JUMP_IF_FALSE, exhausted, -1);
+        }
+        builder.loops.push({ breakLabel: end, continueLabel: top });
+        this.emitBlock(builder, statement.body);
+        builder.loops.pop();
+        builder.jump(OP_JUMP, top);
+        builder.mark(exhausted);
+        if (statement.elseBranch) this.emitBlock(builder, statement.elseBranch);
+        builder.mark(end);
+    }
+
+    emitForLoop(builder, statement) {
+        // The iterator stays on the stack for the whole loop; break pops it before leaving.
+        const top = builder.label();
+        const breakLabel = builder.label();
+        const exhausted = builder.label();
+        const end = builder.label();
+        this.emitExpression(builder, statement.iterable);
+        builder.emit(OP_GET_ITER);
+        builder.mark(top);
+        builder.jump(OP_FOR_ITER, exhausted, 1);
+        this.emitStore(builder, statement.target);
+        builder.loops.push({ breakLabel, continueLabel: top });
+        this.emitBlock(builder, statement.body);
+        builder.loops.pop();
+        builder.jump(OP_JUMP, top);
+        builder.mark(breakLabel);
+        builder.emit(OP_POP_TOP, 0, -1);
+        builder.jump(OP_JUMP, end);
+        builder.mark(exhausted);
+        if (statement.elseBranch) this.emitBlock(builder, statement.elseBranch);
+        builder.mark(end);
+    }
+
+    emitFunction(builder, name, node, params, body, isExpression) {
+        const scope = this.compileScope.children.get(node);
+        const withDefaults = params.filter(param => param.default);
+        for (const param of withDefaults) this.emitExpression(builder, param.default);
+
+        let code;
+        if (isExpression) {
+            const lambda = new CodeBuilder(name, 'function', scope);
+            // Lambdas carry no line of their own; they report the line of the statement defining them.
+            lambda.setLine(builder.line);
+            this.withCompileScope(scope, () => this.emitExpression(lambda, body));
+            lambda.emit(OP_RETURN_VALUE, 0, -1);
+            code = lambda.finish();
+        } else {
+            code = this.compileBytecode(body, scope, 'function', name);
+        }
+
+        const first = !isExpression && body[0];
+        const doc = first && first.type === 'ExpressionStatement' && first.expression.type === 'Literal' &&
+            typeof first.expression.value === 'string' ? first.expression.value : null;
+        const entry = { name, node: isExpression ? null : node, params, signature: new Signature(name, params),
+            scope, outerScope: this.compileScope, code, doc, hasDefaults: params.map(param => Boolean(param.default)) };
+        builder.emit(OP_MAKE_FUNCTION, builder.constant(entry), 1 - withDefaults.length);
+    }
+
+    emitClass(builder, statement) {
+        const scope = this.compileScope.children.get(statement);
+        for (const base of statement.bases) this.emitExpression(builder, base);
+        const code = this.compileBytecode(statement.body, scope, 'block', statement.name);
+        const entry = { name: statement.name, node: statement, scope, outerScope: this.compileScope, code, bases: statement.bases.length };
+        builder.emit(OP_MAKE_CLASS, builder.constant(entry), 1 - statement.bases.length);
+    }
+
+    emitDecorators(builder, decorators) {
+        if (!decorators) return;
+        for (let i = decorators.length - 1; i >= 0; i--) {
+            this.emitExpression(builder, decorators[i]);
+            builder.emit(OP_DECORATE, 0, -1);
         }
     }
 
-    async executeImport(statement) {
-        for (const moduleName of statement.modules) {
-            const module = await this.loadModule(moduleName);
-            this.setVariable(moduleName, module);
+    emitNameLoad(builder, name) {
+        const scope = this.compileScope;
+        const kind = scope.resolution.get(name) || 'global';
+        if (kind === 'global') return builder.emit(OP_LOAD_GLOBAL, builder.nameIndex(name), 1);
+        if (kind === 'class') return builder.emit(OP_LOAD_CLASS, builder.nameIndex(name), 1);
+        const slot = scope.slots.get(name);
+        builder.emit(kind === 'free' || scope.cells.has(name) ? OP_LOAD_DEREF : OP_LOAD_FAST, slot, 1);
+    }
+
+    emitNameStore(builder, name) {
+        const scope = this.compileScope;
+        const kind = scope.resolution.get(name) || 'global';
+        if (kind === 'global') return builder.emit(OP_STORE_GLOBAL, builder.nameIndex(name), -1);
+        if (kind === 'class') return builder.emit(OP_STORE_CLASS, builder.nameIndex(name), -1);
+        const slot = scope.slots.get(name);
+        builder.emit(kind === 'free' || scope.cells.has(name) ? OP_STORE_DEREF : OP_STORE_FAST, slot, -1);
+    }
+
+    emitStore(builder, target) {
+        switch (target.type) {
+            case 'Identifier':
+                this.emitNameStore(builder, target.name);
+                return;
+
+            case 'Attribute':
+                this.emitExpression(builder, target.object);
+                builder.emit(OP_STORE_ATTR, builder.nameIndex(target.attribute), -2);
+                return;
+
+            case 'Subscript':
+                if (target.index.type === 'Slice') break;
+                this.emitExpression(builder, target.object);
+                this.emitExpression(builder, target.index);
+                builder.emit(OP_STORE_SUBSCR, 0, -3);
+                return;
+
+            case 'Tuple':
+            case 'List':
+                if (target.elements.some(element => element.type === 'Starred')) break;
+                builder.emit(OP_UNPACK_SEQUENCE, target.elements.length, target.elements.length - 1);
+                for (const element of target.elements) this.emitStore(builder, element);
+                return;
+        }
+        builder.emit(OP_STORE_TARGET, builder.constant(this.compileTarget(target)), -1);
+    }
+
+    emitBinaryOperator(builder, operator) {
+        const specialized = SPECIALIZED_BINARY_OPCODES.get(operator);
+        if (specialized) {
+            builder.emit(specialized, 0, -1);
+        } else {
+            builder.emit(OP_BINARY_OP, builder.constant(this.getBinaryOperator(operator)), -1);
         }
     }
 
-    async executeFromImport(statement) {
-        const module = await this.loadModule(statement.module);
-        
-        for (const item of statement.items) {
-            if (item.name === '*') {
-                for (const [name, value] of Object.entries(module)) {
-                    if (!name.startsWith('_')) {
-                        this.setVariable(name, value);
-                    }
+    emitExpression(builder, node) {
+        if (!node) return builder.emit(OP_LOAD_CONST, builder.constant(null), 1);
+
+        switch (node.type) {
+            case 'Literal':
+                return builder.emit(OP_LOAD_CONST, builder.constant(node.value), 1);
+
+            case 'Identifier':
+                return this.emitNameLoad(builder, node.name);
+
+            case 'BinaryOp': {
+                this.emitExpression(builder, node.left);
+                if (node.operator === 'and' || node.operator === 'or') {
+                    const end = builder.label();
+                    builder.jump(node.operator === 'and' ? OP_JUMP_IF_FALSE_OR_POP : OP_JUMP_IF_TRUE_OR_POP, end, -1);
+                    this.emitExpression(builder, node.right);
+                    builder.mark(end);
+                    return;
+                }
+                this.emitExpression(builder, node.right);
+                return this.emitBinaryOperator(builder, node.operator);
+            }
+
+            case 'Compare':
+                if (node.operators.length !== 1) break;
+                this.emitExpression(builder, node.left);
+                this.emitExpression(builder, node.comparators[0]);
+                return this.emitBinaryOperator(builder, node.operators[0]);
+
+            case 'UnaryOp':
+                if (!UNARY_OPCODES.has(node.operator)) break;
+                this.emitExpression(builder, node.operand);
+                return builder.emit(UNARY_OPCODES.get(node.operator));
+
+            case 'FunctionCall':
+                return this.emitCall(builder, node);
+
+            case 'Attribute':
+                this.emitExpression(builder, node.object);
+                return builder.emit(OP_LOAD_ATTR, builder.cache(this.emitAttributeCache(node.attribute)));
+
+            case 'Subscript':
+                this.emitExpression(builder, node.object);
+                if (node.index.type === 'Slice') {
+                    this.emitExpression(builder, node.index.lower);
+                    this.emitExpression(builder, node.index.upper);
+                    this.emitExpression(builder, node.index.step);
+                    return builder.emit(OP_BINARY_SLICE, 0, -3);
                 }
-            } else {
-                if (!(item.name in module)) {
-                    throw new Error(`cannot import name '${item.name}' from '${statement.module}'`);
+                this.emitExpression(builder, node.index);
+                return builder.emit(OP_BINARY_SUBSCR, 0, -1);
+
+            case 'List':
+            case 'Tuple':
+            case 'Set': {
+                if (node.elements.some(element => element.type === 'Starred')) break;
+                for (const element of node.elements) this.emitExpression(builder, element);
+                const op = node.type === 'List' ? OP_BUILD_LIST : node.type === 'Tuple' ? OP_BUILD_TUPLE : OP_BUILD_SET;
+                return builder.emit(op, node.elements.length, 1 - node.elements.length);
+            }
+
+            case 'Dict':
+                if (node.pairs.some(pair => pair.key === null)) break;
+                for (const pair of node.pairs) {
+                    this.emitExpression(builder, pair.key);
+                    this.emitExpression(builder, pair.value);
                 }
-                const varName = item.alias || item.name;
-                this.setVariable(varName, module[item.name]);
+                return builder.emit(OP_BUILD_DICT, node.pairs.length, 1 - 2 * node.pairs.length);
+
+            case 'IfExpression': {
+                const orelse = builder.label();
+                const end = builder.label();
+                this.emitExpression(builder, node.condition);
+                builder.jump(OP_POP_JUMP_IF_FALSE, orelse, -1);
+                this.emitExpression(builder, node.body);
+                builder.jump(OP_JUMP, end);
+                builder.mark(orelse);
+                builder.adjust(-1);
+                this.emitExpression(builder, node.orelse);
+                builder.mark(end);
+                return;
             }
+
+            case 'Lambda':
+                return this.emitFunction(builder, '<lambda>', node, node.params, node.body, true);
+
+            case 'NamedExpression':
+                this.emitExpression(builder, node.value);
+                builder.emit(OP_DUP_TOP, 0, 1);
+                return this.emitNameStore(builder, node.name);
         }
+        builder.emit(OP_EVAL, builder.constant(this.compileExpression(node)), 1);
     }
 
-    async executeAssignment(statement) {
-        const value = await this.evaluateNode(statement.value);
-        
-        if (statement.target.type === 'Identifier') {
-            this.setVariable(statement.target.name, value);
-        } else if (statement.target.type === 'Subscript') {
-            const obj = await this.evaluateNode(statement.target.object);
-            const index = await this.evaluateNode(statement.target.index);
-            obj[index] = value;
-        } else if (statement.target.type === 'Attribute') {
-            const obj = await this.evaluateNode(statement.target.object);
-            obj[statement.target.attribute] = value;
+    emitCall(builder, node) {
+        const method = node.function.type === 'Attribute';
+        if (method) {
+            this.emitExpression(builder, node.function.object);
+            builder.emit(OP_LOAD_METHOD, builder.cache(this.emitAttributeCache(node.function.attribute)), 1);
         } else {
-            throw new Error(`Invalid assignment target: ${statement.target.type}`);
+            this.emitExpression(builder, node.function);
         }
-        
-        return value;
+
+        const starred = node.arguments.some(argument => argument.type === 'Starred');
+        const keywords = node.keywords && node.keywords.length > 0 ? node.keywords : null;
+        if (!starred && !keywords) {
+            for (const argument of node.arguments) this.emitExpression(builder, argument);
+            const count = node.arguments.length;
+            return builder.emit(method ? OP_CALL_METHOD : OP_CALL, count, method ? -count - 1 : -count);
+        }
+
+        if (starred) {
+            builder.emit(OP_EVAL, builder.constant(this.compileElements(node.arguments)), 1);
+        } else {
+            for (const argument of node.arguments) this.emitExpression(builder, argument);
+            builder.emit(OP_BUILD_LIST, node.arguments.length, 1 - node.arguments.length);
+        }
+        if (keywords) {
+            for (const keyword of keywords) this.emitExpression(builder, keyword.value);
+            builder.emit(OP_BUILD_KWARGS, builder.constant(keywords.map(keyword => keyword.name)), 1 - keywords.length);
+        }
+        const flags = (method ? CALL_EX_METHOD : 0) | (keywords ? CALL_EX_KEYWORDS : 0);
+        builder.emit(OP_CALL_EX, flags, -1 - (method ? 1 : 0) - (keywords ? 1 : 0));
     }
 
-    executeFunctionDef(statement) {
-        const func = async (...args) => {
-            this.pushScope();
-            
-            try {
-                for (let i = 0; i < statement.params.length; i++) {
-                    this.setVariable(statement.params[i], args[i]);
-                }
-                
-                for (const stmt of statement.body) {
-                    const result = await this.executeStatement(stmt);
-                    if (result && result.type === 'return') {
-                        return result.value;
-                    }
-                }
-                
-                return null;
-            } finally {
-                this.popScope();
-            }
-        };
-        
-        func.__name__ = statement.name;
-        func.__doc__ = null;
-        
-        this.setVariable(statement.name, func);
-        this.functions.set(statement.name, statement);
-        
+    makeBytecodeFunction(entry, defaultValues, frame) {
+        const { name, scope, params, signature, code } = entry;
+        const defaults = params.map((param, i) => entry.hasDefaults[i] ? defaultValues.shift() : NO_DEFAULT);
+        const globals = frame[0];
+        const cells = this.captureCells(scope, entry.outerScope, frame);
+        const func = this.createFunction(name, scope, signature, defaults, this.codeRunner(code), globals, cells, true);
+        func.__doc__ = entry.doc;
+        // Calls with only positional arguments the signature accepts skip bindArguments.
+        func[VM_FUNCTION] = { code, scope, globals, cells, signature, defaults };
+        if (entry.node) this.functions.set(name, entry.node);
         return func;
     }
 
-    executeClassDef(statement) {
-        const classConstructor = function(...args) {
-            const instance = {};
-            instance.__class__ = statement.name;
-            
-            // Copy class methods to instance
-            for (const [name, method] of Object.entries(classConstructor.prototype)) {
-                if (typeof method === 'function') {
-                    instance[name] = function(...methodArgs) {
-                        return method.call(instance, ...methodArgs);
-                    };
-                }
-            }
-            
-            // Call __init__ if it exists
-            if (typeof instance.__init__ === 'function') {
-                instance.__init__(...args);
-            }
-            
-            return instance;
-        };
-        
-        classConstructor.__name__ = statement.name;
-        classConstructor.prototype = {};
-        
-        // Execute class body in a new scope
-        this.pushScope();
-        
-        try {
-            // Set up class context
-            this.setVariable('__class__', statement.name);
-            
-            for (const stmt of statement.body) {
-                this.executeStatement(stmt);
-            }
-            
-            // Copy all functions from class scope to prototype
-            const classScope = this.getCurrentScope();
-            for (const [name, value] of Object.entries(classScope)) {
-                if (typeof value === 'function' && name !== '__class__') {
-                    classConstructor.prototype[name] = value;
-                }
-            }
-        } finally {
-            this.popScope();
+    codeRunner(code) {
+        // Kept out of runCode: a closure there would make every run allocate a context for it.
+        return (frame) => this.runCode(code, frame);
+    }
+
+    bytecodeFrame(record, stack, base, count) {
+        if (this.callDepth + this.nestedCalls >= this.recursionLimit) {
+            throw new this.builtins.RecursionError('maximum recursion depth exceeded');
         }
-        
-        this.setVariable(statement.name, classConstructor);
-        this.classes.set(statement.name, statement);
-        
-        return classConstructor;
+        const scope = record.scope;
+        const frame = this.acquireFrame(scope);
+        frame[0] = record.globals;
+        for (let i = 0; i < count; i++) frame[i + 1] = stack[base + i];
+        for (let i = count; i < record.signature.arity; i++) frame[i + 1] = record.defaults[i];
+        if (scope.cells.size > 0) this.prepareFrame(scope, frame);
+        if (record.cells.length > 0) this.installCells(scope, frame, record.cells);
+        return frame;
     }
 
-    async executeForLoop(statement) {
-        const iterable = await this.evaluateNode(statement.iterable);
-        
-        if (!iterable || typeof iterable[Symbol.iterator] !== 'function') {
-            throw new Error(`'${typeof iterable}' object is not iterable`);
+    boundBytecodeFrame(record, args) {
+        // Keyword and starred calls: bindArguments places the arguments.
+        if (this.callDepth + this.nestedCalls >= this.recursionLimit) {
+            throw new this.builtins.RecursionError('maximum recursion depth exceeded');
         }
-        
-        for (const item of iterable) {
-            this.setVariable(statement.variable, item);
-            
-            for (const stmt of statement.body) {
-                const result = await this.executeStatement(stmt);
-                if (result && result.type === 'break') {
-                    return;
-                } else if (result && result.type === 'continue') {
-                    break;
-                } else if (result && result.type === 'return') {
-                    return result;
-                }
-            }
+        const scope = record.scope;
+        const frame = this.acquireFrame(scope);
+        frame[0] = record.globals;
+        this.bindArguments(record.signature, record.defaults, args, frame);
+        if (scope.cells.size > 0) this.prepareFrame(scope, frame);
+        if (record.cells.length > 0) this.installCells(scope, frame, record.cells);
+        return frame;
+    }
+
+    pushActivation(code, frame, stack, sp, pc, scope) {
+        let activation = this.activations[this.callDepth];
+        if (activation === undefined) {
+            activation = { code: null, frame: null, stack: null, sp: 0, pc: 0, scope: null };
+            this.activations[this.callDepth] = activation;
         }
+        activation.code = code;
+        activation.frame = frame;
+        activation.stack = stack;
+        activation.sp = sp;
+        activation.pc = pc;
+        activation.scope = scope;
+        this.callDepth++;
     }
 
-    async executeWhileLoop(statement) {
-        while (await this.evaluateNode(statement.condition)) {
-            for (const stmt of statement.body) {
-                const result = await this.executeStatement(stmt);
-                if (result && result.type === 'break') {
-                    return;
-                } else if (result && result.type === 'continue') {
-                    break;
-                } else if (result && result.type === 'return') {
-                    return result;
-                }
-            }
+    beginSteps() {
+        this.steps = 0;
+        this.cpuTime = 0;
+        this.sliceStart = performance.now();
+        this.nextSlice = this.sliceSteps;
+        if (this.sampler !== null) this.sampler.resume();
+        this.stepCheck = this.nextStepCheck();
+    }
+
+    nextStepCheck() {
+        let next = Infinity;
+        if (this.maxSteps > 0) next = this.maxSteps + 1;
+        if (this.timeLimit > 0) next = Math.min(next, this.steps + TIME_CHECK_STEPS);
+        if (this.sliceSteps > 0 && this.suspendable) next = Math.min(next, this.nextSlice);
+        if (this.sampler !== null) {
+            // A random distance keeps samples from always landing on the same step of a loop.
+            next = Math.min(next, this.steps + 1 + Math.floor(Math.random() * 2 * SAMPLE_CHECK_STEPS));
         }
+        return next;
     }
 
-    async executeIfStatement(statement) {
-        if (await this.evaluateNode(statement.condition)) {
-            for (const stmt of statement.body) {
-                const result = await this.executeStatement(stmt);
-                if (result && (result.type === 'return' || result.type === 'break' || result.type === 'continue')) {
-                    return result;
-                }
-            }
+    checkSteps(code = null, frame = null, pc = 0) {
+        // The VM passes its running code and frame, which are not on the activation stack.
+        if (this.sampler !== null) {
+            const now = performance.now();
+            if (now >= this.sampler.next) this.sampler.sample(this.activations, this.callDepth, code, frame, pc, now);
+        }
+        // A run over budget stays over it: every later step raises again, so a script cannot
+        // swallow the TimeoutError and carry on.
+        if (this.maxSteps > 0 && this.steps > this.maxSteps) {
+            this.stepCheck = this.steps + 1;
+            throw new this.builtins.TimeoutError(`step limit of ${this.maxSteps} exceeded`);
+        }
+        if (this.timeLimit > 0 && this.cpuTime + performance.now() - this.sliceStart > this.timeLimit) {
+            this.stepCheck = this.steps + 1;
+            throw new this.builtins.TimeoutError(`time limit of ${this.timeLimit} ms exceeded`);
+        }
+        if (this.sliceSteps > 0 && this.steps >= this.nextSlice) {
+            this.nextSlice = this.steps + this.sliceSteps;
+            this.suspend(0);
+        }
+        this.stepCheck = this.nextStepCheck();
+    }
+
+    suspend(delay = 0) {
+        // Asks the outermost VM run of executeCode to pause at its next call boundary, so that
+        // the host's event loop gets control for at least `delay` ms.
+        if (this.suspendable) this.pendingSuspend = Math.max(this.pendingSuspend, delay);
+    }
+
+    cancel() {
+        // Stops the current executeCode run when it next pauses. A run that never pauses can only
+        // be stopped by its host, e.g. by terminating the worker it runs in.
+        if (this.suspendable) this.cancelRequested = true;
+    }
+
+    resumeCode(suspension) {
+        return this.runCode(suspension.code, suspension.frame, suspension);
+    }
+
+    releaseStack(code, stack) {
+        if (code.stacks.length < FRAME_POOL_SIZE) {
+            for (let i = 0; i < stack.length; i++) stack[i] = null;
+            code.stacks.push(stack);
+        }
+    }
+
+    runCode(code, frame, suspension = null) {
+        // Calls between bytecode functions stay in this loop: the caller's registers go onto
+        // this.activations and the callee's frame (owned by `scope`) becomes the current one.
+        // Only the activations above entryDepth belong to this run.
+        const entryDepth = this.callDepth;
+        let scope = null;
+        let stack;
+        let sp = 0;
+        let pc = 0;
+        if (suspension === null) {
+            stack = code.stacks.length > 0 ? code.stacks.pop() : new Array(code.stackSize).fill(null);
         } else {
-            for (const elifBranch of statement.elifBranches) {
-                if (await this.evaluateNode(elifBranch.condition)) {
-                    for (const stmt of elifBranch.body) {
-                        const result = await this.executeStatement(stmt);
-                        if (result && (result.type === 'return' || result.type === 'break' || result.type === 'continue')) {
-                            return result;
-                        }
-                    }
-                    return;
-                }
-            }
-            
-            if (statement.elseBranch) {
-                for (const stmt of statement.elseBranch) {
-                    const result = await this.executeStatement(stmt);
-                    if (result && (result.type === 'return' || result.type === 'break' || result.type === 'continue')) {
-                        return result;
-                    }
-                }
+            for (const activation of suspension.activations) {
+                this.pushActivation(activation.code, activation.frame, activation.stack, activation.sp, activation.pc, activation.scope);
             }
+            stack = suspension.stack;
+            sp = suspension.sp;
+            pc = suspension.pc;
+            scope = suspension.scope;
         }
-    }
+        let instructions = code.instructions;
+        let constants = code.constants;
+        let names = code.names;
+        let caches = code.caches;
+        this.vmRuns++;
 
-    async executeTryStatement(statement) {
         try {
-            for (const stmt of statement.body) {
-                const result = await this.executeStatement(stmt);
-                if (result && (result.type === 'return' || result.type === 'break' || result.type === 'continue')) {
-                    return result;
-                }
-            }
-            
-            if (statement.elseBranch) {
-                for (const stmt of statement.elseBranch) {
-                    const result = await this.executeStatement(stmt);
-                    if (result && (result.type === 'return' || result.type === 'break' || result.type === 'continue')) {
-                        return result;
+            for (;;) {
+                const op = instructions[pc];
+                const arg = instructions[pc + 1];
+                pc += 2;
+
+                switch (op) {
+                    case 1 /* LOAD_CONST */:
+                        stack[sp++] = constants[arg];
+                        break;
+
+                    case 2 /* LOAD_FAST */: {
+                        const value = frame[arg];
+                        if (value === undefined) throw this.unboundError(code.slotNames[arg], false);
+                        stack[sp++] = value;
+                        break;
                     }
-                }
-            }
-        } catch (error) {
-            for (const exceptClause of statement.exceptClauses) {
-                if (!exceptClause.exceptionType || error instanceof this.getVariable(exceptClause.exceptionType)) {
-                    for (const stmt of exceptClause.body) {
-                        const result = await this.executeStatement(stmt);
-                        if (result && (result.type === 'return' || result.type === 'break' || result.type === 'continue')) {
+
+                    case 59 /* LOAD_FAST_LOAD_FAST */: {
+                        const first = frame[arg & 0xffff];
+                        const second = frame[arg >>> 16];
+                        if (first === undefined) throw this.unboundError(code.slotNames[arg & 0xffff], false);
+                        if (second === undefined) throw this.unboundError(code.slotNames[arg >>> 16], false);
+                        stack[sp++] = first;
+                        stack[sp++] = second;
+                        break;
+                    }
+
+                    case 60 /* LOAD_FAST_CONST */: {
+                        const value = frame[arg & 0xffff];
+                        if (value === undefined) throw this.unboundError(code.slotNames[arg & 0xffff], false);
+                        stack[sp++] = value;
+                        stack[sp++] = constants[arg >>> 16];
+                        break;
+                    }
+
+                    case 3 /* LOAD_DEREF */: {
+                        const value = frame[arg].value;
+                        if (value === undefined) {
+                            const name = code.slotNames[arg];
+                            throw this.unboundError(name, code.freeNames.has(name));
+                        }
+                        stack[sp++] = value;
+                        break;
+                    }
+
+                    case 4 /* LOAD_GLOBAL */: {
+                        const name = names[arg];
+                        const globals = frame[0];
+                        let value = globals[name];
+                        if (value === undefined && !(name in globals)) {
+                            if (!(name in this.builtins)) throw new this.builtins.NameError(`name '${name}' is not defined`);
+                            value = this.builtins[name];
+                        }
+                        stack[sp++] = value;
+                        break;
+                    }
+
+                    case 5 /* LOAD_CLASS */: {
+                        const name = names[arg];
+                        const namespace = frame[1];
+                        if (name in namespace) {
+                            stack[sp++] = namespace[name];
+                        } else {
+                            const globals = frame[0];
+                            if (name in globals) stack[sp++] = globals[name];
+                            else if (name in this.builtins) stack[sp++] = this.builtins[name];
+                            else throw new this.builtins.NameError(`name '${name}' is not defined`);
+                        }
+                        break;
+                    }
+
+                    case 6 /* STORE_FAST */:
+                        frame[arg] = stack[--sp];
+                        break;
+
+                    case 7 /* STORE_DEREF */:
+                        frame[arg].value = stack[--sp];
+                        break;
+
+                    case 8 /* STORE_GLOBAL */:
+                        frame[0][names[arg]] = stack[--sp];
+                        break;
+
+                    case 9 /* STORE_CLASS */:
+                        frame[1][names[arg]] = stack[--sp];
+                        break;
+
+                    case 10 /* STORE_ATTR */: {
+                        const object = stack[--sp];
+                        this.setAttribute(object, names[arg], stack[--sp]);
+                        break;
+                    }
+
+                    case 11 /* STORE_SUBSCR */: {
+                        const index = stack[--sp];
+                        const object = stack[--sp];
+                        this.setItem(object, index, stack[--sp]);
+                        break;
+                    }
+
+                    case 12 /* STORE_TARGET */:
+                        constants[arg](frame, stack[--sp]);
+                        break;
+
+                    case 13 /* UNPACK_SEQUENCE */: {
+                        const value = stack[--sp];
+                        const values = Array.isArray(value) ? value : [...this.iterate(value)];
+                        if (values.length !== arg) {
+                            throw new this.builtins.ValueError(values.length > arg
+                                ? `too many values to unpack (expected ${arg})`
+                                : `not enough values to unpack (expected ${arg}, got ${values.length})`);
+                        }
+                        for (let i = arg - 1; i >= 0; i--) stack[sp++] = values[i];
+                        break;
+                    }
+
+                    case 14 /* LOAD_ATTR */:
+                        stack[sp - 1] = this.inlineCaches
+                            ? this.loadCachedAttribute(caches[arg], stack[sp - 1])
+                            : this.getAttribute(stack[sp - 1], caches[arg].attribute);
+                        break;
+
+                    case 15 /* LOAD_METHOD */: {
+                        const receiver = stack[sp - 1];
+                        const cache = caches[arg];
+                        const entry = this.inlineCaches ? this.cachedMethodEntry(cache, receiver) : -1;
+                        stack[sp++] = entry >= 0 ? cache.methods[entry] : this.getMethod(receiver, cache.attribute);
+                        break;
+                    }
+
+                    case 16 /* BINARY_SUBSCR */: {
+                        const index = stack[--sp];
+                        stack[sp - 1] = this.getItem(stack[sp - 1], index);
+                        break;
+                    }
+
+                    case 17 /* BINARY_SLICE */: {
+                        const step = stack[--sp];
+                        const upper = stack[--sp];
+                        const lower = stack[--sp];
+                        stack[sp - 1] = this.sliceSequence(stack[sp - 1], { lower, upper, step });
+                        break;
+                    }
+
+                    case 18 /* BINARY_OP */: {
+                        const right = stack[--sp];
+                        stack[sp - 1] = constants[arg](stack[sp - 1], right);
+                        break;
+                    }
+
+                    case 19 /* BINARY_ADD */: {
+                        const right = stack[--sp];
+                        const left = stack[sp - 1];
+                        if (typeof left === 'number' && typeof right === 'number') {
+                            const result = left + right;
+                            stack[sp - 1] = result <= Number.MAX_SAFE_INTEGER && result >= Number.MIN_SAFE_INTEGER ? result : this.binaryOperators['+'](left, right);
+                        } else if (typeof left === 'string' && typeof right === 'string') {
+                            stack[sp - 1] = left + right;
+                        } else {
+                            stack[sp - 1] = this.binaryOperators['+'](left, right);
+                        }
+                        break;
+                    }
+
+                    case 20 /* BINARY_SUBTRACT */: {
+                        const right = stack[--sp];
+                        const left = stack[sp - 1];
+                        if (typeof left === 'number' && typeof right === 'number') {
+                            const result = left - right;
+                            stack[sp - 1] = result <= Number.MAX_SAFE_INTEGER && result >= Number.MIN_SAFE_INTEGER ? result : this.binaryOperators['-'](left, right);
+                        } else {
+                            stack[sp - 1] = this.binaryOperators['-'](left, right);
+                        }
+                        break;
+                    }
+
+                    case 21 /* BINARY_MULTIPLY */: {
+                        const right = stack[--sp];
+                        const left = stack[sp - 1];
+                        if (typeof left === 'number' && typeof right === 'number') {
+                            const result = left * right;
+                            stack[sp - 1] = result <= Number.MAX_SAFE_INTEGER && result >= Number.MIN_SAFE_INTEGER ? result : this.binaryOperators['*'](left, right);
+                        } else {
+                            stack[sp - 1] = this.binaryOperators['*'](left, right);
+                        }
+                        break;
+                    }
+
+                    case 22 /* BINARY_MODULO */: {
+                        const right = stack[--sp];
+                        const left = stack[sp - 1];
+                        if (typeof left === 'number' && typeof right === 'number' && right > 0) {
+                            const result = left % right;
+                            stack[sp - 1] = result < 0 ? result + right : result;
+                        } else {
+                            stack[sp - 1] = this.binaryOperators['%'](left, right);
+                        }
+                        break;
+                    }
+
+                    case 23 /* COMPARE_LT */: {
+                        const right = stack[--sp];
+                        const left = stack[sp - 1];
+                        stack[sp - 1] = typeof left === 'object' && left !== null ? this.binaryOperators['<'](left, right) : left < right;
+                        break;
+                    }
+
+                    case 24 /* COMPARE_LE */: {
+                        const right = stack[--sp];
+                        const left = stack[sp - 1];
+                        stack[sp - 1] = typeof left === 'object' && left !== null ? this.binaryOperators['<='](left, right) : left <= right;
+                        break;
+                    }
+
+                    case 25 /* COMPARE_GT */: {
+                        const right = stack[--sp];
+                        const left = stack[sp - 1];
+                        stack[sp - 1] = typeof left === 'object' && left !== null ? this.binaryOperators['>'](left, right) : left > right;
+                        break;
+                    }
+
+                    case 26 /* COMPARE_GE */: {
+                        const right = stack[--sp];
+                        const left = stack[sp - 1];
+                        stack[sp - 1] = typeof left === 'object' && left !== null ? this.binaryOperators['>='](left, right) : left >= right;
+                        break;
+                    }
+
+                    case 27 /* COMPARE_EQ */: {
+                        const right = stack[--sp];
+                        const left = stack[sp - 1];
+                        stack[sp - 1] = left === right || (typeof left !== typeof right || typeof left === 'object') && pyEquals(left, right);
+                        break;
+                    }
+
+                    case 28 /* COMPARE_NE */: {
+                        const right = stack[--sp];
+                        const left = stack[sp - 1];
+                        stack[sp - 1] = left !== right && !((typeof left !== typeof right || typeof left === 'object') && pyEquals(left, right));
+                        break;
+                    }
+
+                    case 29 /* UNARY_NOT */:
+                        stack[sp - 1] = !stack[sp - 1];
+                        break;
+
+                    case 30 /* UNARY_NEGATIVE */:
+                        stack[sp - 1] = -stack[sp - 1];
+                        break;
+
+                    case 31 /* UNARY_POSITIVE */:
+                        if (typeof stack[sp - 1] !== 'bigint') stack[sp - 1] = +stack[sp - 1];
+                        break;
+
+                    case 32 /* UNARY_INVERT */:
+                        stack[sp - 1] = invertInt(stack[sp - 1]);
+                        break;
+
+                    case 33 /* POP_TOP */:
+                        sp--;
+                        break;
+
+                    case 34 /* DUP_TOP */:
+                        stack[sp] = stack[sp - 1];
+                        sp++;
+                        break;
+
+                    case 35 /* JUMP */:
+                        // Loops jump backwards once per iteration.
+                        if (arg < pc && ++this.steps >= this.stepCheck) {
+                            this.checkSteps(code, frame, pc);
+                            pc = arg;
+                            if (this.pendingSuspend >= 0 && this.vmRuns === 1) {
+                                return this.suspendRun(code, frame, stack, sp, pc, scope, entryDepth);
+                            }
+                            break;
+                        }
+                        pc = arg;
+                        break;
+
+                    case 61 /* COMPARE_JUMP_IF_FALSE */: {
+                        const right = stack[--sp];
+                        const left = stack[--sp];
+                        let result;
+                        if (typeof left !== typeof right || typeof left === 'object') {
+                            result = this.binaryOperators[COMPARE_OPERATORS[arg & 7]](left, right);
+                        } else {
+                            switch (arg & 7) {
+                                case 0: result = left < right; break;
+                                case 1: result = left <= right; break;
+                                case 2: result = left > right; break;
+                                case 3: result = left >= right; break;
+                                case 4: result = left === right; break;
+                                default: result = left !== right;
+                            }
+                        }
+                        if (!result) pc = arg >> 3;
+                        break;
+                    }
+
+                    case 36 /* POP_JUMP_IF_FALSE */:
+                        if (!stack[--sp]) pc = arg;
+                        break;
+
+                    case 37 /* POP_JUMP_IF_TRUE */:
+                        if (stack[--sp]) pc = arg;
+                        break;
+
+                    case 38 /* JUMP_IF_FALSE_OR_POP */:
+                        if (!stack[sp - 1]) pc = arg;
+                        else sp--;
+                        break;
+
+                    case 39 /* JUMP_IF_TRUE_OR_POP */:
+                        if (stack[sp - 1]) pc = arg;
+                        else sp--;
+                        break;
+
+                    case 40 /* GET_ITER */: {
+                        const iterable = this.iterate(stack[sp - 1]);
+                        // Lists are walked by index, ranges arithmetically, everything else through the iterator protocol.
+                        stack[sp - 1] = Array.isArray(iterable) ? { items: iterable, index: 0 } : iterable[Symbol.iterator]();
+                        break;
+                    }
+
+                    case 41 /* FOR_ITER */: {
+                        const iterator = stack[sp - 1];
+                        if (iterator.items !== undefined) {
+                            if (iterator.index < iterator.items.length) {
+                                stack[sp++] = iterator.items[iterator.index++];
+                            } else {
+                                sp--;
+                                pc = arg;
+                            }
+                        } else if (iterator instanceof RangeIterator) {
+                            if (iterator.remaining > 0) {
+                                stack[sp++] = iterator.current;
+                                iterator.current += iterator.step;
+                                iterator.remaining--;
+                            } else {
+                                sp--;
+                                pc = arg;
+                            }
+                        } else {
+                            const sampling = this.sampler !== null;
+                            if (sampling) this.enterSampledCall(code, frame, pc);
+                            const next = iterator.next();
+                            if (sampling) this.leaveSampledCall();
+                            if (next.done) {
+                                sp--;
+                                pc = arg;
+                            } else {
+                                stack[sp++] = next.value;
+                            }
+                        }
+                        break;
+                    }
+
+                    case 42 /* BUILD_LIST */:
+                    case 43 /* BUILD_TUPLE */:
+                    case 44 /* BUILD_SET */: {
+                        sp -= arg;
+                        const items = new Array(arg);
+                        for (let i = 0; i < arg; i++) items[i] = stack[sp + i];
+                        if (op === OP_BUILD_TUPLE) items.__class__ = 'tuple';
+                        stack[sp++] = op === OP_BUILD_SET ? new PySet(items) : items;
+                        break;
+                    }
+
+                    case 45 /* BUILD_DICT */: {
+                        sp -= 2 * arg;
+                        const dict = new PyDict();
+                        for (let i = 0; i < arg; i++) dict.set(stack[sp + 2 * i], stack[sp + 2 * i + 1]);
+                        stack[sp++] = dict;
+                        break;
+                    }
+
+                    case 46 /* BUILD_KWARGS */: {
+                        const keywordNames = constants[arg];
+                        sp -= keywordNames.length;
+                        const values = {};
+                        for (let i = 0; i < keywordNames.length; i++) {
+                            if (keywordNames[i] === null) this.mergeKeywords(values, stack[sp + i]);
+                            else values[keywordNames[i]] = stack[sp + i];
+                        }
+                        stack[sp++] = values;
+                        break;
+                    }
+
+                    case 47 /* CALL */:
+                    case 48 /* CALL_METHOD */: {
+                        const base = sp - arg;
+                        const func = stack[base - 1];
+                        let record = typeof func === 'function' ? func[VM_FUNCTION] : undefined;
+                        const method = op === OP_CALL_METHOD && record === undefined && typeof func === 'function'
+                            ? func[METHOD_FUNCTION] : undefined;
+                        let callee;
+                        if (record !== undefined && record.signature.accepts(arg)) {
+                            callee = this.bytecodeFrame(record, stack, base, arg);
+                        } else if (method !== undefined && method[VM_FUNCTION] !== undefined && method[VM_FUNCTION].signature.accepts(arg + 1)) {
+                            // A method shared through the class prototype: the receiver becomes self.
+                            stack[base - 1] = stack[base - 2];
+                            record = method[VM_FUNCTION];
+                            callee = this.bytecodeFrame(record, stack, base - 1, arg + 1);
+                        }
+                        if (callee !== undefined) {
+                            if (++this.steps >= this.stepCheck) this.checkSteps(code, frame, pc);
+                            this.pushActivation(code, frame, stack, op === OP_CALL_METHOD ? base - 2 : base - 1, pc, scope);
+                            code = record.code;
+                            frame = callee;
+                            scope = record.scope;
+                            stack = code.stacks.length > 0 ? code.stacks.pop() : new Array(code.stackSize).fill(null);
+                            sp = 0;
+                            pc = 0;
+                            instructions = code.instructions;
+                            constants = code.constants;
+                            names = code.names;
+                            caches = code.caches;
+                            if (this.pendingSuspend >= 0 && this.vmRuns === 1) {
+                                return this.suspendRun(code, frame, stack, sp, pc, scope, entryDepth);
+                            }
+                            break;
+                        }
+
+                        const args = new Array(arg);
+                        for (let i = 0; i < arg; i++) args[i] = stack[base + i];
+                        const sampling = this.sampler !== null;
+                        if (sampling) this.enterSampledCall(code, frame, pc);
+                        let result;
+                        if (method !== undefined) {
+                            result = method(stack[base - 2], ...args);
+                        } else {
+                            result = op === OP_CALL_METHOD
+                                ? this.callFunction(func, args, null, stack[base - 2])
+                                : this.callFunction(func, args);
+                        }
+                        if (sampling) this.leaveSampledCall();
+                        sp = op === OP_CALL_METHOD ? base - 2 : base - 1;
+                        stack[sp++] = result;
+                        if (this.pendingSuspend >= 0 && this.vmRuns === 1) {
+                            return this.suspendRun(code, frame, stack, sp, pc, scope, entryDepth);
+                        }
+                        break;
+                    }
+
+                    case 49 /* CALL_EX */: {
+                        const keywords = arg & CALL_EX_KEYWORDS ? stack[--sp] : null;
+                        let args = stack[--sp];
+                        const func = stack[--sp];
+                        const thisArg = arg & CALL_EX_METHOD ? stack[--sp] : undefined;
+                        let record = typeof func === 'function' ? func[VM_FUNCTION] : undefined;
+                        if (record === undefined && arg & CALL_EX_METHOD && typeof func === 'function' && func[METHOD_FUNCTION] !== undefined) {
+                            record = func[METHOD_FUNCTION][VM_FUNCTION];
+                            if (record !== undefined) args = [thisArg, ...args];
+                        }
+                        if (record !== undefined) {
+                            // Like CALL, the callee runs in this loop, so keyword recursion does not grow the JS stack.
+                            if (keywords) args.push(new KeywordArguments(keywords));
+                            const callee = this.boundBytecodeFrame(record, args);
+                            if (++this.steps >= this.stepCheck) this.checkSteps(code, frame, pc);
+                            this.pushActivation(code, frame, stack, sp, pc, scope);
+                            code = record.code;
+                            frame = callee;
+                            scope = record.scope;
+                            stack = code.stacks.length > 0 ? code.stacks.pop() : new Array(code.stackSize).fill(null);
+                            sp = 0;
+                            pc = 0;
+                            instructions = code.instructions;
+                            constants = code.constants;
+                            names = code.names;
+                            caches = code.caches;
+                            if (this.pendingSuspend >= 0 && this.vmRuns === 1) {
+                                return this.suspendRun(code, frame, stack, sp, pc, scope, entryDepth);
+                            }
+                            break;
+                        }
+                        const sampling = this.sampler !== null;
+                        if (sampling) this.enterSampledCall(code, frame, pc);
+                        stack[sp++] = this.callFunction(func, args, keywords, thisArg);
+                        if (sampling) this.leaveSampledCall();
+                        if (this.pendingSuspend >= 0 && this.vmRuns === 1) {
+                            return this.suspendRun(code, frame, stack, sp, pc, scope, entryDepth);
+                        }
+                        break;
+                    }
+
+                    case 50 /* MAKE_FUNCTION */: {
+                        const entry = constants[arg];
+                        let count = 0;
+                        for (const hasDefault of entry.hasDefaults) if (hasDefault) count++;
+                        sp -= count;
+                        const defaults = stack.slice(sp, sp + count);
+                        stack[sp++] = this.makeBytecodeFunction(entry, defaults, frame);
+                        break;
+                    }
+
+                    case 51 /* MAKE_CLASS */: {
+                        const entry = constants[arg];
+                        sp -= entry.bases;
+                        const bases = stack.slice(sp, sp + entry.bases);
+                        const classFrame = new Array(entry.scope.size);
+                        classFrame[0] = frame[0];
+                        classFrame[1] = {};
+                        this.installCells(entry.scope, classFrame, this.captureCells(entry.scope, entry.outerScope, frame));
+                        stack[sp++] = this.createClass(entry.name, bases, this.codeRunner(entry.code), classFrame);
+                        this.classes.set(entry.name, entry.node);
+                        break;
+                    }
+
+                    case 52 /* DECORATE */: {
+                        const decorator = stack[--sp];
+                        stack[sp - 1] = this.callFunction(decorator, [stack[sp - 1]]);
+                        break;
+                    }
+
+                    case 53 /* EVAL */:
+                        if (this.sampler !== null) {
+                            this.enterSampledCall(code, frame, pc);
+                            stack[sp++] = constants[arg](frame);
+                            this.leaveSampledCall();
+                            break;
+                        }
+                        stack[sp++] = constants[arg](frame);
+                        break;
+
+                    case 54 /* EXEC */: {
+                        const entry = constants[arg];
+                        const sampling = this.sampler !== null;
+                        if (sampling) this.enterSampledCall(code, frame, pc);
+                        const result = entry.run(frame);
+                        if (sampling) this.leaveSampledCall();
+                        if (!result) break;
+                        if (result === BREAK_SIGNAL && entry.breakTarget >= 0) {
+                            pc = entry.breakTarget;
+                        } else if (result === CONTINUE_SIGNAL && entry.continueTarget >= 0) {
+                            pc = entry.continueTarget;
+                        } else if (!code.isFunction) {
+                            this.vmRuns--;
                             return result;
+                        } else {
+                            const value = result.type === 'return' ? result.value : null;
+                            this.releaseStack(code, stack);
+                            if (this.callDepth === entryDepth) {
+                                this.vmRuns--;
+                                return value;
+                            }
+                            this.releaseFrame(scope, frame);
+                            const caller = this.activations[--this.callDepth];
+                            code = caller.code;
+                            frame = caller.frame;
+                            stack = caller.stack;
+                            sp = caller.sp;
+                            pc = caller.pc;
+                            scope = caller.scope;
+                            caller.frame = caller.stack = null;
+                            instructions = code.instructions;
+                            constants = code.constants;
+                            names = code.names;
+                            caches = code.caches;
+                            stack[sp++] = value;
+                        }
+                        break;
+                    }
+
+                    case 56 /* RETURN_NONE */:
+                        if (!code.isFunction) {
+                            this.releaseStack(code, stack);
+                            this.vmRuns--;
+                            return null;
+                        }
+                        stack[sp++] = null;
+                        // falls through
+
+                    case 55 /* RETURN_VALUE */: {
+                        const value = stack[--sp];
+                        this.releaseStack(code, stack);
+                        if (this.callDepth === entryDepth) {
+                            this.vmRuns--;
+                            return code.isFunction ? value : { type: 'return', value };
                         }
+                        this.releaseFrame(scope, frame);
+                        const caller = this.activations[--this.callDepth];
+                        code = caller.code;
+                        frame = caller.frame;
+                        stack = caller.stack;
+                        sp = caller.sp;
+                        pc = caller.pc;
+                        scope = caller.scope;
+                        caller.frame = caller.stack = null;
+                        instructions = code.instructions;
+                        constants = code.constants;
+                        names = code.names;
+                        caches = code.caches;
+                        stack[sp++] = value;
+                        break;
                     }
-                    break;
+
+                    case 57 /* BREAK_OUT */:
+                        this.vmRuns--;
+                        return BREAK_SIGNAL;
+
+                    case 58 /* CONTINUE_OUT */:
+                        this.vmRuns--;
+                        return CONTINUE_SIGNAL;
+
+                    default:
+                        throw new Error(`Unknown opcode ${op} at ${pc - 2} in ${code.name}`);
                 }
             }
-        } finally {
-            if (statement.finallyBranch) {
-                for (const stmt of statement.finallyBranch) {
-                    await this.executeStatement(stmt);
-                }
+        } catch (error) {
+            this.recordTraceback(error, code, frame, pc - 2);
+            while (this.callDepth > entryDepth) {
+                const caller = this.activations[--this.callDepth];
+                this.recordTraceback(error, caller.code, caller.frame, caller.pc - 2);
+                // A call that was being sampled is unwound here rather than by leaveSampledCall.
+                if (caller.stack === null) this.nestedCalls++;
+                caller.frame = caller.stack = null;
             }
+            this.vmRuns--;
+            throw error;
         }
     }
 
-    async executeWithStatement(statement) {
-        const context = await this.evaluateNode(statement.context);
-        
-        if (context && typeof context.__enter__ === 'function') {
-            context.__enter__();
+    suspendRun(code, frame, stack, sp, pc, scope, entryDepth) {
+        const activations = this.activations.slice(entryDepth, this.callDepth).map(activation => ({ ...activation }));
+        for (let depth = entryDepth; depth < this.callDepth; depth++) {
+            this.activations[depth].frame = this.activations[depth].stack = null;
         }
-        
-        try {
-            for (const stmt of statement.body) {
-                const result = await this.executeStatement(stmt);
-                if (result && (result.type === 'return' || result.type === 'break' || result.type === 'continue')) {
-                    return result;
-                }
+        this.callDepth = entryDepth;
+        this.vmRuns--;
+        const delay = this.pendingSuspend;
+        this.pendingSuspend = -1;
+        return new VMSuspension(code, frame, stack, sp, pc, scope, activations, delay);
+    }
+
+    recordTraceback(error, code, frame, pc) {
+        if (!error || typeof error !== 'object') return;
+        if (!error.pythonTraceback) {
+            Object.defineProperty(error, 'pythonTraceback', { value: [], writable: true, configurable: true });
+        }
+        const traceback = error.pythonTraceback;
+        // A block run by try/with shares its function's frame and has already recorded the more precise line.
+        const last = traceback[traceback.length - 1];
+        if (last && last.frame === frame) return;
+        traceback.push({ name: code.name, line: code.lineAt(pc), frame });
+    }
+
+    formatTraceback(error) {
+        const lines = ['Traceback (most recent call last):'];
+        const traceback = error && error.pythonTraceback ? [...error.pythonTraceback].reverse() : [];
+        for (const entry of traceback) {
+            const file = entry.frame[0].__file__ || '<string>';
+            lines.push(`  File "${file}", line ${entry.line}, in ${entry.name}`);
+        }
+        if (error instanceof Error) {
+            lines.push(error.name && error.name !== 'Error' ? `${error.name}: ${error.message}` : error.message);
+        } else {
+            lines.push(this.toString(error));
+        }
+        return lines.join('\n');
+    }
+
+    disassemble(code) {
+        const lines = [];
+        const { instructions } = code;
+        for (let pc = 0; pc < instructions.length; pc += 2) {
+            const op = instructions[pc];
+            const arg = instructions[pc + 1];
+            let detail = '';
+            if (op === OP_LOAD_GLOBAL || op === OP_LOAD_CLASS || op === OP_STORE_GLOBAL || op === OP_STORE_CLASS ||
+                op === OP_STORE_ATTR) {
+                detail = ` (${code.names[arg]})`;
+            } else if (op === OP_LOAD_ATTR || op === OP_LOAD_METHOD) {
+                detail = ` (${code.caches[arg].attribute})`;
+            } else if (op === OP_LOAD_FAST || op === OP_LOAD_DEREF || op === OP_STORE_FAST || op === OP_STORE_DEREF) {
+                detail = ` (${code.slotNames[arg]})`;
+            } else if (op === OP_LOAD_CONST) {
+                detail = ` (${this.repr(code.constants[arg])})`;
+            } else if (op === OP_LOAD_FAST_LOAD_FAST) {
+                detail = ` (${code.slotNames[arg & 0xffff]}, ${code.slotNames[arg >>> 16]})`;
+            } else if (op === OP_LOAD_FAST_CONST) {
+                detail = ` (${code.slotNames[arg & 0xffff]}, ${this.repr(code.constants[arg >>> 16])})`;
+            } else if (op === OP_COMPARE_JUMP_IF_FALSE) {
+                detail = ` (${OPCODE_NAMES[COMPARE_KINDS[arg & 7]]} -> ${arg >> 3})`;
+            } else if (op === OP_MAKE_FUNCTION || op === OP_MAKE_CLASS) {
+                detail = ` (${code.constants[arg].name})`;
             }
-        } finally {
-            if (context && typeof context.__exit__ === 'function') {
-                context.__exit__();
+            lines.push(`${String(code.lineAt(pc)).padStart(4)} ${String(pc).padStart(5)} ${OPCODE_NAMES[op].padEnd(20)} ${arg}${detail}`);
+        }
+        for (const constant of code.constants) {
+            if (constant && constant.code instanceof CodeObject) {
+                lines.push('', `Disassembly of ${constant.code.name}:`, this.disassemble(constant.code));
             }
         }
+        return lines.join('\n');
     }
 
     logExecution(message) {
@@ -2559,9 +9457,9 @@ class PythonInterpreter {
         this.importedModules.clear();
         this.functions.clear();
         this.classes.clear();
-        this.scopeStack = [{}];
+        this.scopeStack = [{ __name__: '__main__' }];
         this.executionLog = [];
-        this.printOutput = [];
+        this.openOutput();
         this.initializeBuiltins();
         this.initializeStandardTypes();
     }
@@ -2583,14 +9481,16 @@ async function runPythonCode(code) {
         return {
             success: true,
             output: result || '',
-            error: null
+            error: null,
+            steps: pythonInterpreter.steps
         };
     } catch (error) {
         pythonInterpreter.logExecution(`Execution error: ${error.message}`);
         return {
             success: false,
             output: 'Operation did not work',
-            error: error.message
+            error: error.message,
+            steps: pythonInterpreter.steps
         };
     }
 }
@@ -0,0 +1,328 @@
+// Runs PythonInterpreter off the calling thread: in a Web Worker in the browser and in a
+// worker_threads Worker in node. This file is both the worker script and the host library.
+//
+// Messages from the host to a worker:
+//   { type: 'init', interpreterUrl, interpreter, isolate }  load the interpreter (sent once, first)
+//   { type: 'run', id, code, sample }                      run a script, sampling it when
+//                                                          sample holds SamplingProfiler options
+//   { type: 'cancel', id }                                 stop the script at its next pause
+// Messages from a worker to the host:
+//   { type: 'ready' }                                      the interpreter loaded (answers init)
+//   { type: 'stdout', id, chunk }                          printed output, in batches as it is printed
+//   { type: 'stderr', id, chunk }                          text written to sys.stderr, likewise
+//   { type: 'result', id, success, output, error, steps }  the script finished; a sampled run adds
+//                                                          profile: { samples, collapsed, speedscope }
+
+const IS_NODE = typeof process !== 'undefined' && !!(process.versions && process.versions.node);
+
+function serveWorker(port, loadInterpreter) {
+    let interpreter = null;
+    let validate = null;
+    let isolate = true;
+    let active = null;
+
+    const run = async ({ id, code, sample }) => {
+        active = id;
+        if (isolate) interpreter.reset();
+        if (sample) interpreter.startSampling(sample);
+        let message;
+        try {
+            if (!validate(code)) {
+                message = { type: 'result', id, success: false, output: '', error: 'Invalid Python code', steps: 0 };
+            } else {
+                const output = await interpreter.executeCode(code);
+                message = { type: 'result', id, success: true, output: output || '', error: null, steps: interpreter.steps };
+            }
+        } catch (error) {
+            message = { type: 'result', id, success: false, output: interpreter.getOutput(), error: error.message, steps: interpreter.steps };
+        }
+        if (sample) {
+            const sampler = interpreter.stopSampling();
+            message.profile = { samples: sampler.samples.length, collapsed: sampler.toCollapsed(), speedscope: sampler.toSpeedscope() };
+        }
+        active = null;
+        port.postMessage(message);
+    };
+
+    port.onMessage(message => {
+        switch (message.type) {
+            case 'init': {
+                const { PythonInterpreter, validatePythonCode } = loadInterpreter(message.interpreterUrl);
+                interpreter = new PythonInterpreter(message.interpreter || {});
+                interpreter.onStdout = chunk => port.postMessage({ type: 'stdout', id: active, chunk });
+                interpreter.onStderr = chunk => port.postMessage({ type: 'stderr', id: active, chunk });
+                validate = validatePythonCode;
+                isolate = message.isolate !== false;
+                port.postMessage({ type: 'ready' });
+                break;
+            }
+            case 'run':
+                run(message);
+                break;
+            case 'cancel':
+                if (message.id === active) interpreter.cancel();
+                break;
+        }
+    });
+}
+
+function defaultConcurrency() {
+    if (IS_NODE) {
+        const os = require('os');
+        return os.availableParallelism ? os.availableParallelism() : os.cpus().length;
+    }
+    return (typeof navigator !== 'undefined' && navigator.hardwareConcurrency) || 4;
+}
+
+// Owns one worker and runs scripts on it one at a time, in the order they were submitted.
+// Options: interpreter (PythonInterpreter options), isolate (reset globals between scripts,
+// default true), cancelTimeout (ms to wait for a cancelled script before terminating the worker),
+// workerUrl and interpreterUrl (browser script locations).
+class PythonWorkerHost {
+    constructor(options = {}) {
+        this.options = options;
+        this.cancelTimeout = options.cancelTimeout !== undefined ? options.cancelTimeout : 250;
+        this.worker = null;
+        this.ready = false;
+        this.current = null;
+        this.nextId = 1;
+        this.pending = 0;
+        this.tail = Promise.resolve();
+    }
+
+    get busy() {
+        return this.pending > 0;
+    }
+
+    // Resolves with { success, output, error, steps } like runPythonCode, plus cancelled: true when the
+    // run was stopped through options.signal. options.onStdout and options.onStderr receive output
+    // in batches as the script writes it. With options.sample (SamplingProfiler options, e.g.
+    // { interval: 1 }), the result also holds profile: { samples, collapsed, speedscope }.
+    // Rejects when no worker can be started or loaded, so that callers can run the script elsewhere.
+    run(code, options = {}) {
+        this.pending++;
+        const result = this.tail.then(() => this.execute(code, options));
+        const done = () => {
+            if (--this.pending === 0) this.idle();
+        };
+        this.tail = result.then(done, done);
+        return result;
+    }
+
+    execute(code, { onStdout = null, onStderr = null, signal = null, sample = null } = {}) {
+        if (signal && signal.aborted) return Promise.resolve(cancelledResult(''));
+        const worker = this.ensureWorker();
+        return new Promise((resolve, reject) => {
+            const run = {
+                id: this.nextId++, resolve, reject, onStdout, onStderr, signal,
+                output: [], outputSize: 0, cancelled: false, timer: null, onAbort: null
+            };
+            if (signal) {
+                run.onAbort = () => this.cancel(run);
+                signal.addEventListener('abort', run.onAbort);
+            }
+            this.current = run;
+            if (IS_NODE) worker.ref();
+            worker.postMessage({ type: 'run', id: run.id, code, sample });
+        });
+    }
+
+    cancel(run) {
+        if (this.current !== run || run.cancelled) return;
+        run.cancelled = true;
+        this.worker.postMessage({ type: 'cancel', id: run.id });
+        // Scripts that never pause cannot see the request; replace their worker instead.
+        run.timer = setTimeout(() => {
+            if (this.current !== run) return;
+            this.destroyWorker();
+            this.finish(cancelledResult(this.outputOf(run)));
+        }, this.cancelTimeout);
+    }
+
+    finish(result, error = null) {
+        const run = this.current;
+        this.current = null;
+        if (run.timer !== null) clearTimeout(run.timer);
+        if (run.signal) run.signal.removeEventListener('abort', run.onAbort);
+        if (error !== null) {
+            run.reject(error);
+            return;
+        }
+        if (run.cancelled) result.cancelled = true;
+        run.resolve(result);
+    }
+
+    handleMessage(message) {
+        if (message.type === 'ready') {
+            this.ready = true;
+            return;
+        }
+        const run = this.current;
+        if (run === null || message.id !== run.id) return;
+        if (message.type === 'stdout') {
+            this.keepOutput(run, message.chunk);
+            if (run.onStdout) run.onStdout(message.chunk);
+        } else if (message.type === 'stderr') {
+            if (run.onStderr) run.onStderr(message.chunk);
+        } else if (message.type === 'result') {
+            const result = { success: message.success, output: message.output, error: message.error, steps: message.steps };
+            if (message.profile) result.profile = message.profile;
+            this.finish(result);
+        }
+    }
+
+    keepOutput(run, chunk) {
+        // The worker's own copy is lost if it has to be terminated, so the host keeps the tail.
+        const limit = (this.options.interpreter && this.options.interpreter.maxOutput) || Infinity;
+        run.output.push(chunk);
+        run.outputSize += chunk.length;
+        while (run.outputSize - run.output[0].length >= limit) run.outputSize -= run.output.shift().length;
+    }
+
+    outputOf(run) {
+        const text = run.output.join('');
+        return text.endsWith('\n') ? text.slice(0, -1) : text;
+    }
+
+    handleFailure(error) {
+        // A worker that never loaded the interpreter is a failure of the host, not of the script.
+        const loaded = this.ready;
+        this.destroyWorker();
+        if (this.current === null) return;
+        if (!loaded) {
+            this.finish(null, error instanceof Error ? error : new Error(String(error)));
+        } else {
+            this.finish({ success: false, output: this.outputOf(this.current), error: error.message || String(error) });
+        }
+    }
+
+    ensureWorker() {
+        if (this.worker !== null) return this.worker;
+        const init = {
+            type: 'init',
+            interpreterUrl: this.options.interpreterUrl || 'python_interpreter.js',
+            interpreter: this.options.interpreter || {},
+            isolate: this.options.isolate !== false
+        };
+        let worker;
+        if (IS_NODE) {
+            const { Worker } = require('worker_threads');
+            worker = new Worker(__filename, { workerData: { pythonWorker: true } });
+            worker.on('message', message => this.handleMessage(message));
+            worker.on('error', error => this.handleFailure(error));
+            worker.on('exit', code => {
+                if (this.worker === worker) this.handleFailure(new Error(`worker exited with code ${code}`));
+            });
+        } else {
+            worker = new Worker(this.options.workerUrl || 'python_worker.js');
+            worker.onmessage = event => this.handleMessage(event.data);
+            worker.onerror = event => {
+                event.preventDefault();
+                this.handleFailure(new Error(event.message));
+            };
+        }
+        worker.postMessage(init);
+        this.worker = worker;
+        return worker;
+    }
+
+    destroyWorker() {
+        const worker = this.worker;
+        this.worker = null;
+        this.ready = false;
+        if (worker !== null) worker.terminate();
+    }
+
+    idle() {
+        // An idle worker should not keep a node process alive.
+        if (IS_NODE && this.worker !== null) this.worker.unref();
+    }
+
+    terminate() {
+        this.destroyWorker();
+        if (this.current !== null) this.finish({ success: false, output: this.outputOf(this.current), error: 'worker terminated' });
+    }
+}
+
+function cancelledResult(output) {
+    return { success: false, output, error: 'execution cancelled', cancelled: true };
+}
+
+// Runs scripts on up to `size` workers at once (default: one per CPU core) and queues the rest.
+// Every other option is passed to the PythonWorkerHost of each worker. Like PythonWorkerHost.run,
+// run rejects when its worker cannot be started.
+class PythonWorkerPool {
+    constructor(options = {}) {
+        const { size, ...hostOptions } = options;
+        this.size = Math.max(1, size || defaultConcurrency());
+        this.hostOptions = hostOptions;
+        this.hosts = [];
+        this.queue = [];
+    }
+
+    run(code, options = {}) {
+        const { signal = null } = options;
+        if (signal && signal.aborted) return Promise.resolve(cancelledResult(''));
+        return new Promise((resolve, reject) => {
+            const job = { code, options, resolve, reject, onAbort: null };
+            if (signal) {
+                // A job still in the queue is cancelled here; a running one by its host.
+                job.onAbort = () => {
+                    const index = this.queue.indexOf(job);
+                    if (index !== -1) {
+                        this.queue.splice(index, 1);
+                        resolve(cancelledResult(''));
+                    }
+                };
+                signal.addEventListener('abort', job.onAbort);
+            }
+            this.queue.push(job);
+            this.dispatch();
+        });
+    }
+
+    dispatch() {
+        while (this.queue.length > 0) {
+            let host = this.hosts.find(candidate => !candidate.busy);
+            if (!host) {
+                if (this.hosts.length >= this.size) return;
+                host = new PythonWorkerHost(this.hostOptions);
+                this.hosts.push(host);
+            }
+            const job = this.queue.shift();
+            if (job.onAbort) job.options.signal.removeEventListener('abort', job.onAbort);
+            host.run(job.code, job.options).then(result => {
+                job.resolve(result);
+                this.dispatch();
+            }, error => {
+                job.reject(error);
+                this.dispatch();
+            });
+        }
+    }
+
+    terminate() {
+        for (const job of this.queue.splice(0)) job.resolve(cancelledResult(''));
+        for (const host of this.hosts) host.terminate();
+        this.hosts = [];
+    }
+}
+
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = { PythonWorkerHost, PythonWorkerPool, serveWorker };
+    const { isMainThread, parentPort, workerData } = require('worker_threads');
+    if (!isMainThread && workerData && workerData.pythonWorker) {
+        serveWorker({
+            postMessage: message => parentPort.postMessage(message),
+            onMessage: handler => parentPort.on('message', handler)
+        }, () => require(require('path').join(__dirname, 'python_interpreter.js')));
+    }
+} else if (typeof WorkerGlobalScope !== 'undefined' && self instanceof WorkerGlobalScope) {
+    serveWorker({
+        postMessage: message => self.postMessage(message),
+        onMessage: handler => { self.onmessage = event => handler(event.data); }
+    }, url => {
+        importScripts(url);
+        return { PythonInterpreter, validatePythonCode };
+    });
+}
@@ -0,0 +1,64 @@
+// Precompile Python modules into .pyast.json artifacts next to their sources.
+// loadModule() uses an artifact instead of parsing when its source hash matches.
+// Usage: node scripts/build_pyast.js [--clean] [dir ...]   (default: python_stdlib py_files)
+const fs = require('fs');
+const path = require('path');
+
+const ROOT = path.resolve(__dirname, '..');
+const { PythonInterpreter } = require(path.join(ROOT, 'python_interpreter.js'));
+
+const SUFFIX = '.pyast.json';
+const args = process.argv.slice(2);
+const clean = args.includes('--clean');
+const dirs = args.filter(arg => arg !== '--clean');
+if (dirs.length === 0) dirs.push('python_stdlib', 'py_files');
+
+function walk(dir, files = []) {
+    for (const entry of fs.readdirSync(dir, { withFileTypes: true })) {
+        if (entry.name === '__pycache__') continue;
+        const full = path.join(dir, entry.name);
+        if (entry.isDirectory()) walk(full, files);
+        else files.push(full);
+    }
+    return files;
+}
+
+const interpreter = new PythonInterpreter();
+let written = 0;
+let removed = 0;
+let sourceBytes = 0;
+let artifactBytes = 0;
+const failures = [];
+
+for (const dir of dirs) {
+    for (const file of walk(path.resolve(ROOT, dir))) {
+        if (clean) {
+            if (file.endsWith(SUFFIX)) {
+                fs.unlinkSync(file);
+                removed++;
+            }
+            continue;
+        }
+        if (!file.endsWith('.py')) continue;
+
+        const source = fs.readFileSync(file, 'utf8');
+        let artifact;
+        try {
+            artifact = interpreter.serializeAST(source);
+        } catch (error) {
+            failures.push(`${path.relative(ROOT, file)}: ${error.message}`);
+            continue;
+        }
+        fs.writeFileSync(file.slice(0, -3) + SUFFIX, artifact);
+        written++;
+        sourceBytes += source.length;
+        artifactBytes += artifact.length;
+    }
+}
+
+if (clean) {
+    console.log(`Removed ${removed} ${SUFFIX} artifacts`);
+} else {
+    console.log(`Wrote ${written} ${SUFFIX} artifacts (${(sourceBytes / 1024).toFixed(0)} KB source -> ${(artifactBytes / 1024).toFixed(0)} KB AST)`);
+    for (const failure of failures) console.log(`  skipped ${failure}`);
+}